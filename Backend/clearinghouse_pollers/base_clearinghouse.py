@@ -14,6 +14,8 @@ from typing import List, Dict, Any, Optional
 from uuid import UUID
 import logging
 
+from pollers.http_pool import get_http_registry, pool_options
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,6 +47,8 @@ class BaseClearinghousePoller(ABC):
                 - submitter_id: EDI submitter ID
                 - poll_interval_seconds: Polling interval (default 300)
                 - use_mock_data: Whether to use mock data
+                - http_max_connections, http_max_keepalive_connections,
+                  http_keepalive_expiry, http2: HTTP pool tuning (see pollers.http_pool)
             db_session_factory: SQLAlchemy async session factory
         """
         self.connection_id = connection_id
@@ -58,6 +62,12 @@ class BaseClearinghousePoller(ABC):
         self.api_base_url = config.get('api_base_url', '')
         self.submitter_id = config.get('submitter_id', '')
 
+        # Long-lived HTTP client from the registry shared with the EHR pollers
+        self.http = (
+            get_http_registry().acquire(connection_id, self.api_base_url, **pool_options(config))
+            if self.api_base_url else None
+        )
+
         # State
         self._is_running = False
 
@@ -271,4 +281,5 @@ class BaseClearinghousePoller(ABC):
             'use_mock_data': self.use_mock_data,
             'poll_interval_seconds': self.poll_interval,
             'metrics': self.metrics.copy(),
+            'http_pool': self.http.get_status() if self.http else None,
         }
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends, Request
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends, Request, Query
 from contextlib import asynccontextmanager
 from fastapi.responses import JSONResponse, FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
@@ -7,13 +7,12 @@ from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional, Union
 import sys
 import os
+import asyncio
 import yaml
 import json
 import logging
 import uuid
-from datetime import datetime
-from io import BytesIO
-import pandas as pd
+from datetime import date, datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, insert, update, delete
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -35,6 +34,11 @@ from medical_coding_ai.api.deps import get_current_user
 # Import poller scheduler
 from pollers.scheduler import start_pollers, stop_pollers
 from medical_coding_ai.middleware.audit import AuditMiddleware
+from medical_coding_ai.utils.audit_writer import get_audit_writer
+from medical_coding_ai.utils.export_stream import (
+    CLAIM_EXPORT_FIELDS, SESSION_CODE_FIELDS, SESSION_EXPORT_FIELDS, claim_export_batches, claim_export_query,
+    export_response, session_code_rows, session_export_batches, session_export_query, single_batch
+)
 from medical_coding_ai.middleware.security_headers import SecurityHeadersMiddleware
 from medical_coding_ai.utils.db import get_db
 from medical_coding_ai.models.medical_models import MedicalCodeParseResult
@@ -64,9 +68,16 @@ try:
     logger.info("Importing HCPCSAgent...")
     from agents.hcpcs_agent import HCPCSAgent
     logger.info("Importing DocumentProcessor...")
-    from utils.document_processor import DocumentProcessor
+    from utils.document_processor import DocumentProcessor, process_document_job, process_text_job
+    from utils.cpu_executor import get_cpu_executor, CPUExecutorFull, CPUTaskTimeout, CPUTaskCrashed
+    from utils.pdf_text import PDFBudgetExceeded
     logger.info("Importing CodeSearcher...")
     from utils.code_searcher import CodeSearcher
+    from utils.code_catalog import get_code_catalog
+    from utils.llm_client import get_llm_client, cancel_on_disconnect, ClientDisconnectedError
+    from utils.llm_cache import get_llm_cache, set_cache_tenant, bypass_llm_cache
+    from utils.embedding_service import get_embedding_service
+    from utils.pdf_ingestion import get_ingestion_tracker
     logger.info("Importing KnowledgeBaseManager...")
     from utils.kb_manager import KnowledgeBaseManager
     logger.info("All project modules imported successfully")
@@ -90,6 +101,9 @@ async def lifespan(app: FastAPI):
         logger.info("EHR pollers started successfully")
     except Exception as e:
         logger.warning(f"Failed to start EHR pollers: {e}. Continuing without pollers.")
+
+    # Background writer for request audit entries
+    get_audit_writer(app_config).start()
     
     yield
     
@@ -103,6 +117,13 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Error stopping pollers: {e}")
 
+    # Flush queued audit entries
+    await get_audit_writer().stop()
+    logger.info("Audit log writer stopped")
+
+    # Stop document processing workers
+    get_cpu_executor().shutdown()
+
 # Create FastAPI app
 app = FastAPI(
     title="Medical Coding AI API",
@@ -215,6 +236,7 @@ class AnalysisRequest(BaseModel):
     run_icd10: bool = True
     run_cpt: bool = True
     run_hcpcs: bool = False
+    force_reanalysis: bool = False  # Skip cached LLM responses
 
 class SearchRequest(BaseModel):
     query: str
@@ -223,6 +245,7 @@ class SearchRequest(BaseModel):
 class CodeVerificationRequest(BaseModel):
     session_id: str
     codes: List[Dict[str, Any]]
+    force_reverify: bool = False  # Skip cached LLM responses
 
 class ManualCodeRequest(BaseModel):
     session_id: str
@@ -269,11 +292,37 @@ def load_config():
         return {
             'ollama': {
                 'model_name': 'llama3.2:3b-instruct-q4_0',
-                'base_url': 'http://localhost:11434'
+                'base_url': 'http://localhost:11434',
+                'timeout': 120,
+                'max_concurrent_requests': 4
+            },
+            'audit_log': {
+                'max_queue_size': 10000,
+                'batch_size': 500,
+                'flush_interval_seconds': 1.0,
+                'spill_path': 'data/audit_spill.jsonl',
+                'dead_letter_path': 'data/audit_rejected.jsonl'
+            },
+            'document_upload': {
+                'max_bytes': 25 * 1024 * 1024,
+                'max_pages': 500
+            },
+            'cpu_executor': {
+                'workers': 0,
+                'max_queue': 32,
+                'timeout_seconds': 120
             },
             'vector_store': {
                 'dimension': 384,
-                'similarity_threshold': 0.7
+                'similarity_threshold': 0.7,
+                'index_type': 'hnsw',
+                'ef_search': 128
+            },
+            'embeddings': {
+                'backend': 'torch',
+                'max_batch_size': 32,
+                'max_wait_ms': 5,
+                'cache_size': 4096
             },
             'knowledge_base': {
                 'pdf_source_directory': 'knowledge_base_pdfs',
@@ -283,7 +332,10 @@ def load_config():
                 'chunk_size': 1000,
                 'chunk_overlap': 200,
                 'update_on_startup': False,
-                'auto_process_on_startup': False
+                'auto_process_on_startup': False,
+                'process_in_background': True,
+                'ingestion_workers': 0,
+                'pages_per_shard': 100
             },
             'agents': {
                 'confidence_threshold': 60,
@@ -301,22 +353,37 @@ def initialize_components():
         # Initialize document processor
         logger.info("Initializing document processor...")
         components['document_processor'] = DocumentProcessor()
+        get_cpu_executor(app_config)
         logger.info("Document processor initialized")
         
+        # Shared in-memory code catalog used by the searcher and agents
+        logger.info("Loading code catalog...")
+        components['code_catalog'] = get_code_catalog()
+        components['code_catalog'].get_snapshot()
+        logger.info("Code catalog loaded")
+        
         # Initialize code searcher
         logger.info("Initializing code searcher...")
-        components['code_searcher'] = CodeSearcher()
+        components['code_searcher'] = CodeSearcher(components['code_catalog'])
         logger.info("Code searcher initialized")
         
+        # One embedding model shared by the KB manager and every agent's
+        # vector store; loaded on first use
+        components['embedding_service'] = get_embedding_service(app_config)
+        
         # Initialize knowledge base manager
         logger.info("Initializing knowledge base manager...")
         components['kb_manager'] = KnowledgeBaseManager()
         logger.info("Knowledge base manager initialized")
         
+        # Shared async LLM client used by all agents
+        components['llm_client'] = get_llm_client(app_config)
+        components['llm_cache'] = get_llm_cache(app_config)
+        
         # Initialize master agent
         logger.info("Initializing master agent...")
         model_name = app_config.get('ollama', {}).get('model_name', 'llama3.2:3b-instruct-q4_0')
-        components['master_agent'] = MasterAgent(model_name)
+        components['master_agent'] = MasterAgent(model_name, code_searcher=components['code_searcher'])
         logger.info("Master agent initialized")
         
         logger.info("All components initialized successfully")
@@ -449,6 +516,33 @@ async def delete_session(session_id: str, user: User = Depends(get_current_user)
     return {"message": "Session deleted successfully"}
 
 # Document processing endpoints
+def _raise_cpu_job_error(error: Exception):
+    """Map document processing worker failures to HTTP errors"""
+    if isinstance(error, CPUExecutorFull):
+        raise HTTPException(status_code=503, detail="Document processing is busy, please retry shortly",
+                            headers={"Retry-After": "5"})
+    if isinstance(error, CPUTaskTimeout):
+        logger.error(f"Document processing timed out: {error}")
+        raise HTTPException(status_code=504, detail="Document processing timed out")
+    if isinstance(error, CPUTaskCrashed):
+        logger.error(f"Document processing worker crashed: {error}")
+        raise HTTPException(status_code=422, detail="The document could not be processed")
+    if isinstance(error, PDFBudgetExceeded):
+        raise HTTPException(status_code=413, detail=str(error))
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+async def _read_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """Read an upload in chunks, stopping as soon as it exceeds max_bytes (0 = no limit)"""
+    chunks = []
+    size = 0
+    while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+        size += len(chunk)
+        if max_bytes and size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"File exceeds the upload limit of {max_bytes} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
 @app.post("/api/document/upload")
 async def upload_document(
     file: UploadFile = File(...),
@@ -460,17 +554,13 @@ async def upload_document(
         # Create new session automatically
         session_id = uuid.uuid4()
         
-        # Read file content
-        content = await file.read()
+        # Read file content within the upload budget
+        upload_config = app_config.get('document_upload') or {}
+        content = await _read_upload(file, upload_config.get('max_bytes', 0))
         
-        # Extract text based on file type
-        if file.filename.endswith('.pdf'):
-            text = components['document_processor'].extract_text_from_pdf(BytesIO(content))
-        else:
-            text = content.decode('utf-8')
-        
-        # Process and anonymize
-        processed_data = components['document_processor'].process_medical_text(text)
+        # Extract text based on file type, then process and anonymize (in a worker process)
+        text, processed_data = await get_cpu_executor().run(
+            process_document_job, content, file.filename, upload_config.get('max_pages', 0))
         
         # Prepare session data
         session_data = {
@@ -503,7 +593,10 @@ async def upload_document(
             "patient_data": processed_data
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
+        _raise_cpu_job_error(e)
         logger.error(f"Error processing document: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -517,8 +610,8 @@ async def process_text_document(
     try:
         session_id = uuid.uuid4()
         
-        # Process and anonymize text
-        processed_data = components['document_processor'].process_medical_text(request.text)
+        # Process and anonymize text (in a worker process)
+        processed_data = await get_cpu_executor().run(process_text_job, request.text)
         
         # Prepare session data
         session_data = {
@@ -550,7 +643,10 @@ async def process_text_document(
             "patient_data": processed_data
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
+        _raise_cpu_job_error(e)
         logger.error(f"Error processing text: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -558,6 +654,7 @@ async def process_text_document(
 @app.post("/api/analysis/run")
 async def run_analysis(
     request: AnalysisRequest,
+    http_request: Request,
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -572,18 +669,25 @@ async def run_analysis(
         if not components.get('master_agent'):
             raise HTTPException(status_code=500, detail="Master agent not initialized")
         
-        # Get document text
+        # Get document text, and the extraction cached when it was processed
         document_text = session_data.get('patient_data', {}).get('text', '')
         if not document_text:
             raise HTTPException(status_code=400, detail="No document text found")
-        
-        # Run analysis
-        results = components['master_agent'].analyze_document(
-            document_text,
-            run_icd10=request.run_icd10,
-            run_cpt=request.run_cpt,
-            run_hcpcs=request.run_hcpcs
-        )
+        extraction = session_data['patient_data'].get('clinical_extraction')
+        
+        # Run analysis; LLM calls are cancelled if the client goes away
+        set_cache_tenant(user.tenant_id)
+        with bypass_llm_cache(request.force_reanalysis):
+            results = await cancel_on_disconnect(
+                components['master_agent'].analyze_document(
+                    document_text,
+                    run_icd10=request.run_icd10,
+                    run_cpt=request.run_cpt,
+                    run_hcpcs=request.run_hcpcs,
+                    extraction=extraction
+                ),
+                http_request.is_disconnected
+            )
         
         # Get suggested codes
         suggested_codes = components['master_agent'].get_code_suggestions(results)
@@ -606,6 +710,9 @@ async def run_analysis(
             "total_codes": len(suggested_codes)
         }
         
+    except ClientDisconnectedError:
+        logger.info(f"Client disconnected, analysis cancelled for session {request.session_id}")
+        raise HTTPException(status_code=499, detail="Client closed request")
     except Exception as e:
         logger.error(f"Error running analysis: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -810,6 +917,7 @@ async def remove_selected_code(
 @app.post("/api/codes/verify")
 async def verify_codes(
     request: CodeVerificationRequest,
+    http_request: Request,
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -835,10 +943,15 @@ async def verify_codes(
         codes_to_verify = request.codes if request.codes else session_data.get('selected_codes', [])
         
         # Verify codes
-        verification_results = components['master_agent'].verify_codes(
-            codes_to_verify,
-            document_data
-        )
+        set_cache_tenant(user.tenant_id)
+        with bypass_llm_cache(request.force_reverify):
+            verification_results = await cancel_on_disconnect(
+                components['master_agent'].verify_codes(
+                    codes_to_verify,
+                    document_data
+                ),
+                http_request.is_disconnected
+            )
         
         # Store results in session
         session_data['verification_results'] = verification_results
@@ -856,6 +969,9 @@ async def verify_codes(
             "total_verified": len(verification_results)
         }
         
+    except ClientDisconnectedError:
+        logger.info(f"Client disconnected, verification cancelled for session {request.session_id}")
+        raise HTTPException(status_code=499, detail="Client closed request")
     except Exception as e:
         logger.error(f"Error verifying codes: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -877,6 +993,17 @@ async def get_verification_results(
     }
 
 # Export endpoints
+async def _session_code_batches(session_id: str, db: AsyncSession, user_id: str):
+    """Export rows of one session's selected codes (400 if none are selected)"""
+    session_obj = await get_session_data(session_id, db, user_id)
+    session_data = session_obj.parse_result
+    
+    selected_codes = session_data.get('selected_codes', [])
+    if not selected_codes:
+        raise HTTPException(status_code=400, detail="No codes selected for export")
+    
+    return single_batch(list(session_code_rows(selected_codes, session_data.get('verification_results'))))
+
 @app.get("/api/export/csv/{session_id}")
 async def export_csv(
     session_id: str,
@@ -885,71 +1012,12 @@ async def export_csv(
 ):
     """Export session data as CSV with specific format"""
     try:
-        session_obj = await get_session_data(session_id, db, user.user_id)
-        session_data = session_obj.parse_result
-        
-        selected_codes = session_data.get('selected_codes', [])
-        if not selected_codes:
-            raise HTTPException(status_code=400, detail="No codes selected for export")
-        
-        # Prepare data for export with exact headers
-        export_data = []
-        for i, code in enumerate(selected_codes, 1):
-            # Determine AI confidence or Manual
-            confidence_value = code.get('confidence', 0)
-            if confidence_value > 0:
-                ai_confidence = f"{int(confidence_value * 100)}%"
-            else:
-                ai_confidence = "Manual"
-            
-            # Find verification result for this code
-            validation_score = "85%"  # Default
-            reason = ""
-            
-            verification_results = session_data.get('verification_results', [])
-            if verification_results:
-                for verification in verification_results:
-                    if verification.get('code') == code.get('code'):
-                        validation_score = f"{verification.get('verification_confidence', 85)}%"
-                        
-                        # Combine concerns and recommendations for reason
-                        concerns = verification.get('concerns', '').strip()
-                        recommendations = verification.get('recommendations', '').strip()
-                        
-                        if concerns or recommendations:
-                            reason_parts = []
-                            if concerns:
-                                reason_parts.append(f"Issue: {concerns}")
-                            if recommendations:
-                                reason_parts.append(f"Recommendation: {recommendations}")
-                            reason = " | ".join(reason_parts)
-                        else:
-                            reason = "No specific concerns identified"
-                        break
-            
-            code_data = {
-                'Sno': i,
-                'Code': code.get('code'),
-                'AI confidence score/Manual Code': ai_confidence,
-                'Validation score': validation_score,
-                'Reason': reason
-            }
-            
-            export_data.append(code_data)
-        
-        # Create DataFrame and convert to CSV
-        df = pd.DataFrame(export_data)
-        csv_data = df.to_csv(index=False)
-        
-        # Return CSV data as downloadable response
-        filename = f"medical_codes_{session_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        
-        return Response(
-            content=csv_data,
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+        batches = await _session_code_batches(session_id, db, user.user_id)
+        filename = f"medical_codes_{session_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        return export_response(batches, 'csv', SESSION_CODE_FIELDS, filename)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error exporting CSV: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -962,79 +1030,44 @@ async def export_excel(
 ):
     """Export session data as Excel with specific format"""
     try:
-        session_obj = await get_session_data(session_id, db, user.user_id)
-        session_data = session_obj.parse_result
-        
-        selected_codes = session_data.get('selected_codes', [])
-        if not selected_codes:
-            raise HTTPException(status_code=400, detail="No codes selected for export")
-        
-        # Prepare data for export with exact headers
-        export_data = []
-        for i, code in enumerate(selected_codes, 1):
-            # Determine AI confidence or Manual
-            confidence_value = code.get('confidence', 0)
-            if confidence_value > 0:
-                ai_confidence = f"{int(confidence_value * 100)}%"
-            else:
-                ai_confidence = "Manual"
-            
-            # Find verification result for this code
-            validation_score = "85%"  # Default
-            reason = ""
-            
-            verification_results = session_data.get('verification_results', [])
-            if verification_results:
-                for verification in verification_results:
-                    if verification.get('code') == code.get('code'):
-                        validation_score = f"{verification.get('verification_confidence', 85)}%"
-                        
-                        # Combine concerns and recommendations for reason
-                        concerns = verification.get('concerns', '').strip()
-                        recommendations = verification.get('recommendations', '').strip()
-                        
-                        if concerns or recommendations:
-                            reason_parts = []
-                            if concerns:
-                                reason_parts.append(f"Issue: {concerns}")
-                            if recommendations:
-                                reason_parts.append(f"Recommendation: {recommendations}")
-                            reason = " | ".join(reason_parts)
-                        else:
-                            reason = "No specific concerns identified"
-                        break
-            
-            code_data = {
-                'Sno': i,
-                'Code': code.get('code'),
-                'AI confidence score/Manual Code': ai_confidence,
-                'Validation score': validation_score,
-                'Reason': reason
-            }
-            
-            export_data.append(code_data)
-        
-        # Create DataFrame and convert to Excel
-        df = pd.DataFrame(export_data)
-        
-        # Create Excel file in memory
-        excel_buffer = BytesIO()
-        with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Medical Codes')
-        
-        excel_buffer.seek(0)
-        filename = f"medical_codes_{session_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        
-        return Response(
-            content=excel_buffer.read(),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+        batches = await _session_code_batches(session_id, db, user.user_id)
+        filename = f"medical_codes_{session_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        return export_response(batches, 'xlsx', SESSION_CODE_FIELDS, filename, sheet_name='Medical Codes')
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error exporting Excel: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/export/sessions")
+async def export_sessions(
+    format: str = Query('csv', pattern='^(csv|ndjson|xlsx)$'),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream the selected codes of every session created in a date range (tenant-wide for admins)"""
+    query = session_export_query(user, date_from, date_to)
+    filename = f"medical_codes_{date_from or 'all'}_{date_to or 'all'}"
+    return export_response(session_export_batches(db, query), format, SESSION_EXPORT_FIELDS, filename,
+                           sheet_name='Medical Codes')
+
+@app.get("/api/export/claims")
+async def export_claims(
+    format: str = Query('csv', pattern='^(csv|ndjson|xlsx)$'),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream the tenant's claims with service dates in a date range"""
+    query = claim_export_query(user.tenant_id, date_from, date_to)
+    filename = f"claims_{date_from or 'all'}_{date_to or 'all'}"
+    return export_response(claim_export_batches(db, query), format, CLAIM_EXPORT_FIELDS, filename,
+                           sheet_name='Claims')
+
 @app.get("/api/export/{session_id}/json")
 async def export_json(
     session_id: str,
@@ -1069,6 +1102,29 @@ async def export_json(
         logger.error(f"Error exporting JSON: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# LLM client and response cache status
+@app.get("/api/llm/status")
+async def get_llm_status(user: User = Depends(get_current_user)):
+    """Get LLM client and response cache metrics"""
+    llm_client = components.get('llm_client')
+    llm_cache = components.get('llm_cache')
+    return {
+        "client": llm_client.get_status() if llm_client else None,
+        "cache": llm_cache.get_status() if llm_cache else None
+    }
+
+# Audit log writer status
+@app.get("/api/audit/status")
+async def get_audit_status(user: User = Depends(get_current_user)):
+    """Get audit log queue depth and writer metrics"""
+    return get_audit_writer().get_status()
+
+# Document processing worker status
+@app.get("/api/document/workers/status")
+async def get_document_workers_status(user: User = Depends(get_current_user)):
+    """Get document processing pool size, jobs and metrics"""
+    return get_cpu_executor().get_status()
+
 # Knowledge base management endpoints
 @app.get("/api/knowledge-base/status")
 async def get_knowledge_base_status():
@@ -1080,6 +1136,7 @@ async def get_knowledge_base_status():
         status = {}
         knowledge_base_pdfs_dir = os.path.join(project_root, '..', 'knowledge_base_pdfs')
         processed_dir = os.path.join(project_root, 'data', 'knowledge_base')
+        ingestion = get_ingestion_tracker().get_status()
         
         for kb_type in kb_types:
             # Check if PDF exists
@@ -1091,7 +1148,9 @@ async def get_knowledge_base_status():
             json_exists = os.path.exists(json_path)
             
             # Determine status
-            if pdf_exists and json_exists:
+            if ingestion.get(kb_type, {}).get('status') == 'running':
+                status_text = "Processing"
+            elif pdf_exists and json_exists:
                 status_text = "Ready"
             elif pdf_exists:
                 status_text = "Needs Processing"
@@ -1102,10 +1161,17 @@ async def get_knowledge_base_status():
                 "name": kb_names[kb_type],
                 "status": status_text,
                 "pdf_exists": pdf_exists,
-                "processed": json_exists
+                "processed": json_exists,
+                "ingestion": ingestion.get(kb_type)
             }
         
-        return {"knowledge_bases": status}
+        catalog = components.get('code_catalog')
+        embedding_service = components.get('embedding_service')
+        return {
+            "knowledge_bases": status,
+            "code_catalog": catalog.get_status() if catalog else None,
+            "embedding_service": embedding_service.get_status() if embedding_service else None
+        }
         
     except Exception as e:
         logger.error(f"Error getting knowledge base status: {e}")
@@ -1121,13 +1187,21 @@ async def process_knowledge_base(kb_type: str, user: User = Depends(get_current_
         if not components.get('kb_manager'):
             raise HTTPException(status_code=500, detail="Knowledge base manager not available")
         
-        # Process the knowledge base
-        success = components['kb_manager'].process_pdf_to_json(kb_type)
+        # Process the knowledge base off the event loop so status requests
+        # can report its progress meanwhile
+        success = await asyncio.to_thread(components['kb_manager'].process_pdf_to_json, kb_type)
         
         if success:
+            # Swap the new codes into the shared catalog right away instead
+            # of waiting for the next file change check
+            catalog_version = None
+            if components.get('code_catalog'):
+                catalog_version = components['code_catalog'].refresh(force=True).version
+            
             return {
                 "kb_type": kb_type,
                 "status": "processed",
+                "catalog_version": catalog_version,
                 "message": f"{kb_type.upper()} knowledge base processed successfully"
             }
         else:
@@ -1154,6 +1228,7 @@ async def root():
             "code_search": "/api/codes/search",
             "verification": "/api/codes/verify",
             "export": "/api/export/{session_id}/{format}",
+            "range_export": "/api/export/{sessions|claims}?format=csv|ndjson|xlsx&date_from=&date_to=",
             "knowledge_base": "/api/knowledge-base/status"
         },
         "documentation": "/docs"
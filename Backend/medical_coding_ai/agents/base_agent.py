@@ -1,4 +1,4 @@
-import ollama
+import asyncio
 import yaml
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
@@ -11,6 +11,10 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
 from utils.vector_store import VectorStore
+from utils.vector_index import code_documents
+from utils.code_catalog import get_code_catalog
+from utils.llm_client import get_llm_client
+from utils.llm_cache import get_llm_cache, LLMResponseCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,9 +26,11 @@ class BaseAgent(ABC):
     def __init__(self, model_name: str = "llama3.2:3b-instruct-q4_0", agent_type: str = "base"):
         self.model_name = model_name
         self.agent_type = agent_type
-        self.vector_store = VectorStore()
         self.knowledge_loaded = False
         self.config = self._load_config()
+        self.vector_store = VectorStore.from_config(self.config)
+        self.llm_client = get_llm_client(self.config)
+        self.llm_cache = get_llm_cache(self.config)
         
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from config.yaml"""
@@ -40,31 +46,42 @@ class BaseAgent(ABC):
             }
     
     @abstractmethod
-    def analyze_document(self, document_text: str) -> Dict[str, Any]:
+    async def analyze_document(self, document_text: str) -> Dict[str, Any]:
         """Analyze document for agent-specific information"""
         pass
     
     @abstractmethod
-    def suggest_codes(self, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def suggest_codes(self, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Suggest medical codes based on analysis"""
         pass
     
-    def load_knowledge_base(self, codes: List[Dict[str, Any]]):
-        """Load processed codes into vector store"""
+    def load_knowledge_base(self, codes: Optional[List[Dict[str, Any]]] = None):
+        """Load processed codes into vector store
+        
+        Args:
+            codes: Codes to load; defaults to this agent's codes from the
+                shared code catalog, served from the persisted index built
+                during PDF processing when it matches the catalog's source
+        """
+        if self.knowledge_loaded:
+            self.vector_store.clear()
+            self.knowledge_loaded = False
+        
+        if codes is None:
+            catalog = get_code_catalog()
+            catalog_type = self.agent_type.lower().replace('-', '')
+            source_hash = catalog.get_source_hash(catalog_type)
+            if source_hash and self.vector_store.load_persisted(catalog.data_dir / 'embeddings', catalog_type, source_hash):
+                self.knowledge_loaded = True
+                logger.info(f"Loaded persisted index with {self.vector_store.count()} codes for {self.agent_type}")
+                return
+            codes = catalog.get_codes(catalog_type)
+        
         if not codes:
             logger.warning(f"No codes provided for {self.agent_type}")
             return
             
-        documents = [code['text_chunk'] for code in codes]
-        metadata = [
-            {
-                'code': code['code'],
-                'description': code['description'],
-                'type': code['type'],
-                'agent': self.agent_type
-            }
-            for code in codes
-        ]
+        documents, metadata = code_documents(codes)
         
         self.vector_store.add_documents(documents, metadata)
         self.knowledge_loaded = True
@@ -92,8 +109,16 @@ class BaseAgent(ABC):
             logger.error(f"Error searching codes: {e}")
             return []
     
-    def query_llm_with_context(self, prompt: str, context_codes: List[Dict[str, Any]] = None) -> str:
-        """Query LLM with relevant code context"""
+    async def search_relevant_codes_async(self, query: str, k: int = 10) -> List[Dict[str, Any]]:
+        """Run search_relevant_codes in a worker thread so concurrent agents overlap"""
+        return await asyncio.to_thread(self.search_relevant_codes, query, k)
+    
+    async def query_llm_with_context(self, prompt: str, context_codes: List[Dict[str, Any]] = None) -> str:
+        """Query LLM with relevant code context
+        
+        Awaits the shared async LLM client so the event loop keeps serving
+        other requests; cancellation of the caller propagates to the request.
+        """
         context = ""
         if context_codes:
             context = f"Relevant {self.agent_type} codes for reference:\n"
@@ -102,14 +127,23 @@ class BaseAgent(ABC):
             context += "\n"
         
         full_prompt = f"{context}Query: {prompt}"
+        system_prompt = f'You are a medical coding specialist focusing on {self.agent_type} codes. Provide accurate, evidence-based coding suggestions with confidence scores.'
+        
+        # Identical prompts are answered from the response cache
+        cache_key = None
+        if self.llm_cache:
+            cache_key = LLMResponseCache.make_key(self.model_name, system_prompt, full_prompt)
+            cached = await self.llm_cache.get(cache_key)
+            if cached is not None:
+                return cached
         
         try:
-            response = ollama.chat(
+            response = await self.llm_client.chat(
                 model=self.model_name,
                 messages=[
                     {
                         'role': 'system', 
-                        'content': f'You are a medical coding specialist focusing on {self.agent_type} codes. Provide accurate, evidence-based coding suggestions with confidence scores.'
+                        'content': system_prompt
                     },
                     {
                         'role': 'user', 
@@ -117,7 +151,9 @@ class BaseAgent(ABC):
                     }
                 ]
             )
-            return response['message']['content']
+            if cache_key:
+                await self.llm_cache.set(cache_key, response)
+            return response
         except Exception as e:
             logger.error(f"LLM query failed: {e}")
             return f"Error: Unable to process request - {str(e)}"
@@ -133,5 +169,5 @@ class BaseAgent(ABC):
             'agent_type': self.agent_type,
             'model_name': self.model_name,
             'knowledge_loaded': self.knowledge_loaded,
-            'vector_store_size': len(self.vector_store.documents) if self.knowledge_loaded else 0
+            'vector_store_size': self.vector_store.count() if self.knowledge_loaded else 0
         }
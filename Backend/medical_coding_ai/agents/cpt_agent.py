@@ -1,13 +1,14 @@
 import re
 import sys
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # Add project root to path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
 from agents.base_agent import BaseAgent
+from utils.clinical_extraction import get_clinical_extractor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,15 +20,21 @@ class CPTAgent(BaseAgent):
         super().__init__(model_name, "CPT")
         self.code_pattern = r'\d{5}'
         
-    def analyze_document(self, document_text: str) -> Dict[str, Any]:
-        """Analyze document for procedure-related information"""
+    async def analyze_document(self, document_text: str,
+                               extraction: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Analyze document for procedure-related information
+        
+        extraction is the document's clinical extraction, when the caller
+        already has it (see utils/clinical_extraction)
+        """
         logger.info("Starting CPT analysis")
         
         # Extract procedure-related information
-        procedures = self._extract_procedures(document_text)
-        services = self._extract_services(document_text)
-        treatments = self._extract_treatments(document_text)
-        visits = self._extract_visits(document_text)
+        entities = get_clinical_extractor().extract(document_text, extraction)['cpt']
+        procedures = list(entities['procedures'])
+        services = list(entities['services'])
+        treatments = list(entities['treatments'])
+        visits = list(entities['visits'])
         
         # Search for relevant CPT codes using RAG
         search_terms = []
@@ -36,7 +43,7 @@ class CPTAgent(BaseAgent):
         search_terms.extend(treatments[:3])
         
         search_query = f"procedure service treatment: {' '.join(search_terms)}"
-        relevant_codes = self.search_relevant_codes(search_query, k=15)
+        relevant_codes = await self.search_relevant_codes_async(search_query, k=15)
         
         # Prepare context for LLM analysis
         context_window = self.config.get('agents', {}).get('context_window', 2000)
@@ -69,7 +76,7 @@ class CPTAgent(BaseAgent):
         """
         
         try:
-            analysis = self.query_llm_with_context(prompt, relevant_codes)
+            analysis = await self.query_llm_with_context(prompt, relevant_codes)
         except Exception as e:
             logger.error(f"Error in LLM analysis: {e}")
             analysis = "Analysis failed due to LLM error. Using extracted information only."
@@ -87,12 +94,12 @@ class CPTAgent(BaseAgent):
         }
         
         # Generate suggested codes based on the analysis
-        suggested_codes = self.suggest_codes(analysis_result)
+        suggested_codes = await self.suggest_codes(analysis_result)
         analysis_result["suggested_codes"] = suggested_codes
         
         return analysis_result
     
-    def suggest_codes(self, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def suggest_codes(self, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Suggest top 5 CPT codes with enhanced detection for prosthetic evaluations and medical procedures"""
         logger.info("Generating CPT code suggestions")
         
@@ -373,197 +380,6 @@ class CPTAgent(BaseAgent):
         logger.info(f"Generated {len(final_suggestions)} CPT suggestions with enhanced matching")
         return final_suggestions
     
-    def _extract_procedures(self, text: str) -> List[str]:
-        """Extract procedures from text with enhanced pattern matching"""
-        procedures = []
-        
-        # Enhanced CPT code extraction patterns
-        cpt_patterns = [
-            r'(\d{5})\s*-\s*([^\n\r]+)',  # 99214 - Description format
-            r'(\d{5})[:\s]+([^\n\r]+)',   # Alternative format
-            r'CPT[:\s]*(\d{5})[:\s]*([^\n\r]+)',  # CPT: code format
-            r'([LVGHIJK]\d{4})\s*-\s*([^\n\r]+)',  # HCPCS Level II codes like L6000, V2623
-        ]
-        
-        for pattern in cpt_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                if len(match) == 2:
-                    code, description = match
-                    procedures.append(f"{code.strip()} - {description.strip()}")
-        
-        # Section-based procedure extraction
-        procedure_sections = [
-            r'(?:ORDERED SERVICES|PROCEDURES)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)',
-            r'(?:SERVICES & PROCEDURES)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)',
-            r'(?:PROCEDURE|OPERATION|SURGERY)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)',
-            r'(?:SURGICAL PROCEDURE)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)',
-            r'(?:DIAGNOSTIC PROCEDURE)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)',
-            r'(?:INTERVENTION)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)'
-        ]
-        
-        for pattern in procedure_sections:
-            matches = re.findall(pattern, text, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                cleaned = self._clean_medical_text(match)
-                if cleaned and len(cleaned) > 5:
-                    procedures.append(cleaned)
-        
-        # Enhanced procedure keywords for prosthetic/rehabilitation cases
-        procedure_keywords = [
-            r'\b(prosthetic\s+(?:evaluation|assessment|fitting|adjustment))\b',
-            r'\b(artificial\s+(?:eye|limb)\s+(?:evaluation|fitting))\b',
-            r'\b(office\s+visit)\b',
-            r'\b(physical\s+performance\s+test)\b',
-            r'\b(consultation)\b',
-            r'\b(evaluation)\b',
-            r'\b(assessment)\b',
-            r'\b(biopsy|incision|excision|resection|repair|reconstruction)\b',
-            r'\b(endoscopy|colonoscopy|arthroscopy|laparoscopy)\b',
-            r'\b(catheterization|angioplasty|stent|ablation)\b',
-            r'\b(injection|infusion|transfusion)\b',
-            r'\b(suture|closure|drainage|debridement)\b',
-            r'\b(x-ray|CT scan|MRI|ultrasound|mammography)\b',
-            r'\b(EKG|ECG|echocardiogram|stress test)\b'
-        ]
-        
-        for pattern in procedure_keywords:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if match and len(match) > 3:
-                    procedures.append(match.strip().title())
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_procedures = []
-        for procedure in procedures:
-            procedure_clean = procedure.lower().strip()
-            if procedure_clean not in seen and len(procedure) > 3:
-                seen.add(procedure_clean)
-                unique_procedures.append(procedure)
-        
-        return unique_procedures[:15]  # Return top 15 procedures
-    
-    def _extract_services(self, text: str) -> List[str]:
-        """Extract medical services from text"""
-        services = []
-        
-        # Service patterns
-        service_patterns = [
-            r'(?:CONSULTATION|VISIT|EXAMINATION|ASSESSMENT)[:\s]*([^\n]+)',
-            r'(?:EVALUATION AND MANAGEMENT|E&M)[:\s]*([^\n]+)',
-            r'(?:OFFICE VISIT|CLINIC VISIT)[:\s]*([^\n]+)',
-            r'(?:FOLLOW.?UP|FOLLOW UP)[:\s]*([^\n]+)',
-            r'(?:COUNSELING|EDUCATION)[:\s]*([^\n]+)'
-        ]
-        
-        for pattern in service_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                cleaned = self._clean_medical_text(match)
-                if cleaned and len(cleaned) > 5:
-                    services.append(cleaned)
-        
-        # Service keywords
-        service_keywords = [
-            r'\b(consultation|examination|evaluation|assessment)\b',
-            r'\b(counseling|education|teaching|instruction)\b',
-            r'\b(monitoring|observation|surveillance)\b',
-            r'\b(interpretation|reading|review)\b'
-        ]
-        
-        for pattern in service_keywords:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if match and len(match) > 3:
-                    services.append(match.strip().title())
-        
-        return list(set([s.strip() for s in services if len(s.strip()) > 3]))[:10]
-    
-    def _extract_treatments(self, text: str) -> List[str]:
-        """Extract treatments from text"""
-        treatments = []
-        
-        # Treatment patterns
-        treatment_patterns = [
-            r'(?:TREATMENT|THERAPY|INTERVENTION)[:\s]*([^\n]+)',
-            r'(?:ADMINISTERED|GIVEN|PROVIDED)[:\s]*([^\n]+)',
-            r'(?:MEDICATION|DRUG|PRESCRIPTION)[:\s]*([^\n]+)',
-            r'(?:PHYSICAL THERAPY|OCCUPATIONAL THERAPY|SPEECH THERAPY)[:\s]*([^\n]+)'
-        ]
-        
-        for pattern in treatment_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                cleaned = self._clean_medical_text(match)
-                if cleaned and len(cleaned) > 5:
-                    treatments.append(cleaned)
-        
-        # Treatment keywords
-        treatment_keywords = [
-            r'\b(therapy|treatment|medication|prescription)\b',
-            r'\b(administration|injection|infusion)\b',
-            r'\b(rehabilitation|physiotherapy|occupational therapy)\b',
-            r'\b(chemotherapy|radiation|immunotherapy)\b'
-        ]
-        
-        for pattern in treatment_keywords:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if match and len(match) > 3:
-                    treatments.append(match.strip().title())
-        
-        return list(set([t.strip() for t in treatments if len(t.strip()) > 3]))[:10]
-    
-    def _extract_visits(self, text: str) -> List[str]:
-        """Extract visit information for E&M coding"""
-        visits = []
-        
-        # Visit patterns
-        visit_patterns = [
-            r'(?:OFFICE VISIT|CLINIC VISIT|HOSPITAL VISIT)[:\s]*([^\n]+)',
-            r'(?:NEW PATIENT|ESTABLISHED PATIENT)[:\s]*([^\n]+)',
-            r'(?:INITIAL VISIT|FOLLOW.?UP VISIT)[:\s]*([^\n]+)',
-            r'(?:CONSULTATION|REFERRAL)[:\s]*([^\n]+)'
-        ]
-        
-        for pattern in visit_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                cleaned = self._clean_medical_text(match)
-                if cleaned and len(cleaned) > 5:
-                    visits.append(cleaned)
-        
-        # Determine visit complexity indicators
-        complexity_indicators = {
-            'straightforward': ['routine', 'simple', 'straightforward', 'minimal'],
-            'low': ['low complexity', 'limited', 'minor'],
-            'moderate': ['moderate', 'intermediate', 'comprehensive'],
-            'high': ['high complexity', 'extensive', 'detailed', 'complex']
-        }
-        
-        text_lower = text.lower()
-        for complexity, keywords in complexity_indicators.items():
-            if any(keyword in text_lower for keyword in keywords):
-                visits.append(f"{complexity} complexity visit")
-        
-        return list(set(visits))[:5]
-    
-    def _clean_medical_text(self, text: str) -> str:
-        """Clean and normalize medical text"""
-        if not text:
-            return ""
-        
-        # Remove extra whitespace
-        cleaned = re.sub(r'\s+', ' ', text.strip())
-        
-        # Remove common artifacts
-        cleaned = re.sub(r'\d+\.\s*', '', cleaned)  # Remove numbering
-        cleaned = re.sub(r'^\W+', '', cleaned)      # Remove leading punctuation
-        cleaned = re.sub(r'\W+$', '', cleaned)      # Remove trailing punctuation
-        
-        return cleaned.strip()
-    
     def _format_codes_for_prompt(self, codes: List[Dict[str, Any]]) -> str:
         """Format codes for LLM prompt"""
         if not codes:
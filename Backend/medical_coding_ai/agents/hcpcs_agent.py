@@ -1,13 +1,14 @@
 import re
 import sys
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # Add project root to path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
 from agents.base_agent import BaseAgent
+from utils.clinical_extraction import get_clinical_extractor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,16 +20,22 @@ class HCPCSAgent(BaseAgent):
         super().__init__(model_name, "HCPCS")
         self.code_pattern = r'[A-Z]\d{4}'
         
-    def analyze_document(self, document_text: str) -> Dict[str, Any]:
-        """Analyze document for equipment/supply-related information"""
+    async def analyze_document(self, document_text: str,
+                               extraction: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Analyze document for equipment/supply-related information
+        
+        extraction is the document's clinical extraction, when the caller
+        already has it (see utils/clinical_extraction)
+        """
         logger.info("Starting HCPCS analysis")
         
         # Extract HCPCS-related information
-        equipment = self._extract_equipment(document_text)
-        supplies = self._extract_supplies(document_text)
-        prosthetics = self._extract_prosthetics(document_text)
-        ambulance = self._extract_ambulance_services(document_text)
-        other_services = self._extract_other_services(document_text)
+        entities = get_clinical_extractor().extract(document_text, extraction)['hcpcs']
+        equipment = list(entities['equipment'])
+        supplies = list(entities['supplies'])
+        prosthetics = list(entities['prosthetics'])
+        ambulance = list(entities['ambulance'])
+        other_services = list(entities['other_services'])
         
         # Search for relevant HCPCS codes using RAG
         search_terms = []
@@ -37,7 +44,7 @@ class HCPCSAgent(BaseAgent):
         search_terms.extend(prosthetics[:3])
         
         search_query = f"equipment supply prosthetic device: {' '.join(search_terms)}"
-        relevant_codes = self.search_relevant_codes(search_query, k=15)
+        relevant_codes = await self.search_relevant_codes_async(search_query, k=15)
         
         # Prepare context for LLM analysis
         context_window = self.config.get('agents', {}).get('context_window', 2000)
@@ -71,7 +78,7 @@ class HCPCSAgent(BaseAgent):
         """
         
         try:
-            analysis = self.query_llm_with_context(prompt, relevant_codes)
+            analysis = await self.query_llm_with_context(prompt, relevant_codes)
         except Exception as e:
             logger.error(f"Error in LLM analysis: {e}")
             analysis = "Analysis failed due to LLM error. Using extracted information only."
@@ -88,7 +95,7 @@ class HCPCSAgent(BaseAgent):
             "analysis_quality": self._assess_analysis_quality(equipment, supplies, prosthetics, ambulance, other_services)
         }
     
-    def suggest_codes(self, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def suggest_codes(self, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Suggest top 3 HCPCS codes with confidence scores"""
         logger.info("Generating HCPCS code suggestions")
         
@@ -131,7 +138,7 @@ class HCPCSAgent(BaseAgent):
         """
         
         try:
-            suggestions = self.query_llm_with_context(prompt, relevant_codes)
+            suggestions = await self.query_llm_with_context(prompt, relevant_codes)
             parsed_suggestions = self._parse_suggestions(suggestions)
             
             # Validate and enhance suggestions
@@ -144,182 +151,6 @@ class HCPCSAgent(BaseAgent):
             logger.error(f"Error generating suggestions: {e}")
             return self._fallback_suggestions(relevant_codes)
     
-    def _extract_equipment(self, text: str) -> List[str]:
-        """Extract durable medical equipment from text"""
-        equipment = []
-        
-        # Equipment sections
-        equipment_sections = [
-            r'(?:EQUIPMENT|DME|DURABLE MEDICAL EQUIPMENT)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)',
-            r'(?:MEDICAL DEVICE|DEVICE)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)',
-            r'(?:ASSISTIVE DEVICE)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)'
-        ]
-        
-        for pattern in equipment_sections:
-            matches = re.findall(pattern, text, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                cleaned = self._clean_medical_text(match)
-                if cleaned and len(cleaned) > 5:
-                    equipment.append(cleaned)
-        
-        # Equipment keywords
-        equipment_keywords = [
-            r'\b(wheelchair|walker|cane|crutches|scooter)\b',
-            r'\b(oxygen|nebulizer|CPAP|BiPAP|ventilator)\b',
-            r'\b(hospital bed|mattress|rails|trapeze)\b',
-            r'\b(lift|transfer|commode|shower chair)\b',
-            r'\b(glucose monitor|blood pressure monitor)\b',
-            r'\b(hearing aid|cochlear implant)\b',
-            r'\b(prosthetic|orthotic|brace|splint)\b'
-        ]
-        
-        for pattern in equipment_keywords:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if match and len(match) > 3:
-                    equipment.append(match.strip().title())
-        
-        return list(set([e.strip() for e in equipment if len(e.strip()) > 3]))[:10]
-    
-    def _extract_supplies(self, text: str) -> List[str]:
-        """Extract medical supplies from text"""
-        supplies = []
-        
-        # Supply patterns
-        supply_patterns = [
-            r'(?:SUPPLIES|MEDICAL SUPPLIES)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)',
-            r'(?:WOUND CARE|DRESSING)[:\s]*([^\n]+)',
-            r'(?:CATHETER|TUBE|BAG)[:\s]*([^\n]+)',
-            r'(?:INJECTION|SYRINGE|NEEDLE)[:\s]*([^\n]+)'
-        ]
-        
-        for pattern in supply_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                cleaned = self._clean_medical_text(match)
-                if cleaned and len(cleaned) > 5:
-                    supplies.append(cleaned)
-        
-        # Supply keywords
-        supply_keywords = [
-            r'\b(bandage|dressing|gauze|tape|pad)\b',
-            r'\b(catheter|tube|bag|pouch|collection)\b',
-            r'\b(syringe|needle|lancet|test strip)\b',
-            r'\b(ostomy|colostomy|ileostomy|urostomy)\b',
-            r'\b(diabetic|glucose|insulin|pen)\b',
-            r'\b(wound|burn|pressure|ulcer)\b'
-        ]
-        
-        for pattern in supply_keywords:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if match and len(match) > 3:
-                    supplies.append(match.strip().title())
-        
-        return list(set([s.strip() for s in supplies if len(s.strip()) > 3]))[:10]
-    
-    def _extract_prosthetics(self, text: str) -> List[str]:
-        """Extract prosthetics and orthotics from text"""
-        prosthetics = []
-        
-        # Prosthetic patterns
-        prosthetic_patterns = [
-            r'(?:PROSTHETIC|PROSTHESIS|ARTIFICIAL)[:\s]*([^\n]+)',
-            r'(?:ORTHOTIC|BRACE|SUPPORT)[:\s]*([^\n]+)',
-            r'(?:IMPLANT|REPLACEMENT)[:\s]*([^\n]+)'
-        ]
-        
-        for pattern in prosthetic_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                cleaned = self._clean_medical_text(match)
-                if cleaned and len(cleaned) > 5:
-                    prosthetics.append(cleaned)
-        
-        # Prosthetic keywords from the attachment
-        prosthetic_keywords = [
-            r'\b(artificial|prosthetic|replacement)\s+(joint|limb|eye|tooth)\b',
-            r'\b(knee|hip|ankle|shoulder|elbow|wrist)\s+(joint|replacement)\b',
-            r'\b(orthotic|brace|support|splint)\b',
-            r'\b(foot|hand|finger|toe)\s+(prosthetic|replacement)\b'
-        ]
-        
-        for pattern in prosthetic_keywords:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                prosthetic = match if isinstance(match, str) else ' '.join(match)
-                if prosthetic and len(prosthetic) > 3:
-                    prosthetics.append(prosthetic.strip().title())
-        
-        return list(set([p.strip() for p in prosthetics if len(p.strip()) > 3]))[:10]
-    
-    def _extract_ambulance_services(self, text: str) -> List[str]:
-        """Extract ambulance services from text"""
-        ambulance = []
-        
-        ambulance_patterns = [
-            r'(?:AMBULANCE|TRANSPORT|EMS)[:\s]*([^\n]+)',
-            r'(?:EMERGENCY TRANSPORT)[:\s]*([^\n]+)',
-            r'(?:MEDICAL TRANSPORT)[:\s]*([^\n]+)'
-        ]
-        
-        for pattern in ambulance_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                cleaned = self._clean_medical_text(match)
-                if cleaned and len(cleaned) > 5:
-                    ambulance.append(cleaned)
-        
-        # Check for ambulance keywords
-        ambulance_keywords = [
-            r'\b(ambulance|EMS|paramedic|emergency transport)\b',
-            r'\b(air ambulance|helicopter|flight)\b',
-            r'\b(ground ambulance|BLS|ALS)\b'
-        ]
-        
-        for pattern in ambulance_keywords:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if match and len(match) > 3:
-                    ambulance.append(match.strip().title())
-        
-        return list(set(ambulance))[:5]
-    
-    def _extract_other_services(self, text: str) -> List[str]:
-        """Extract other HCPCS services from text"""
-        services = []
-        
-        service_patterns = [
-            r'(?:PHYSICAL THERAPY|PT|PHYSIOTHERAPY)[:\s]*([^\n]+)',
-            r'(?:OCCUPATIONAL THERAPY|OT)[:\s]*([^\n]+)',
-            r'(?:SPEECH THERAPY|SPEECH PATHOLOGY)[:\s]*([^\n]+)',
-            r'(?:SOCIAL SERVICES|CASE MANAGEMENT)[:\s]*([^\n]+)'
-        ]
-        
-        for pattern in service_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                cleaned = self._clean_medical_text(match)
-                if cleaned and len(cleaned) > 5:
-                    services.append(cleaned)
-        
-        return list(set(services))[:5]
-    
-    def _clean_medical_text(self, text: str) -> str:
-        """Clean and normalize medical text"""
-        if not text:
-            return ""
-        
-        # Remove extra whitespace
-        cleaned = re.sub(r'\s+', ' ', text.strip())
-        
-        # Remove common artifacts
-        cleaned = re.sub(r'\d+\.\s*', '', cleaned)
-        cleaned = re.sub(r'^\W+', '', cleaned)
-        cleaned = re.sub(r'\W+$', '', cleaned)
-        
-        return cleaned.strip()
-    
     def _format_codes_for_prompt(self, codes: List[Dict[str, Any]]) -> str:
         """Format codes for LLM prompt"""
         if not codes:
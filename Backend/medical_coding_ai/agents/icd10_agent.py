@@ -1,13 +1,14 @@
 import re
 import sys
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # Add project root to path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
 from agents.base_agent import BaseAgent
+from utils.clinical_extraction import get_clinical_extractor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,14 +20,20 @@ class ICD10Agent(BaseAgent):
         super().__init__(model_name, "ICD-10")
         self.code_pattern = r'[A-Z]\d{2}\.?\d*'
         
-    def analyze_document(self, document_text: str) -> Dict[str, Any]:
-        """Analyze document for diagnosis-related information"""
+    async def analyze_document(self, document_text: str,
+                               extraction: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Analyze document for diagnosis-related information
+        
+        extraction is the document's clinical extraction, when the caller
+        already has it (see utils/clinical_extraction)
+        """
         logger.info("Starting ICD-10 analysis")
         
         # Extract key diagnostic information
-        conditions = self._extract_conditions(document_text)
-        symptoms = self._extract_symptoms(document_text)
-        diagnoses = self._extract_diagnoses(document_text)
+        entities = get_clinical_extractor().extract(document_text, extraction)['icd10']
+        conditions = list(entities['conditions'])
+        symptoms = list(entities['symptoms'])
+        diagnoses = list(entities['diagnoses'])
         
         # Search for relevant codes using RAG
         search_terms = []
@@ -35,7 +42,7 @@ class ICD10Agent(BaseAgent):
         search_terms.extend(diagnoses[:3])
         
         search_query = f"diagnosis conditions symptoms: {' '.join(search_terms)}"
-        relevant_codes = self.search_relevant_codes(search_query, k=15)
+        relevant_codes = await self.search_relevant_codes_async(search_query, k=15)
         
         # Prepare context for LLM analysis
         context_window = self.config.get('agents', {}).get('context_window', 2000)
@@ -66,7 +73,7 @@ class ICD10Agent(BaseAgent):
         """
         
         try:
-            analysis = self.query_llm_with_context(prompt, relevant_codes)
+            analysis = await self.query_llm_with_context(prompt, relevant_codes)
         except Exception as e:
             logger.error(f"Error in LLM analysis: {e}")
             analysis = "Analysis failed due to LLM error. Using extracted information only."
@@ -83,12 +90,12 @@ class ICD10Agent(BaseAgent):
         }
         
         # Generate suggested codes based on the analysis
-        suggested_codes = self.suggest_codes(analysis_result)
+        suggested_codes = await self.suggest_codes(analysis_result)
         analysis_result["suggested_codes"] = suggested_codes
         
         return analysis_result
     
-    def suggest_codes(self, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def suggest_codes(self, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Suggest top 5 ICD-10 codes with enhanced detection and confidence scores"""
         logger.info("Generating ICD-10 code suggestions")
         
@@ -262,7 +269,7 @@ class ICD10Agent(BaseAgent):
         # If we have fewer than 5 matches, use LLM to generate additional suggestions
         if len(unique_matched_codes) < 5:
             try:
-                llm_suggestions = self._get_llm_suggestions(analysis, specific_codes)
+                llm_suggestions = await self._get_llm_suggestions(analysis, specific_codes)
                 unique_matched_codes.extend(llm_suggestions)
             except Exception as e:
                 logger.error(f"Error getting LLM suggestions: {e}")
@@ -273,237 +280,6 @@ class ICD10Agent(BaseAgent):
         logger.info(f"Generated {len(final_suggestions)} ICD-10 suggestions with enhanced matching")
         return final_suggestions
     
-    def _extract_conditions(self, text: str) -> List[str]:
-        """Extract medical conditions from text with enhanced pattern matching"""
-        conditions = []
-        
-        # Enhanced ICD-10 code extraction patterns
-        icd10_patterns = [
-            r'([A-Z]\d{2}\.?\d*)\s*-\s*([^\n\r]+)',  # Z89.221 - Description format
-            r'([A-Z]\d{2}\.?\d*)[:\s]+([^\n\r]+)',   # Alternative format
-            r'ICD-10[:\s]*([A-Z]\d{2}\.?\d*)[:\s]*([^\n\r]+)',  # ICD-10: code format
-            r'([A-Z]\d{2}\.?\d*)\s*\([^\)]*\)\s*-\s*([^\n\r]+)',  # Z89.221 (subcategory) - desc
-        ]
-        
-        for pattern in icd10_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                if len(match) == 2:
-                    code, description = match
-                    conditions.append(f"{code.strip()} - {description.strip()}")
-        
-        # Section-based extraction with improved patterns
-        section_patterns = [
-            r'(?:CHIEF COMPLAINT|CC)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)',
-            r'(?:DIAGNOSES?)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)',
-            r'(?:Principal|Primary)[:\s]*([^\n]+)',
-            r'(?:Secondary)[:\s]*([^\n]+)',
-            r'(?:HISTORY OF PRESENT ILLNESS|HPI)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)',
-            r'(?:PAST HISTORY|PATIENT PAST HISTORY)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)',
-            r'(?:ASSESSMENT|IMPRESSION)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)'
-        ]
-        
-        for pattern in section_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                cleaned = self._clean_medical_text(match)
-                if cleaned and len(cleaned) > 5:
-                    conditions.append(cleaned)
-        
-        # Extract prosthetic-related conditions specifically for your document
-        prosthetic_patterns = [
-            r'(prosthetic\s+[a-z\s]+)',
-            r'(artificial\s+[a-z\s]+)',
-            r'(amputation\s+[a-z\s]*)',
-            r'(absence\s+of\s+[a-z\s]+)',
-            r'(presence\s+of\s+[a-z\s]+)',
-            r'(osteonecrosis\s+[a-z\s]*)',
-            r'(mechanical\s+(?:grinding|issues|problems|complications))',
-            r'(socket\s+(?:pressure|pain|fit))',
-            r'(residual\s+limb)',
-            r'(phantom\s+limb)',
-        ]
-        
-        for pattern in prosthetic_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if isinstance(match, str) and len(match.strip()) > 3:
-                    conditions.append(match.strip())
-        
-        # Extract common medical conditions
-        condition_patterns = [
-            r'(diabetes[^,\.\n]*)',
-            r'(hypertension[^,\.\n]*)',
-            r'(heart\s+disease[^,\.\n]*)',
-            r'(amputation[^,\.\n]*)',
-            r'(prosthetic[^,\.\n]*)',
-            r'(artificial[^,\.\n]*)',
-            r'(trauma[^,\.\n]*)',
-            r'(mechanical[^,\.\n]*)',
-            r'(pain[^,\.\n]*)',
-            r'(osteonecrosis[^,\.\n]*)',
-            r'(PTSD[^,\.\n]*)',
-            r'(stress\s+disorder[^,\.\n]*)',
-            r'(nicotine\s+dependence[^,\.\n]*)',
-            r'(smoking[^,\.\n]*)',
-        ]
-        
-        for pattern in condition_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if len(match.strip()) > 3:  # Filter out very short matches
-                    conditions.append(match.strip())
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_conditions = []
-        for condition in conditions:
-            condition_clean = condition.lower().strip()
-            if condition_clean not in seen and len(condition) > 3:
-                seen.add(condition_clean)
-                unique_conditions.append(condition)
-        
-        return unique_conditions[:20]  # Return top 20 conditions for better analysis
-        
-        for pattern in section_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                cleaned = self._clean_medical_text(match)
-                if cleaned and len(cleaned) > 5:
-                    conditions.append(cleaned)
-        
-        # Enhanced condition patterns for prosthetics, amputations, etc.
-        condition_patterns = [
-            r'\b(amputation|amputee|absent limb|prosthetic|artificial)\b[^.]*',
-            r'\b(traumatic|acquired)\s+(?:absence|amputation)[^.]*',
-            r'\b(presence of artificial|artificial eye|prosthetic arm|prosthetic limb)\b[^.]*',
-            r'\b(osteonecrosis|necrosis|bone death)\b[^.]*',
-            r'\b(post-traumatic stress|PTSD|trauma|stress disorder)\b[^.]*',
-            r'\b(phantom limb|residual limb|socket|interface)\b[^.]*',
-            r'\b(diabetes mellitus|type \d+ diabetes|diabetes)\b[^.]*',
-            r'\b(hypertension|high blood pressure|elevated blood pressure)\b[^.]*',
-            r'\b(mechanical\s+(?:grinding|issues|problems|complications))\b[^.]*',
-            r'\b(skin\s+(?:breakdown|irritation|erosion))\b[^.]*',
-            r'\b(\w+itis|\w+osis|\w+pathy|\w+emia|\w+uria)\b[^.]*'
-        ]
-        
-        for pattern in condition_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                condition = match.strip()
-                if condition and len(condition) > 10:  # Longer phrases are more meaningful
-                    conditions.append(condition.title())
-        
-        # Remove duplicates and clean
-        unique_conditions = []
-        seen = set()
-        for condition in conditions:
-            condition_lower = condition.lower()
-            if condition_lower not in seen and len(condition) > 5:
-                unique_conditions.append(condition)
-                seen.add(condition_lower)
-        
-        return unique_conditions[:15]  # Return more conditions for better analysis
-    
-    def _extract_symptoms(self, text: str) -> List[str]:
-        """Extract symptoms from text"""
-        symptoms = []
-        
-        # Enhanced symptom patterns for the prosthetic case
-        symptom_patterns = [
-            r'(?:SYMPTOMS?|COMPLAINTS?|SIGNS?)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)',
-            r'(?:PATIENT (?:REPORTS?|COMPLAINS? OF|PRESENTS? WITH))[:\s]*([^\n]+)',
-            r'(?:CHIEF COMPLAINT)[:\s]*([^\n]+)',
-            r'(?:Quality)[:\s]*([^\n]+)',
-            r'(?:Severity)[:\s]*([^\n]+)',
-            r'(?:Duration)[:\s]*([^\n]+)',
-            r'(?:Timing)[:\s]*([^\n]+)',
-            r'(?:Context)[:\s]*([^\n]+)',
-            r'(?:Associated S/S)[:\s]*([^\n]+)',
-            r'\b(pain|discomfort|aching|burning|throbbing|stabbing)\b[^.]*',
-            r'\b(mechanical\s+(?:grinding|sounds|noise|issues))\b[^.]*',
-            r'\b(socket\s+(?:pressure|pain|discomfort))\b[^.]*',
-            r'\b(displacement|poor\s+fit|interface\s+issues)\b[^.]*',
-            r'\b(skin\s+(?:irritation|breakdown|erosion))\b[^.]*',
-            r'\b(phantom\s+limb\s+pain)\b[^.]*',
-            r'\b(morning\s+stiffness|stiffness)\b[^.]*',
-            r'\b(reduced\s+(?:function|capacity|mobility))\b[^.]*',
-            r'\b(\d+/10\s+pain|pain\s+score)\b[^.]*',
-            r'\bpatient (?:reports?|states?|complains? of|notes?) ([^\n.!?]+)',
-            r'increasing ([^\n.!?]+)',
-            r'difficulty (?:with )?([^\n.!?]+)',
-            r'problems? (?:with )?([^\n.!?]+)'
-        ]
-        
-        for pattern in symptom_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                symptom = self._clean_medical_text(match)
-                if symptom and len(symptom) > 5:
-                    symptoms.append(symptom)
-        
-        # Remove duplicates
-        unique_symptoms = list(set([s.strip() for s in symptoms if len(s.strip()) > 5]))
-        return unique_symptoms[:15]
-    
-    def _extract_diagnoses(self, text: str) -> List[str]:
-        """Extract explicit diagnoses from text"""
-        diagnoses = []
-        
-        # First, extract explicit ICD-10 codes mentioned in the document
-        icd10_pattern = r'\b[A-Z]\d{2}(?:\.\d{1,3})?\b'
-        icd10_codes = re.findall(icd10_pattern, text)
-        for code in icd10_codes:
-            diagnoses.append(f"ICD-10 Code: {code}")
-        
-        # Enhanced diagnosis patterns for better extraction
-        diagnosis_patterns = [
-            r'(?:DIAGNOSIS|DX|DIAGNOSES)[:\s]*([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)',
-            r'(?:FINAL DIAGNOSIS|PRIMARY DIAGNOSIS)[:\s]*([^\n]+)',
-            r'(?:WORKING DIAGNOSIS|PROVISIONAL DIAGNOSIS)[:\s]*([^\n]+)',
-            r'(?:DIFFERENTIAL DIAGNOSIS|SECONDARY DIAGNOSIS)[:\s]*([^\n]+)',
-            r'(?:ASSESSMENT AND PLAN|ASSESSMENT)[:\s]*\n?(?:\d+\.?\s*)?([^\n]+)',
-            r'diagnosed with ([^\n.;]+)',
-            r'diagnosis of ([^\n.;]+)',
-            r'condition(?:s)? of ([^\n.;]+)',
-            r'patient has ([^\n.;]+)',
-            r'presents with ([^\n.;]+)',
-            r'history of ([^\n.;]+)',
-            r'status post ([^\n.;]+)',
-            r'following ([^\n.;]+)',
-            # Prosthetic and amputation specific patterns
-            r'(?:below|above) knee amputation',
-            r'(?:transtibial|transfemoral) amputation',
-            r'prosthetic (?:knee|leg|limb)',
-            r'artificial (?:knee|leg|limb)',
-            r'osteonecrosis',
-            r'avascular necrosis'
-        ]
-        
-        for pattern in diagnosis_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                diagnosis = self._clean_medical_text(match)
-                if diagnosis and len(diagnosis) > 3:  # Lowered threshold
-                    diagnoses.append(diagnosis)
-        
-        return list(set(diagnoses))[:15]  # Increased limit
-    
-    def _clean_medical_text(self, text: str) -> str:
-        """Clean and normalize medical text"""
-        if not text:
-            return ""
-        
-        # Remove extra whitespace
-        cleaned = re.sub(r'\s+', ' ', text.strip())
-        
-        # Remove common artifacts
-        cleaned = re.sub(r'\d+\.\s*', '', cleaned)  # Remove numbering
-        cleaned = re.sub(r'^\W+', '', cleaned)      # Remove leading punctuation
-        cleaned = re.sub(r'\W+$', '', cleaned)      # Remove trailing punctuation
-        
-        return cleaned.strip()
-    
     def _format_codes_for_prompt(self, codes: List[Dict[str, Any]]) -> str:
         """Format codes for LLM prompt"""
         if not codes:
@@ -737,7 +513,7 @@ class ICD10Agent(BaseAgent):
         
         return suggestions[:3]
     
-    def _get_llm_suggestions(self, analysis: Dict[str, Any], specific_codes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    async def _get_llm_suggestions(self, analysis: Dict[str, Any], specific_codes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Get additional suggestions from LLM when keyword matching is insufficient"""
         conditions = analysis.get('extracted_conditions', [])
         symptoms = analysis.get('extracted_symptoms', [])
@@ -761,7 +537,7 @@ class ICD10Agent(BaseAgent):
         """
         
         try:
-            response = self.query_llm_with_context(prompt, specific_codes)
+            response = await self.query_llm_with_context(prompt, specific_codes)
             return self._parse_suggestions(response)
         except Exception as e:
             logger.error(f"Error getting LLM suggestions: {e}")
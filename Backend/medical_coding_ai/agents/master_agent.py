@@ -1,6 +1,8 @@
 import re
 import sys
 import os
+import asyncio
+import time
 from typing import List, Dict, Any, Tuple, Optional
 
 # Add project root to path
@@ -10,6 +12,7 @@ sys.path.append(project_root)
 from agents.base_agent import BaseAgent
 from utils.knowledge_base_manager import KnowledgeBaseManager
 from utils.code_searcher import CodeSearcher
+from utils.clinical_extraction import get_clinical_extractor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,7 +20,8 @@ logger = logging.getLogger(__name__)
 class MasterAgent(BaseAgent):
     """Master agent that orchestrates and validates medical coding"""
     
-    def __init__(self, model_name: str = "llama3.2:3b-instruct-q4_0"):
+    def __init__(self, model_name: str = "llama3.2:3b-instruct-q4_0",
+                 code_searcher: Optional[CodeSearcher] = None):
         super().__init__(model_name, "Master")
         
         # Initialize knowledge base manager
@@ -26,8 +30,15 @@ class MasterAgent(BaseAgent):
             logger.info("Knowledge base manager initialized")
             
             # Process PDFs if needed - safely handle errors
-            auto_process = self.config.get('knowledge_base', {}).get('auto_process_on_startup', True)
-            if auto_process:
+            kb_config = self.config.get('knowledge_base', {})
+            auto_process = kb_config.get('auto_process_on_startup', True)
+            if auto_process and kb_config.get('process_in_background', True):
+                # Large manuals take minutes even in parallel; report progress
+                # through /api/knowledge-base/status instead of blocking here
+                self.kb_manager.start_background_processing()
+                processing_results = {"status": "processing", "message": "Processing PDFs in the background"}
+                logger.info("Knowledge base processing started in the background")
+            elif auto_process:
                 try:
                     processing_results = self.kb_manager.check_and_process_pdfs()
                     logger.info(f"Knowledge base processing results: {processing_results}")
@@ -40,7 +51,7 @@ class MasterAgent(BaseAgent):
             
             # Initialize code searcher - safely handle errors
             try:
-                self.code_searcher = CodeSearcher()
+                self.code_searcher = code_searcher or CodeSearcher()
                 logger.info("Code searcher initialized")
             except Exception as cs_error:
                 logger.error(f"Code searcher initialization error: {cs_error}")
@@ -49,7 +60,7 @@ class MasterAgent(BaseAgent):
         except Exception as e:
             logger.error(f"Error initializing knowledge base manager: {e}")
             self.kb_manager = None
-            self.code_searcher = None
+            self.code_searcher = code_searcher
         
         # Initialize specialized agents
         try:
@@ -74,7 +85,7 @@ class MasterAgent(BaseAgent):
         self.hcpcs_agent = hcpcs_agent
         logger.info("Master agent configured with specialized agents")
     
-    def orchestrate_analysis(self, document_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def orchestrate_analysis(self, document_data: Dict[str, Any]) -> Dict[str, Any]:
         """Orchestrate analysis across all applicable agents"""
         logger.info("Starting master agent orchestration")
         
@@ -94,35 +105,29 @@ class MasterAgent(BaseAgent):
         if not anonymized_text:
             return {'error': 'No anonymized text available for analysis'}
         
+        # Extract once; the plan and every agent share the result
+        extraction = get_clinical_extractor().extract(anonymized_text, document_data.get('clinical_extraction'))
+        
         # Determine which agents should analyze based on document content
-        analysis_plan = self._determine_analysis_plan(document_data)
+        analysis_plan = self._determine_analysis_plan(document_data, extraction)
         logger.info(f"Analysis plan: {analysis_plan}")
         
-        # Run applicable agents
+        # Run applicable agents concurrently
         try:
-            if analysis_plan['needs_icd10'] and self.icd10_agent:
-                logger.info("Running ICD-10 analysis")
-                results['icd10_analysis'] = self.icd10_agent.analyze_document(anonymized_text)
-                results['processing_stats']['icd10'] = 'completed'
-            else:
-                results['processing_stats']['icd10'] = 'skipped'
-            
-            if analysis_plan['needs_cpt'] and self.cpt_agent:
-                logger.info("Running CPT analysis")
-                results['cpt_analysis'] = self.cpt_agent.analyze_document(anonymized_text)
-                results['processing_stats']['cpt'] = 'completed'
-            else:
-                results['processing_stats']['cpt'] = 'skipped'
-            
-            if analysis_plan['needs_hcpcs'] and self.hcpcs_agent:
-                logger.info("Running HCPCS analysis")
-                results['hcpcs_analysis'] = self.hcpcs_agent.analyze_document(anonymized_text)
-                results['processing_stats']['hcpcs'] = 'completed'
-            else:
-                results['processing_stats']['hcpcs'] = 'skipped'
+            agent_results, processing_stats = await self._run_agents_concurrently(
+                anonymized_text,
+                run_icd10=analysis_plan['needs_icd10'],
+                run_cpt=analysis_plan['needs_cpt'],
+                run_hcpcs=analysis_plan['needs_hcpcs'],
+                extraction=extraction
+            )
+            results['icd10_analysis'] = agent_results.get('icd10')
+            results['cpt_analysis'] = agent_results.get('cpt')
+            results['hcpcs_analysis'] = agent_results.get('hcpcs')
+            results['processing_stats'] = processing_stats
             
             # Generate master insights
-            results['master_insights'] = self._generate_insights(results, document_data, analysis_plan)
+            results['master_insights'] = await self._generate_insights(results, document_data, analysis_plan)
             logger.info("Master analysis completed successfully")
             
         except Exception as e:
@@ -131,7 +136,7 @@ class MasterAgent(BaseAgent):
         
         return results
     
-    def verify_codes(self, selected_codes: List[Dict[str, Any]], 
+    async def verify_codes(self, selected_codes: List[Dict[str, Any]], 
                     document_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Verify selected codes for appropriateness and accuracy with enhanced error handling"""
         logger.info(f"Starting verification of {len(selected_codes)} codes")
@@ -184,7 +189,7 @@ class MasterAgent(BaseAgent):
         # Verify each group
         for agent_type, codes in codes_by_type.items():
             if codes:
-                batch_results = self._verify_code_batch(codes, document_data, agent_type)
+                batch_results = await self._verify_code_batch(codes, document_data, agent_type)
                 verification_results.extend(batch_results)
         
         # Perform cross-code validation
@@ -193,15 +198,20 @@ class MasterAgent(BaseAgent):
         logger.info(f"Verification completed for {len(final_results)} codes")
         return final_results
     
-    def _determine_analysis_plan(self, document_data: Dict[str, Any]) -> Dict[str, bool]:
+    def _determine_analysis_plan(self, document_data: Dict[str, Any],
+                                 extraction: Optional[Dict[str, Any]] = None) -> Dict[str, bool]:
         """Determine which agents should analyze the document"""
-        text = document_data.get('anonymized_text', '').lower()
+        text = document_data.get('anonymized_text', '')
         patient_data = document_data.get('patient_data', {})
+        extraction = get_clinical_extractor().extract(
+            text, extraction or document_data.get('clinical_extraction')
+        )
+        indicators = extraction['indicators']
         
         # Base decisions on content analysis
-        needs_icd10 = self._needs_icd10_analysis(text, patient_data)
-        needs_cpt = self._needs_cpt_analysis(text, patient_data)
-        needs_hcpcs = self._needs_hcpcs_analysis(text, patient_data)
+        needs_icd10 = self._needs_icd10_analysis(indicators, patient_data)
+        needs_cpt = self._needs_cpt_analysis(indicators, patient_data)
+        needs_hcpcs = self._needs_hcpcs_analysis(indicators, patient_data)
         
         return {
             'needs_icd10': needs_icd10,
@@ -210,49 +220,26 @@ class MasterAgent(BaseAgent):
             'analysis_reasoning': self._get_analysis_reasoning(text, needs_icd10, needs_cpt, needs_hcpcs)
         }
     
-    def _needs_icd10_analysis(self, text: str, patient_data: Dict[str, Any]) -> bool:
+    def _needs_icd10_analysis(self, indicators: Dict[str, List[str]], patient_data: Dict[str, Any]) -> bool:
         """Determine if ICD-10 analysis is needed"""
         # Always analyze for diagnoses unless explicitly a procedure-only document
-        diagnosis_indicators = [
-            'diagnosis', 'condition', 'disease', 'disorder', 'syndrome',
-            'chief complaint', 'assessment', 'impression', 'symptoms',
-            'past medical history', 'comorbid', 'chronic', 'acute'
-        ]
-        
-        procedure_only_indicators = [
-            'operative report', 'surgery report', 'procedure note'
-        ]
-        
-        has_diagnosis_content = any(indicator in text for indicator in diagnosis_indicators)
-        is_procedure_only = any(indicator in text for indicator in procedure_only_indicators)
+        has_diagnosis_content = bool(indicators['diagnosis'])
+        is_procedure_only = bool(indicators['procedure_only'])
         has_conditions = len(patient_data.get('conditions', [])) > 0
         
         return has_diagnosis_content or has_conditions or not is_procedure_only
     
-    def _needs_cpt_analysis(self, text: str, patient_data: Dict[str, Any]) -> bool:
+    def _needs_cpt_analysis(self, indicators: Dict[str, List[str]], patient_data: Dict[str, Any]) -> bool:
         """Determine if CPT analysis is needed"""
-        procedure_indicators = [
-            'procedure', 'surgery', 'operation', 'treatment', 'therapy',
-            'examination', 'test', 'consultation', 'visit', 'evaluation',
-            'office visit', 'follow-up', 'assessment', 'counseling'
-        ]
-        
-        has_procedure_content = any(indicator in text for indicator in procedure_indicators)
+        has_procedure_content = bool(indicators['procedure'])
         has_procedures = len(patient_data.get('procedures', [])) > 0
         
         # Most medical documents involve some billable service
-        return has_procedure_content or has_procedures or 'visit' in text
+        return has_procedure_content or has_procedures
     
-    def _needs_hcpcs_analysis(self, text: str, patient_data: Dict[str, Any]) -> bool:
+    def _needs_hcpcs_analysis(self, indicators: Dict[str, List[str]], patient_data: Dict[str, Any]) -> bool:
         """Determine if HCPCS analysis is needed"""
-        hcpcs_indicators = [
-            'equipment', 'device', 'prosthetic', 'orthotic', 'brace',
-            'wheelchair', 'walker', 'cane', 'oxygen', 'cpap', 'supply',
-            'dressing', 'catheter', 'ambulance', 'transport', 'dme',
-            'artificial', 'implant', 'replacement'
-        ]
-        
-        return any(indicator in text for indicator in hcpcs_indicators)
+        return bool(indicators['hcpcs'])
     
     def _get_analysis_reasoning(self, text: str, needs_icd10: bool, 
                               needs_cpt: bool, needs_hcpcs: bool) -> str:
@@ -270,10 +257,18 @@ class MasterAgent(BaseAgent):
         
         return "; ".join(reasoning_parts) if reasoning_parts else "No specific coding indicators found"
     
-    def _verify_code_batch(self, codes: List[Dict[str, Any]], 
+    async def _verify_code_batch(self, codes: List[Dict[str, Any]], 
                           document_data: Dict[str, Any], agent_type: str) -> List[Dict[str, Any]]:
-        """Verify a batch of codes of the same type with enhanced error handling"""
+        """Verify a batch of codes of the same type with enhanced error handling
+        
+        With agents.verification_mode 'batched' (default) the codes are verified
+        in one prompt per agents.verification_batch_size codes; codes whose
+        answer cannot be parsed fall back to a per-code prompt. 'per_code'
+        sends one prompt per code.
+        """
+        # Results in input order; None marks codes still to be verified
         batch_results = []
+        pending = []
         
         for code in codes:
             try:
@@ -320,8 +315,8 @@ class MasterAgent(BaseAgent):
                     'source': str(code.get('source', 'unknown'))
                 }
                 
-                verification = self._verify_single_code(validated_code, document_data, agent_type)
-                batch_results.append(verification)
+                pending.append((len(batch_results), validated_code))
+                batch_results.append(None)
                 
             except Exception as e:
                 logger.error(f"Error verifying code: {e}")
@@ -338,8 +333,129 @@ class MasterAgent(BaseAgent):
                 }
                 batch_results.append(self._create_error_verification(safe_code, str(e)))
         
+        agents_config = self.config.get('agents', {})
+        mode = agents_config.get('verification_mode', 'batched')
+        batch_size = max(1, int(agents_config.get('verification_batch_size', 10)))
+        
+        unresolved = pending
+        if mode == 'batched' and len(pending) > 1:
+            unresolved = []
+            for i in range(0, len(pending), batch_size):
+                chunk = pending[i:i + batch_size]
+                parsed = await self._verify_codes_batched([code for _, code in chunk], document_data, agent_type)
+                for (position, code), verification in zip(chunk, parsed):
+                    if verification is None:
+                        unresolved.append((position, code))
+                    else:
+                        batch_results[position] = verification
+            if unresolved:
+                logger.info(f"Falling back to per-code verification for {len(unresolved)} {agent_type} codes")
+        
+        for position, validated_code in unresolved:
+            try:
+                batch_results[position] = await self._verify_single_code(validated_code, document_data, agent_type)
+            except Exception as e:
+                logger.error(f"Error verifying code: {e}")
+                batch_results[position] = self._create_error_verification(validated_code, str(e))
+        
         return batch_results
     
+    async def _verify_codes_batched(self, codes: List[Dict[str, Any]], 
+                                    document_data: Dict[str, Any], agent_type: str) -> List[Optional[Dict[str, Any]]]:
+        """Verify several codes of one type with a single prompt
+        
+        Returns one entry per input code: the parsed verification, or None if
+        the response had no usable answer for that code. If the LLM call
+        itself failed, every code gets the fallback verification instead of
+        a per-code retry that would wait on the same failure.
+        """
+        anonymized_text = document_data.get('anonymized_text', '')[:2000]
+        
+        code_lines = []
+        for i, code in enumerate(codes, 1):
+            code_lines.append(
+                f"{i}. Code: {code['code']} | Description: {code['description']} | "
+                f"AI Confidence: {code.get('confidence', 0):.0%} | "
+                f"Reasoning: {code.get('reasoning', 'Not provided')}"
+            )
+        
+        codes_text = '\n        '.join(code_lines)
+        
+        prompt = f"""
+        As a medical coding expert, verify if each of these {agent_type} codes is appropriate for the patient document.
+        
+        CODES TO VERIFY:
+        {codes_text}
+        
+        PATIENT DOCUMENT:
+        {anonymized_text}
+        
+        VERIFICATION CRITERIA:
+        1. Is the code clinically appropriate for the documented condition/procedure?
+        2. Is there sufficient documentation to support this code?
+        3. Does the code accurately represent what is documented?
+        4. Are there any coding conflicts or contraindications?
+        
+        For EVERY code above, respond with one block in this exact format, in the same order:
+        CODE: [code]
+        APPROPRIATE: [Yes/No]
+        CONFIDENCE: [0-100]
+        CONCERNS: [Your concerns or "None"]
+        RECOMMENDATIONS: [Your recommendations]
+        """
+        
+        try:
+            response = await self.query_llm_with_context(prompt)
+        except Exception as e:
+            response = f"Error: {e}"
+        if (response or '').startswith('Error:'):
+            logger.error(f"Batched LLM verification failed for {len(codes)} {agent_type} codes: {response}")
+            return [self._create_enhanced_fallback_verification(code) for code in codes]
+        
+        blocks = self._split_verification_blocks(response)
+        
+        results = []
+        for code in codes:
+            block = blocks.get(code['code'].upper(), [])
+            verification_text = block.pop(0) if block else None
+            if verification_text is None:
+                results.append(None)
+            else:
+                results.append(self._parse_verification_enhanced(verification_text, code))
+        return results
+    
+    def _split_verification_blocks(self, response: str) -> Dict[str, List[str]]:
+        """Split a batched verification response into per-code answer blocks
+        
+        Only blocks with both an APPROPRIATE and a numeric CONFIDENCE line are
+        kept, so anything else is retried with a per-code prompt.
+        """
+        blocks = {}
+        if not response or response.startswith('Error:'):
+            return blocks
+        
+        current_code = None
+        current_lines = []
+        
+        def flush():
+            text = '\n'.join(current_lines)
+            if current_code and re.search(r'^APPROPRIATE:', text, re.MULTILINE) and \
+                    re.search(r'^CONFIDENCE:[^\d\n]*\d', text, re.MULTILINE):
+                blocks.setdefault(current_code, []).append(text)
+        
+        for raw_line in response.split('\n'):
+            # Tolerate markdown decoration such as "**CODE:** E11.9" or "- CONFIDENCE: 90"
+            line = raw_line.replace('**', '').strip().lstrip('-*# ').strip()
+            if line.upper().startswith('CODE:'):
+                flush()
+                current_code = line.split(':', 1)[1].strip().strip('[]').upper()
+                current_lines = []
+            elif current_code:
+                current_lines.append(line)
+        flush()
+        
+        return blocks
+    
     def _safe_float_conversion(self, value) -> float:
         """Safely convert a value to float for confidence scores"""
         try:
@@ -357,7 +473,7 @@ class MasterAgent(BaseAgent):
         except (ValueError, TypeError):
             return 0.5
     
-    def _verify_single_code(self, code: Dict[str, Any], 
+    async def _verify_single_code(self, code: Dict[str, Any], 
                            document_data: Dict[str, Any], agent_type: str) -> Dict[str, Any]:
         """Verify a single code with enhanced logic"""
         
@@ -400,7 +516,7 @@ class MasterAgent(BaseAgent):
         """
         
         try:
-            verification = self.query_llm_with_context(prompt)
+            verification = await self.query_llm_with_context(prompt)
             return self._parse_verification_enhanced(verification, code)
         except Exception as e:
             logger.error(f"LLM verification failed for {code.get('code')}: {e}")
@@ -609,7 +725,7 @@ class MasterAgent(BaseAgent):
         # Add specific conflict rules here
         return False
     
-    def _generate_insights(self, results: Dict[str, Any], 
+    async def _generate_insights(self, results: Dict[str, Any], 
                           document_data: Dict[str, Any], 
                           analysis_plan: Dict[str, Any]) -> Dict[str, Any]:
         """Generate master insights"""
@@ -644,7 +760,7 @@ class MasterAgent(BaseAgent):
         """
         
         try:
-            insights_text = self.query_llm_with_context(insights_prompt)
+            insights_text = await self.query_llm_with_context(insights_prompt)
         except Exception as e:
             logger.error(f"Error generating insights: {e}")
             insights_text = f"Analysis completed for {analyses_performed} coding systems. Manual review recommended."
@@ -734,24 +850,86 @@ class MasterAgent(BaseAgent):
             'assessment': 'Good' if avg_quality >= 70 else 'Fair' if avg_quality >= 50 else 'Needs Improvement'
         }
     
-    def analyze_document(self, document_text: str, run_icd10: bool = True, 
-                       run_cpt: bool = True, run_hcpcs: bool = False) -> Dict[str, Any]:
-        """Analyze document with selected agents"""
-        results = {}
+    async def analyze_document(self, document_text: str, run_icd10: bool = True, 
+                       run_cpt: bool = True, run_hcpcs: bool = False,
+                       extraction: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Analyze document with selected agents
         
-        if run_icd10 and self.icd10_agent:
-            logger.info("Running ICD-10 analysis")
-            results['icd10'] = self.icd10_agent.analyze_document(document_text)
+        extraction is the clinical extraction cached on the processed
+        document, if any; it is reused when it was made from document_text.
+        """
+        results, processing_stats = await self._run_agents_concurrently(
+            document_text, run_icd10=run_icd10, run_cpt=run_cpt, run_hcpcs=run_hcpcs,
+            extraction=extraction
+        )
+        results['processing_stats'] = processing_stats
         
-        if run_cpt and self.cpt_agent:
-            logger.info("Running CPT analysis")
-            results['cpt'] = self.cpt_agent.analyze_document(document_text)
+        return results
+    
+    async def _run_agents_concurrently(self, document_text: str, run_icd10: bool = True,
+                                       run_cpt: bool = True, run_hcpcs: bool = True,
+                                       extraction: Optional[Dict[str, Any]] = None
+                                       ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Fan the document out to the selected agents and gather their results
+        
+        Agents run in parallel, each with its own timeout (agents.agent_timeout).
+        A failed or timed-out agent is left out of the results instead of
+        failing the whole analysis, so wall-clock time tracks the slowest
+        agent rather than the sum of all three. The document is extracted
+        once and the agents share the extraction.
+        
+        Returns:
+            (results keyed 'icd10'/'cpt'/'hcpcs', per-agent processing stats)
+        """
+        timeout = self.config.get('agents', {}).get('agent_timeout', 180)
+        selected = {
+            'icd10': self.icd10_agent if run_icd10 else None,
+            'cpt': self.cpt_agent if run_cpt else None,
+            'hcpcs': self.hcpcs_agent if run_hcpcs else None
+        }
         
-        if run_hcpcs and self.hcpcs_agent:
-            logger.info("Running HCPCS analysis")
-            results['hcpcs'] = self.hcpcs_agent.analyze_document(document_text)
+        if any(selected.values()):
+            extraction = get_clinical_extractor().extract(document_text, extraction)
         
-        return results
+        async def run_agent(name, agent):
+            logger.info(f"Running {agent.agent_type} analysis")
+            start = time.perf_counter()
+            stats = {}
+            result = None
+            try:
+                result = await asyncio.wait_for(
+                    agent.analyze_document(document_text, extraction=extraction), timeout=timeout
+                )
+                stats['status'] = 'completed'
+            except asyncio.TimeoutError:
+                logger.error(f"{agent.agent_type} analysis timed out after {timeout}s")
+                stats['status'] = 'timeout'
+                stats['error'] = f"Timed out after {timeout}s"
+            except Exception as e:
+                logger.error(f"{agent.agent_type} analysis failed: {e}")
+                stats['status'] = 'failed'
+                stats['error'] = str(e)
+            stats['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            return name, result, stats
+        
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*[
+            run_agent(name, agent) for name, agent in selected.items() if agent
+        ])
+        
+        results = {}
+        processing_stats = {
+            name: {'status': 'skipped', 'latency_ms': 0.0}
+            for name, agent in selected.items() if not agent
+        }
+        for name, result, stats in outcomes:
+            processing_stats[name] = stats
+            if result is not None:
+                results[name] = result
+        processing_stats['total_latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        
+        logger.info(f"Agent fan-out finished: {processing_stats}")
+        return results, processing_stats
     
     def get_code_suggestions(self, analysis_results: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Get code suggestions from analysis results with improved error handling"""
@@ -887,20 +1065,17 @@ class MasterAgent(BaseAgent):
     
     def search_codes(self, query: str, code_type: str = "all", max_results: int = 15) -> List[Dict[str, Any]]:
         """Search for medical codes matching query"""
-        # Make sure we're using the latest processed knowledge base
         if not self.code_searcher:
             self.code_searcher = CodeSearcher()
         
-        # Reload the knowledge base to ensure we have the latest data
-        self.code_searcher.load_latest_knowledge_base()
-        
-        # Search for codes
+        # The searcher follows the shared code catalog, which only reloads
+        # the processed JSON files when they change on disk
         results = self.code_searcher.search(query, code_type, max_results)
         
         # Return results
         logger.info(f"Code search for '{query}' in '{code_type}' returned {len(results)} results")
         return results
     
-    def suggest_codes(self, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def suggest_codes(self, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Implement abstract method - not used directly"""
         return []
@@ -23,6 +23,7 @@ import os
 from ..utils.db import get_db
 from ..api.deps import get_current_user, require_admin
 from ..models.user_models import User, AuditLog
+from ..utils.user_cache import invalidate_user
 from ..repositories.settings_repository import (
     AISettingsRepository,
     SecuritySettingsRepository,
@@ -280,6 +281,7 @@ async def update_user(
 
     await db.commit()
     await db.refresh(user)
+    invalidate_user(user.user_id)
 
     logger.info(f"Updated user {user.username} by admin {current_user.username}")
 
@@ -330,6 +332,7 @@ async def delete_user(
     user.updated_at = datetime.utcnow()
 
     await db.commit()
+    invalidate_user(user.user_id)
 
     logger.info(f"Deactivated user {user.username} by admin {current_user.username}")
 
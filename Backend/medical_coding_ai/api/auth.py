@@ -19,6 +19,7 @@ from typing import Optional
 from ..utils.crypto import encrypt, decrypt, deterministic_hash
 from ..utils.password_validator import validate_password
 from ..utils.email_service import send_activation_email, send_password_reset_email
+from ..utils.user_cache import invalidate_user
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
@@ -789,6 +790,7 @@ async def reset_password(request: Request, payload: ResetPasswordRequest, db: As
     stmt2 = update(PasswordReset).where(PasswordReset.id == matching_reset.id).values(used=True)
     await db.execute(stmt2)
     await db.commit()
+    invalidate_user(user_id)
 
     return {"reset": True, "message": "Password reset successfully. You can now sign in with your new password."}
 
@@ -869,6 +871,7 @@ async def accept_legal(
 
     await db.execute(stmt)
     await db.commit()
+    invalidate_user(user.user_id)
 
     return {
         "accepted": True,
@@ -918,6 +921,7 @@ async def logout(
         
         # Add token to blacklist
         blacklisted = await blacklist_token(jti, exp)
+        invalidate_user(current_user.user_id)
         
         if not blacklisted:
             # Log warning but don't fail - user is still effectively logged out on client side
@@ -1129,6 +1133,7 @@ async def update_mfa_preferences(
         stmt = update(User).where(User.user_id == user.user_id).values(**updates)
         await db.execute(stmt)
         await db.commit()
+        invalidate_user(user.user_id)
 
     return {
         "success": True,
@@ -3,10 +3,13 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from jose import jwt, JWTError
+from dataclasses import dataclass
+from typing import Optional
 import os
 from ..utils.db import get_db
 from ..models.user_models import User
 from ..utils.redis_client import is_token_blacklisted
+from ..utils.user_cache import get_user_cache
 
 # Import JWT_SECRET from auth.py to ensure consistency
 # Note: JWT_SECRET is validated at startup in auth.py
@@ -15,12 +18,65 @@ from .auth import JWT_SECRET, JWT_ALGORITHM
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/signin")
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+@dataclass(frozen=True)
+class Principal:
+    """Claims of a verified JWT, decoded once per request"""
+    token: str
+    user_id: Optional[str]
+    tenant_id: Optional[str]
+    jti: Optional[str]
+    token_type: Optional[str]
+
+
+def decode_principal(token: str) -> Principal:
+    """
+    Verify a JWT and read its claims.
+
+    Raises:
+        JWTError: If the token is invalid or expired
+    """
+    payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    return Principal(
+        token=token,
+        user_id=payload.get("sub"),
+        tenant_id=payload.get("tenant_id"),
+        jti=payload.get("jti"),  # JWT ID for blacklist check
+        token_type=payload.get("type"),
+    )
+
+
+def request_principal(request: Request, token: str) -> Principal:
+    """
+    Principal for the request's bearer token.
+
+    Uses the one AuditMiddleware decoded into request.state when it was
+    decoded from the same token, otherwise decodes the token.
+
+    Raises:
+        JWTError: If the token is invalid or expired
+    """
+    principal = getattr(request.state, 'principal', None)
+    if principal is not None and principal.token == token:
+        return principal
+    principal = decode_principal(token)
+    request.state.principal = principal
+    return principal
+
+
+async def get_current_user(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+):
     """
     Get current authenticated user from JWT token.
     Validates token and checks if it's blacklisted (logged out).
 
+    The token is decoded once per request (see request_principal) and active
+    users are served from the short-lived user cache (utils/user_cache.py).
+
     Args:
+        request: Current request
         token: JWT token from Authorization header
         db: Database session
 
@@ -38,18 +94,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
 
     try:
         # Decode and validate JWT
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-
-        user_id: str = payload.get("sub")
-        jti: str = payload.get("jti")  # JWT ID for blacklist check
-        token_type: str = payload.get("type")
-        tenant_id: str = payload.get("tenant_id")  # Tenant ID for validation
+        principal = request_principal(request, token)
 
-        if user_id is None:
+        if principal.user_id is None:
             raise credentials_exception
 
         # Validate token type
-        if token_type != "access":
+        if principal.token_type != "access":
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token type",
@@ -57,7 +108,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
             )
 
         # Check if token is blacklisted (user logged out)
-        if jti and await is_token_blacklisted(jti):
+        if principal.jti and await is_token_blacklisted(principal.jti):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token has been revoked. Please log in again.",
@@ -67,16 +118,20 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     except JWTError:
         raise credentials_exception
 
-    # Get user from database
-    q = select(User).where(User.user_id == user_id)
-    result = await db.execute(q)
-    user = result.scalar_one_or_none()
+    # Get user from the cache, else the database
+    user_cache = get_user_cache()
+    user = user_cache.get(principal.user_id)
+    if user is None:
+        q = select(User).where(User.user_id == principal.user_id)
+        result = await db.execute(q)
+        user = result.scalar_one_or_none()
 
-    if user is None or not user.is_active:
-        raise credentials_exception
+        if user is None or not user.is_active:
+            raise credentials_exception
+        user_cache.put(user)
 
     # Validate tenant_id matches (prevent token tampering)
-    if tenant_id and str(user.tenant_id) != tenant_id:
+    if principal.tenant_id and str(user.tenant_id) != principal.tenant_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token tenant mismatch. Please log in again.",
@@ -48,6 +48,9 @@ class EHRConnectionCreate(BaseModel):
     public_key_id: Optional[str] = Field(None, description="Key ID for JWT")
     poll_interval_seconds: int = Field(30, ge=10, le=3600, description="Polling interval (10-3600 seconds)")
     use_mock_data: bool = Field(True, description="Use mock FHIR data for testing")
+    poller_settings: Dict[str, Any] = Field(
+        default_factory=dict, description="Poller tuning, e.g. {\"bulk_export\": true}"
+    )
 
 
 class EHRConnectionUpdate(BaseModel):
@@ -59,6 +62,7 @@ class EHRConnectionUpdate(BaseModel):
     private_key: Optional[str] = None
     poll_interval_seconds: Optional[int] = Field(None, ge=10, le=3600)
     use_mock_data: Optional[bool] = None
+    poller_settings: Optional[Dict[str, Any]] = None
     is_active: Optional[bool] = None
 
 
@@ -73,6 +77,7 @@ class EHRConnectionResponse(BaseModel):
     poll_interval_seconds: int
     is_active: bool
     use_mock_data: bool
+    poller_settings: Optional[Dict[str, Any]] = None
     last_sync_at: Optional[datetime]
     last_sync_status: Optional[str]
     last_sync_error: Optional[str]
@@ -92,6 +97,7 @@ class SyncStateResponse(BaseModel):
     records_processed: int
     records_created: int
     records_updated: int
+    records_skipped: Optional[int] = 0
     error_count: int
     error_message: Optional[str]
 
@@ -126,6 +132,19 @@ class TriggerSyncRequest(BaseModel):
     )
 
 
+def _validate_poller_settings(settings: Optional[Dict[str, Any]]):
+    """Reject poller_settings keys the pollers do not read."""
+    from pollers.base_poller import POLLER_SETTINGS
+
+    unknown = sorted(set(settings or {}) - POLLER_SETTINGS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown poller settings: {', '.join(unknown)}. "
+                   f"Must be among: {', '.join(sorted(POLLER_SETTINGS))}"
+        )
+
+
 # ============================================================================
 # EHR CONNECTION ENDPOINTS
 # ============================================================================
@@ -177,6 +196,7 @@ async def create_ehr_connection(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid ehr_type. Must be one of: {', '.join(valid_types)}"
         )
+    _validate_poller_settings(connection.poller_settings)
 
     repo = EHRConnectionRepository(db)
 
@@ -206,6 +226,7 @@ async def create_ehr_connection(
         'public_key_id': connection.public_key_id,
         'poll_interval_seconds': connection.poll_interval_seconds,
         'use_mock_data': connection.use_mock_data,
+        'poller_settings': connection.poller_settings,
         'is_active': True,
         'created_by': current_user.user_id
     }
@@ -261,8 +282,10 @@ async def update_ehr_connection(
     """
     Update an EHR connection configuration.
 
-    Requires admin role.
+    Requires admin role. poller_settings replaces the stored settings.
     """
+    _validate_poller_settings(updates.poller_settings)
+
     repo = EHRConnectionRepository(db)
     connection = await repo.get_by_id(connection_id, current_user.tenant_id)
 
@@ -421,7 +444,8 @@ async def trigger_sync_endpoint(
     Trigger an immediate sync for a connection.
 
     Requires admin role. This triggers the sync immediately
-    instead of waiting for the next polling interval.
+    instead of waiting for the next polling interval. When the connection
+    is polled by another worker, the sync is queued for that worker.
     """
     conn_repo = EHRConnectionRepository(db)
 
@@ -463,6 +487,18 @@ async def trigger_sync_endpoint(
             "warning": result.get('error')
         }
 
+    if result.get('queued'):
+        logger.info(
+            f"Manual sync for connection {connection_id} queued on worker "
+            f"{result['worker_id']} by user {current_user.user_id}"
+        )
+        return {
+            "message": result['message'],
+            "connection_id": str(connection_id),
+            "resource_types": request.resource_types if request else None,
+            "worker_id": result['worker_id']
+        }
+
     logger.info(
         f"Manual sync completed for connection {connection_id} "
         f"by user {current_user.user_id}"
@@ -561,11 +597,12 @@ async def get_pollers_status(
     Get status of all active pollers.
 
     Returns information about running pollers, their metrics, and health status.
+    With distributed poller workers, reports the pollers of every worker.
     """
-    from pollers.scheduler import get_poller_status
+    from pollers.scheduler import get_cluster_status
 
     try:
-        status_info = get_poller_status()
+        status_info = await get_cluster_status()
         return status_info
 
     except Exception as e:
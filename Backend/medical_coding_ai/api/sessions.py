@@ -12,6 +12,7 @@ from ..models.session_models import UserSession
 from ..models.user_models import User, RefreshToken
 from ..utils.db import get_db
 from ..utils.crypto import encrypt, decrypt
+from ..utils.user_cache import invalidate_user
 from .deps import get_current_user
 
 
@@ -122,6 +123,7 @@ async def logout_all_devices(
     revoked_tokens = tokens_result.rowcount
 
     await db.commit()
+    invalidate_user(user.user_id)
 
     return {
         "success": True,
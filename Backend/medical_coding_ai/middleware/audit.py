@@ -1,11 +1,9 @@
 from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi import Request
-from ..utils.db import get_db
-from ..models.user_models import AuditLog
-import asyncio
+from ..utils.audit_writer import get_audit_writer
 import logging
 from typing import Optional, Tuple
-from jose import jwt, JWTError
+from jose import JWTError
 
 logger = logging.getLogger(__name__)
 
@@ -23,13 +21,21 @@ class AuditMiddleware(BaseHTTPMiddleware):
 
         response = await call_next(request)
 
-        # run fire-and-forget log (don't block response)
+        # queue the entry for the background writer (don't block response)
         try:
-            loop = asyncio.get_event_loop()
-            loop.create_task(self._log(request, path, method, ip, user_agent, user_id, tenant_id))
+            get_audit_writer().record(
+                tenant_id=tenant_id,
+                user_id=user_id,
+                action_type='request',
+                action_category='data_access',
+                api_endpoint=path,
+                http_method=method,
+                ip_address=ip,
+                user_agent=user_agent
+            )
         except Exception as e:
             # Log error but don't block response
-            logger.error(f"Failed to schedule audit log task: {e}")
+            logger.error(f"Failed to queue audit log entry: {e}")
 
         return response
 
@@ -38,6 +44,9 @@ class AuditMiddleware(BaseHTTPMiddleware):
         Extract user_id and tenant_id from JWT token in Authorization header.
         Returns (None, None) for unauthenticated requests.
 
+        The decoded token is stored in request.state.principal, so
+        get_current_user() does not decode it again.
+
         Args:
             request: FastAPI Request object
 
@@ -53,17 +62,15 @@ class AuditMiddleware(BaseHTTPMiddleware):
             # Extract token
             token = auth_header.split(' ')[1]
 
-            # Import JWT configuration from auth module
-            from ..api.auth import JWT_SECRET, JWT_ALGORITHM
+            # Import token decoding from the API dependencies
+            from ..api.deps import decode_principal
 
-            # Decode token (without validation - just for audit purposes)
+            # Decode token (for audit purposes; not rejected here)
             # Note: Full validation happens in get_current_user() dependency
-            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-
-            user_id = payload.get('sub')
-            tenant_id = payload.get('tenant_id')
+            principal = decode_principal(token)
+            request.state.principal = principal
 
-            return user_id, tenant_id
+            return principal.user_id, principal.tenant_id
 
         except JWTError:
             # Invalid token - this is fine, middleware should not reject requests
@@ -73,41 +80,3 @@ class AuditMiddleware(BaseHTTPMiddleware):
             # Log unexpected errors but don't fail the request
             logger.warning(f"Unexpected error extracting user context for audit: {e}")
             return None, None
-
-    async def _log(self, request: Request, path: str, method: str, ip: str, user_agent: str,
-                   user_id: Optional[str], tenant_id: Optional[str]):
-        """
-        Persist audit log entry to database.
-
-        Args:
-            request: FastAPI Request object
-            path: API endpoint path
-            method: HTTP method
-            ip: Client IP address
-            user_agent: User agent string
-            user_id: User ID from JWT token (None if unauthenticated)
-            tenant_id: Tenant ID from JWT token (None if unauthenticated)
-        """
-        async for db in get_db():
-            try:
-                entry = AuditLog(
-                    tenant_id=tenant_id,
-                    user_id=user_id,
-                    action_type='request',
-                    action_category='data_access',
-                    api_endpoint=path,
-                    http_method=method,
-                    ip_address=ip,
-                    user_agent=user_agent
-                )
-                db.add(entry)
-                await db.commit()
-                return
-            except Exception as e:
-                # Log to stderr for monitoring but don't fail the request
-                logger.error(f"Failed to persist audit log: {e}")
-                try:
-                    await db.rollback()
-                except Exception:
-                    pass
-                return
@@ -13,7 +13,7 @@ Includes:
 - Remittance advice (ERA)
 """
 
-from sqlalchemy import Column, String, Boolean, DateTime, Date, Integer, Numeric, Text, ForeignKey, JSON
+from sqlalchemy import Column, String, Boolean, DateTime, Date, Integer, Numeric, Text, ForeignKey, JSON, Index, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from ..utils.db import Base
@@ -32,7 +32,9 @@ class Patient(Base):
     fhir_id = Column(String(100), index=True)  # FHIR resource ID from EHR
     source_ehr = Column(String(50))  # 'epic', 'athena', 'cerner', 'meditech'
     source_organization_id = Column(String(100))  # EHR organization identifier
+    source_connection_id = Column(UUID(as_uuid=True), ForeignKey('ehr_connections.connection_id', ondelete='SET NULL'), index=True)  # Connection that last synced the patient
     fhir_raw = Column(JSONB)  # Complete FHIR resource for reference
+    source_hash = Column(String(64))  # SHA-256 of the FHIR resource without meta (sync change detection)
     last_synced_at = Column(DateTime)  # Last sync from EHR
 
     # Patient Identifiers
@@ -88,6 +90,11 @@ class Patient(Base):
     insurance_policies = relationship("PatientInsurance", back_populates="patient", cascade="all, delete-orphan")
     claims = relationship("Claim", back_populates="patient")
 
+    __table_args__ = (
+        # EHR sync upsert conflict target (migration 009)
+        Index('uq_patients_tenant_fhir_id', 'tenant_id', 'fhir_id', unique=True, postgresql_where=text('fhir_id IS NOT NULL')),
+    )
+
 
 class InsurancePayer(Base):
     """Insurance companies and payers"""
@@ -205,6 +212,7 @@ class Encounter(Base):
     source_ehr = Column(String(50))  # 'epic', 'athena', 'cerner', 'meditech'
     source_organization_id = Column(String(100))
     fhir_raw = Column(JSONB)  # Complete FHIR Encounter resource
+    source_hash = Column(String(64))  # SHA-256 of the FHIR resource without meta (sync change detection)
     last_synced_at = Column(DateTime)
 
     # Encounter Identification
@@ -262,6 +270,11 @@ class Encounter(Base):
     procedures = relationship("EncounterProcedure", back_populates="encounter", cascade="all, delete-orphan")
     claims = relationship("Claim", back_populates="encounter")
 
+    __table_args__ = (
+        # EHR sync upsert conflict target (migration 009)
+        Index('uq_encounters_tenant_fhir_id', 'tenant_id', 'fhir_id', unique=True, postgresql_where=text('fhir_id IS NOT NULL')),
+    )
+
 
 class EncounterDiagnosis(Base):
     """ICD-10 diagnoses for encounters"""
@@ -274,6 +287,7 @@ class EncounterDiagnosis(Base):
     fhir_id = Column(String(100), index=True)  # FHIR Condition resource ID
     source_ehr = Column(String(50))
     fhir_raw = Column(JSONB)  # Complete FHIR Condition resource
+    source_hash = Column(String(64))  # SHA-256 of the FHIR resource without meta (sync change detection)
 
     # Diagnosis Code
     icd10_code = Column(String(10), nullable=False, index=True)
@@ -303,6 +317,11 @@ class EncounterDiagnosis(Base):
     # Relationships
     encounter = relationship("Encounter", back_populates="diagnoses")
 
+    __table_args__ = (
+        # EHR sync upsert conflict target (migration 009)
+        Index('uq_encounter_diagnoses_encounter_fhir_id', 'encounter_id', 'fhir_id', unique=True, postgresql_where=text('fhir_id IS NOT NULL')),
+    )
+
 
 class EncounterProcedure(Base):
     """CPT/HCPCS procedures for encounters"""
@@ -315,6 +334,7 @@ class EncounterProcedure(Base):
     fhir_id = Column(String(100), index=True)  # FHIR Procedure resource ID
     source_ehr = Column(String(50))
     fhir_raw = Column(JSONB)  # Complete FHIR Procedure resource
+    source_hash = Column(String(64))  # SHA-256 of the FHIR resource without meta (sync change detection)
 
     # Procedure Code
     procedure_code = Column(String(10), nullable=False, index=True)
@@ -368,6 +388,11 @@ class EncounterProcedure(Base):
     encounter = relationship("Encounter", back_populates="procedures")
     claim_line_items = relationship("ClaimLineItem", back_populates="procedure")
 
+    __table_args__ = (
+        # EHR sync upsert conflict target (migration 009)
+        Index('uq_encounter_procedures_encounter_fhir_id', 'encounter_id', 'fhir_id', unique=True, postgresql_where=text('fhir_id IS NOT NULL')),
+    )
+
 
 class Claim(Base):
     """Insurance claims submission and tracking"""
@@ -763,6 +788,7 @@ class EHRConnection(Base):
     poll_interval_seconds = Column(Integer, default=30)
     is_active = Column(Boolean, default=True, index=True)
     use_mock_data = Column(Boolean, default=True)  # Use mock FHIR data for testing
+    poller_settings = Column(JSONB, nullable=False, default=dict)  # Poller tuning, keys in pollers.base_poller.POLLER_SETTINGS
 
     # Sync Status
     last_sync_at = Column(DateTime)
@@ -798,6 +824,7 @@ class SyncState(Base):
     records_processed = Column(Integer, default=0)
     records_created = Column(Integer, default=0)
     records_updated = Column(Integer, default=0)
+    records_skipped = Column(Integer, default=0)  # Unchanged since last sync, not written
     error_count = Column(Integer, default=0)
     last_error_message = Column(Text)
 
@@ -813,6 +840,35 @@ class SyncState(Base):
     connection = relationship("EHRConnection", back_populates="sync_states")
 
 
+class PollerWorker(Base):
+    """Poller worker process, kept alive by its heartbeat"""
+    __tablename__ = 'poller_workers'
+
+    worker_id = Column(String(100), primary_key=True)  # e.g. 'hostname-pid-ab12cd'
+    hostname = Column(String(255))
+    pid = Column(Integer)
+
+    started_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    heartbeat_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow, index=True)
+
+
+class PollerLease(Base):
+    """Lease giving one poller worker ownership of an EHR connection"""
+    __tablename__ = 'poller_leases'
+
+    connection_id = Column(UUID(as_uuid=True), ForeignKey('ehr_connections.connection_id', ondelete='CASCADE'), primary_key=True)
+    worker_id = Column(String(100), nullable=False, index=True)
+
+    # Lease Timing (database clock, UTC)
+    lease_expires_at = Column(DateTime, nullable=False)
+    acquired_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    renewed_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    # Routing
+    sync_requested_at = Column(DateTime)  # Manual sync waiting for the holder to pick up
+    status = Column(JSONB)  # Holder's last published poller status
+
+
 # ============================================================================
 # REFERENCE DATA MODELS
 # ============================================================================
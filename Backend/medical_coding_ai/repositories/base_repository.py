@@ -5,11 +5,12 @@ Provides common CRUD operations with multi-tenant isolation.
 All repositories should extend this base class.
 """
 
-from typing import TypeVar, Generic, List, Optional, Dict, Any, Type
+from typing import TypeVar, Generic, List, Optional, Dict, Any, Type, Iterable
 from uuid import UUID
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, literal_column
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import DeclarativeBase
 import logging
 
@@ -17,6 +18,15 @@ logger = logging.getLogger(__name__)
 
 T = TypeVar('T', bound=DeclarativeBase)
 
+# Rows per INSERT ... ON CONFLICT statement for EHR bulk upserts
+DEFAULT_UPSERT_BATCH_SIZE = 500
+
+# asyncpg/PostgreSQL limit on bind parameters per statement
+MAX_BIND_PARAMETERS = 32767
+
+# Columns an EHR re-sync never overwrites
+IMMUTABLE_COLUMNS = ('created_at', 'created_by')
+
 
 class BaseRepository(Generic[T]):
     """
@@ -236,6 +246,190 @@ class BaseRepository(Generic[T]):
         result = await self.session.execute(query)
         return result.scalar_one()
 
+    async def bulk_upsert(
+        self,
+        rows: List[Dict[str, Any]],
+        conflict_columns: List[str],
+        conflict_where=None,
+        batch_size: int = DEFAULT_UPSERT_BATCH_SIZE
+    ) -> Dict[str, Any]:
+        """
+        Upsert rows with INSERT ... ON CONFLICT DO UPDATE, batch_size rows per statement.
+
+        Rows are matched on conflict_columns, which need a unique index
+        (conflict_where is the predicate of a partial unique index). Keys that
+        are not columns of the table are ignored. When the same conflict key
+        appears more than once, the last row wins. Existing rows get every
+        provided column except the primary key, conflict columns and
+        created_at/created_by, plus updated_at. Rows carrying a source_hash
+        equal to the stored one are not rewritten and are counted as unchanged;
+        their IDs are looked up so callers still get every ID, and only their
+        last_synced_at is refreshed when the rows carry one.
+
+        Args:
+            rows: Column value dicts
+            conflict_columns: Unique key columns, e.g. ['tenant_id', 'fhir_id']
+            conflict_where: Partial index predicate, if any
+            batch_size: Rows per statement
+
+        Returns:
+            Dict with:
+                - ids: fhir_id -> primary key of every upserted row
+                - created: Number of inserted rows
+                - updated: Number of updated rows
+                - unchanged: Number of rows skipped because their source_hash matched
+        """
+        table = self.model_class.__table__
+        pk_column = self._get_primary_key_column()
+        column_names = set(table.columns.keys())
+
+        # One row per conflict key; ON CONFLICT cannot touch a row twice in one statement
+        unique_rows: Dict[tuple, Dict[str, Any]] = {}
+        for row in rows:
+            values = {key: value for key, value in row.items() if key in column_names}
+            unique_rows[tuple(values.get(column) for column in conflict_columns)] = values
+
+        # Multi-row VALUES needs the same columns in every row
+        groups: Dict[frozenset, List[Dict[str, Any]]] = {}
+        for values in unique_rows.values():
+            groups.setdefault(frozenset(values), []).append(values)
+
+        result = {'ids': {}, 'created': 0, 'updated': 0, 'unchanged': 0}
+        returning = [pk_column, literal_column('(xmax = 0)').label('inserted')]
+        if 'fhir_id' in column_names:
+            returning.append(table.c.fhir_id)
+
+        written = set()
+        for keys, group in groups.items():
+            rows_per_statement = max(1, min(batch_size, MAX_BIND_PARAMETERS // len(table.columns)))
+
+            for start in range(0, len(group), rows_per_statement):
+                stmt = insert(self.model_class).values(group[start:start + rows_per_statement])
+                update_values = {
+                    key: stmt.excluded[key] for key in keys
+                    if key not in conflict_columns and key != pk_column.name and key not in IMMUTABLE_COLUMNS
+                }
+                if 'updated_at' in column_names:
+                    update_values['updated_at'] = datetime.utcnow()
+
+                # Skip the update when the content hash has not changed
+                unchanged_where = (
+                    table.c.source_hash.is_distinct_from(stmt.excluded.source_hash)
+                    if 'source_hash' in keys else None
+                )
+
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=conflict_columns,
+                    index_where=conflict_where,
+                    set_=update_values,
+                    where=unchanged_where
+                ).returning(*returning)
+
+                for record in (await self.session.execute(stmt)).all():
+                    if 'fhir_id' in column_names:
+                        result['ids'][record.fhir_id] = record[0]
+                        written.add(record.fhir_id)
+                    result['created' if record.inserted else 'updated'] += 1
+
+        # Without a source_hash every conflicting row is updated and returned
+        hashed = any('source_hash' in keys for keys in groups)
+        if hashed:
+            result['unchanged'] = len(unique_rows) - result['created'] - result['updated']
+        if result['unchanged'] and 'fhir_id' in conflict_columns:
+            unchanged = {key: values for key, values in unique_rows.items() if values['fhir_id'] not in written}
+            result['ids'].update(await self._lookup_conflict_ids(unchanged, conflict_columns, batch_size))
+            if 'last_synced_at' in column_names:
+                await self._touch_last_synced(unchanged.values(), result['ids'], batch_size)
+
+        logger.debug(
+            f"Bulk upserted {len(unique_rows)} {self.model_class.__name__} rows "
+            f"({result['created']} created, {result['updated']} updated, {result['unchanged']} unchanged)"
+        )
+        return result
+
+    async def _lookup_conflict_ids(
+        self,
+        rows: Dict[tuple, Dict[str, Any]],
+        conflict_columns: List[str],
+        batch_size: int
+    ) -> Dict[str, Any]:
+        """fhir_id -> primary key of existing rows, matched on their full conflict key."""
+        table = self.model_class.__table__
+        pk_column = self._get_primary_key_column()
+        keys = list(rows)
+        ids = {}
+
+        for start in range(0, len(keys), batch_size):
+            chunk = keys[start:start + batch_size]
+            query = select(pk_column, *(table.c[column] for column in conflict_columns))
+            for position, column in enumerate(conflict_columns):
+                query = query.where(table.c[column].in_({key[position] for key in chunk}))
+
+            wanted = set(chunk)
+            for record in (await self.session.execute(query)).all():
+                key = tuple(record[1:])
+                if key in wanted:
+                    ids[rows[key]['fhir_id']] = record[0]
+
+        return ids
+
+    async def _touch_last_synced(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        ids: Dict[str, Any],
+        batch_size: int
+    ):
+        """Set last_synced_at of existing rows to the value each row carries."""
+        pk_column = self._get_primary_key_column()
+        by_sync_time: Dict[datetime, List[Any]] = {}
+        for values in rows:
+            if values.get('last_synced_at') and values['fhir_id'] in ids:
+                by_sync_time.setdefault(values['last_synced_at'], []).append(ids[values['fhir_id']])
+
+        for synced_at, pks in by_sync_time.items():
+            for start in range(0, len(pks), batch_size):
+                await self.session.execute(
+                    update(self.model_class)
+                    .where(pk_column.in_(pks[start:start + batch_size]))
+                    .values(last_synced_at=synced_at)
+                )
+
+    async def resolve_fhir_ids(
+        self,
+        model_class: Type[DeclarativeBase],
+        fhir_ids: Iterable[str],
+        tenant_id: Optional[UUID] = None,
+        batch_size: int = DEFAULT_UPSERT_BATCH_SIZE
+    ) -> Dict[str, UUID]:
+        """
+        Map FHIR IDs of referenced records (e.g. an encounter's patient) to
+        their primary keys with one IN query per batch.
+
+        Args:
+            model_class: Referenced model with a fhir_id column
+            fhir_ids: FHIR IDs to resolve
+            tenant_id: Optional tenant filter
+            batch_size: FHIR IDs per query
+
+        Returns:
+            fhir_id -> primary key for every ID found
+        """
+        pk_column = model_class.__mapper__.primary_key[0]
+        wanted = list(dict.fromkeys(fhir_id for fhir_id in fhir_ids if fhir_id))
+        resolved: Dict[str, UUID] = {}
+
+        for start in range(0, len(wanted), batch_size):
+            query = select(model_class.fhir_id, pk_column).where(
+                model_class.fhir_id.in_(wanted[start:start + batch_size])
+            )
+            if tenant_id and hasattr(model_class, 'tenant_id'):
+                query = query.where(model_class.tenant_id == tenant_id)
+
+            result = await self.session.execute(query)
+            resolved.update({fhir_id: record_id for fhir_id, record_id in result.all()})
+
+        return resolved
+
     def _get_primary_key_column(self):
         """Get the primary key column of the model."""
         mapper = self.model_class.__mapper__
@@ -3,6 +3,7 @@ Condition (Diagnosis) Repository
 
 Provides data access for EncounterDiagnosis records with:
 - UPSERT logic using fhir_id for EHR sync
+- Set-based bulk UPSERT (INSERT ... ON CONFLICT) for EHR sync batches
 - ICD-10 code operations
 - AI suggestion tracking
 """
@@ -14,8 +15,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, func
 import logging
 
-from .base_repository import BaseRepository
-from ..models.ehr_models import EncounterDiagnosis
+from .base_repository import BaseRepository, DEFAULT_UPSERT_BATCH_SIZE
+from ..models.ehr_models import Encounter, EncounterDiagnosis
 
 logger = logging.getLogger(__name__)
 
@@ -97,6 +98,66 @@ class ConditionRepository(BaseRepository[EncounterDiagnosis]):
             logger.debug(f"Created condition {new_condition.diagnosis_id} from EHR sync")
             return new_condition
 
+    async def bulk_upsert_from_ehr(
+        self,
+        conditions: List[Dict[str, Any]],
+        encounter_ids: Optional[Dict[str, UUID]] = None,
+        batch_size: int = DEFAULT_UPSERT_BATCH_SIZE
+    ) -> Dict[str, Any]:
+        """
+        Upsert a batch of conditions from EHR sync, batch_size rows per statement.
+
+        Rows are matched on (encounter_id, fhir_id) like upsert_from_ehr.
+        encounter_fhir_id references are resolved from encounter_ids (e.g. the
+        ids returned by EncounterRepository.bulk_upsert_from_ehr) and the rest
+        with one lookup per batch, scoped to the row's tenant_id when given.
+        Conditions whose encounter is not found are skipped. Does not commit.
+
+        Args:
+            conditions: Conditions data dicts, each with fhir_id
+            encounter_ids: Known encounter fhir_id -> encounter_id
+            batch_size: Rows per statement
+
+        Returns:
+            Dict with ids (fhir_id -> diagnosis_id), created and updated counts,
+            and skipped (fhir_ids of conditions without an encounter)
+        """
+        encounter_ids = dict(encounter_ids or {})
+        for condition_data in conditions:
+            if not condition_data.get('fhir_id'):
+                raise ValueError("fhir_id is required for EHR upsert")
+
+        missing: Dict[Optional[UUID], List[str]] = {}
+        for condition_data in conditions:
+            encounter_fhir_id = condition_data.get('encounter_fhir_id')
+            if not condition_data.get('encounter_id') and encounter_fhir_id not in encounter_ids:
+                missing.setdefault(condition_data.get('tenant_id'), []).append(encounter_fhir_id)
+        for tenant_id, fhir_ids in missing.items():
+            encounter_ids.update(await self.resolve_fhir_ids(Encounter, fhir_ids, tenant_id, batch_size))
+
+        rows = []
+        skipped = []
+        for condition_data in conditions:
+            row = dict(condition_data)
+            if not row.get('encounter_id'):
+                row['encounter_id'] = encounter_ids.get(row.get('encounter_fhir_id'))
+            if not row['encounter_id']:
+                skipped.append(row['fhir_id'])
+                continue
+            rows.append(row)
+
+        if skipped:
+            logger.warning(f"Skipped {len(skipped)} conditions whose encounter was not found")
+
+        result = await self.bulk_upsert(
+            rows,
+            conflict_columns=['encounter_id', 'fhir_id'],
+            conflict_where=EncounterDiagnosis.fhir_id.isnot(None),
+            batch_size=batch_size
+        )
+        result['skipped'] = skipped
+        return result
+
     async def get_by_fhir_id_and_encounter(
         self,
         fhir_id: str,
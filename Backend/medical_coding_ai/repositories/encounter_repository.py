@@ -3,6 +3,7 @@ Encounter Repository
 
 Provides data access for Encounter records with:
 - UPSERT logic using fhir_id for EHR sync deduplication
+- Set-based bulk UPSERT (INSERT ... ON CONFLICT) for EHR sync batches
 - Multi-tenant isolation
 - Relationship loading for diagnoses and procedures
 """
@@ -15,8 +16,8 @@ from sqlalchemy import select, and_, or_
 from sqlalchemy.orm import selectinload
 import logging
 
-from .base_repository import BaseRepository
-from ..models.ehr_models import Encounter, EncounterDiagnosis, EncounterProcedure
+from .base_repository import BaseRepository, DEFAULT_UPSERT_BATCH_SIZE
+from ..models.ehr_models import Encounter, EncounterDiagnosis, EncounterProcedure, Patient
 
 logger = logging.getLogger(__name__)
 
@@ -104,6 +105,67 @@ class EncounterRepository(BaseRepository[Encounter]):
             logger.debug(f"Created encounter {new_encounter.encounter_id} from EHR sync")
             return new_encounter
 
+    async def bulk_upsert_from_ehr(
+        self,
+        encounters: List[Dict[str, Any]],
+        patient_ids: Optional[Dict[str, UUID]] = None,
+        batch_size: int = DEFAULT_UPSERT_BATCH_SIZE
+    ) -> Dict[str, Any]:
+        """
+        Upsert a batch of encounters from EHR sync, batch_size rows per statement.
+
+        patient_fhir_id references are resolved from patient_ids (e.g. the
+        ids returned by PatientRepository.bulk_upsert_from_ehr) and the rest
+        with one lookup per batch. Encounters whose patient is not found are
+        skipped. Does not commit.
+
+        Args:
+            encounters: Encounter data dicts, each with tenant_id and fhir_id
+            patient_ids: Known patient fhir_id -> patient_id
+            batch_size: Rows per statement
+
+        Returns:
+            Dict with ids (fhir_id -> encounter_id), created and updated
+            counts, and skipped (fhir_ids of encounters without a patient)
+        """
+        patient_ids = dict(patient_ids or {})
+        for encounter_data in encounters:
+            if not encounter_data.get('tenant_id') or not encounter_data.get('fhir_id'):
+                raise ValueError("tenant_id and fhir_id are required for EHR upsert")
+
+        # Resolve the remaining patient references per tenant
+        missing: Dict[UUID, List[str]] = {}
+        for encounter_data in encounters:
+            patient_fhir_id = encounter_data.get('patient_fhir_id')
+            if 'patient_id' not in encounter_data and patient_fhir_id not in patient_ids:
+                missing.setdefault(encounter_data['tenant_id'], []).append(patient_fhir_id)
+        for tenant_id, fhir_ids in missing.items():
+            patient_ids.update(await self.resolve_fhir_ids(Patient, fhir_ids, tenant_id, batch_size))
+
+        synced_at = datetime.utcnow()
+        rows = []
+        skipped = []
+        for encounter_data in encounters:
+            row = {**encounter_data, 'last_synced_at': synced_at}
+            if 'patient_id' not in row:
+                row['patient_id'] = patient_ids.get(row.get('patient_fhir_id'))
+            if not row['patient_id']:
+                skipped.append(row['fhir_id'])
+                continue
+            rows.append(row)
+
+        if skipped:
+            logger.warning(f"Skipped {len(skipped)} encounters whose patient was not found")
+
+        result = await self.bulk_upsert(
+            rows,
+            conflict_columns=['tenant_id', 'fhir_id'],
+            conflict_where=Encounter.fhir_id.isnot(None),
+            batch_size=batch_size
+        )
+        result['skipped'] = skipped
+        return result
+
     async def get_by_encounter_number(
         self,
         encounter_number: str,
@@ -3,6 +3,7 @@ Patient Repository
 
 Provides data access for Patient records with:
 - UPSERT logic using fhir_id for EHR sync deduplication
+- Set-based bulk UPSERT (INSERT ... ON CONFLICT) for EHR sync batches
 - Multi-tenant isolation
 - Search and filtering capabilities
 """
@@ -15,7 +16,7 @@ from sqlalchemy import select, and_, or_
 from sqlalchemy.dialects.postgresql import insert
 import logging
 
-from .base_repository import BaseRepository
+from .base_repository import BaseRepository, DEFAULT_UPSERT_BATCH_SIZE
 from ..models.ehr_models import Patient
 
 logger = logging.getLogger(__name__)
@@ -85,6 +86,39 @@ class PatientRepository(BaseRepository[Patient]):
             logger.debug(f"Created patient {new_patient.patient_id} from EHR sync")
             return new_patient
 
+    async def bulk_upsert_from_ehr(
+        self,
+        patients: List[Dict[str, Any]],
+        batch_size: int = DEFAULT_UPSERT_BATCH_SIZE
+    ) -> Dict[str, Any]:
+        """
+        Upsert a batch of patients from EHR sync, batch_size rows per statement.
+
+        Same conflict resolution as upsert_from_ehr (tenant_id + fhir_id), but
+        one INSERT ... ON CONFLICT DO UPDATE per batch instead of a SELECT and
+        an UPDATE/INSERT per patient. Does not commit.
+
+        Args:
+            patients: Patient data dicts, each with tenant_id and fhir_id
+            batch_size: Rows per statement
+
+        Returns:
+            Dict with ids (fhir_id -> patient_id), created and updated counts
+        """
+        synced_at = datetime.utcnow()
+        rows = []
+        for patient_data in patients:
+            if not patient_data.get('tenant_id') or not patient_data.get('fhir_id'):
+                raise ValueError("tenant_id and fhir_id are required for EHR upsert")
+            rows.append({**patient_data, 'last_synced_at': synced_at})
+
+        return await self.bulk_upsert(
+            rows,
+            conflict_columns=['tenant_id', 'fhir_id'],
+            conflict_where=Patient.fhir_id.isnot(None),
+            batch_size=batch_size
+        )
+
     async def get_by_mrn(
         self,
         mrn: str,
@@ -197,6 +231,44 @@ class PatientRepository(BaseRepository[Patient]):
         result = await self.session.execute(query)
         return list(result.scalars().all())
 
+    async def get_fhir_ids(
+        self,
+        tenant_id: UUID,
+        source_ehr: str,
+        connection_id: UUID
+    ) -> List[str]:
+        """
+        FHIR IDs of the active patients synced through an EHR connection.
+
+        Incremental syncs search for these patients' updated encounters,
+        conditions and procedures. Patients synced before connections were
+        recorded (NULL source_connection_id) are included for every
+        connection of the EHR type until their next update claims them.
+
+        Args:
+            tenant_id: Tenant UUID
+            source_ehr: EHR source type
+            connection_id: EHR connection UUID
+
+        Returns:
+            List of FHIR patient IDs
+        """
+        query = select(Patient.fhir_id).where(
+            and_(
+                Patient.tenant_id == tenant_id,
+                Patient.source_ehr == source_ehr,
+                or_(
+                    Patient.source_connection_id == connection_id,
+                    Patient.source_connection_id == None
+                ),
+                Patient.fhir_id.isnot(None),
+                Patient.is_active == True
+            )
+        )
+
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
     async def get_patient_with_insurance(
         self,
         patient_id: UUID,
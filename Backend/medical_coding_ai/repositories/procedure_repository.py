@@ -3,6 +3,7 @@ Procedure Repository
 
 Provides data access for EncounterProcedure records with:
 - UPSERT logic using fhir_id for EHR sync
+- Set-based bulk UPSERT (INSERT ... ON CONFLICT) for EHR sync batches
 - CPT/HCPCS code operations
 - AI suggestion tracking
 - NCCI edit conflict tracking
@@ -15,8 +16,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, func
 import logging
 
-from .base_repository import BaseRepository
-from ..models.ehr_models import EncounterProcedure
+from .base_repository import BaseRepository, DEFAULT_UPSERT_BATCH_SIZE
+from ..models.ehr_models import Encounter, EncounterProcedure
 
 logger = logging.getLogger(__name__)
 
@@ -100,6 +101,66 @@ class ProcedureRepository(BaseRepository[EncounterProcedure]):
             logger.debug(f"Created procedure {new_procedure.procedure_id} from EHR sync")
             return new_procedure
 
+    async def bulk_upsert_from_ehr(
+        self,
+        procedures: List[Dict[str, Any]],
+        encounter_ids: Optional[Dict[str, UUID]] = None,
+        batch_size: int = DEFAULT_UPSERT_BATCH_SIZE
+    ) -> Dict[str, Any]:
+        """
+        Upsert a batch of procedures from EHR sync, batch_size rows per statement.
+
+        Rows are matched on (encounter_id, fhir_id) like upsert_from_ehr.
+        encounter_fhir_id references are resolved from encounter_ids (e.g. the
+        ids returned by EncounterRepository.bulk_upsert_from_ehr) and the rest
+        with one lookup per batch, scoped to the row's tenant_id when given.
+        Procedures whose encounter is not found are skipped. Does not commit.
+
+        Args:
+            procedures: Procedures data dicts, each with fhir_id
+            encounter_ids: Known encounter fhir_id -> encounter_id
+            batch_size: Rows per statement
+
+        Returns:
+            Dict with ids (fhir_id -> procedure_id), created and updated counts,
+            and skipped (fhir_ids of procedures without an encounter)
+        """
+        encounter_ids = dict(encounter_ids or {})
+        for procedure_data in procedures:
+            if not procedure_data.get('fhir_id'):
+                raise ValueError("fhir_id is required for EHR upsert")
+
+        missing: Dict[Optional[UUID], List[str]] = {}
+        for procedure_data in procedures:
+            encounter_fhir_id = procedure_data.get('encounter_fhir_id')
+            if not procedure_data.get('encounter_id') and encounter_fhir_id not in encounter_ids:
+                missing.setdefault(procedure_data.get('tenant_id'), []).append(encounter_fhir_id)
+        for tenant_id, fhir_ids in missing.items():
+            encounter_ids.update(await self.resolve_fhir_ids(Encounter, fhir_ids, tenant_id, batch_size))
+
+        rows = []
+        skipped = []
+        for procedure_data in procedures:
+            row = dict(procedure_data)
+            if not row.get('encounter_id'):
+                row['encounter_id'] = encounter_ids.get(row.get('encounter_fhir_id'))
+            if not row['encounter_id']:
+                skipped.append(row['fhir_id'])
+                continue
+            rows.append(row)
+
+        if skipped:
+            logger.warning(f"Skipped {len(skipped)} procedures whose encounter was not found")
+
+        result = await self.bulk_upsert(
+            rows,
+            conflict_columns=['encounter_id', 'fhir_id'],
+            conflict_where=EncounterProcedure.fhir_id.isnot(None),
+            batch_size=batch_size
+        )
+        result['skipped'] = skipped
+        return result
+
     async def get_by_fhir_id_and_encounter(
         self,
         fhir_id: str,
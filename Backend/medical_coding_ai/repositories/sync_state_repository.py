@@ -103,6 +103,7 @@ class SyncStateRepository(BaseRepository[SyncState]):
             records_processed=0,
             records_created=0,
             records_updated=0,
+            records_skipped=0,
             error_count=0
         )
 
@@ -123,7 +124,9 @@ class SyncStateRepository(BaseRepository[SyncState]):
         resource_type: str,
         records_processed: int,
         records_created: int,
-        records_updated: int
+        records_updated: int,
+        records_skipped: int = 0,
+        sync_time: Optional[datetime] = None
     ) -> SyncState:
         """
         Update sync state after successful sync.
@@ -134,18 +137,23 @@ class SyncStateRepository(BaseRepository[SyncState]):
             records_processed: Number of records processed
             records_created: Number of new records created
             records_updated: Number of existing records updated
+            records_skipped: Number of unchanged records not written
+            sync_time: New watermark, e.g. when the sync started (default now)
 
         Returns:
             Updated SyncState
         """
         sync_state = await self.get_or_create(connection_id, resource_type)
 
-        sync_state.last_sync_time = datetime.utcnow()
+        sync_state.last_sync_time = sync_time or datetime.utcnow()
         sync_state.last_sync_status = 'success'
         sync_state.records_processed = (sync_state.records_processed or 0) + records_processed
         sync_state.records_created = (sync_state.records_created or 0) + records_created
         sync_state.records_updated = (sync_state.records_updated or 0) + records_updated
-        sync_state.error_message = None
+        sync_state.records_skipped = (sync_state.records_skipped or 0) + records_skipped
+        sync_state.error_count = 0
+        sync_state.last_error_message = None
+        sync_state.updated_at = datetime.utcnow()
 
         await self.session.flush()
         await self.session.refresh(sync_state)
@@ -166,6 +174,9 @@ class SyncStateRepository(BaseRepository[SyncState]):
         """
         Update sync state after sync error.
 
+        last_sync_time is left alone: it is the watermark of the last
+        successful sync, which the next sync resumes from.
+
         Args:
             connection_id: EHR connection UUID
             resource_type: FHIR resource type
@@ -176,10 +187,10 @@ class SyncStateRepository(BaseRepository[SyncState]):
         """
         sync_state = await self.get_or_create(connection_id, resource_type)
 
-        sync_state.last_sync_time = datetime.utcnow()
         sync_state.last_sync_status = 'error'
         sync_state.error_count = (sync_state.error_count or 0) + 1
-        sync_state.error_message = error_message
+        sync_state.last_error_message = error_message
+        sync_state.updated_at = datetime.utcnow()
 
         await self.session.flush()
         await self.session.refresh(sync_state)
@@ -265,8 +276,9 @@ class SyncStateRepository(BaseRepository[SyncState]):
                 'records_processed': state.records_processed or 0,
                 'records_created': state.records_created or 0,
                 'records_updated': state.records_updated or 0,
+                'records_skipped': state.records_skipped or 0,
                 'error_count': state.error_count or 0,
-                'last_error': state.error_message
+                'last_error': state.last_error_message
             }
 
         return summary
@@ -296,8 +308,9 @@ class SyncStateRepository(BaseRepository[SyncState]):
                 sync_state.records_processed = 0
                 sync_state.records_created = 0
                 sync_state.records_updated = 0
+                sync_state.records_skipped = 0
                 sync_state.error_count = 0
-                sync_state.error_message = None
+                sync_state.last_error_message = None
                 await self.session.flush()
                 return 1
             return 0
@@ -309,8 +322,9 @@ class SyncStateRepository(BaseRepository[SyncState]):
                 state.records_processed = 0
                 state.records_created = 0
                 state.records_updated = 0
+                state.records_skipped = 0
                 state.error_count = 0
-                state.error_message = None
+                state.last_error_message = None
             await self.session.flush()
             return len(sync_states)
 
@@ -1,3 +1,4 @@
+import asyncio
 import streamlit as st
 import pandas as pd
 import plotly.express as px
@@ -277,10 +278,13 @@ class MedicalCodingApp:
             
             if os.path.exists(processed_icd10_path):
                 with st.spinner("📚 Loading processed ICD-10 knowledge base..."):
-                    icd10_codes = self.kb_manager.load_processed_codes('icd10') if self.kb_manager else []
-                    if icd10_codes and st.session_state.master_agent.icd10_agent:
-                        st.session_state.master_agent.icd10_agent.load_knowledge_base(icd10_codes)
-                        st.session_state.processing_status['icd10'] = f"✅ Loaded {len(icd10_codes)} processed codes"
+                    # Defaults to the shared catalog, memory-mapping the index
+                    # built during PDF processing when it is current
+                    icd10_agent = st.session_state.master_agent.icd10_agent
+                    if icd10_agent:
+                        icd10_agent.load_knowledge_base()
+                    if icd10_agent and icd10_agent.knowledge_loaded:
+                        st.session_state.processing_status['icd10'] = f"✅ Loaded {icd10_agent.vector_store.count()} processed codes"
                     else:
                         st.session_state.processing_status['icd10'] = "⚠️ Using sample data"
             elif os.path.exists(icd10_path):
@@ -299,10 +303,13 @@ class MedicalCodingApp:
             
             if os.path.exists(processed_cpt_path):
                 with st.spinner("📚 Loading processed CPT knowledge base..."):
-                    cpt_codes = self.kb_manager.load_processed_codes('cpt') if self.kb_manager else []
-                    if cpt_codes and st.session_state.master_agent.cpt_agent:
-                        st.session_state.master_agent.cpt_agent.load_knowledge_base(cpt_codes)
-                        st.session_state.processing_status['cpt'] = f"✅ Loaded {len(cpt_codes)} processed codes"
+                    # Defaults to the shared catalog, memory-mapping the index
+                    # built during PDF processing when it is current
+                    cpt_agent = st.session_state.master_agent.cpt_agent
+                    if cpt_agent:
+                        cpt_agent.load_knowledge_base()
+                    if cpt_agent and cpt_agent.knowledge_loaded:
+                        st.session_state.processing_status['cpt'] = f"✅ Loaded {cpt_agent.vector_store.count()} processed codes"
                     else:
                         st.session_state.processing_status['cpt'] = "⚠️ Using sample data"
             elif os.path.exists(cpt_path):
@@ -321,10 +328,13 @@ class MedicalCodingApp:
             
             if os.path.exists(processed_hcpcs_path):
                 with st.spinner("📚 Loading processed HCPCS knowledge base..."):
-                    hcpcs_codes = self.kb_manager.load_processed_codes('hcpcs') if self.kb_manager else []
-                    if hcpcs_codes and st.session_state.master_agent.hcpcs_agent:
-                        st.session_state.master_agent.hcpcs_agent.load_knowledge_base(hcpcs_codes)
-                        st.session_state.processing_status['hcpcs'] = f"✅ Loaded {len(hcpcs_codes)} processed codes"
+                    # Defaults to the shared catalog, memory-mapping the index
+                    # built during PDF processing when it is current
+                    hcpcs_agent = st.session_state.master_agent.hcpcs_agent
+                    if hcpcs_agent:
+                        hcpcs_agent.load_knowledge_base()
+                    if hcpcs_agent and hcpcs_agent.knowledge_loaded:
+                        st.session_state.processing_status['hcpcs'] = f"✅ Loaded {hcpcs_agent.vector_store.count()} processed codes"
                     else:
                         st.session_state.processing_status['hcpcs'] = "⚠️ Using sample data"
             elif os.path.exists(hcpcs_path):
@@ -664,13 +674,14 @@ class MedicalCodingApp:
                 progress_container.progress(0.1)
                 progress_text.text("Analyzing document...")
                 
-                # Run analysis
-                results = st.session_state.master_agent.analyze_document(
+                # Run analysis (agents are async; Streamlit runs scripts synchronously)
+                results = asyncio.run(st.session_state.master_agent.analyze_document(
                     document_text, 
                     run_icd10=run_icd10, 
                     run_cpt=run_cpt, 
-                    run_hcpcs=run_hcpcs
-                )
+                    run_hcpcs=run_hcpcs,
+                    extraction=st.session_state.patient_data.get('clinical_extraction')
+                ))
                 
                 # Update progress
                 progress_container.progress(0.7)
@@ -1404,10 +1415,10 @@ class MedicalCodingApp:
                 }
                 
                 # Verify codes
-                verification_results = st.session_state.master_agent.verify_codes(
+                verification_results = asyncio.run(st.session_state.master_agent.verify_codes(
                     st.session_state.selected_codes,
                     document_data
-                )
+                ))
                 
                 # Store results
                 st.session_state.verification_results = verification_results
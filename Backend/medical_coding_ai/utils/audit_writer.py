@@ -0,0 +1,383 @@
+"""
+Write-Behind Audit Log Writer
+
+Request audit entries are queued in memory by AuditMiddleware and written by
+one background task in multi-row INSERTs, instead of a session and commit per
+request competing with the handlers for pooled connections.
+
+- The queue is bounded (max_queue_size); a batch is written as soon as
+  batch_size entries are queued, otherwise every flush_interval seconds
+- When the queue is full, or the database is unavailable, entries are
+  appended to a local JSONL spill file and written back once the database
+  accepts writes again; without a spill file they are dropped and counted
+- String fields are truncated to their column lengths when queued; if the
+  database still rejects a batch, it is split in halves until the rejected
+  rows are isolated, and those go to a dead-letter file instead of the spill
+  file, so one bad row never holds back the rows batched with it
+- stop() flushes whatever is queued, and is called from the app's lifespan
+  shutdown
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from sqlalchemy import String, insert
+from sqlalchemy.exc import DisconnectionError, InterfaceError, OperationalError
+
+from ..models.user_models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL_SECONDS = 1.0
+DEFAULT_SPILL_PATH = 'data/audit_spill.jsonl'
+DEFAULT_DEAD_LETTER_PATH = 'data/audit_rejected.jsonl'
+# After a failed write, wait this long before writing spilled entries back
+REPLAY_RETRY_SECONDS = 30
+
+# Columns written for every entry; multi-row VALUES need the same keys in each row
+AUDIT_COLUMNS = (
+    'tenant_id', 'user_id', 'action_type', 'action_category', 'api_endpoint',
+    'http_method', 'ip_address', 'user_agent', 'created_at',
+)
+# Longest value each string column accepts (user_agent and api_endpoint come from clients)
+COLUMN_LENGTHS = {
+    column: AuditLog.__table__.c[column].type.length
+    for column in AUDIT_COLUMNS
+    if isinstance(AuditLog.__table__.c[column].type, String) and AuditLog.__table__.c[column].type.length
+}
+# Errors meaning the database could not be reached, as opposed to rejecting the rows
+UNAVAILABLE_ERRORS = (OperationalError, InterfaceError, DisconnectionError, OSError, asyncio.TimeoutError)
+
+
+class AuditWriter:
+    """Bounded in-memory audit queue drained by a background batch writer"""
+
+    def __init__(self, session_factory=None, max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+                 spill_path: Optional[Union[str, Path]] = None,
+                 dead_letter_path: Optional[Union[str, Path]] = None):
+        """
+        Args:
+            session_factory: Async session factory (utils/db.AsyncSessionLocal if omitted)
+            max_queue_size: Entries held in memory before spilling (or dropping)
+            batch_size: Entries per INSERT
+            flush_interval: Longest an entry waits in the queue, in seconds
+            spill_path: JSONL file for entries that could not be queued or written
+                (None drops them)
+            dead_letter_path: JSONL file for entries the database rejected
+                (None drops them)
+        """
+        self.session_factory = session_factory
+        self.max_queue_size = max(1, int(max_queue_size))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.spill_path = Path(spill_path) if spill_path else None
+        self.dead_letter_path = Path(dead_letter_path) if dead_letter_path else None
+
+        self._queue: deque = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._spill_lock = threading.Lock()
+        self._replay_after = 0.0
+
+        # Metrics
+        self.metrics = {
+            'enqueued': 0,
+            'written': 0,
+            'batches': 0,
+            'spilled': 0,
+            'replayed': 0,
+            'dropped': 0,
+            'rejected': 0,
+            'write_errors': 0,
+            'max_queue_depth': 0,
+            'last_flush_ms': 0.0,
+        }
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], session_factory=None) -> 'AuditWriter':
+        """Create a writer from the ``audit_log`` section of config.yaml"""
+        audit_config = (config or {}).get('audit_log', {}) or {}
+        return cls(
+            session_factory=session_factory,
+            max_queue_size=audit_config.get('max_queue_size', DEFAULT_MAX_QUEUE_SIZE),
+            batch_size=audit_config.get('batch_size', DEFAULT_BATCH_SIZE),
+            flush_interval=audit_config.get('flush_interval_seconds', DEFAULT_FLUSH_INTERVAL_SECONDS),
+            spill_path=audit_config.get('spill_path', DEFAULT_SPILL_PATH),
+            dead_letter_path=audit_config.get('dead_letter_path', DEFAULT_DEAD_LETTER_PATH),
+        )
+
+    # =========================================================================
+    # QUEUEING
+    # =========================================================================
+
+    def record(self, **fields) -> bool:
+        """
+        Queue an audit entry (AuditLog column values) without waiting.
+
+        Starts the writer on the running event loop if needed.
+
+        Returns:
+            False if the queue was full and the entry was spilled or dropped
+        """
+        entry = _fit_columns({column: fields.get(column) for column in AUDIT_COLUMNS})
+        if entry['created_at'] is None:
+            entry['created_at'] = datetime.utcnow()
+
+        self._ensure_running()
+        if len(self._queue) >= self.max_queue_size or (self._stopping and self._task is None):
+            self._spill([entry])
+            return False
+
+        self._queue.append(entry)
+        self.metrics['enqueued'] += 1
+        self.metrics['max_queue_depth'] = max(self.metrics['max_queue_depth'], len(self._queue))
+        if len(self._queue) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    # =========================================================================
+    # WRITER
+    # =========================================================================
+
+    def start(self):
+        """Start the background writer on the running event loop"""
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop the writer after flushing queued entries; entries left after timeout are spilled"""
+        task = self._task
+        if task is None:
+            return
+        self._task = None
+        self._stopping = True
+        if not task.done():
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(task, timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Audit writer did not flush within {timeout:.0f}s")
+            except Exception as e:
+                logger.error(f"Audit writer failed: {e}")
+        self._spill(self._drain(len(self._queue)))
+
+    def _ensure_running(self):
+        task = self._task
+        if task is not None and not task.done() and task.get_loop() is _running_loop():
+            return
+        if _running_loop() is not None and not self._stopping:
+            self.start()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            if await self.flush() and not self._stopping:
+                await self._replay_spill()
+            if self._stopping:
+                return
+
+    async def flush(self) -> bool:
+        """
+        Write every queued entry.
+
+        Returns:
+            False if the database was unavailable (unwritten entries are spilled)
+        """
+        start = time.perf_counter()
+        ok = True
+        while self._queue:
+            unwritten = await self._write(self._drain(self.batch_size))
+            if unwritten:
+                self._spill(unwritten)
+                ok = False
+        self.metrics['last_flush_ms'] = (time.perf_counter() - start) * 1000
+        return ok
+
+    def _drain(self, count: int) -> List[Dict[str, Any]]:
+        return [self._queue.popleft() for _ in range(min(count, len(self._queue)))]
+
+    async def _write(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Insert entries in one multi-row INSERT, isolating rows the database rejects.
+
+        Returns:
+            The entries left unwritten because the database is unavailable
+        """
+        if not entries:
+            return []
+        error = await self._insert(entries)
+        if error is None:
+            return []
+        if isinstance(error, UNAVAILABLE_ERRORS):
+            self._replay_after = time.monotonic() + REPLAY_RETRY_SECONDS
+            return entries
+        if len(entries) == 1:
+            self._reject(entries[0], error)
+            return []
+
+        # The database rejected some row: bisect until it is found
+        middle = len(entries) // 2
+        unwritten = await self._write(entries[:middle])
+        if unwritten:
+            return unwritten + entries[middle:]
+        return await self._write(entries[middle:])
+
+    async def _insert(self, entries: List[Dict[str, Any]]) -> Optional[Exception]:
+        try:
+            async with self._session_factory()() as session:
+                await session.execute(insert(AuditLog).values(entries))
+                await session.commit()
+        except Exception as e:
+            self.metrics['write_errors'] += 1
+            logger.error(f"Failed to persist {len(entries)} audit log entries: {e}")
+            return e
+
+        self.metrics['written'] += len(entries)
+        self.metrics['batches'] += 1
+        return None
+
+    def _session_factory(self):
+        if self.session_factory is None:
+            from .db import AsyncSessionLocal
+            self.session_factory = AsyncSessionLocal
+        return self.session_factory
+
+    # =========================================================================
+    # SPILL FILE
+    # =========================================================================
+
+    def _reject(self, entry: Dict[str, Any], error: Exception):
+        """Move an entry the database rejects to the dead-letter file; it is never retried"""
+        self.metrics['rejected'] += 1
+        if self.dead_letter_path is None:
+            return
+        try:
+            line = json.dumps(dict(entry, error=str(error)[:500]), default=str) + '\n'
+            with self._spill_lock:
+                self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+        except OSError as e:
+            logger.error(f"Failed to write rejected audit log entry to {self.dead_letter_path}: {e}")
+
+    def _spill(self, entries: List[Dict[str, Any]]):
+        """Append entries to the spill file, or drop them if there is none (or it fails)"""
+        if not entries:
+            return
+        if self.spill_path is not None:
+            try:
+                lines = ''.join(json.dumps(entry, default=str) + '\n' for entry in entries)
+                with self._spill_lock:
+                    self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+                    with open(self.spill_path, 'a', encoding='utf-8') as f:
+                        f.write(lines)
+                self.metrics['spilled'] += len(entries)
+                return
+            except OSError as e:
+                logger.error(f"Failed to spill audit log entries to {self.spill_path}: {e}")
+        self.metrics['dropped'] += len(entries)
+
+    async def _replay_spill(self):
+        """Write spilled entries back once the database accepts writes again"""
+        if self.spill_path is None or time.monotonic() < self._replay_after:
+            return
+        replay_path = self.spill_path.with_suffix(self.spill_path.suffix + '.replay')
+        if not (self.spill_path.exists() or replay_path.exists()):
+            return
+
+        with self._spill_lock:
+            if not replay_path.exists():
+                os.replace(self.spill_path, replay_path)
+        try:
+            with open(replay_path, 'r', encoding='utf-8') as f:
+                entries = [_load_entry(line) for line in f if line.strip()]
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read spilled audit log entries from {replay_path}: {e}")
+            return
+
+        for offset in range(0, len(entries), self.batch_size):
+            batch = entries[offset:offset + self.batch_size]
+            written = self.metrics['written']
+            unwritten = await self._write(batch)
+            self.metrics['replayed'] += self.metrics['written'] - written
+            if unwritten:
+                # Keep the rest for the next attempt
+                self._spill(unwritten + entries[offset + len(batch):])
+                break
+        replay_path.unlink()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Queue depth and writer metrics"""
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'queue_depth': len(self._queue),
+            'max_queue_size': self.max_queue_size,
+            'batch_size': self.batch_size,
+            'flush_interval_seconds': self.flush_interval,
+            'spill_path': str(self.spill_path) if self.spill_path else None,
+            'dead_letter_path': str(self.dead_letter_path) if self.dead_letter_path else None,
+            'metrics': self.metrics.copy(),
+        }
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _fit_columns(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Truncate string values to their column lengths"""
+    for column, length in COLUMN_LENGTHS.items():
+        value = entry.get(column)
+        if isinstance(value, str) and len(value) > length:
+            entry[column] = value[:length]
+    return entry
+
+
+def _load_entry(line: str) -> Dict[str, Any]:
+    entry = json.loads(line)
+    if entry.get('created_at'):
+        entry['created_at'] = datetime.fromisoformat(entry['created_at'])
+    return _fit_columns({column: entry.get(column) for column in AUDIT_COLUMNS})
+
+
+_audit_writer: Optional[AuditWriter] = None
+_audit_writer_lock = threading.Lock()
+
+
+def get_audit_writer(config: Optional[Dict[str, Any]] = None) -> AuditWriter:
+    """Get or create the process-wide audit log writer"""
+    global _audit_writer
+
+    if _audit_writer is None:
+        with _audit_writer_lock:
+            if _audit_writer is None:
+                _audit_writer = AuditWriter.from_config(config)
+                logger.info(
+                    f"Audit log writer initialized (batch_size={_audit_writer.batch_size}, "
+                    f"flush_interval={_audit_writer.flush_interval}s, "
+                    f"max_queue_size={_audit_writer.max_queue_size})"
+                )
+
+    return _audit_writer
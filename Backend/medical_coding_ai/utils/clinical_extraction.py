@@ -0,0 +1,1048 @@
+"""
+Clinical Extraction
+
+Shared engine behind the entity extraction of DocumentProcessor and the
+ICD-10, CPT and HCPCS agents. A document used to be scanned by every
+consumer in turn, each trying its own uncompiled patterns one at a time over
+the full text (well over 200 passes per analysis). It is now extracted once:
+
+- Every rule is compiled once, at import
+- The literal a rule must start with (a section header such as
+  "CHIEF COMPLAINT", or a keyword such as "wheelchair") is derived from the
+  pattern. The document is indexed once per distinct literal with
+  str.find, and a rule is only tried where its literal occurs, so headers
+  and keywords absent from the document cost nothing. Rules without such a
+  literal still scan the whole text
+- The sections shown by the frontend (chief complaint, history,
+  examination, assessment, plan) are located once and shared
+- The result is a plain dict, cached on the processed document
+  ('clinical_extraction') and in a small in-process LRU, so the agents and
+  MasterAgent's analysis plan reuse it instead of rescanning
+
+Output is that of the original per-consumer methods (pinned by
+tests/fixtures/clinical_extraction), except that de-duplicated lists keep
+the order in which entries were found instead of set order, which varied
+between processes.
+
+Rule matches are located the way re.findall / re.search would find them:
+a rule is matched at each occurrence of its literal in turn, skipping
+occurrences inside the previous match. Occurrences are found in the
+lower-cased text, so texts whose lower-casing does not line up with the
+regex engine's case folding (see _UNSAFE_FOLDS) are scanned in full.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Section body: the rest of the header line plus continuation lines, up to
+# the next line that starts like a "Header:" line
+BLOCK = r'([^\n]+(?:\n(?!(?:[A-Z\s]+:))[^\n]+)*)'
+LINE = r'([^\n]+)'
+
+# Characters whose lower() does not line up with re.IGNORECASE on ASCII
+# patterns: U+0130 lower-cases to two characters, U+0131 and U+017F match
+# "i" and "s" without lower-casing to them
+_UNSAFE_FOLDS = ('İ', 'ı', 'ſ')
+
+_META = frozenset('.^$*+?{}[]\\|()')
+_QUANTIFIERS = frozenset('?*{')
+
+_WHITESPACE = re.compile(r'\s+')
+_NUMBERING = re.compile(r'\d+\.\s*')
+_LEADING_PUNCTUATION = re.compile(r'^\W+')
+_TRAILING_PUNCTUATION = re.compile(r'\W+$')
+_DATE_SEPARATOR = re.compile(r'[/\-]')
+_LIST_SEPARATOR = re.compile(r'[,;\n]')
+_DOSAGE = re.compile(r'\d+\s*mg|\d+\s*ml|\d+\s*times?.*')
+_NON_PHONE = re.compile(r'[^\d\-]')
+
+
+# =============================================================================
+# RULES
+# =============================================================================
+
+def _split_alternatives(pattern: str) -> List[str]:
+    """Split a pattern on its top-level | (outside groups and classes)"""
+    branches, depth, start, i = [], 0, 0, 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '[':
+            i = _class_end(pattern, i)
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == '|' and depth == 0:
+            branches.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    branches.append(pattern[start:])
+    return branches
+
+
+def _class_end(pattern: str, i: int) -> int:
+    """Index of the ] closing the character class opened at i"""
+    i += 1
+    if i < len(pattern) and pattern[i] == '^':
+        i += 1
+    if i < len(pattern) and pattern[i] == ']':
+        i += 1
+    while i < len(pattern) and pattern[i] != ']':
+        i += 2 if pattern[i] == '\\' else 1
+    return i
+
+
+def _group_end(pattern: str) -> Optional[int]:
+    """Index of the ) closing the group that opens the pattern"""
+    depth, i = 0, 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '[':
+            i = _class_end(pattern, i)
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return None
+
+
+def _literal_prefixes(pattern: str) -> Optional[Tuple[str, ...]]:
+    """
+    Literals one of which every match of the pattern starts with.
+
+    Returns None when some match can start without one (the rule is then
+    run over the whole text).
+    """
+    branches = _split_alternatives(pattern)
+    if len(branches) > 1:
+        prefixes = [_literal_prefixes(branch) for branch in branches]
+        if any(prefix is None for prefix in prefixes):
+            return None
+        return tuple(literal for prefix in prefixes for literal in prefix)
+    if pattern.startswith(r'\b'):
+        return _literal_prefixes(pattern[2:])
+    if pattern.startswith('('):
+        end = _group_end(pattern)
+        if end is None or pattern[end + 1:end + 2] in _QUANTIFIERS:
+            return None
+        inner = pattern[1:end]
+        if inner.startswith('?:'):
+            inner = inner[2:]
+        elif inner.startswith('?'):
+            return None
+        return _literal_prefixes(inner)
+    literal = []
+    for ch in pattern:
+        if ch in _META:
+            if ch in _QUANTIFIERS and literal:
+                literal.pop()
+            break
+        literal.append(ch)
+    return (''.join(literal),) if literal else None
+
+
+class Rule:
+    """A compiled pattern and the literals its matches start with"""
+
+    __slots__ = ('pattern', 'regex', 'anchors', 'ignorecase')
+
+    def __init__(self, pattern: str, flags: int = re.IGNORECASE):
+        self.pattern = pattern
+        self.regex = re.compile(pattern, flags)
+        self.ignorecase = bool(flags & re.IGNORECASE)
+        anchors = _literal_prefixes(pattern)
+        if anchors is not None:
+            if self.ignorecase:
+                anchors = {anchor.lower() for anchor in anchors}
+            # A literal that starts with another one adds no occurrences
+            anchors = tuple(sorted(
+                anchor for anchor in set(anchors)
+                if not any(other != anchor and anchor.startswith(other) for other in anchors)
+            ))
+        self.anchors = anchors
+
+    def __repr__(self):
+        return f"Rule({self.pattern!r}, anchors={self.anchors!r})"
+
+
+def _rules(*patterns: str, flags: int = re.IGNORECASE) -> Tuple[Rule, ...]:
+    return tuple(Rule(pattern, flags) for pattern in patterns)
+
+
+MULTILINE = re.IGNORECASE | re.MULTILINE
+
+# --- Patient identifiers and vital signs (DocumentProcessor) ----------------
+
+DOB_RULES = _rules(
+    r"DOB[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})",
+    r"Date of Birth[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})",
+    r"Born[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})",
+    r"Birth Date[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})"
+)
+# Checked against a plausible range; only used when VISIT_RULES find nothing
+VALIDATED_VISIT_RULES = _rules(
+    r"Visit[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})",
+    r"Date[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})",
+    r"Visit Date[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})",
+    r"Appointment[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})",
+    r"Seen on[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})"
+)
+VISIT_RULES = _rules(
+    r"Visit[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})",
+    r"Date[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})",
+    r"Appointment[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})",
+    r"Service Date[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})"
+)
+CONTACT_RULES = _rules(
+    r"Contact No[.:\s]*(\d[\d\-\s]+)",
+    r"Phone[:\s]*(\d[\d\-\s]+)",
+    r"Tel[:\s]*(\d[\d\-\s]+)"
+)
+GENDER_RULE = Rule(r"Gender[:\s]*(\w+)")
+AGE_RULES = _rules(
+    r"Age[:\s]*(\d+)\s*(?:Years?|yrs?)",
+    r"(\d+)\s*(?:Years?|yrs?)\s*old"
+)
+
+VITAL_SIGN_RULES = {
+    'bp': _rules(
+        r"BP[:\s]*(\d+/\d+)",
+        r"Blood Pressure[:\s]*(\d+/\d+)",
+        r"(\d+/\d+)\s*mmHg"
+    ),
+    'pulse': _rules(
+        r"Pulse[:\s]*(\d+)",
+        r"HR[:\s]*(\d+)",
+        r"Heart Rate[:\s]*(\d+)",
+        r"(\d+)\s*bpm"
+    ),
+    'resp': _rules(
+        r"RR[:\s]*(\d+)",
+        r"Resp[:\s]*(\d+)",
+        r"Respiratory Rate[:\s]*(\d+)",
+        r"(\d+)\s*breaths?/min"
+    ),
+    'temp': _rules(
+        r"Temp[:\s]*(\d+\.?\d*)[°\s]*[CF]?",
+        r"Temperature[:\s]*(\d+\.?\d*)[°\s]*[CF]?",
+        r"(\d+\.?\d*)[°\s]*[CF]"
+    ),
+    'height': _rules(
+        r"Height[:\s]*(\d+['\"]?\s*\d*['\"]?)",
+        r"Ht[:\s]*(\d+['\"]?\s*\d*['\"]?)",
+        r"(\d+)['\"]?\s*(\d*)['\"]?\s*tall"
+    ),
+    'weight': _rules(
+        r"Weight[:\s]*(\d+\.?\d*)\s*(?:lbs?|kg)?",
+        r"Wt[:\s]*(\d+\.?\d*)\s*(?:lbs?|kg)?",
+        r"(\d+\.?\d*)\s*(?:lbs?|kg)"
+    ),
+    'bmi': _rules(
+        r"BMI[:\s]*(\d+\.?\d*)",
+        r"Body Mass Index[:\s]*(\d+\.?\d*)"
+    ),
+}
+
+# --- Sections shown by the frontend (first header found wins) ---------------
+
+SECTION_RULES = {
+    'chief_complaint': _rules(
+        r"CHIEF COMPLAINT[:\s]*" + BLOCK,
+        r"CC[:\s]*" + BLOCK,
+        r"PRESENTING COMPLAINT[:\s]*" + BLOCK,
+        r"COMPLAINT[:\s]*" + BLOCK,
+        flags=MULTILINE
+    ),
+    'history': _rules(
+        r"HISTORY OF PRESENT ILLNESS[:\s]*" + BLOCK,
+        r"HPI[:\s]*" + BLOCK,
+        r"HISTORY[:\s]*" + BLOCK,
+        r"PATIENT HISTORY[:\s]*" + BLOCK,
+        r"MEDICAL HISTORY[:\s]*" + BLOCK,
+        flags=MULTILINE
+    ),
+    'examination': _rules(
+        r"PHYSICAL EXAMINATION[:\s]*" + BLOCK,
+        r"PHYSICAL EXAM[:\s]*" + BLOCK,
+        r"EXAMINATION[:\s]*" + BLOCK,
+        r"EXAM[:\s]*" + BLOCK,
+        r"PE[:\s]*" + BLOCK,
+        flags=MULTILINE
+    ),
+    'assessment': _rules(
+        r"ASSESSMENT[:\s]*" + BLOCK,
+        r"IMPRESSION[:\s]*" + BLOCK,
+        r"CLINICAL ASSESSMENT[:\s]*" + BLOCK,
+        r"DIAGNOSIS[:\s]*" + BLOCK,
+        flags=MULTILINE
+    ),
+    'plan': _rules(
+        r"PLAN[:\s]*" + BLOCK,
+        r"TREATMENT PLAN[:\s]*" + BLOCK,
+        r"MANAGEMENT[:\s]*" + BLOCK,
+        r"RECOMMENDATIONS?[:\s]*" + BLOCK,
+        flags=MULTILINE
+    ),
+}
+
+# --- Document summary lists (DocumentProcessor) -----------------------------
+
+CONDITION_SECTION_RULES = _rules(
+    r"CHIEF COMPLAINT[:\s]*" + BLOCK,
+    r"DIAGNOSIS[:\s]*" + BLOCK,
+    r"HISTORY OF PRESENT ILLNESS[:\s]*" + BLOCK,
+    r"ASSESSMENT[:\s]*" + BLOCK,
+    r"IMPRESSION[:\s]*" + BLOCK,
+    r"PATIENT PAST HISTORY[:\s]*" + BLOCK,
+    flags=MULTILINE
+)
+CONDITION_TERM_RULES = _rules(
+    r'\b(diabetes|hypertension|hyperlipidemia|obesity|depression|anxiety|arthritis)\b',
+    r'\b(\w+itis|\w+osis|\w+pathy|\w+emia|\w+uria)\b',
+    r'\b(chronic|acute|severe|mild)\s+(\w+\s+\w+)\b',
+    r'\b(type\s+\d+\s+diabetes)\b',
+    r'\b(high\s+blood\s+pressure)\b'
+)
+PROCEDURE_SECTION_RULES = _rules(
+    r"PROCEDURE[:\s]*" + BLOCK,
+    r"OPERATION[:\s]*" + BLOCK,
+    r"SURGERY[:\s]*" + BLOCK,
+    r"TREATMENT[:\s]*" + BLOCK,
+    flags=MULTILINE
+)
+PROCEDURE_KEYWORD_RULES = _rules(*(
+    rf"\b{keyword}[:\s]*([^\n.!?]+)" for keyword in (
+        "surgery", "operation", "procedure", "treatment", "therapy",
+        "examination", "test", "consultation", "visit", "biopsy",
+        "injection", "infusion", "catheterization", "endoscopy"
+    )
+))
+MEDICATION_SECTION_RULES = _rules(
+    r"MEDICATIONS?[:\s]*" + BLOCK,
+    r"CURRENT MEDICATIONS?[:\s]*" + BLOCK,
+    r"DRUGS?[:\s]*" + BLOCK,
+    flags=MULTILINE
+)
+ALLERGY_RULES = _rules(
+    r"ALLERGIES?[:\s]*" + BLOCK,
+    r"ALLERGIC TO[:\s]*([^\n]+)",
+    r"DRUG ALLERGIES?[:\s]*([^\n]+)",
+    flags=MULTILINE
+)
+
+# --- ICD-10 agent ------------------------------------------------------------
+
+ICD10_CODE_RULES = _rules(
+    r'([A-Z]\d{2}\.?\d*)\s*-\s*([^\n\r]+)',  # Z89.221 - Description format
+    r'([A-Z]\d{2}\.?\d*)[:\s]+([^\n\r]+)',   # Alternative format
+    r'ICD-10[:\s]*([A-Z]\d{2}\.?\d*)[:\s]*([^\n\r]+)',  # ICD-10: code format
+    r'([A-Z]\d{2}\.?\d*)\s*\([^\)]*\)\s*-\s*([^\n\r]+)',  # Z89.221 (subcategory) - desc
+    flags=MULTILINE
+)
+ICD10_SECTION_RULES = _rules(
+    r'(?:CHIEF COMPLAINT|CC)[:\s]*' + BLOCK,
+    r'(?:DIAGNOSES?)[:\s]*' + BLOCK,
+    r'(?:Principal|Primary)[:\s]*([^\n]+)',
+    r'(?:Secondary)[:\s]*([^\n]+)',
+    r'(?:HISTORY OF PRESENT ILLNESS|HPI)[:\s]*' + BLOCK,
+    r'(?:PAST HISTORY|PATIENT PAST HISTORY)[:\s]*' + BLOCK,
+    r'(?:ASSESSMENT|IMPRESSION)[:\s]*' + BLOCK,
+    flags=MULTILINE
+)
+ICD10_PROSTHETIC_RULES = _rules(
+    r'(prosthetic\s+[a-z\s]+)',
+    r'(artificial\s+[a-z\s]+)',
+    r'(amputation\s+[a-z\s]*)',
+    r'(absence\s+of\s+[a-z\s]+)',
+    r'(presence\s+of\s+[a-z\s]+)',
+    r'(osteonecrosis\s+[a-z\s]*)',
+    r'(mechanical\s+(?:grinding|issues|problems|complications))',
+    r'(socket\s+(?:pressure|pain|fit))',
+    r'(residual\s+limb)',
+    r'(phantom\s+limb)',
+)
+ICD10_CONDITION_RULES = _rules(
+    r'(diabetes[^,\.\n]*)',
+    r'(hypertension[^,\.\n]*)',
+    r'(heart\s+disease[^,\.\n]*)',
+    r'(amputation[^,\.\n]*)',
+    r'(prosthetic[^,\.\n]*)',
+    r'(artificial[^,\.\n]*)',
+    r'(trauma[^,\.\n]*)',
+    r'(mechanical[^,\.\n]*)',
+    r'(pain[^,\.\n]*)',
+    r'(osteonecrosis[^,\.\n]*)',
+    r'(PTSD[^,\.\n]*)',
+    r'(stress\s+disorder[^,\.\n]*)',
+    r'(nicotine\s+dependence[^,\.\n]*)',
+    r'(smoking[^,\.\n]*)',
+)
+SYMPTOM_RULES = _rules(
+    r'(?:SYMPTOMS?|COMPLAINTS?|SIGNS?)[:\s]*' + BLOCK,
+    r'(?:PATIENT (?:REPORTS?|COMPLAINS? OF|PRESENTS? WITH))[:\s]*([^\n]+)',
+    r'(?:CHIEF COMPLAINT)[:\s]*([^\n]+)',
+    r'(?:Quality)[:\s]*([^\n]+)',
+    r'(?:Severity)[:\s]*([^\n]+)',
+    r'(?:Duration)[:\s]*([^\n]+)',
+    r'(?:Timing)[:\s]*([^\n]+)',
+    r'(?:Context)[:\s]*([^\n]+)',
+    r'(?:Associated S/S)[:\s]*([^\n]+)',
+    r'\b(pain|discomfort|aching|burning|throbbing|stabbing)\b[^.]*',
+    r'\b(mechanical\s+(?:grinding|sounds|noise|issues))\b[^.]*',
+    r'\b(socket\s+(?:pressure|pain|discomfort))\b[^.]*',
+    r'\b(displacement|poor\s+fit|interface\s+issues)\b[^.]*',
+    r'\b(skin\s+(?:irritation|breakdown|erosion))\b[^.]*',
+    r'\b(phantom\s+limb\s+pain)\b[^.]*',
+    r'\b(morning\s+stiffness|stiffness)\b[^.]*',
+    r'\b(reduced\s+(?:function|capacity|mobility))\b[^.]*',
+    r'\b(\d+/10\s+pain|pain\s+score)\b[^.]*',
+    r'\bpatient (?:reports?|states?|complains? of|notes?) ([^\n.!?]+)',
+    r'increasing ([^\n.!?]+)',
+    r'difficulty (?:with )?([^\n.!?]+)',
+    r'problems? (?:with )?([^\n.!?]+)'
+)
+ICD10_CODE_MENTION_RULE = Rule(r'\b[A-Z]\d{2}(?:\.\d{1,3})?\b', flags=0)
+DIAGNOSIS_RULES = _rules(
+    r'(?:DIAGNOSIS|DX|DIAGNOSES)[:\s]*' + BLOCK,
+    r'(?:FINAL DIAGNOSIS|PRIMARY DIAGNOSIS)[:\s]*([^\n]+)',
+    r'(?:WORKING DIAGNOSIS|PROVISIONAL DIAGNOSIS)[:\s]*([^\n]+)',
+    r'(?:DIFFERENTIAL DIAGNOSIS|SECONDARY DIAGNOSIS)[:\s]*([^\n]+)',
+    r'(?:ASSESSMENT AND PLAN|ASSESSMENT)[:\s]*\n?(?:\d+\.?\s*)?([^\n]+)',
+    r'diagnosed with ([^\n.;]+)',
+    r'diagnosis of ([^\n.;]+)',
+    r'condition(?:s)? of ([^\n.;]+)',
+    r'patient has ([^\n.;]+)',
+    r'presents with ([^\n.;]+)',
+    r'history of ([^\n.;]+)',
+    r'status post ([^\n.;]+)',
+    r'following ([^\n.;]+)',
+    # Prosthetic and amputation specific patterns
+    r'(?:below|above) knee amputation',
+    r'(?:transtibial|transfemoral) amputation',
+    r'prosthetic (?:knee|leg|limb)',
+    r'artificial (?:knee|leg|limb)',
+    r'osteonecrosis',
+    r'avascular necrosis',
+    flags=MULTILINE
+)
+
+# --- CPT agent ---------------------------------------------------------------
+
+CPT_CODE_RULES = _rules(
+    r'(\d{5})\s*-\s*([^\n\r]+)',  # 99214 - Description format
+    r'(\d{5})[:\s]+([^\n\r]+)',   # Alternative format
+    r'CPT[:\s]*(\d{5})[:\s]*([^\n\r]+)',  # CPT: code format
+    r'([LVGHIJK]\d{4})\s*-\s*([^\n\r]+)',  # HCPCS Level II codes like L6000, V2623
+    flags=MULTILINE
+)
+CPT_SECTION_RULES = _rules(
+    r'(?:ORDERED SERVICES|PROCEDURES)[:\s]*' + BLOCK,
+    r'(?:SERVICES & PROCEDURES)[:\s]*' + BLOCK,
+    r'(?:PROCEDURE|OPERATION|SURGERY)[:\s]*' + BLOCK,
+    r'(?:SURGICAL PROCEDURE)[:\s]*' + BLOCK,
+    r'(?:DIAGNOSTIC PROCEDURE)[:\s]*' + BLOCK,
+    r'(?:INTERVENTION)[:\s]*' + BLOCK,
+    flags=MULTILINE
+)
+CPT_PROCEDURE_RULES = _rules(
+    r'\b(prosthetic\s+(?:evaluation|assessment|fitting|adjustment))\b',
+    r'\b(artificial\s+(?:eye|limb)\s+(?:evaluation|fitting))\b',
+    r'\b(office\s+visit)\b',
+    r'\b(physical\s+performance\s+test)\b',
+    r'\b(consultation)\b',
+    r'\b(evaluation)\b',
+    r'\b(assessment)\b',
+    r'\b(biopsy|incision|excision|resection|repair|reconstruction)\b',
+    r'\b(endoscopy|colonoscopy|arthroscopy|laparoscopy)\b',
+    r'\b(catheterization|angioplasty|stent|ablation)\b',
+    r'\b(injection|infusion|transfusion)\b',
+    r'\b(suture|closure|drainage|debridement)\b',
+    r'\b(x-ray|CT scan|MRI|ultrasound|mammography)\b',
+    r'\b(EKG|ECG|echocardiogram|stress test)\b'
+)
+SERVICE_RULES = _rules(
+    r'(?:CONSULTATION|VISIT|EXAMINATION|ASSESSMENT)[:\s]*([^\n]+)',
+    r'(?:EVALUATION AND MANAGEMENT|E&M)[:\s]*([^\n]+)',
+    r'(?:OFFICE VISIT|CLINIC VISIT)[:\s]*([^\n]+)',
+    r'(?:FOLLOW.?UP|FOLLOW UP)[:\s]*([^\n]+)',
+    r'(?:COUNSELING|EDUCATION)[:\s]*([^\n]+)'
+)
+SERVICE_KEYWORD_RULES = _rules(
+    r'\b(consultation|examination|evaluation|assessment)\b',
+    r'\b(counseling|education|teaching|instruction)\b',
+    r'\b(monitoring|observation|surveillance)\b',
+    r'\b(interpretation|reading|review)\b'
+)
+TREATMENT_RULES = _rules(
+    r'(?:TREATMENT|THERAPY|INTERVENTION)[:\s]*([^\n]+)',
+    r'(?:ADMINISTERED|GIVEN|PROVIDED)[:\s]*([^\n]+)',
+    r'(?:MEDICATION|DRUG|PRESCRIPTION)[:\s]*([^\n]+)',
+    r'(?:PHYSICAL THERAPY|OCCUPATIONAL THERAPY|SPEECH THERAPY)[:\s]*([^\n]+)'
+)
+TREATMENT_KEYWORD_RULES = _rules(
+    r'\b(therapy|treatment|medication|prescription)\b',
+    r'\b(administration|injection|infusion)\b',
+    r'\b(rehabilitation|physiotherapy|occupational therapy)\b',
+    r'\b(chemotherapy|radiation|immunotherapy)\b'
+)
+VISIT_TYPE_RULES = _rules(
+    r'(?:OFFICE VISIT|CLINIC VISIT|HOSPITAL VISIT)[:\s]*([^\n]+)',
+    r'(?:NEW PATIENT|ESTABLISHED PATIENT)[:\s]*([^\n]+)',
+    r'(?:INITIAL VISIT|FOLLOW.?UP VISIT)[:\s]*([^\n]+)',
+    r'(?:CONSULTATION|REFERRAL)[:\s]*([^\n]+)'
+)
+VISIT_COMPLEXITY_KEYWORDS = {
+    'straightforward': ('routine', 'simple', 'straightforward', 'minimal'),
+    'low': ('low complexity', 'limited', 'minor'),
+    'moderate': ('moderate', 'intermediate', 'comprehensive'),
+    'high': ('high complexity', 'extensive', 'detailed', 'complex')
+}
+
+# --- HCPCS agent -------------------------------------------------------------
+
+EQUIPMENT_SECTION_RULES = _rules(
+    r'(?:EQUIPMENT|DME|DURABLE MEDICAL EQUIPMENT)[:\s]*' + BLOCK,
+    r'(?:MEDICAL DEVICE|DEVICE)[:\s]*' + BLOCK,
+    r'(?:ASSISTIVE DEVICE)[:\s]*' + BLOCK,
+    flags=MULTILINE
+)
+EQUIPMENT_KEYWORD_RULES = _rules(
+    r'\b(wheelchair|walker|cane|crutches|scooter)\b',
+    r'\b(oxygen|nebulizer|CPAP|BiPAP|ventilator)\b',
+    r'\b(hospital bed|mattress|rails|trapeze)\b',
+    r'\b(lift|transfer|commode|shower chair)\b',
+    r'\b(glucose monitor|blood pressure monitor)\b',
+    r'\b(hearing aid|cochlear implant)\b',
+    r'\b(prosthetic|orthotic|brace|splint)\b'
+)
+SUPPLY_RULES = _rules(
+    r'(?:SUPPLIES|MEDICAL SUPPLIES)[:\s]*' + BLOCK,
+    r'(?:WOUND CARE|DRESSING)[:\s]*([^\n]+)',
+    r'(?:CATHETER|TUBE|BAG)[:\s]*([^\n]+)',
+    r'(?:INJECTION|SYRINGE|NEEDLE)[:\s]*([^\n]+)'
+)
+SUPPLY_KEYWORD_RULES = _rules(
+    r'\b(bandage|dressing|gauze|tape|pad)\b',
+    r'\b(catheter|tube|bag|pouch|collection)\b',
+    r'\b(syringe|needle|lancet|test strip)\b',
+    r'\b(ostomy|colostomy|ileostomy|urostomy)\b',
+    r'\b(diabetic|glucose|insulin|pen)\b',
+    r'\b(wound|burn|pressure|ulcer)\b'
+)
+PROSTHETIC_RULES = _rules(
+    r'(?:PROSTHETIC|PROSTHESIS|ARTIFICIAL)[:\s]*([^\n]+)',
+    r'(?:ORTHOTIC|BRACE|SUPPORT)[:\s]*([^\n]+)',
+    r'(?:IMPLANT|REPLACEMENT)[:\s]*([^\n]+)'
+)
+PROSTHETIC_KEYWORD_RULES = _rules(
+    r'\b(artificial|prosthetic|replacement)\s+(joint|limb|eye|tooth)\b',
+    r'\b(knee|hip|ankle|shoulder|elbow|wrist)\s+(joint|replacement)\b',
+    r'\b(orthotic|brace|support|splint)\b',
+    r'\b(foot|hand|finger|toe)\s+(prosthetic|replacement)\b'
+)
+AMBULANCE_RULES = _rules(
+    r'(?:AMBULANCE|TRANSPORT|EMS)[:\s]*([^\n]+)',
+    r'(?:EMERGENCY TRANSPORT)[:\s]*([^\n]+)',
+    r'(?:MEDICAL TRANSPORT)[:\s]*([^\n]+)'
+)
+AMBULANCE_KEYWORD_RULES = _rules(
+    r'\b(ambulance|EMS|paramedic|emergency transport)\b',
+    r'\b(air ambulance|helicopter|flight)\b',
+    r'\b(ground ambulance|BLS|ALS)\b'
+)
+OTHER_SERVICE_RULES = _rules(
+    r'(?:PHYSICAL THERAPY|PT|PHYSIOTHERAPY)[:\s]*([^\n]+)',
+    r'(?:OCCUPATIONAL THERAPY|OT)[:\s]*([^\n]+)',
+    r'(?:SPEECH THERAPY|SPEECH PATHOLOGY)[:\s]*([^\n]+)',
+    r'(?:SOCIAL SERVICES|CASE MANAGEMENT)[:\s]*([^\n]+)'
+)
+
+# --- Analysis plan (MasterAgent), matched as substrings of the lower-cased text
+
+ANALYSIS_INDICATORS = {
+    'diagnosis': (
+        'diagnosis', 'condition', 'disease', 'disorder', 'syndrome',
+        'chief complaint', 'assessment', 'impression', 'symptoms',
+        'past medical history', 'comorbid', 'chronic', 'acute'
+    ),
+    'procedure_only': (
+        'operative report', 'surgery report', 'procedure note'
+    ),
+    'procedure': (
+        'procedure', 'surgery', 'operation', 'treatment', 'therapy',
+        'examination', 'test', 'consultation', 'visit', 'evaluation',
+        'office visit', 'follow-up', 'assessment', 'counseling'
+    ),
+    'hcpcs': (
+        'equipment', 'device', 'prosthetic', 'orthotic', 'brace',
+        'wheelchair', 'walker', 'cane', 'oxygen', 'cpap', 'supply',
+        'dressing', 'catheter', 'ambulance', 'transport', 'dme',
+        'artificial', 'implant', 'replacement'
+    )
+}
+
+
+# =============================================================================
+# MATCHING
+# =============================================================================
+
+class TextIndex:
+    """
+    A document and the occurrences of rule literals in it.
+
+    Occurrences are looked up lazily and kept per literal, so a header
+    shared by several rules (e.g. "assessment") is searched for once.
+    """
+
+    def __init__(self, text: str, anchored: bool = True):
+        self.text = text
+        self.lowered = text.lower()
+        self.anchored = (anchored and len(self.lowered) == len(text)
+                         and not any(ch in text for ch in _UNSAFE_FOLDS))
+        self._occurrences: Dict[Tuple[str, bool], List[int]] = {}
+
+    def _find(self, literal: str, ignorecase: bool) -> List[int]:
+        key = (literal, ignorecase)
+        positions = self._occurrences.get(key)
+        if positions is None:
+            haystack = self.lowered if ignorecase else self.text
+            positions = []
+            start = haystack.find(literal)
+            while start != -1:
+                positions.append(start)
+                start = haystack.find(literal, start + 1)
+            self._occurrences[key] = positions
+        return positions
+
+    def finditer(self, rule: Rule):
+        """Matches of the rule, as re.finditer would return them"""
+        if not self.anchored or rule.anchors is None:
+            yield from rule.regex.finditer(self.text)
+            return
+        if len(rule.anchors) == 1:
+            positions = self._find(rule.anchors[0], rule.ignorecase)
+        else:
+            positions = sorted(set().union(*(self._find(anchor, rule.ignorecase) for anchor in rule.anchors)))
+        end = 0
+        for position in positions:
+            if position < end:
+                continue
+            match = rule.regex.match(self.text, position)
+            if match:
+                yield match
+                end = max(match.end(), position + 1)
+
+    def findall(self, rule: Rule) -> list:
+        """re.findall of the rule over the document"""
+        groups = rule.regex.groups
+        if groups == 0:
+            return [match.group() for match in self.finditer(rule)]
+        if groups == 1:
+            return [match.group(1) or '' for match in self.finditer(rule)]
+        return [match.groups('') for match in self.finditer(rule)]
+
+    def search(self, rule: Rule):
+        """re.search of the rule over the document"""
+        return next(self.finditer(rule), None)
+
+
+def clean_medical_text(text: str) -> str:
+    """Clean and normalize medical text"""
+    if not text:
+        return ""
+    cleaned = _WHITESPACE.sub(' ', text.strip())
+    cleaned = _NUMBERING.sub('', cleaned)  # Remove numbering
+    cleaned = _LEADING_PUNCTUATION.sub('', cleaned)
+    cleaned = _TRAILING_PUNCTUATION.sub('', cleaned)
+    return cleaned.strip()
+
+
+def _unique(items) -> list:
+    """Items without duplicates, in the order they were first found"""
+    return list(dict.fromkeys(items))
+
+
+def _unique_ignoring_case(items, min_length: int) -> list:
+    seen = set()
+    unique_items = []
+    for item in items:
+        key = item.lower().strip()
+        if key not in seen and len(item) > min_length:
+            seen.add(key)
+            unique_items.append(item)
+    return unique_items
+
+
+def _section_matches(index: TextIndex, rules, min_length: int = 5) -> List[str]:
+    """Cleaned section/line captures longer than min_length"""
+    found = []
+    for rule in rules:
+        for match in index.findall(rule):
+            cleaned = clean_medical_text(match)
+            if cleaned and len(cleaned) > min_length:
+                found.append(cleaned)
+    return found
+
+
+def _keyword_matches(index: TextIndex, rules) -> List[str]:
+    """Title-cased keyword captures longer than three characters"""
+    found = []
+    for rule in rules:
+        for match in index.findall(rule):
+            if match and len(match) > 3:
+                found.append(match.strip().title())
+    return found
+
+
+# =============================================================================
+# EXTRACTORS
+# =============================================================================
+
+def _valid_date(date: str, first_year: int, last_year: int) -> bool:
+    parts = _DATE_SEPARATOR.split(date)
+    if len(parts) != 3:
+        return False
+    try:
+        month, day, year = map(int, parts)
+    except ValueError:
+        return False
+    return first_year <= year <= last_year and 1 <= month <= 12 and 1 <= day <= 31
+
+
+def extract_demographics(index: TextIndex) -> Dict[str, str]:
+    """Date of birth, visit date, contact number, gender and age"""
+    data = {}
+
+    for rule in DOB_RULES:
+        match = index.search(rule)
+        if match and _valid_date(match.group(1), 1900, 2024):
+            data['date_of_birth'] = match.group(1)
+            break
+
+    for rule in VISIT_RULES:
+        match = index.search(rule)
+        if match:
+            data['visit_date'] = match.group(1)
+            break
+    else:
+        for rule in VALIDATED_VISIT_RULES:
+            match = index.search(rule)
+            if match and _valid_date(match.group(1), 2020, 2025):
+                data['visit_date'] = match.group(1)
+                break
+
+    for rule in CONTACT_RULES:
+        match = index.search(rule)
+        if match:
+            contact = _NON_PHONE.sub('', match.group(1))
+            if len(contact) >= 7:  # Minimum phone number length
+                data['contact_number'] = contact
+                break
+
+    match = index.search(GENDER_RULE)
+    if match:
+        data['gender'] = match.group(1).strip()
+
+    for rule in AGE_RULES:
+        match = index.search(rule)
+        if match:
+            data['age'] = match.group(1)
+            break
+
+    return data
+
+
+def extract_vital_signs(index: TextIndex) -> Dict[str, str]:
+    """Blood pressure, pulse, respiratory rate, temperature, height, weight and BMI"""
+    vital_signs = {}
+    for name, rules in VITAL_SIGN_RULES.items():
+        for rule in rules:
+            match = index.search(rule)
+            if match:
+                if rule.regex.groups == 1:
+                    vital_signs[name] = match.group(1)
+                else:
+                    vital_signs[name] = f"{match.group(1)}'{match.group(2)}\""
+                break
+    return vital_signs
+
+
+def split_sections(index: TextIndex) -> Dict[str, str]:
+    """The chief complaint, history, examination, assessment and plan sections"""
+    sections = {}
+    for name, rules in SECTION_RULES.items():
+        sections[name] = ""
+        for rule in rules:
+            match = index.search(rule)
+            if match:
+                body = _WHITESPACE.sub(' ', match.group(1).strip())
+                if body and len(body) > 5:
+                    sections[name] = body
+                    break
+    return sections
+
+
+def extract_document_lists(index: TextIndex) -> Dict[str, List[str]]:
+    """Conditions, procedures, medications and allergies for the document summary"""
+    conditions = []
+    for rule in CONDITION_SECTION_RULES:
+        for match in index.findall(rule):
+            cleaned = _WHITESPACE.sub(' ', match.strip())
+            if cleaned and len(cleaned) > 5:
+                conditions.append(cleaned)
+    for rule in CONDITION_TERM_RULES:
+        for match in index.findall(rule):
+            condition = match if isinstance(match, str) else ' '.join(filter(None, match))
+            if condition and len(condition) > 3:
+                conditions.append(condition.lower().title())
+
+    procedures = []
+    for rule in PROCEDURE_SECTION_RULES:
+        for match in index.findall(rule):
+            cleaned = _WHITESPACE.sub(' ', match.strip())
+            if cleaned and len(cleaned) > 5:
+                procedures.append(cleaned)
+    for rule in PROCEDURE_KEYWORD_RULES:
+        for match in index.findall(rule):
+            cleaned = match.strip()
+            if cleaned and len(cleaned) > 5 and not any(char.isdigit() for char in cleaned[:3]):
+                procedures.append(cleaned)
+
+    medications = []
+    for rule in MEDICATION_SECTION_RULES:
+        for match in index.findall(rule):
+            for med in _LIST_SEPARATOR.split(match):
+                cleaned = _DOSAGE.sub('', med).strip()
+                if cleaned and len(cleaned) > 2:
+                    medications.append(cleaned)
+
+    allergies = []
+    for rule in ALLERGY_RULES:
+        for match in index.findall(rule):
+            if "no known" not in match.lower() and "nkda" not in match.lower():
+                for item in _LIST_SEPARATOR.split(match):
+                    cleaned = item.strip()
+                    if cleaned and len(cleaned) > 2:
+                        allergies.append(cleaned)
+
+    return {
+        'conditions': _unique(c.strip() for c in conditions if len(c.strip()) > 3)[:10],
+        'procedures': _unique(p.strip() for p in procedures if len(p.strip()) > 5)[:10],
+        'medications': _unique(medications[:10]),
+        'allergies': _unique(allergies[:5])
+    }
+
+
+def extract_icd10_entities(index: TextIndex) -> Dict[str, List[str]]:
+    """Conditions, symptoms and diagnoses for ICD-10 coding"""
+    conditions = []
+    for rule in ICD10_CODE_RULES:
+        for code, description in index.findall(rule):
+            conditions.append(f"{code.strip()} - {description.strip()}")
+    conditions.extend(_section_matches(index, ICD10_SECTION_RULES))
+    for rules in (ICD10_PROSTHETIC_RULES, ICD10_CONDITION_RULES):
+        for rule in rules:
+            for match in index.findall(rule):
+                if len(match.strip()) > 3:
+                    conditions.append(match.strip())
+
+    symptoms = _section_matches(index, SYMPTOM_RULES)
+
+    diagnoses = [f"ICD-10 Code: {code}" for code in index.findall(ICD10_CODE_MENTION_RULE)]
+    for rule in DIAGNOSIS_RULES:
+        for match in index.findall(rule):
+            diagnosis = clean_medical_text(match)
+            if diagnosis and len(diagnosis) > 3:
+                diagnoses.append(diagnosis)
+
+    return {
+        'conditions': _unique_ignoring_case(conditions, 3)[:20],
+        'symptoms': _unique(s.strip() for s in symptoms if len(s.strip()) > 5)[:15],
+        'diagnoses': _unique(diagnoses)[:15]
+    }
+
+
+def extract_cpt_entities(index: TextIndex) -> Dict[str, List[str]]:
+    """Procedures, services, treatments and visit types for CPT coding"""
+    procedures = []
+    for rule in CPT_CODE_RULES:
+        for code, description in index.findall(rule):
+            procedures.append(f"{code.strip()} - {description.strip()}")
+    procedures.extend(_section_matches(index, CPT_SECTION_RULES))
+    procedures.extend(_keyword_matches(index, CPT_PROCEDURE_RULES))
+
+    services = _section_matches(index, SERVICE_RULES) + _keyword_matches(index, SERVICE_KEYWORD_RULES)
+    treatments = _section_matches(index, TREATMENT_RULES) + _keyword_matches(index, TREATMENT_KEYWORD_RULES)
+
+    visits = _section_matches(index, VISIT_TYPE_RULES)
+    for complexity, keywords in VISIT_COMPLEXITY_KEYWORDS.items():
+        if any(keyword in index.lowered for keyword in keywords):
+            visits.append(f"{complexity} complexity visit")
+
+    return {
+        'procedures': _unique_ignoring_case(procedures, 3)[:15],
+        'services': _unique(s.strip() for s in services if len(s.strip()) > 3)[:10],
+        'treatments': _unique(t.strip() for t in treatments if len(t.strip()) > 3)[:10],
+        'visits': _unique(visits)[:5]
+    }
+
+
+def extract_hcpcs_entities(index: TextIndex) -> Dict[str, List[str]]:
+    """Equipment, supplies, prosthetics, ambulance and other services for HCPCS coding"""
+    equipment = (_section_matches(index, EQUIPMENT_SECTION_RULES)
+                 + _keyword_matches(index, EQUIPMENT_KEYWORD_RULES))
+    supplies = _section_matches(index, SUPPLY_RULES) + _keyword_matches(index, SUPPLY_KEYWORD_RULES)
+
+    prosthetics = _section_matches(index, PROSTHETIC_RULES)
+    for rule in PROSTHETIC_KEYWORD_RULES:
+        for match in index.findall(rule):
+            prosthetic = match if isinstance(match, str) else ' '.join(match)
+            if prosthetic and len(prosthetic) > 3:
+                prosthetics.append(prosthetic.strip().title())
+
+    ambulance = _section_matches(index, AMBULANCE_RULES) + _keyword_matches(index, AMBULANCE_KEYWORD_RULES)
+
+    return {
+        'equipment': _unique(e.strip() for e in equipment if len(e.strip()) > 3)[:10],
+        'supplies': _unique(s.strip() for s in supplies if len(s.strip()) > 3)[:10],
+        'prosthetics': _unique(p.strip() for p in prosthetics if len(p.strip()) > 3)[:10],
+        'ambulance': _unique(ambulance)[:5],
+        'other_services': _unique(_section_matches(index, OTHER_SERVICE_RULES))[:5]
+    }
+
+
+def find_indicators(index: TextIndex) -> Dict[str, List[str]]:
+    """Analysis-plan indicators present in the document"""
+    return {
+        group: [indicator for indicator in indicators if indicator in index.lowered]
+        for group, indicators in ANALYSIS_INDICATORS.items()
+    }
+
+
+def text_fingerprint(text: str) -> str:
+    """Identifies the text an extraction belongs to"""
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+
+def extract_clinical_entities(text: str, anchored: bool = True) -> Dict[str, Any]:
+    """
+    Extract everything the document processor and the coding agents use.
+
+    Args:
+        text: Document text
+        anchored: Try rules only where their literal occurs (False scans
+            the whole text with every rule, as the original code did)
+
+    Returns:
+        JSON-serializable dict: fingerprint, sections, demographics,
+        vital_signs, conditions, procedures, medications, allergies,
+        icd10, cpt, hcpcs and indicators
+    """
+    index = TextIndex(text, anchored=anchored)
+    extraction = {
+        'fingerprint': text_fingerprint(text),
+        'sections': split_sections(index),
+        'demographics': extract_demographics(index),
+        'vital_signs': extract_vital_signs(index)
+    }
+    extraction.update(extract_document_lists(index))
+    extraction['icd10'] = extract_icd10_entities(index)
+    extraction['cpt'] = extract_cpt_entities(index)
+    extraction['hcpcs'] = extract_hcpcs_entities(index)
+    extraction['indicators'] = find_indicators(index)
+    return extraction
+
+
+# =============================================================================
+# SHARED EXTRACTOR
+# =============================================================================
+
+class ClinicalExtractor:
+    """
+    Extracts documents once and shares the result.
+
+    An extraction cached on the processed document is reused when it belongs
+    to the text being analyzed; otherwise recent extractions are kept in a
+    small LRU, so the agents analyzing one document share a single scan.
+    """
+
+    def __init__(self, cache_size: int = 32):
+        self.cache_size = cache_size
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics = {
+            'extractions': 0,
+            'reused': 0,
+            'cache_hits': 0,
+            'last_extraction_ms': 0.0
+        }
+
+    def extract(self, text: str, cached: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Extraction of text, reusing cached if it was made from the same text.
+
+        The result is shared; callers must not modify it.
+        """
+        fingerprint = text_fingerprint(text)
+        if cached and cached.get('fingerprint') == fingerprint:
+            with self._lock:
+                self.metrics['reused'] += 1
+            return cached
+
+        with self._lock:
+            extraction = self._cache.get(fingerprint)
+            if extraction is not None:
+                self._cache.move_to_end(fingerprint)
+                self.metrics['cache_hits'] += 1
+                return extraction
+
+        start = time.perf_counter()
+        extraction = extract_clinical_entities(text)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self.metrics['extractions'] += 1
+            self.metrics['last_extraction_ms'] = round(elapsed_ms, 2)
+            if self.cache_size > 0:
+                self._cache[fingerprint] = extraction
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        logger.debug(f"Extracted clinical entities from {len(text)} chars in {elapsed_ms:.1f}ms")
+        return extraction
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            status = dict(self.metrics)
+            status['cached_documents'] = len(self._cache)
+        status['cache_size'] = self.cache_size
+        return status
+
+
+_extractor: Optional[ClinicalExtractor] = None
+_extractor_lock = threading.Lock()
+
+
+def get_clinical_extractor() -> ClinicalExtractor:
+    """Get the process-wide clinical extractor"""
+    global _extractor
+    if _extractor is None:
+        with _extractor_lock:
+            if _extractor is None:
+                _extractor = ClinicalExtractor()
+    return _extractor
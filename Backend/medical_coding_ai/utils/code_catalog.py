@@ -0,0 +1,336 @@
+"""
+Code Catalog
+
+Process-wide, versioned in-memory copy of the ICD-10, CPT and HCPCS code lists.
+
+The processed knowledge base JSON files can be tens of MB once embeddings are
+stored inline, so they are parsed once and shared by CodeSearcher, the agents
+and the API components. A reload only happens when a source file's mtime/size
+changes and its content hash differs from the loaded copy, or when a reload is
+explicitly requested (e.g. after /api/knowledge-base/process). Each reload
+builds a new snapshot and swaps it in with a single assignment, so readers
+never observe a half-loaded catalog.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CODE_TYPES = ('icd10', 'cpt', 'hcpcs')
+
+# Files tried in order for each code type before falling back to the
+# built-in sample codes below
+SOURCE_FILES = {
+    'icd10': ['icd10_processed.json', 'sample_icd10_codes.json'],
+    'cpt': ['cpt_processed.json'],
+    'hcpcs': ['hcpcs_processed.json'],
+}
+
+# Sample codes used when no knowledge base file can be loaded
+SAMPLE_ICD10_CODES = [
+    # Diabetes codes
+    {"code": "E11.9", "description": "Type 2 diabetes mellitus without complications", "type": "ICD-10"},
+    {"code": "E11.21", "description": "Type 2 diabetes mellitus with diabetic nephropathy", "type": "ICD-10"},
+    {"code": "E11.22", "description": "Type 2 diabetes mellitus with diabetic chronic kidney disease", "type": "ICD-10"},
+    {"code": "E11.29", "description": "Type 2 diabetes mellitus with other diabetic kidney complication", "type": "ICD-10"},
+    {"code": "E11.311", "description": "Type 2 diabetes mellitus with unspecified diabetic retinopathy with macular edema", "type": "ICD-10"},
+    {"code": "E11.319", "description": "Type 2 diabetes mellitus with unspecified diabetic retinopathy without macular edema", "type": "ICD-10"},
+    {"code": "E11.36", "description": "Type 2 diabetes mellitus with diabetic cataract", "type": "ICD-10"},
+    {"code": "E11.40", "description": "Type 2 diabetes mellitus with diabetic neuropathy, unspecified", "type": "ICD-10"},
+    {"code": "E11.51", "description": "Type 2 diabetes mellitus with diabetic peripheral angiopathy without gangrene", "type": "ICD-10"},
+    {"code": "E11.52", "description": "Type 2 diabetes mellitus with diabetic peripheral angiopathy with gangrene", "type": "ICD-10"},
+    {"code": "E11.59", "description": "Type 2 diabetes mellitus with other circulatory complications", "type": "ICD-10"},
+    {"code": "E11.610", "description": "Type 2 diabetes mellitus with diabetic neuropathic arthropathy", "type": "ICD-10"},
+    {"code": "E11.618", "description": "Type 2 diabetes mellitus with other diabetic arthropathy", "type": "ICD-10"},
+    {"code": "E11.620", "description": "Type 2 diabetes mellitus with diabetic dermatitis", "type": "ICD-10"},
+    {"code": "E11.621", "description": "Type 2 diabetes mellitus with foot ulcer", "type": "ICD-10"},
+    {"code": "E11.622", "description": "Type 2 diabetes mellitus with other skin ulcer", "type": "ICD-10"},
+    {"code": "E11.628", "description": "Type 2 diabetes mellitus with other skin complications", "type": "ICD-10"},
+    # Artificial joint codes
+    {"code": "Z96621", "description": "Presence of right artificial elbow joint", "type": "ICD-10"},
+    {"code": "Z96622", "description": "Presence of left artificial elbow joint", "type": "ICD-10"},
+    {"code": "Z96629", "description": "Presence of unspecified artificial elbow joint", "type": "ICD-10"},
+    {"code": "Z96631", "description": "Presence of right artificial wrist joint", "type": "ICD-10"},
+    {"code": "Z96632", "description": "Presence of left artificial wrist joint", "type": "ICD-10"},
+    {"code": "Z96639", "description": "Presence of unspecified artificial wrist joint", "type": "ICD-10"},
+    {"code": "Z96641", "description": "Presence of right artificial hip joint", "type": "ICD-10"},
+    {"code": "Z96642", "description": "Presence of left artificial hip joint", "type": "ICD-10"},
+    {"code": "Z96643", "description": "Presence of artificial hip joint, bilateral", "type": "ICD-10"},
+    {"code": "Z96649", "description": "Presence of unspecified artificial hip joint", "type": "ICD-10"},
+    {"code": "Z96651", "description": "Presence of right artificial knee joint", "type": "ICD-10"},
+    {"code": "Z96652", "description": "Presence of left artificial knee joint", "type": "ICD-10"},
+    {"code": "Z96653", "description": "Presence of artificial knee joint, bilateral", "type": "ICD-10"},
+    {"code": "Z96659", "description": "Presence of unspecified artificial knee joint", "type": "ICD-10"},
+    {"code": "Z96661", "description": "Presence of right artificial ankle joint", "type": "ICD-10"},
+    {"code": "Z96662", "description": "Presence of left artificial ankle joint", "type": "ICD-10"},
+    {"code": "Z96669", "description": "Presence of unspecified artificial ankle joint", "type": "ICD-10"},
+    {"code": "Z96691", "description": "Finger-joint replacement of right hand", "type": "ICD-10"},
+    {"code": "Z96692", "description": "Finger-joint replacement of left hand", "type": "ICD-10"},
+    {"code": "Z96693", "description": "Finger-joint replacement, bilateral", "type": "ICD-10"},
+    {"code": "Z96698", "description": "Presence of other orthopedic joint implants", "type": "ICD-10"},
+    {"code": "Z967", "description": "Presence of other bone and tendon implants", "type": "ICD-10"},
+    {"code": "Z9681", "description": "Presence of artificial skin", "type": "ICD-10"},
+    {"code": "E11.9", "description": "Type 2 diabetes mellitus without complications", "type": "ICD-10"},
+    {"code": "I10", "description": "Essential hypertension", "type": "ICD-10"},
+    {"code": "E78.5", "description": "Hyperlipidemia, unspecified", "type": "ICD-10"},
+    {"code": "J45.20", "description": "Mild intermittent asthma, uncomplicated", "type": "ICD-10"},
+    {"code": "K58.9", "description": "Irritable bowel syndrome without diarrhea", "type": "ICD-10"},
+    {"code": "K21.9", "description": "Gastro-esophageal reflux disease without esophagitis", "type": "ICD-10"},
+    {"code": "J10", "description": "Essential hypertension", "type": "ICD-10"}
+]
+
+SAMPLE_CPT_CODES = [
+    {"code": "99213", "description": "Office or other outpatient visit for established patient, low to moderate complexity", "type": "CPT"},
+    {"code": "99214", "description": "Office or other outpatient visit for established patient, moderate complexity", "type": "CPT"},
+    {"code": "99215", "description": "Office or other outpatient visit for established patient, high complexity", "type": "CPT"},
+    {"code": "99212", "description": "Office or other outpatient visit for established patient, straightforward", "type": "CPT"},
+    {"code": "99201", "description": "Office or other outpatient visit for new patient, straightforward", "type": "CPT"},
+    {"code": "99202", "description": "Office or other outpatient visit for new patient, low complexity", "type": "CPT"},
+    {"code": "99203", "description": "Office or other outpatient visit for new patient, moderate complexity", "type": "CPT"},
+    {"code": "99204", "description": "Office or other outpatient visit for new patient, moderate to high complexity", "type": "CPT"},
+    {"code": "99205", "description": "Office or other outpatient visit for new patient, high complexity", "type": "CPT"},
+    {"code": "12001", "description": "Simple repair of superficial wounds of scalp, neck, axillae, external genitalia, trunk and/or extremities; 2.5 cm or less", "type": "CPT"},
+    {"code": "71020", "description": "Radiologic examination, chest, 2 views, frontal and lateral", "type": "CPT"},
+    {"code": "93000", "description": "Electrocardiogram, routine ECG with at least 12 leads; with interpretation and report", "type": "CPT"},
+    {"code": "36415", "description": "Collection of venous blood by venipuncture", "type": "CPT"},
+    {"code": "80053", "description": "Comprehensive metabolic panel", "type": "CPT"},
+    {"code": "85025", "description": "Blood count; complete (CBC), automated (Hgb, Hct, RBC, WBC and platelet count) and automated differential WBC count", "type": "CPT"}
+]
+
+SAMPLE_HCPCS_CODES = [
+    {"code": "L3000", "description": "Foot insert, removable, molded to patient model, longitudinal arch support", "type": "HCPCS"},
+    {"code": "E0100", "description": "Cane, includes canes of all materials, adjustable or fixed, with tip", "type": "HCPCS"},
+    {"code": "E0130", "description": "Walker, rigid (pickup), adjustable or fixed height", "type": "HCPCS"},
+    {"code": "E0140", "description": "Walker, with trunk support, adjustable or fixed height, any type", "type": "HCPCS"},
+    {"code": "E1390", "description": "Oxygen concentrator, single delivery port, capable of delivering 85 percent or greater oxygen concentration at the prescribed flow rate", "type": "HCPCS"},
+    {"code": "E0424", "description": "Stationary compressed gaseous oxygen system, rental; includes container, contents, regulator, flowmeter, humidifier, nebulizer, cannula or mask, and tubing", "type": "HCPCS"},
+    {"code": "K0001", "description": "Standard wheelchair", "type": "HCPCS"},
+    {"code": "L1900", "description": "Ankle foot orthosis, spring wire, dorsiflexion assist calf band, custom fabricated", "type": "HCPCS"},
+    {"code": "L8400", "description": "Prosthetic sheath, below knee, each", "type": "HCPCS"},
+    {"code": "L8420", "description": "Prosthetic sock, multiple ply, below knee, each", "type": "HCPCS"},
+    {"code": "A4100", "description": "Skin barrier, solid, 4 x 4 or equivalent, each", "type": "HCPCS"},
+    {"code": "A4206", "description": "Syringe with needle, sterile, 1 cc or less, each", "type": "HCPCS"},
+    {"code": "A4253", "description": "Blood glucose test or reagent strips for home blood glucose monitor, per 50 strips", "type": "HCPCS"}
+]
+
+SAMPLE_CODES = {
+    'icd10': SAMPLE_ICD10_CODES,
+    'cpt': SAMPLE_CPT_CODES,
+    'hcpcs': SAMPLE_HCPCS_CODES,
+}
+
+
+class CatalogSnapshot:
+    """One immutable version of the loaded code lists"""
+
+    def __init__(self, version: int, codes: Dict[str, List[Dict[str, Any]]],
+                 sources: Dict[str, str], loaded_at: datetime):
+        self.version = version
+        self.codes = codes
+        self.sources = sources
+        self.loaded_at = loaded_at
+
+    def get_codes(self, code_type: str) -> List[Dict[str, Any]]:
+        """Get the code list for 'icd10', 'cpt' or 'hcpcs'"""
+        return self.codes.get(code_type, [])
+
+
+class CodeCatalog:
+    """Shared code catalog that reloads only when its source files change"""
+
+    def __init__(self, data_dir: Optional[Path] = None, check_interval: float = 1.0):
+        """
+        Args:
+            data_dir: Directory holding the processed/sample JSON files
+            check_interval: Minimum seconds between file change checks
+        """
+        self.data_dir = Path(data_dir) if data_dir else Path(__file__).parent.parent / 'data' / 'knowledge_base'
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._file_stats: Dict[str, Tuple[Tuple[str, int, int], ...]] = {}
+        self._file_hashes: Dict[str, Tuple[str, ...]] = {}
+        self._last_check = 0.0
+
+        # Metrics
+        self.metrics = {
+            'reload_count': 0,
+            'failed_reloads': 0,
+            'last_reload_duration_ms': 0,
+            'total_reload_duration_ms': 0,
+            'last_reload_at': None,
+            'last_error': None,
+        }
+
+    def get_snapshot(self) -> CatalogSnapshot:
+        """Get the current snapshot, reloading first if source files changed"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._last_check < self.check_interval:
+            return snapshot
+        return self.refresh()
+
+    def get_codes(self, code_type: str) -> List[Dict[str, Any]]:
+        """Get the current code list for one code type"""
+        return self.get_snapshot().get_codes(code_type)
+
+    def get_source_hash(self, code_type: str) -> Optional[str]:
+        """MD5 of the file the current codes of one type were loaded from.
+
+        None when the built-in sample codes are in use.
+        """
+        source = self.get_snapshot().sources.get(code_type)
+        for entry in self._file_hashes.get(code_type, ()):
+            filename, _, digest = entry.rpartition(':')
+            if filename == source:
+                return digest
+        return None
+
+    def refresh(self, force: bool = False) -> CatalogSnapshot:
+        """Check source files and swap in a new snapshot if anything changed.
+
+        Args:
+            force: Reload every code type even if no file change is detected
+        """
+        with self._lock:
+            self._last_check = time.monotonic()
+            current = self._snapshot
+
+            changed = []
+            for code_type in CODE_TYPES:
+                stats = self._stat_sources(code_type)
+                if current is None or force or stats != self._file_stats.get(code_type):
+                    changed.append((code_type, stats))
+
+            if not changed:
+                return current
+
+            start = time.perf_counter()
+            codes = dict(current.codes) if current else {}
+            sources = dict(current.sources) if current else {}
+            reloaded = []
+
+            try:
+                for code_type, stats in changed:
+                    hashes = self._hash_sources(stats)
+                    self._file_stats[code_type] = stats
+                    if current is not None and not force and hashes == self._file_hashes.get(code_type):
+                        # Touched but identical content - keep the loaded list
+                        continue
+                    codes[code_type], sources[code_type] = self._load_code_type(code_type)
+                    self._file_hashes[code_type] = hashes
+                    reloaded.append(code_type)
+            except Exception as e:
+                self.metrics['failed_reloads'] += 1
+                self.metrics['last_error'] = str(e)
+                logger.error(f"Error reloading code catalog: {e}")
+                if current is None:
+                    raise
+                return current
+
+            if not reloaded:
+                return current
+
+            snapshot = CatalogSnapshot(
+                version=(current.version + 1) if current else 1,
+                codes=codes,
+                sources=sources,
+                loaded_at=datetime.now()
+            )
+            self._snapshot = snapshot
+
+            duration_ms = (time.perf_counter() - start) * 1000
+            self.metrics['reload_count'] += 1
+            self.metrics['last_reload_duration_ms'] = duration_ms
+            self.metrics['total_reload_duration_ms'] += duration_ms
+            self.metrics['last_reload_at'] = snapshot.loaded_at.isoformat()
+
+            logger.info(
+                f"Code catalog v{snapshot.version} loaded in {duration_ms:.0f}ms "
+                f"(reloaded: {', '.join(reloaded)})"
+            )
+            return snapshot
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get catalog version, per-type counts and reload metrics"""
+        snapshot = self._snapshot
+        return {
+            'version': snapshot.version if snapshot else 0,
+            'loaded_at': snapshot.loaded_at.isoformat() if snapshot else None,
+            'counts': {code_type: len(snapshot.get_codes(code_type)) if snapshot else 0
+                       for code_type in CODE_TYPES},
+            'sources': dict(snapshot.sources) if snapshot else {},
+            'metrics': self.metrics.copy(),
+        }
+
+    def _stat_sources(self, code_type: str) -> Tuple[Tuple[str, int, int], ...]:
+        """Cheap change signature: (name, mtime_ns, size) for each existing source file"""
+        stats = []
+        for filename in SOURCE_FILES[code_type]:
+            try:
+                st = os.stat(self.data_dir / filename)
+            except OSError:
+                continue
+            stats.append((filename, st.st_mtime_ns, st.st_size))
+        return tuple(stats)
+
+    def _hash_sources(self, stats: Tuple[Tuple[str, int, int], ...]) -> Tuple[str, ...]:
+        """MD5 of each source file, only computed after a stat change"""
+        hashes = []
+        for filename, _, _ in stats:
+            hash_md5 = hashlib.md5()
+            try:
+                with open(self.data_dir / filename, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        hash_md5.update(chunk)
+            except OSError:
+                continue
+            hashes.append(f"{filename}:{hash_md5.hexdigest()}")
+        return tuple(hashes)
+
+    def _load_code_type(self, code_type: str) -> Tuple[List[Dict[str, Any]], str]:
+        """Load one code type from the first readable source file"""
+        for filename in SOURCE_FILES[code_type]:
+            path = self.data_dir / filename
+            if not path.exists():
+                logger.warning(f"No {code_type.upper()} data found at {path}")
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict) and 'codes' in data:
+                    codes = data['codes']
+                else:
+                    codes = data if isinstance(data, list) else []
+                logger.info(f"Loaded {len(codes)} {code_type.upper()} codes from {filename}")
+                return codes, filename
+            except Exception as e:
+                logger.error(f"Error loading {code_type.upper()} codes from {path}: {e}")
+
+        codes = [dict(code) for code in SAMPLE_CODES[code_type]]
+        logger.info(f"Loaded {len(codes)} built-in sample {code_type.upper()} codes")
+        return codes, 'builtin_sample'
+
+
+_code_catalog: Optional[CodeCatalog] = None
+_code_catalog_lock = threading.Lock()
+
+
+def get_code_catalog() -> CodeCatalog:
+    """Get or create the process-wide code catalog"""
+    global _code_catalog
+
+    if _code_catalog is None:
+        with _code_catalog_lock:
+            if _code_catalog is None:
+                _code_catalog = CodeCatalog()
+
+    return _code_catalog
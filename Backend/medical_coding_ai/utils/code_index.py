@@ -0,0 +1,244 @@
+"""
+Code Search Index
+
+Prebuilt lookup structures behind CodeSearcher.search. Instead of scoring every
+ICD-10/CPT/HCPCS entry for each keystroke, the index narrows a query down to the
+handful of codes that can possibly score above zero and only scores those:
+
+- a token -> posting-list inverted index over lowercased descriptions
+- a joined vocabulary string used to find which tokens contain a query fragment
+- a joined code string used to find codes containing the query (exact, prefix
+  and partial code matches all score the same way)
+
+Scoring mirrors CodeSearcher._calculate_relevance exactly so results are
+identical to the legacy full scan.
+"""
+
+import re
+from bisect import bisect_right
+from collections import Counter
+from heapq import nsmallest
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+_TOKEN_RE = re.compile(r'\w+')
+_KEY_SEPARATOR = '\n'
+
+
+class _JoinedKeys:
+    """Substring lookup over many short keys using a single joined string.
+
+    str.find runs in C, so scanning ~100k codes or a description vocabulary
+    is far cheaper than a Python loop over the keys.
+    """
+
+    def __init__(self, keys: Sequence[str]):
+        self._text = _KEY_SEPARATOR.join(keys)
+        self._starts = []
+        offset = 0
+        for key in keys:
+            self._starts.append(offset)
+            offset += len(key) + 1
+        # Sentinel so the "next key" offset always exists
+        self._starts.append(offset)
+
+    def find(self, fragment: str) -> List[int]:
+        """Return ids of all keys containing fragment"""
+        if not fragment or _KEY_SEPARATOR in fragment:
+            return []
+
+        text = self._text
+        starts = self._starts
+        key_ids = []
+        pos = text.find(fragment)
+        while pos != -1:
+            key_id = bisect_right(starts, pos) - 1
+            key_ids.append(key_id)
+            # Jump to the next key so each key is reported once
+            pos = text.find(fragment, starts[key_id + 1])
+        return key_ids
+
+
+class CodeSearchIndex:
+    """Inverted index over a snapshot of the code databases"""
+
+    def __init__(self, sources: Dict[str, List[Dict[str, Any]]],
+                 popularity_bonus: Callable[[Dict[str, Any]], float]):
+        # Keep references to the source lists so they stay alive (and keep
+        # their identity) for as long as the index is in use
+        self.sources = sources
+        self.source_sizes = {group: len(codes) for group, codes in sources.items()}
+
+        self._entries: List[Dict[str, Any]] = []
+        self._groups: List[str] = []
+        self._codes: List[str] = []
+        self._descriptions: List[str] = []
+        self._bonuses: List[float] = []
+        self._code_lookup: Dict[str, int] = {}
+
+        for group, codes in sources.items():
+            for code_data in codes:
+                doc_id = len(self._entries)
+                code = str(code_data.get('code', ''))
+                self._entries.append(code_data)
+                self._groups.append(group)
+                self._codes.append(code.lower())
+                self._descriptions.append(str(code_data.get('description', '')).lower())
+                self._bonuses.append(popularity_bonus(code_data))
+                self._code_lookup.setdefault(code.upper(), doc_id)
+
+        # Token -> posting list of document ids (ascending)
+        postings: Dict[str, List[int]] = {}
+        for doc_id, description in enumerate(self._descriptions):
+            for token in set(_TOKEN_RE.findall(description)):
+                postings.setdefault(token, []).append(doc_id)
+
+        self._vocabulary = list(postings)
+        self._postings = [postings[token] for token in self._vocabulary]
+        self._token_ids = {token: i for i, token in enumerate(self._vocabulary)}
+        self._vocabulary_keys = _JoinedKeys(self._vocabulary)
+        self._code_keys = _JoinedKeys(self._codes)
+        # Popular codes always receive a bonus, so they always score above zero
+        self._popular_ids = {doc_id for doc_id, bonus in enumerate(self._bonuses) if bonus > 0}
+        self._max_bonus = max(self._bonuses, default=0.0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def search(self, query: str, groups: Sequence[str],
+               max_results: int = 20) -> List[Tuple[float, Dict[str, Any]]]:
+        """Return (score, code_data) pairs for a lowercased, stripped query.
+
+        Ordering matches a stable sort by descending score over the source
+        lists, i.e. ties keep ICD-10, CPT, HCPCS insertion order.
+        """
+        if not query or not groups or max_results <= 0:
+            return []
+
+        allowed = set(groups)
+        query_words = query.split()
+        whole_word = re.compile(r'\b' + re.escape(query) + r'\b')
+
+        # Strong candidates: the query matches the code or the description
+        strong = set(self._code_keys.find(query))
+        strong |= self._description_matches(query)
+        strong |= self._popular_ids
+
+        scored = []
+        for doc_id in strong:
+            if self._groups[doc_id] not in allowed:
+                continue
+            score = self._score(doc_id, query, query_words, whole_word)
+            if score > 0:
+                scored.append((-score, doc_id))
+
+        # Weak candidates only match through the word-overlap tier, so they
+        # score at most 30 plus a popularity bonus. Skip them entirely when
+        # enough strong candidates already outrank that.
+        if len(query_words) > 1:
+            weak_ceiling = 30.0 + self._max_bonus
+            strong_enough = sum(1 for neg_score, _ in scored if -neg_score > weak_ceiling)
+            if strong_enough < max_results:
+                scored.extend(self._score_word_overlap(query_words, strong, allowed))
+
+        return [(-neg_score, self._entries[doc_id])
+                for neg_score, doc_id in nsmallest(max_results, scored)]
+
+    def _score_word_overlap(self, query_words: List[str], exclude: Set[int],
+                            allowed: Set[str]) -> List[Tuple[float, int]]:
+        """Score documents that match only individual query words"""
+        word_counts = Counter()
+        for word, occurrences in Counter(query_words).items():
+            docs = self._description_matches(word)
+            for _ in range(occurrences):
+                word_counts.update(docs)
+
+        scored = []
+        for doc_id, word_matches in word_counts.items():
+            if doc_id in exclude or self._groups[doc_id] not in allowed:
+                continue
+            # Same arithmetic as _score with no code or description match
+            score = 0.0
+            score += (word_matches / len(query_words)) * 30.0
+            score += self._bonuses[doc_id]
+            scored.append((-score, doc_id))
+        return scored
+
+    def lookup_code(self, code_upper: str) -> Optional[Dict[str, Any]]:
+        """Return the first entry whose code matches exactly (case-insensitive)"""
+        doc_id = self._code_lookup.get(code_upper)
+        return self._entries[doc_id] if doc_id is not None else None
+
+    def _description_matches(self, fragment: str) -> Set[int]:
+        """Documents whose description contains fragment as a substring"""
+        candidates = self._description_candidates(fragment)
+        if candidates is None:
+            candidates = range(len(self._entries))
+        elif _TOKEN_RE.fullmatch(fragment):
+            # A single word run is found exactly by the token lookup
+            return candidates
+
+        descriptions = self._descriptions
+        return {doc_id for doc_id in candidates if fragment in descriptions[doc_id]}
+
+    def _description_candidates(self, fragment: str) -> Optional[Set[int]]:
+        """Documents whose description may contain fragment as a substring.
+
+        Every word run of the fragment must fall inside a single description
+        token; runs with punctuation on both sides must be whole tokens.
+        Returns None when the fragment has no word characters to prune on.
+        """
+        runs = list(_TOKEN_RE.finditer(fragment))
+        if not runs:
+            return None
+
+        run_postings = []
+        for run in runs:
+            if run.start() > 0 and run.end() < len(fragment):
+                token_id = self._token_ids.get(run.group())
+                token_ids = [token_id] if token_id is not None else []
+            else:
+                token_ids = self._vocabulary_keys.find(run.group())
+            if not token_ids:
+                return set()
+            run_postings.append(token_ids)
+
+        # Intersect starting from the most selective run
+        run_postings.sort(key=len)
+        result: Optional[Set[int]] = None
+        for token_ids in run_postings:
+            docs = set()
+            for token_id in token_ids:
+                docs.update(self._postings[token_id])
+            result = docs if result is None else result & docs
+            if not result:
+                return set()
+        return result
+
+    def _score(self, doc_id: int, query: str, query_words: List[str],
+               whole_word: re.Pattern) -> float:
+        """Same tiers and arithmetic as CodeSearcher._calculate_relevance"""
+        score = 0.0
+        code = self._codes[doc_id]
+        description = self._descriptions[doc_id]
+
+        # Exact code match, otherwise any partial/prefix code match
+        if query == code:
+            score += 100.0
+        elif query in code:
+            score += 80.0
+
+        # A whole-word match is always a substring match, so test the
+        # cheap substring first and only run the regex on real hits
+        if query == description:
+            score += 90.0
+        elif query in description:
+            score += 60.0 if whole_word.search(description) is not None else 40.0
+
+        if len(query_words) > 1:
+            word_matches = sum(1 for word in query_words if word in description)
+            word_score = (word_matches / len(query_words)) * 30.0
+            score += word_score
+
+        score += self._bonuses[doc_id]
+
+        return score
@@ -1,216 +1,74 @@
 import re
 import sys
 import os
-import json
 from typing import List, Dict, Any, Optional
 import logging
-from pathlib import Path
 
 # Add project root to path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
+from utils.code_catalog import (
+    CatalogSnapshot, CodeCatalog, get_code_catalog,
+    SAMPLE_ICD10_CODES, SAMPLE_CPT_CODES, SAMPLE_HCPCS_CODES
+)
+from utils.code_index import CodeSearchIndex
+
 logger = logging.getLogger(__name__)
 
 class CodeSearcher:
     """Search and retrieve medical codes from knowledge bases"""
     
-    def __init__(self):
+    def __init__(self, catalog: Optional[CodeCatalog] = None):
         self.icd10_codes = []
         self.cpt_codes = []
         self.hcpcs_codes = []
+        self._index = None
+        self._catalog = catalog or get_code_catalog()
+        self._catalog_version = None
         self.load_latest_knowledge_base()
     
     def load_latest_knowledge_base(self):
-        """Load the latest knowledge base from processed JSON files"""
-        # Define paths to processed JSON files
-        processed_dir = Path(project_root) / 'data' / 'knowledge_base'
-        sample_dir = Path(project_root) / 'data' / 'knowledge_base'
-        
-        # Make sure directories exist
-        os.makedirs(processed_dir, exist_ok=True)
-        
-        icd10_json = processed_dir / 'icd10_processed.json'
-        cpt_json = processed_dir / 'cpt_processed.json'
-        hcpcs_json = processed_dir / 'hcpcs_processed.json'
-        
-        # Check for sample data if processed files don't exist
-        sample_icd10 = sample_dir / 'sample_icd10_codes.json'
-        sample_cpt = sample_dir / 'sample_cpt_codes.json'
-        sample_hcpcs = sample_dir / 'sample_hcpcs_codes.json'
-        
-        # Try loading ICD-10 codes
-        if icd10_json.exists():
-            try:
-                with open(icd10_json, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, dict) and 'codes' in data:
-                        self.icd10_codes = data['codes']
-                    else:
-                        self.icd10_codes = data if isinstance(data, list) else []
-                logger.info(f"Loaded {len(self.icd10_codes)} ICD-10 codes from processed data")
-            except Exception as e:
-                logger.error(f"Error loading ICD-10 codes: {e}")
-                # Try loading sample data
-                if sample_icd10.exists():
-                    try:
-                        with open(sample_icd10, 'r', encoding='utf-8') as f:
-                            self.icd10_codes = json.load(f)
-                        logger.info(f"Loaded {len(self.icd10_codes)} ICD-10 codes from sample data")
-                    except Exception as ex:
-                        logger.error(f"Error loading sample ICD-10 codes: {ex}")
-                        self.load_sample_icd10_codes()
-                else:
-                    self.load_sample_icd10_codes()
-        else:
-            logger.warning(f"No processed ICD-10 data found at {icd10_json}")
-            # Try loading sample data
-            if sample_icd10.exists():
-                try:
-                    with open(sample_icd10, 'r', encoding='utf-8') as f:
-                        self.icd10_codes = json.load(f)
-                    logger.info(f"Loaded {len(self.icd10_codes)} ICD-10 codes from sample data")
-                except Exception as ex:
-                    logger.error(f"Error loading sample ICD-10 codes: {ex}")
-                    self.load_sample_icd10_codes()
-            else:
-                self.load_sample_icd10_codes()
+        """Load the latest knowledge base from the shared code catalog.
         
-        # Try loading CPT codes
-        if cpt_json.exists():
-            try:
-                with open(cpt_json, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, dict) and 'codes' in data:
-                        self.cpt_codes = data['codes']
-                    else:
-                        self.cpt_codes = data if isinstance(data, list) else []
-                logger.info(f"Loaded {len(self.cpt_codes)} CPT codes from processed data")
-            except Exception as e:
-                logger.error(f"Error loading CPT codes: {e}")
-                self.load_sample_cpt_codes()
-        else:
-            logger.warning(f"No processed CPT data found at {cpt_json}")
-            self.load_sample_cpt_codes()
-        
-        # Try loading HCPCS codes
-        if hcpcs_json.exists():
-            try:
-                with open(hcpcs_json, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, dict) and 'codes' in data:
-                        self.hcpcs_codes = data['codes']
-                    else:
-                        self.hcpcs_codes = data if isinstance(data, list) else []
-                logger.info(f"Loaded {len(self.hcpcs_codes)} HCPCS codes from processed data")
-            except Exception as e:
-                logger.error(f"Error loading HCPCS codes: {e}")
-                self.load_sample_hcpcs_codes()
-        else:
-            logger.warning(f"No processed HCPCS data found at {hcpcs_json}")
-            self.load_sample_hcpcs_codes()
+        The catalog only re-reads the processed JSON files when they change,
+        so this is cheap to call repeatedly.
+        """
+        self._apply_snapshot(self._catalog.get_snapshot())
     
     def reload_knowledge_base(self):
         """Reload the knowledge base from processed JSON files"""
         logger.info("Reloading knowledge base data...")
-        self.load_latest_knowledge_base()
+        self._apply_snapshot(self._catalog.refresh(force=True))
+    
+    def _apply_snapshot(self, snapshot: CatalogSnapshot):
+        """Point the code lists at a catalog snapshot"""
+        self.icd10_codes = snapshot.get_codes('icd10')
+        self.cpt_codes = snapshot.get_codes('cpt')
+        self.hcpcs_codes = snapshot.get_codes('hcpcs')
+        self._catalog_version = snapshot.version
+        # Any previously built search index is stale after a reload
+        self._index = None
+    
+    def _sync_with_catalog(self):
+        """Pick up a newer catalog version if one has been loaded"""
+        snapshot = self._catalog.get_snapshot()
+        if snapshot.version != self._catalog_version:
+            self._apply_snapshot(snapshot)
     
     def load_sample_icd10_codes(self):
         """Load sample ICD-10 codes for demonstration"""
-        # Sample ICD-10 codes based on your attachment
-        self.icd10_codes = [
-            # Diabetes codes
-            {"code": "E11.9", "description": "Type 2 diabetes mellitus without complications", "type": "ICD-10"},
-            {"code": "E11.21", "description": "Type 2 diabetes mellitus with diabetic nephropathy", "type": "ICD-10"},
-            {"code": "E11.22", "description": "Type 2 diabetes mellitus with diabetic chronic kidney disease", "type": "ICD-10"},
-            {"code": "E11.29", "description": "Type 2 diabetes mellitus with other diabetic kidney complication", "type": "ICD-10"},
-            {"code": "E11.311", "description": "Type 2 diabetes mellitus with unspecified diabetic retinopathy with macular edema", "type": "ICD-10"},
-            {"code": "E11.319", "description": "Type 2 diabetes mellitus with unspecified diabetic retinopathy without macular edema", "type": "ICD-10"},
-            {"code": "E11.36", "description": "Type 2 diabetes mellitus with diabetic cataract", "type": "ICD-10"},
-            {"code": "E11.40", "description": "Type 2 diabetes mellitus with diabetic neuropathy, unspecified", "type": "ICD-10"},
-            {"code": "E11.51", "description": "Type 2 diabetes mellitus with diabetic peripheral angiopathy without gangrene", "type": "ICD-10"},
-            {"code": "E11.52", "description": "Type 2 diabetes mellitus with diabetic peripheral angiopathy with gangrene", "type": "ICD-10"},
-            {"code": "E11.59", "description": "Type 2 diabetes mellitus with other circulatory complications", "type": "ICD-10"},
-            {"code": "E11.610", "description": "Type 2 diabetes mellitus with diabetic neuropathic arthropathy", "type": "ICD-10"},
-            {"code": "E11.618", "description": "Type 2 diabetes mellitus with other diabetic arthropathy", "type": "ICD-10"},
-            {"code": "E11.620", "description": "Type 2 diabetes mellitus with diabetic dermatitis", "type": "ICD-10"},
-            {"code": "E11.621", "description": "Type 2 diabetes mellitus with foot ulcer", "type": "ICD-10"},
-            {"code": "E11.622", "description": "Type 2 diabetes mellitus with other skin ulcer", "type": "ICD-10"},
-            {"code": "E11.628", "description": "Type 2 diabetes mellitus with other skin complications", "type": "ICD-10"},
-            # Artificial joint codes
-            {"code": "Z96621", "description": "Presence of right artificial elbow joint", "type": "ICD-10"},
-            {"code": "Z96622", "description": "Presence of left artificial elbow joint", "type": "ICD-10"},
-            {"code": "Z96629", "description": "Presence of unspecified artificial elbow joint", "type": "ICD-10"},
-            {"code": "Z96631", "description": "Presence of right artificial wrist joint", "type": "ICD-10"},
-            {"code": "Z96632", "description": "Presence of left artificial wrist joint", "type": "ICD-10"},
-            {"code": "Z96639", "description": "Presence of unspecified artificial wrist joint", "type": "ICD-10"},
-            {"code": "Z96641", "description": "Presence of right artificial hip joint", "type": "ICD-10"},
-            {"code": "Z96642", "description": "Presence of left artificial hip joint", "type": "ICD-10"},
-            {"code": "Z96643", "description": "Presence of artificial hip joint, bilateral", "type": "ICD-10"},
-            {"code": "Z96649", "description": "Presence of unspecified artificial hip joint", "type": "ICD-10"},
-            {"code": "Z96651", "description": "Presence of right artificial knee joint", "type": "ICD-10"},
-            {"code": "Z96652", "description": "Presence of left artificial knee joint", "type": "ICD-10"},
-            {"code": "Z96653", "description": "Presence of artificial knee joint, bilateral", "type": "ICD-10"},
-            {"code": "Z96659", "description": "Presence of unspecified artificial knee joint", "type": "ICD-10"},
-            {"code": "Z96661", "description": "Presence of right artificial ankle joint", "type": "ICD-10"},
-            {"code": "Z96662", "description": "Presence of left artificial ankle joint", "type": "ICD-10"},
-            {"code": "Z96669", "description": "Presence of unspecified artificial ankle joint", "type": "ICD-10"},
-            {"code": "Z96691", "description": "Finger-joint replacement of right hand", "type": "ICD-10"},
-            {"code": "Z96692", "description": "Finger-joint replacement of left hand", "type": "ICD-10"},
-            {"code": "Z96693", "description": "Finger-joint replacement, bilateral", "type": "ICD-10"},
-            {"code": "Z96698", "description": "Presence of other orthopedic joint implants", "type": "ICD-10"},
-            {"code": "Z967", "description": "Presence of other bone and tendon implants", "type": "ICD-10"},
-            {"code": "Z9681", "description": "Presence of artificial skin", "type": "ICD-10"},
-            {"code": "E11.9", "description": "Type 2 diabetes mellitus without complications", "type": "ICD-10"},
-            {"code": "I10", "description": "Essential hypertension", "type": "ICD-10"},
-            {"code": "E78.5", "description": "Hyperlipidemia, unspecified", "type": "ICD-10"},
-            {"code": "J45.20", "description": "Mild intermittent asthma, uncomplicated", "type": "ICD-10"},
-            {"code": "K58.9", "description": "Irritable bowel syndrome without diarrhea", "type": "ICD-10"},
-            {"code": "K21.9", "description": "Gastro-esophageal reflux disease without esophagitis", "type": "ICD-10"},
-            {"code": "J10", "description": "Essential hypertension", "type": "ICD-10"}
-        ]
+        self.icd10_codes = [dict(code) for code in SAMPLE_ICD10_CODES]
         logger.info(f"Loaded {len(self.icd10_codes)} sample ICD-10 codes")
     
     def load_sample_cpt_codes(self):
         """Load sample CPT codes for demonstration"""
-        # Sample CPT codes
-        self.cpt_codes = [
-            {"code": "99213", "description": "Office or other outpatient visit for established patient, low to moderate complexity", "type": "CPT"},
-            {"code": "99214", "description": "Office or other outpatient visit for established patient, moderate complexity", "type": "CPT"},
-            {"code": "99215", "description": "Office or other outpatient visit for established patient, high complexity", "type": "CPT"},
-            {"code": "99212", "description": "Office or other outpatient visit for established patient, straightforward", "type": "CPT"},
-            {"code": "99201", "description": "Office or other outpatient visit for new patient, straightforward", "type": "CPT"},
-            {"code": "99202", "description": "Office or other outpatient visit for new patient, low complexity", "type": "CPT"},
-            {"code": "99203", "description": "Office or other outpatient visit for new patient, moderate complexity", "type": "CPT"},
-            {"code": "99204", "description": "Office or other outpatient visit for new patient, moderate to high complexity", "type": "CPT"},
-            {"code": "99205", "description": "Office or other outpatient visit for new patient, high complexity", "type": "CPT"},
-            {"code": "12001", "description": "Simple repair of superficial wounds of scalp, neck, axillae, external genitalia, trunk and/or extremities; 2.5 cm or less", "type": "CPT"},
-            {"code": "71020", "description": "Radiologic examination, chest, 2 views, frontal and lateral", "type": "CPT"},
-            {"code": "93000", "description": "Electrocardiogram, routine ECG with at least 12 leads; with interpretation and report", "type": "CPT"},
-            {"code": "36415", "description": "Collection of venous blood by venipuncture", "type": "CPT"},
-            {"code": "80053", "description": "Comprehensive metabolic panel", "type": "CPT"},
-            {"code": "85025", "description": "Blood count; complete (CBC), automated (Hgb, Hct, RBC, WBC and platelet count) and automated differential WBC count", "type": "CPT"}
-        ]
+        self.cpt_codes = [dict(code) for code in SAMPLE_CPT_CODES]
         logger.info(f"Loaded {len(self.cpt_codes)} sample CPT codes")
     
     def load_sample_hcpcs_codes(self):
         """Load sample HCPCS codes for demonstration"""
-        # Sample HCPCS codes
-        self.hcpcs_codes = [
-            {"code": "L3000", "description": "Foot insert, removable, molded to patient model, longitudinal arch support", "type": "HCPCS"},
-            {"code": "E0100", "description": "Cane, includes canes of all materials, adjustable or fixed, with tip", "type": "HCPCS"},
-            {"code": "E0130", "description": "Walker, rigid (pickup), adjustable or fixed height", "type": "HCPCS"},
-            {"code": "E0140", "description": "Walker, with trunk support, adjustable or fixed height, any type", "type": "HCPCS"},
-            {"code": "E1390", "description": "Oxygen concentrator, single delivery port, capable of delivering 85 percent or greater oxygen concentration at the prescribed flow rate", "type": "HCPCS"},
-            {"code": "E0424", "description": "Stationary compressed gaseous oxygen system, rental; includes container, contents, regulator, flowmeter, humidifier, nebulizer, cannula or mask, and tubing", "type": "HCPCS"},
-            {"code": "K0001", "description": "Standard wheelchair", "type": "HCPCS"},
-            {"code": "L1900", "description": "Ankle foot orthosis, spring wire, dorsiflexion assist calf band, custom fabricated", "type": "HCPCS"},
-            {"code": "L8400", "description": "Prosthetic sheath, below knee, each", "type": "HCPCS"},
-            {"code": "L8420", "description": "Prosthetic sock, multiple ply, below knee, each", "type": "HCPCS"},
-            {"code": "A4100", "description": "Skin barrier, solid, 4 x 4 or equivalent, each", "type": "HCPCS"},
-            {"code": "A4206", "description": "Syringe with needle, sterile, 1 cc or less, each", "type": "HCPCS"},
-            {"code": "A4253", "description": "Blood glucose test or reagent strips for home blood glucose monitor, per 50 strips", "type": "HCPCS"}
-        ]
+        self.hcpcs_codes = [dict(code) for code in SAMPLE_HCPCS_CODES]
         logger.info(f"Loaded {len(self.hcpcs_codes)} sample HCPCS codes")
     
     def search(self, query: str, code_type: str = "all", max_results: int = 20) -> List[Dict[str, Any]]:
@@ -220,37 +78,27 @@ class CodeSearcher:
         if not query or len(query.strip()) < 2:
             return []
         
+        self._sync_with_catalog()
+        
         query_lower = query.lower().strip()
         results = []
         
-        # Determine which databases to search
-        databases = self._get_search_databases(code_type)
-        
-        # Search in each database
-        for database in databases:
-            for code_data in database:
-                relevance_score = self._calculate_relevance(query_lower, code_data)
-                if relevance_score > 0:
-                    result = code_data.copy()
-                    result['relevance_score'] = relevance_score
-                    results.append(result)
-        
-        # Sort by relevance and return top results
-        results.sort(key=lambda x: x['relevance_score'], reverse=True)
-        return results[:max_results]
+        # Only candidates from the prebuilt index are scored; ranking matches
+        # a full scan with _calculate_relevance
+        index = self._get_index()
+        for relevance_score, code_data in index.search(query_lower, self._get_search_groups(code_type), max_results):
+            result = code_data.copy()
+            result['relevance_score'] = relevance_score
+            results.append(result)
+        
+        return results
     
     def search_by_code(self, code: str) -> Optional[Dict[str, Any]]:
         """Search for a specific code"""
         code_upper = code.upper().strip()
         
-        # Search in all databases
-        all_codes = self.icd10_codes + self.cpt_codes + self.hcpcs_codes
-        
-        for code_data in all_codes:
-            if code_data['code'].upper() == code_upper:
-                return code_data
-        
-        return None
+        self._sync_with_catalog()
+        return self._get_index().lookup_code(code_upper)
     
     def search_by_description(self, description: str, code_type: str = "all") -> List[Dict[str, Any]]:
         """Search for codes by description keywords"""
@@ -282,6 +130,39 @@ class CodeSearcher:
         
         return databases
     
+    def _get_search_groups(self, code_type: str) -> List[str]:
+        """Get index groups to search based on code type"""
+        groups = []
+        code_type = code_type.lower()
+        
+        if code_type in ["all", "icd10", "icd-10"]:
+            groups.append('icd10')
+        if code_type in ["all", "cpt"]:
+            groups.append('cpt')
+        if code_type in ["all", "hcpcs"]:
+            groups.append('hcpcs')
+        
+        return groups
+    
+    def _get_index(self) -> CodeSearchIndex:
+        """Get the search index, rebuilding it if the code lists were replaced"""
+        sources = {
+            'icd10': self.icd10_codes,
+            'cpt': self.cpt_codes,
+            'hcpcs': self.hcpcs_codes
+        }
+        
+        index = self._index
+        if index is None or any(
+            index.sources[group] is not codes or index.source_sizes[group] != len(codes)
+            for group, codes in sources.items()
+        ):
+            index = CodeSearchIndex(sources, self._get_popularity_bonus)
+            self._index = index
+            logger.info(f"Built code search index over {len(index)} codes")
+        
+        return index
+    
     def _calculate_relevance(self, query: str, code_data: Dict[str, Any]) -> float:
         """Calculate relevance score for a code based on query"""
         score = 0.0
@@ -0,0 +1,252 @@
+"""
+CPU-Bound Work Executor
+
+Runs CPU-heavy request work (PDF text extraction, regex extraction and
+anonymization of clinical text) in a process pool, so a long document does
+not pin the event loop and stall every other request.
+
+- The pool has one worker process per CPU (``workers``)
+- At most ``workers + max_queue`` jobs are accepted at a time; further jobs
+  are rejected with CPUExecutorFull, which the API reports as 503
+- Jobs are handed to the pool only when a worker is free, so each job's
+  timeout counts from when it starts running, not from when it was queued;
+  a job still waiting for a worker after its timeout is rejected with
+  CPUExecutorFull without touching the pool
+- A running job that times out has its pool killed and replaced, so a
+  runaway parse cannot hold a worker forever; jobs that were running on the
+  killed pool are retried without counting as crashes
+- A worker crash (e.g. a malformed PDF taking down the parser) breaks only
+  the pool, not the API process: the pool is replaced and jobs that were
+  in flight on it are retried once
+
+Job functions must be picklable (module-level) and so must their arguments
+and results.
+
+    cpu_executor:
+      workers: 0              # worker processes (0 = one per CPU)
+      max_queue: 32           # jobs waiting for a worker before rejecting
+      timeout_seconds: 120    # per-job limit
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_QUEUE = 32
+DEFAULT_TIMEOUT_SECONDS = 120.0
+# Attempts of a job whose pool broke under it (a crash of this or another job)
+MAX_ATTEMPTS = 2
+
+
+class CPUExecutorFull(Exception):
+    """Raised when the executor already holds its maximum number of jobs."""
+
+
+class CPUTaskTimeout(Exception):
+    """Raised when a job does not finish within its timeout."""
+
+
+class CPUTaskCrashed(Exception):
+    """Raised when a job's worker process died (on every attempt)."""
+
+
+class CPUExecutor:
+    """Bounded process pool for CPU-bound request work"""
+
+    def __init__(self, workers: int = 0, max_queue: int = DEFAULT_MAX_QUEUE,
+                 timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS):
+        """
+        Args:
+            workers: Worker processes (0 = one per CPU)
+            max_queue: Jobs accepted beyond the running ones
+            timeout_seconds: Default per-job timeout
+        """
+        self.workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+        self.max_queue = max(0, int(max_queue))
+        self.timeout_seconds = float(timeout_seconds)
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._jobs = 0
+        # Free workers, bound to the event loop the jobs are awaited on
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._running = 0
+        # Pools killed for a timeout; their other jobs did not crash
+        self._killed: 'weakref.WeakSet[ProcessPoolExecutor]' = weakref.WeakSet()
+
+        # Metrics
+        self.metrics = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'timeouts': 0,
+            'queue_timeouts': 0,
+            'crashes': 0,
+            'pool_restarts': 0,
+            'max_jobs': 0,
+            'last_job_ms': 0.0,
+        }
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> 'CPUExecutor':
+        """Create an executor from the ``cpu_executor`` section of config.yaml"""
+        executor_config = (config or {}).get('cpu_executor', {}) or {}
+        return cls(
+            workers=executor_config.get('workers', 0),
+            max_queue=executor_config.get('max_queue', DEFAULT_MAX_QUEUE),
+            timeout_seconds=executor_config.get('timeout_seconds', DEFAULT_TIMEOUT_SECONDS)
+        )
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """
+        Run fn(*args) in a worker process.
+
+        The timeout counts from when a worker picks the job up.
+
+        Raises:
+            CPUExecutorFull: If workers + max_queue jobs are already accepted,
+                or no worker became free within timeout
+            CPUTaskTimeout: If the job did not finish within timeout of starting
+            CPUTaskCrashed: If the worker process died
+            Exception: Whatever fn raised
+        """
+        with self._lock:
+            if self._jobs >= self.workers + self.max_queue:
+                self.metrics['rejected'] += 1
+                raise CPUExecutorFull(f"CPU executor is busy ({self._jobs} jobs)")
+            self._jobs += 1
+            self.metrics['submitted'] += 1
+            self.metrics['max_jobs'] = max(self.metrics['max_jobs'], self._jobs)
+
+        start = time.perf_counter()
+        try:
+            result = await self._run(fn, args, self.timeout_seconds if timeout is None else timeout)
+            self.metrics['completed'] += 1
+            return result
+        except Exception:
+            self.metrics['failed'] += 1
+            raise
+        finally:
+            self.metrics['last_job_ms'] = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._jobs -= 1
+
+    async def _run(self, fn: Callable, args: tuple, timeout: float) -> Any:
+        slots = self._get_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            # Never started, so there is nothing to kill
+            self.metrics['queue_timeouts'] += 1
+            raise CPUExecutorFull(f"No CPU executor worker became free within {timeout:.0f}s")
+
+        self._running += 1
+        try:
+            return await self._run_started(fn, args, timeout)
+        finally:
+            self._running -= 1
+            slots.release()
+
+    async def _run_started(self, fn: Callable, args: tuple, timeout: float) -> Any:
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            executor = self._get_executor()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._replace(executor)
+                continue
+
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            except asyncio.TimeoutError:
+                self.metrics['timeouts'] += 1
+                # The job cannot be cancelled once running; kill its pool instead
+                self._replace(executor, kill=True)
+                raise CPUTaskTimeout(f"{getattr(fn, '__name__', 'job')} did not finish within {timeout:.0f}s")
+            except BrokenProcessPool:
+                if executor in self._killed:
+                    logger.info(f"Retrying {getattr(fn, '__name__', 'job')}: "
+                                f"its pool was killed for another job's timeout")
+                    continue
+                self.metrics['crashes'] += 1
+                self._replace(executor)
+                logger.warning(f"CPU executor worker died running {getattr(fn, '__name__', 'job')} "
+                               f"(attempt {attempt} of {MAX_ATTEMPTS})")
+
+        raise CPUTaskCrashed(f"Worker process died running {getattr(fn, '__name__', 'job')}")
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.workers)
+            self._slots_loop = loop
+        return self._slots
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _replace(self, executor: ProcessPoolExecutor, kill: bool = False):
+        """Discard a broken or stuck pool; the next job starts a fresh one"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self.metrics['pool_restarts'] += 1
+
+        if kill:
+            self._killed.add(executor)
+            # Private, but the only handle on the processes of a stuck pool
+            for process in list((getattr(executor, '_processes', None) or {}).values()):
+                process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """Stop the worker processes (running jobs are abandoned)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Pool size, jobs and metrics"""
+        return {
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'timeout_seconds': self.timeout_seconds,
+            'jobs': self._jobs,
+            'running': self._running,
+            'metrics': self.metrics.copy(),
+        }
+
+
+_cpu_executor: Optional[CPUExecutor] = None
+_cpu_executor_lock = threading.Lock()
+
+
+def get_cpu_executor(config: Optional[Dict[str, Any]] = None) -> CPUExecutor:
+    """Get or create the process-wide CPU-bound work executor"""
+    global _cpu_executor
+
+    if _cpu_executor is None:
+        with _cpu_executor_lock:
+            if _cpu_executor is None:
+                _cpu_executor = CPUExecutor.from_config(config)
+                logger.info(
+                    f"CPU executor initialized (workers={_cpu_executor.workers}, "
+                    f"max_queue={_cpu_executor.max_queue}, timeout={_cpu_executor.timeout_seconds}s)"
+                )
+
+    return _cpu_executor
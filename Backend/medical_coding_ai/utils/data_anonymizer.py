@@ -1,9 +1,10 @@
-import re
 import yaml
-from typing import Dict, Any, List
+from typing import Dict, Any
 import logging
 import os
 
+from .phi_scrubber import PHIScrubber, is_medical_term
+
 logger = logging.getLogger(__name__)
 
 class DataAnonymizer:
@@ -15,6 +16,7 @@ class DataAnonymizer:
         self.contact_placeholder = self.config.get('anonymization', {}).get('placeholder_contact', '[CONTACT_XXX]')
         self.id_placeholder = self.config.get('anonymization', {}).get('placeholder_id', '[ID_XXX]')
         self.address_placeholder = self.config.get('anonymization', {}).get('placeholder_address', '[ADDRESS]')
+        self.scrubber = PHIScrubber.from_config(self.config)
     
     def _load_config(self, config_path: str = None) -> Dict[str, Any]:
         """Load configuration"""
@@ -71,121 +73,16 @@ class DataAnonymizer:
         return anonymized
     
     def anonymize_text(self, text: str) -> str:
-        """Anonymize personal information in raw text"""
-        if not text:
-            return text
-            
-        anonymized_text = text
-        config = self.config.get('anonymization', {})
-        
-        if config.get('mask_names', True):
-            # Replace names (assuming they're in caps or title case)
-            anonymized_text = self._mask_names(anonymized_text)
-        
-        if config.get('mask_contacts', True):
-            # Replace phone numbers
-            anonymized_text = self._mask_phone_numbers(anonymized_text)
-        
-        if config.get('mask_ids', True):
-            # Replace ID numbers
-            anonymized_text = self._mask_id_numbers(anonymized_text)
-        
-        if config.get('mask_addresses', True):
-            # Replace addresses
-            anonymized_text = self._mask_addresses(anonymized_text)
-        
-        return anonymized_text
-    
-    def _mask_names(self, text: str) -> str:
-        """Mask names in text"""
-        # Pattern for names in medical documents
-        patterns = [
-            r'\b[A-Z][a-z]+ [A-Z][a-z]+\b',  # First Last
-            r'\b[A-Z][a-z]+, [A-Z][a-z]+\b',  # Last, First
-            r'\b[A-Z]{2,}\s+[A-Z]{2,}\b',    # ALL CAPS names
-            r"Patient's?\s+Name[:\s]*([A-Z\s]+)",
-            r"Patient[:\s]*([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)"
-        ]
-        
-        for pattern in patterns:
-            # Exclude common medical terms
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                name_candidate = match.group(0)
-                if not self._is_medical_term(name_candidate):
-                    text = text.replace(name_candidate, self.name_placeholder)
-        
-        return text
-    
-    def _mask_phone_numbers(self, text: str) -> str:
-        """Mask phone numbers in text"""
-        patterns = [
-            r'\b\d{3,5}[-\s]?\d{2}[-\s]?\d{6,7}\b',  # International format
-            r'\b\(\d{3}\)\s?\d{3}[-\s]?\d{4}\b',     # (123) 456-7890
-            r'\b\d{3}[-\s]?\d{3}[-\s]?\d{4}\b',      # 123-456-7890
-            r'\b\d{10,15}\b'                          # Long number sequences
-        ]
-        
-        for pattern in patterns:
-            text = re.sub(pattern, self.contact_placeholder, text)
-        
-        return text
-    
-    def _mask_id_numbers(self, text: str) -> str:
-        """Mask ID numbers in text"""
-        patterns = [
-            r'\b[A-Z]{2,3}\d{5,8}\b',     # Medical record patterns
-            r'\b\d{2,3}-\d{2}-\d{4}\b',   # SSN-like patterns
-            r'\bEH\d+\b',                 # Example from your document
-            r'\b\d{6,}/[A-Z]{2}/[A-Z]{3}/\d{2}\b'  # Visit number patterns
-        ]
-        
-        for pattern in patterns:
-            text = re.sub(pattern, self.id_placeholder, text)
-        
-        return text
-    
-    def _mask_addresses(self, text: str) -> str:
-        """Mask addresses in text"""
-        patterns = [
-            r'\b\d+\s+[A-Z][a-z]+\s+(?:Street|St|Avenue|Ave|Road|Rd|Lane|Ln|Drive|Dr|Boulevard|Blvd)\b',
-            r'\b[A-Z][a-z]+,\s+[A-Z]{2}\s+\d{5}\b',  # City, State ZIP
-            r'\bP\.?O\.?\s+Box\s+\d+\b'               # PO Box
-        ]
-        
-        for pattern in patterns:
-            text = re.sub(pattern, self.address_placeholder, text, flags=re.IGNORECASE)
-        
-        return text
+        """Anonymize personal information in raw text (see utils/phi_scrubber.py)"""
+        return self.scrubber.scrub(text)
     
     def _anonymize_text_item(self, item: str) -> str:
         """Anonymize a single text item"""
-        if not item:
-            return item
-        
-        # Apply basic anonymization to individual items
-        anonymized = item
-        
-        # Remove specific names that might appear in conditions/procedures
-        anonymized = re.sub(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b', '[NAME]', anonymized)
-        
-        return anonymized
+        return self.scrubber.scrub_item(item)
     
     def _is_medical_term(self, text: str) -> bool:
         """Check if text is likely a medical term rather than a name"""
-        medical_keywords = [
-            'diagnosis', 'condition', 'disease', 'syndrome', 'disorder',
-            'treatment', 'procedure', 'surgery', 'operation', 'therapy',
-            'medication', 'drug', 'prescription', 'injection', 'infusion',
-            'examination', 'test', 'scan', 'x-ray', 'mri', 'ct', 'ultrasound',
-            'blood', 'urine', 'laboratory', 'pathology', 'biopsy',
-            'chronic', 'acute', 'severe', 'mild', 'moderate',
-            'primary', 'secondary', 'tertiary', 'bilateral', 'unilateral',
-            'anterior', 'posterior', 'superior', 'inferior', 'medial', 'lateral'
-        ]
-        
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in medical_keywords)
+        return is_medical_term(text)
     
     def get_anonymization_stats(self, original_text: str, anonymized_text: str) -> Dict[str, Any]:
         """Get statistics about anonymization process"""
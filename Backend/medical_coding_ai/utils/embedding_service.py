@@ -0,0 +1,357 @@
+"""
+Embedding Service
+
+One process-wide sentence embedding model shared by every VectorStore, the
+knowledge base managers and the PDF processor, instead of each of them
+lazily loading its own copy of all-MiniLM-L6-v2.
+
+Query encoding goes through two layers:
+
+- an LRU cache of query embeddings, so repeated queries (the same document
+  re-analysed, identical extracted terms across agents) skip the model
+- a micro-batcher: concurrent encode_query calls (e.g. the ICD-10, CPT and
+  HCPCS agents searching at the same time from worker threads) are queued,
+  and a single worker thread encodes them together once ``max_batch_size``
+  requests are waiting or the oldest has waited ``max_wait_ms``
+
+Bulk corpus encoding (encode) goes straight to the model in large batches.
+
+The ``embeddings`` section of config.yaml selects the backend: "torch" (the
+default SentenceTransformer) or "onnx", which loads the model's ONNX export
+through sentence-transformers' ONNX Runtime backend; pointing
+``onnx_file_name`` at a quantized export (e.g. onnx/model_qint8_avx2.onnx)
+gives int8 CPU inference. If the ONNX backend cannot be loaded the service
+falls back to torch.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+BACKENDS = ('torch', 'onnx')
+# After a failed model load, wait this long before trying again, doubling up to the maximum
+LOAD_RETRY_SECONDS = 30
+LOAD_RETRY_MAX_SECONDS = 15 * 60
+
+
+class EmbeddingService:
+    """Shared embedding model with query micro-batching and an LRU cache"""
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, backend: str = 'torch',
+                 onnx_file_name: Optional[str] = None, device: str = 'cpu',
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0, cache_size: int = 4096,
+                 loader: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            model_name: SentenceTransformer model name
+            backend: 'torch' or 'onnx'
+            onnx_file_name: ONNX export to load with the onnx backend,
+                relative to the model repository
+            device: Device for the torch backend
+            max_batch_size: Maximum queries encoded together
+            max_wait_ms: Longest a query waits for others to join its batch
+            cache_size: Query embeddings kept in the LRU cache (0 disables it)
+            loader: Callable returning a model with ``encode``; overrides
+                the backend (used by tests and benchmarks)
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown embeddings.backend '{backend}', expected one of {', '.join(BACKENDS)}")
+
+        self.model_name = model_name
+        self.backend = backend
+        self.onnx_file_name = onnx_file_name
+        self.device = device
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.cache_size = max(0, int(cache_size))
+
+        self._loader = loader
+        self._model = None
+        self._load_error: Optional[str] = None
+        self._load_failures = 0
+        self._load_retry_at = 0.0
+        self._loaded_backend: Optional[str] = None
+        self._model_lock = threading.Lock()
+
+        self._cache: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+        # Metrics
+        self.metrics = {
+            'query_requests': 0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'batches': 0,
+            'batched_queries': 0,
+            'max_batch_size_seen': 0,
+            'bulk_requests': 0,
+            'bulk_texts': 0,
+            'encode_time_ms': 0.0,
+            'errors': 0,
+        }
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> 'EmbeddingService':
+        """Create a service from the ``embeddings`` section of config.yaml"""
+        embeddings_config = (config or {}).get('embeddings', {}) or {}
+        return cls(
+            model_name=embeddings_config.get('model_name', DEFAULT_EMBEDDING_MODEL),
+            backend=embeddings_config.get('backend', 'torch'),
+            onnx_file_name=embeddings_config.get('onnx_file_name'),
+            device=embeddings_config.get('device', 'cpu'),
+            max_batch_size=embeddings_config.get('max_batch_size', 32),
+            max_wait_ms=embeddings_config.get('max_wait_ms', 5.0),
+            cache_size=embeddings_config.get('cache_size', 4096)
+        )
+
+    # ------------------------------------------------------------------
+    # Model
+    # ------------------------------------------------------------------
+
+    @property
+    def model(self):
+        """The loaded model, or None if it could not be loaded (retried with backoff)"""
+        if self._model is None and time.monotonic() >= self._load_retry_at:
+            with self._model_lock:
+                if self._model is None and time.monotonic() >= self._load_retry_at:
+                    self._model = self._load_model()
+        return self._model
+
+    def is_available(self) -> bool:
+        """Load the model if needed and report whether it is usable"""
+        return self.model is not None
+
+    def _load_model(self):
+        start = time.perf_counter()
+        try:
+            if self._loader is not None:
+                model = self._loader()
+                self._loaded_backend = 'custom'
+            else:
+                model = self._load_sentence_transformer()
+            logger.info(f"Embedding model {self.model_name} loaded ({self._loaded_backend}) "
+                        f"in {(time.perf_counter() - start):.1f}s")
+            self._load_error = None
+            self._load_failures = 0
+            return model
+        except Exception as e:
+            # A download or file-system hiccup should not disable embeddings until restart
+            self._load_error = str(e)
+            self._load_failures += 1
+            delay = min(LOAD_RETRY_MAX_SECONDS, LOAD_RETRY_SECONDS * 2 ** (self._load_failures - 1))
+            self._load_retry_at = time.monotonic() + delay
+            logger.error(f"Error loading embedding model {self.model_name}: {e} (retrying in {delay:.0f}s)")
+            return None
+
+    def _load_sentence_transformer(self):
+        from sentence_transformers import SentenceTransformer
+
+        if self.backend == 'onnx':
+            try:
+                model_kwargs = {'file_name': self.onnx_file_name} if self.onnx_file_name else None
+                model = SentenceTransformer(self.model_name, backend='onnx', model_kwargs=model_kwargs)
+                self._loaded_backend = 'onnx'
+                return model
+            except Exception as e:
+                logger.warning(f"ONNX embedding backend unavailable ({e}), using torch")
+
+        model = SentenceTransformer(self.model_name, device=self.device)
+        self._loaded_backend = 'torch'
+        return model
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+
+    def encode(self, texts: Sequence[str], batch_size: int = 64, show_progress_bar: bool = False,
+               **kwargs) -> np.ndarray:
+        """Encode a corpus directly (no cache, no micro-batching).
+
+        Signature-compatible with SentenceTransformer.encode for the
+        knowledge base builders.
+        """
+        model = self._require_model()
+        self.metrics['bulk_requests'] += 1
+        self.metrics['bulk_texts'] += len(texts)
+        return self._encode_batch(model, list(texts), batch_size=batch_size,
+                                  show_progress_bar=show_progress_bar, **kwargs)
+
+    def encode_query(self, text: str) -> np.ndarray:
+        """Embedding of one query, from the cache or the next micro-batch"""
+        return self.encode_queries([text])[0]
+
+    def encode_queries(self, texts: Sequence[str]) -> np.ndarray:
+        """Embeddings of several queries (rows in input order).
+
+        Cached queries are answered immediately; the rest join the shared
+        micro-batch queue. Returned arrays are copies the caller may modify
+        (e.g. faiss.normalize_L2 in place).
+        """
+        self._require_model()
+        self.metrics['query_requests'] += len(texts)
+
+        results: List[Optional[np.ndarray]] = [self._cache_get(text) for text in texts]
+        pending = []
+        for position, (text, cached) in enumerate(zip(texts, results)):
+            if cached is None:
+                future: Future = Future()
+                self._submit(text, future)
+                pending.append((position, future))
+
+        self.metrics['cache_hits'] += len(texts) - len(pending)
+        self.metrics['cache_misses'] += len(pending)
+
+        for position, future in pending:
+            results[position] = future.result()
+
+        return np.stack([np.array(vector, dtype='float32', copy=True) for vector in results])
+
+    def clear_cache(self):
+        """Drop all cached query embeddings"""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get model, batching and cache status"""
+        metrics = self.metrics.copy()
+        lookups = metrics['cache_hits'] + metrics['cache_misses']
+        return {
+            'model_name': self.model_name,
+            'backend': self.backend,
+            'loaded_backend': self._loaded_backend,
+            'loaded': self._model is not None,
+            'load_error': self._load_error,
+            'load_failures': self._load_failures,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'cache_entries': len(self._cache),
+            'cache_size': self.cache_size,
+            'cache_hit_rate': metrics['cache_hits'] / lookups if lookups else 0.0,
+            'avg_batch_size': metrics['batched_queries'] / metrics['batches'] if metrics['batches'] else 0.0,
+            'metrics': metrics,
+        }
+
+    def _require_model(self):
+        model = self.model
+        if model is None:
+            raise RuntimeError(f"Embedding model {self.model_name} is not available: {self._load_error}")
+        return model
+
+    def _encode_batch(self, model, texts: List[str], **kwargs) -> np.ndarray:
+        start = time.perf_counter()
+        try:
+            embeddings = model.encode(texts, **kwargs)
+        finally:
+            self.metrics['encode_time_ms'] += (time.perf_counter() - start) * 1000
+        return np.asarray(embeddings, dtype='float32')
+
+    # ------------------------------------------------------------------
+    # Micro-batching
+    # ------------------------------------------------------------------
+
+    def _submit(self, text: str, future: Future):
+        self._ensure_worker()
+        self._queue.put((text, future))
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run_worker, name='embedding-batcher', daemon=True)
+                self._worker.start()
+
+    def _run_worker(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._encode_pending(batch)
+
+    def _encode_pending(self, batch):
+        # Identical queries in one batch are encoded once
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            embeddings = self._encode_batch(self.model, unique_texts, batch_size=len(unique_texts))
+        except Exception as e:
+            self.metrics['errors'] += 1
+            logger.error(f"Error encoding query batch: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        by_text = dict(zip(unique_texts, embeddings))
+        for text, vector in by_text.items():
+            self._cache_put(text, vector)
+
+        self.metrics['batches'] += 1
+        self.metrics['batched_queries'] += len(batch)
+        self.metrics['max_batch_size_seen'] = max(self.metrics['max_batch_size_seen'], len(batch))
+        for text, future in batch:
+            future.set_result(by_text[text])
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def _cache_get(self, text: str) -> Optional[np.ndarray]:
+        if not self.cache_size:
+            return None
+        with self._cache_lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+            return vector
+
+    def _cache_put(self, text: str, vector: np.ndarray):
+        if not self.cache_size:
+            return
+        vector = np.array(vector, dtype='float32', copy=True)
+        vector.setflags(write=False)
+        with self._cache_lock:
+            self._cache[text] = vector
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+_embedding_service: Optional[EmbeddingService] = None
+_embedding_service_lock = threading.Lock()
+
+
+def get_embedding_service(config: Optional[Dict[str, Any]] = None) -> EmbeddingService:
+    """Get or create the process-wide embedding service.
+
+    The model itself is only loaded on first use.
+    """
+    global _embedding_service
+
+    if _embedding_service is None:
+        with _embedding_service_lock:
+            if _embedding_service is None:
+                _embedding_service = EmbeddingService.from_config(config)
+                logger.info(
+                    f"Embedding service initialized ({_embedding_service.model_name}, "
+                    f"backend={_embedding_service.backend}, max_batch={_embedding_service.max_batch_size}, "
+                    f"max_wait={_embedding_service.max_wait * 1000:.0f}ms)"
+                )
+
+    return _embedding_service
@@ -0,0 +1,240 @@
+"""
+Streaming Exports
+
+Writes coding session and claim exports while they are read from the
+database, so memory stays flat however many rows are exported:
+
+- rows come from a server-side cursor (``AsyncSession.stream`` with
+  ``yield_per``) one batch at a time
+- CSV and NDJSON are encoded a batch at a time and sent as response chunks
+- XLSX goes through openpyxl's write-only workbook, which spools each row to
+  a temporary file; the finished file is then sent in chunks and deleted
+
+Each writer consumes an async iterable of row batches (lists of dicts keyed
+by the export's field names), so the same writers serve a single session and
+a tenant-wide date range.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterator, List, Optional
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.ehr_models import Claim
+from ..models.medical_models import MedicalCodeParseResult
+from ..models.user_models import User
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+EXPORT_BATCH_ROWS = 1000
+CHUNK_BYTES = 64 * 1024
+
+SESSION_CODE_FIELDS = ['Sno', 'Code', 'AI confidence score/Manual Code', 'Validation score', 'Reason']
+SESSION_EXPORT_FIELDS = ['Session', 'Created'] + SESSION_CODE_FIELDS
+CLAIM_EXPORT_FIELDS = [
+    'claim_id', 'claim_number', 'claim_type', 'claim_status', 'payment_status',
+    'service_date_from', 'service_date_to', 'total_charge_amount', 'allowed_amount',
+    'paid_amount', 'patient_responsibility', 'adjustment_amount', 'submission_date',
+    'payment_date', 'is_denied', 'denial_reason_code', 'created_at',
+]
+
+MEDIA_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+Batches = AsyncIterable[List[Dict[str, Any]]]
+
+
+# =============================================================================
+# ROWS
+# =============================================================================
+
+def session_code_rows(selected_codes: List[Dict[str, Any]],
+                      verification_results: Optional[List[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+    """One export row per selected code, with its verification outcome"""
+    verifications = {}
+    for verification in verification_results or []:
+        # The first verification of a code is the one reported
+        verifications.setdefault(verification.get('code'), verification)
+
+    for i, code in enumerate(selected_codes, 1):
+        # AI confidence or Manual
+        confidence_value = code.get('confidence', 0)
+        ai_confidence = f"{int(confidence_value * 100)}%" if confidence_value > 0 else "Manual"
+
+        validation_score = "85%"  # Default
+        reason = ""
+        verification = verifications.get(code.get('code'))
+        if verification is not None:
+            validation_score = f"{verification.get('verification_confidence', 85)}%"
+
+            # Combine concerns and recommendations for reason
+            concerns = verification.get('concerns', '').strip()
+            recommendations = verification.get('recommendations', '').strip()
+            reason_parts = []
+            if concerns:
+                reason_parts.append(f"Issue: {concerns}")
+            if recommendations:
+                reason_parts.append(f"Recommendation: {recommendations}")
+            reason = " | ".join(reason_parts) or "No specific concerns identified"
+
+        yield {
+            'Sno': i,
+            'Code': code.get('code'),
+            'AI confidence score/Manual Code': ai_confidence,
+            'Validation score': validation_score,
+            'Reason': reason
+        }
+
+
+async def single_batch(rows: List[Dict[str, Any]]) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Rows already in memory, as a batch stream"""
+    if rows:
+        yield rows
+
+
+def session_export_query(user: User, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """Sessions created from date_from to date_to inclusive: the tenant's for admins, otherwise the user's own"""
+    query = select(
+        MedicalCodeParseResult.medical_code_parse_id,
+        MedicalCodeParseResult.created_at,
+        # Only the parts of the session document that are exported leave the database
+        MedicalCodeParseResult.parse_result['selected_codes'],
+        MedicalCodeParseResult.parse_result['verification_results'],
+    )
+    if user.role == 'admin':
+        query = query.join(User, User.user_id == MedicalCodeParseResult.user_id).where(
+            User.tenant_id == user.tenant_id)
+    else:
+        query = query.where(MedicalCodeParseResult.user_id == user.user_id)
+
+    if date_from:
+        query = query.where(MedicalCodeParseResult.created_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        query = query.where(MedicalCodeParseResult.created_at <
+                            datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return query.order_by(MedicalCodeParseResult.created_at, MedicalCodeParseResult.medical_code_parse_id)
+
+
+def claim_export_query(tenant_id, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """The tenant's claims with service dates in [date_from, date_to]"""
+    query = select(*(getattr(Claim, field) for field in CLAIM_EXPORT_FIELDS)).where(Claim.tenant_id == tenant_id)
+    if date_from:
+        query = query.where(Claim.service_date_from >= date_from)
+    if date_to:
+        query = query.where(Claim.service_date_from <= date_to)
+    return query.order_by(Claim.service_date_from, Claim.claim_id)
+
+
+async def stream_partitions(db: AsyncSession, query, batch_rows: int = EXPORT_BATCH_ROWS) -> AsyncIterator[list]:
+    """Result rows of query from a server-side cursor, batch_rows at a time"""
+    result = await db.stream(query.execution_options(yield_per=batch_rows))
+    async for partition in result.partitions():
+        yield partition
+
+
+async def session_export_batches(db: AsyncSession, query, batch_rows: int = EXPORT_BATCH_ROWS) -> Batches:
+    """Selected code rows of every session returned by session_export_query"""
+    async for partition in stream_partitions(db, query, batch_rows):
+        batch = []
+        for session_id, created_at, selected_codes, verification_results in partition:
+            for row in session_code_rows(selected_codes or [], verification_results):
+                batch.append({'Session': str(session_id),
+                              'Created': created_at.isoformat() if created_at else '', **row})
+        if batch:
+            yield batch
+
+
+async def claim_export_batches(db: AsyncSession, query, batch_rows: int = EXPORT_BATCH_ROWS) -> Batches:
+    """Rows of claim_export_query as dicts"""
+    async for partition in stream_partitions(db, query, batch_rows):
+        yield [dict(zip(CLAIM_EXPORT_FIELDS, row)) for row in partition]
+
+
+# =============================================================================
+# WRITERS
+# =============================================================================
+
+async def csv_chunks(batches: Batches, fields: List[str]) -> AsyncIterator[bytes]:
+    """CSV with a header row, encoded one batch at a time"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, lineterminator='\n')
+    writer.writeheader()
+    async for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header only: nothing was exported
+        yield buffer.getvalue().encode('utf-8')
+
+
+async def ndjson_chunks(batches: Batches) -> AsyncIterator[bytes]:
+    """One JSON object per line, encoded one batch at a time"""
+    async for batch in batches:
+        yield "".join(json.dumps(row, default=str) + "\n" for row in batch).encode('utf-8')
+
+
+def _cell(value):
+    if value is None or isinstance(value, (str, int, float, Decimal, date, datetime)):
+        return value
+    return str(value)
+
+
+def _append_rows(sheet, batch: List[Dict[str, Any]], fields: List[str]):
+    for row in batch:
+        sheet.append([_cell(row.get(field)) for field in fields])
+
+
+async def xlsx_chunks(batches: Batches, fields: List[str], sheet_name: str) -> AsyncIterator[bytes]:
+    """An XLSX workbook built row by row in write-only mode, then sent in chunks"""
+    if Workbook is None:
+        raise ImportError("openpyxl not available")
+
+    workbook = Workbook(write_only=True)
+    try:
+        sheet = workbook.create_sheet(sheet_name)
+        sheet.append(fields)
+        async for batch in batches:
+            await asyncio.to_thread(_append_rows, sheet, batch, fields)
+
+        with tempfile.TemporaryFile() as f:
+            await asyncio.to_thread(workbook.save, f)
+            f.seek(0)
+            while chunk := await asyncio.to_thread(f.read, CHUNK_BYTES):
+                yield chunk
+    finally:
+        workbook.close()
+
+
+def export_response(batches: Batches, fmt: str, fields: List[str], filename: str,
+                    sheet_name: str = 'Export') -> StreamingResponse:
+    """Stream batches as a csv, ndjson or xlsx attachment named filename.<fmt>"""
+    if fmt == 'csv':
+        chunks = csv_chunks(batches, fields)
+    elif fmt == 'ndjson':
+        chunks = ndjson_chunks(batches)
+    elif fmt == 'xlsx':
+        chunks = xlsx_chunks(batches, fields, sheet_name)
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{fmt}"}
+    )
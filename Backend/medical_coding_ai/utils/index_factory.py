@@ -0,0 +1,132 @@
+"""
+FAISS Index Factory
+
+Builds the FAISS index type selected in the ``vector_store`` section of
+config.yaml. All index types use inner product on L2-normalized embeddings,
+i.e. cosine similarity, so scores are comparable across types.
+
+    vector_store:
+      index_type: "hnsw"        # flat | hnsw | ivf_flat | ivf_pq
+      hnsw_m: 32                # HNSW graph degree
+      ef_construction: 200      # HNSW build-time beam width
+      ef_search: 64             # HNSW query-time beam width
+      nlist: 1024               # IVF cells
+      nprobe: 16                # IVF cells scanned per query
+      pq_m: 48                  # IVF-PQ sub-quantizers (must divide dimension)
+      pq_nbits: 8               # IVF-PQ bits per sub-quantizer code
+
+Flat is exact. HNSW needs no training and trades memory for recall/latency
+via ef_search. IVF-Flat and IVF-PQ are trained on the code corpus itself;
+nlist is capped to what the corpus can train (FAISS wants ~39 points per
+centroid), and a corpus too small to train falls back to the next simpler
+type, so the small sample knowledge base keeps working with any setting.
+Query-time parameters (ef_search, nprobe) can be changed on an already built
+index with set_search_params.
+"""
+
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ('flat', 'hnsw', 'ivf_flat', 'ivf_pq')
+
+DEFAULT_INDEX_PARAMS = {
+    'index_type': 'flat',
+    'hnsw_m': 32,
+    'ef_construction': 200,
+    'ef_search': 64,
+    'nlist': 1024,
+    'nprobe': 16,
+    'pq_m': 48,
+    'pq_nbits': 8,
+}
+
+# FAISS k-means warns below this many training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+# Fewer IVF cells than this is no faster than a flat scan
+MIN_NLIST = 4
+
+
+def index_params_from_config(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Index parameters from the ``vector_store`` section of config.yaml"""
+    store_config = (config or {}).get('vector_store', {}) or {}
+    params = dict(DEFAULT_INDEX_PARAMS)
+    params.update({key: store_config[key] for key in DEFAULT_INDEX_PARAMS if key in store_config})
+    params['index_type'] = str(params['index_type']).lower()
+
+    if params['index_type'] not in INDEX_TYPES:
+        raise ValueError(f"Unknown vector_store.index_type '{params['index_type']}', "
+                         f"expected one of {', '.join(INDEX_TYPES)}")
+    return params
+
+
+def create_index(dimension: int, params: Dict[str, Any],
+                 n_vectors: Optional[int] = None) -> Tuple[Any, Dict[str, Any]]:
+    """Create an empty index for ``n_vectors`` training/corpus vectors.
+
+    Without ``n_vectors`` IVF indexes use the configured nlist as is; callers
+    that know the corpus size should pass it so nlist fits the corpus.
+
+    Returns:
+        (index, effective build parameters) - the parameters record what was
+        actually built after corpus-size adjustments
+    """
+    params = {**DEFAULT_INDEX_PARAMS, **params}
+    index_type = params['index_type']
+
+    if index_type == 'ivf_pq':
+        if dimension % params['pq_m'] != 0:
+            raise ValueError(f"vector_store.pq_m ({params['pq_m']}) must divide the dimension ({dimension})")
+        if n_vectors is not None and n_vectors < (1 << params['pq_nbits']) * MIN_POINTS_PER_CENTROID:
+            logger.warning(f"{n_vectors} vectors are too few to train IVF-PQ, using IVF-Flat")
+            index_type = 'ivf_flat'
+
+    nlist = params['nlist']
+    if index_type in ('ivf_flat', 'ivf_pq') and n_vectors is not None:
+        nlist = min(nlist, n_vectors // MIN_POINTS_PER_CENTROID)
+        if nlist < MIN_NLIST:
+            logger.warning(f"{n_vectors} vectors are too few to train an IVF index, using flat")
+            index_type = 'flat'
+
+    metric = faiss.METRIC_INNER_PRODUCT
+    if index_type == 'flat':
+        index = faiss.IndexFlatIP(dimension)
+        built = {'index_type': 'flat'}
+    elif index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dimension, params['hnsw_m'], metric)
+        index.hnsw.efConstruction = params['ef_construction']
+        built = {'index_type': 'hnsw', 'hnsw_m': params['hnsw_m'],
+                 'ef_construction': params['ef_construction']}
+    elif index_type == 'ivf_flat':
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist, metric)
+        built = {'index_type': 'ivf_flat', 'nlist': nlist}
+    else:
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, params['pq_m'], params['pq_nbits'], metric)
+        built = {'index_type': 'ivf_pq', 'nlist': nlist, 'pq_m': params['pq_m'],
+                 'pq_nbits': params['pq_nbits']}
+
+    set_search_params(index, params)
+    return index, built
+
+
+def build_index(vectors: np.ndarray, params: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+    """Create, train (when needed) and fill an index with normalized vectors"""
+    index, built = create_index(vectors.shape[1], params, len(vectors))
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index, built
+
+
+def set_search_params(index, params: Dict[str, Any]):
+    """Apply query-time parameters (ef_search, nprobe) to a built index"""
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = int(params.get('ef_search', DEFAULT_INDEX_PARAMS['ef_search']))
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(int(params.get('nprobe', DEFAULT_INDEX_PARAMS['nprobe'])), index.nlist)
@@ -7,12 +7,16 @@ from pathlib import Path
 import yaml
 from datetime import datetime
 import hashlib
+from functools import partial
 
 try:
     import pdfplumber
-    # from sentence_transformers import SentenceTransformer
     import faiss
     import numpy as np
+    from .vector_index import PersistedCodeIndex, code_documents
+    from .embedding_service import get_embedding_service
+    from .index_factory import create_index, index_params_from_config
+    from .pdf_ingestion import PDFIngestionPipeline, write_json_atomically
     DEPENDENCIES_AVAILABLE = True
 except ImportError as e:
     logging.warning(f"Some dependencies not available: {e}")
@@ -21,6 +25,8 @@ except ImportError as e:
     SentenceTransformer = None
     faiss = None
     np = None
+    PersistedCodeIndex = None
+    PDFIngestionPipeline = None
 
 logger = logging.getLogger(__name__)
 
@@ -51,25 +57,36 @@ class KnowledgeBaseManager:
         os.makedirs(self.processed_dir, exist_ok=True)
         os.makedirs(self.embeddings_dir, exist_ok=True)
         
-        # Initialize sentence transformer lazily
+        # Shared embedding service, resolved lazily
         self._encoder = None
+        
+        # Processing parameters
+        self.chunk_size = self.config.get('knowledge_base', {}).get('chunk_size', 1000)
+        self.chunk_overlap = self.config.get('knowledge_base', {}).get('chunk_overlap', 200)
+        
+        # Sharded, checkpointed PDF extraction
+        self.ingestion = None
+        if PDFIngestionPipeline is not None:
+            self.ingestion = PDFIngestionPipeline.from_config(
+                self.config, os.path.join(self.processed_dir, 'checkpoints')
+            )
+
+    def __getstate__(self):
+        # Extraction methods are pickled into ingestion workers; the shared
+        # encoder and the pipeline itself stay in this process
+        state = self.__dict__.copy()
+        state['_encoder'] = None
+        state['ingestion'] = None
+        return state
 
     @property
     def encoder(self):
         if self._encoder is None:
-            try:
-                from sentence_transformers import SentenceTransformer
-                self._encoder = SentenceTransformer('all-MiniLM-L6-v2')
-                logger.info("Sentence transformer loaded successfully")
-            except Exception as e:
-                logger.error(f"Error loading sentence transformer: {e}")
-                self._encoder = None
+            service = get_embedding_service(self.config)
+            if service.is_available():
+                self._encoder = service
         return self._encoder
         
-        # Processing parameters
-        self.chunk_size = self.config.get('knowledge_base', {}).get('chunk_size', 1000)
-        self.chunk_overlap = self.config.get('knowledge_base', {}).get('chunk_overlap', 200)
-        
     def _default_config(self) -> Dict[str, Any]:
         """Default configuration"""
         return {
@@ -165,40 +182,12 @@ class KnowledgeBaseManager:
         
         logger.info(f"Processing {pdf_type.upper()} PDF to JSON...")
         
-        extracted_codes = []
-        
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                total_pages = len(pdf.pages)
-                logger.info(f"Processing {total_pages} pages for {pdf_type.upper()}")
-                
-                for page_num, page in enumerate(pdf.pages, 1):
-                    try:
-                        text = page.extract_text()
-                        if text:
-                            # Extract codes based on type
-                            if pdf_type == 'icd10':
-                                page_codes = self._extract_icd10_codes_from_text(text, page_num)
-                            elif pdf_type == 'cpt':
-                                page_codes = self._extract_cpt_codes_from_text(text, page_num)
-                            elif pdf_type == 'hcpcs':
-                                page_codes = self._extract_hcpcs_codes_from_text(text, page_num)
-                            else:
-                                page_codes = []
-                            
-                            extracted_codes.extend(page_codes)
-                        
-                        # Progress reporting
-                        if progress_callback and page_num % 50 == 0:
-                            progress = (page_num / total_pages) * 100
-                            progress_callback(f"Processing page {page_num}/{total_pages} ({progress:.1f}%)")
-                        
-                        if page_num % 100 == 0:
-                            logger.info(f"Processed {page_num}/{total_pages} pages, found {len(extracted_codes)} codes")
-                            
-                    except Exception as e:
-                        logger.warning(f"Error processing page {page_num}: {e}")
-                        continue
+            # Pages are extracted one at a time across worker processes
+            extracted_codes = self.ingestion.run(
+                pdf_type, pdf_path, partial(self._extract_page_codes, pdf_type),
+                self._get_file_hash(pdf_path), progress_callback=progress_callback
+            )
             
             # Save processed data
             processed_data = {
@@ -209,16 +198,31 @@ class KnowledgeBaseManager:
                 'codes': extracted_codes
             }
             
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(processed_data, f, indent=2, ensure_ascii=False)
+            write_json_atomically(json_path, processed_data)
+            self.ingestion.clear_checkpoints(pdf_type)
             
             logger.info(f"Successfully processed {pdf_type.upper()}: {len(extracted_codes)} codes saved to {json_path}")
+            
+            # Build the persisted index now so agents never embed at start-up;
+            # without it they fall back to encoding the codes themselves
+            if not self.create_embeddings(pdf_type, progress_callback):
+                logger.warning(f"No persisted index built for {pdf_type.upper()}")
             return True
             
         except Exception as e:
             logger.error(f"Error processing {pdf_type} PDF: {e}")
             return False
     
+    def _extract_page_codes(self, pdf_type: str, text: str, page_num: int) -> List[Dict[str, Any]]:
+        """Extract codes of one type from a page (runs in ingestion workers)"""
+        if pdf_type == 'icd10':
+            return self._extract_icd10_codes_from_text(text, page_num)
+        elif pdf_type == 'cpt':
+            return self._extract_cpt_codes_from_text(text, page_num)
+        elif pdf_type == 'hcpcs':
+            return self._extract_hcpcs_codes_from_text(text, page_num)
+        return []
+    
     def _extract_icd10_codes_from_text(self, text: str, page_num: int) -> List[Dict[str, Any]]:
         """Extract ICD-10 codes from text"""
         codes = []
@@ -304,31 +308,47 @@ class KnowledgeBaseManager:
         return codes
     
     def create_embeddings(self, pdf_type: str, progress_callback=None) -> bool:
-        """Create vector embeddings for processed codes"""
+        """Build the persisted vector index for processed codes
+        
+        Writes a FAISS index plus metadata table into embeddings/, versioned
+        by the hash of the processed JSON. Agents memory-map it at start-up
+        instead of re-encoding every code (see utils/vector_index.py).
+        """
         if not self.encoder:
             logger.error("Sentence transformer not available")
             return False
         
         json_path = os.path.join(self.processed_dir, f'{pdf_type}_processed.json')
-        embeddings_path = os.path.join(self.embeddings_dir, f'{pdf_type}_embeddings.faiss')
         
         if not os.path.exists(json_path):
             logger.warning(f"Processed JSON not found: {json_path}")
             return False
         
         try:
+            source_hash = self._get_file_hash(json_path)
+            index_params = index_params_from_config(self.config)
+            # The configured model; an index built with another one is rebuilt
+            model_name = self.encoder.model_name
+            existing = PersistedCodeIndex.load(self.embeddings_dir, pdf_type, source_hash, model_name)
+            if existing is not None:
+                # Also rebuild when vector_store.index_type or its build parameters changed
+                _, expected_build = create_index(existing.dimension, index_params, len(existing))
+                if existing.manifest.get('index') == expected_build:
+                    logger.info(f"{pdf_type.upper()} index is up to date ({len(existing)} codes)")
+                    return True
+            
             with open(json_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
             
-            codes = data.get('codes', [])
+            codes = data.get('codes', []) if isinstance(data, dict) else data
             if not codes:
                 logger.warning(f"No codes found in {json_path}")
                 return False
             
             logger.info(f"Creating embeddings for {len(codes)} {pdf_type.upper()} codes")
             
-            # Extract text chunks for embedding
-            texts = [code.get('text_chunk', '') for code in codes]
+            # Same text and metadata the agents would otherwise embed at start-up
+            texts, metadata = code_documents(codes)
             
             # Create embeddings in batches to manage memory
             batch_size = 100
@@ -343,21 +363,12 @@ class KnowledgeBaseManager:
                     progress = ((i + len(batch)) / len(texts)) * 100
                     progress_callback(f"Creating embeddings: {i + len(batch)}/{len(texts)} ({progress:.1f}%)")
             
-            # Convert to numpy array
-            embeddings_array = np.array(all_embeddings)
-            
-            # Create FAISS index
-            dimension = embeddings_array.shape[1]
-            index = faiss.IndexFlatIP(dimension)  # Inner product (cosine similarity)
-            
-            # Normalize vectors for cosine similarity
-            faiss.normalize_L2(embeddings_array)
-            index.add(embeddings_array)
+            PersistedCodeIndex.build(
+                self.embeddings_dir, pdf_type, texts, metadata,
+                np.array(all_embeddings), source_hash, model_name, index_params
+            )
             
-            # Save FAISS index
-            faiss.write_index(index, embeddings_path)
-            
-            logger.info(f"Embeddings saved: {embeddings_path}")
+            logger.info(f"Embeddings saved to {self.embeddings_dir}")
             return True
             
         except Exception as e:
@@ -406,11 +417,10 @@ class KnowledgeBaseManager:
             # Process PDF to JSON
             json_success = self.process_pdf_to_json(pdf_type, progress_callback)
             
-            # Create embeddings
+            # Embeddings are built during processing; this only reports
+            # (or retries) the persisted index
             embeddings_success = False
             if json_success:
-                if progress_callback:
-                    progress_callback(f"Creating embeddings for {pdf_type.upper()}...")
                 embeddings_success = self.create_embeddings(pdf_type, progress_callback)
             
             results[pdf_type] = json_success and embeddings_success
@@ -427,10 +437,10 @@ class KnowledgeBaseManager:
         
         for pdf_type in ['icd10', 'cpt', 'hcpcs']:
             json_path = os.path.join(self.processed_dir, f'{pdf_type}_processed.json')
-            embeddings_path = os.path.join(self.embeddings_dir, f'{pdf_type}_embeddings.faiss')
+            manifest_path = os.path.join(self.embeddings_dir, f'{pdf_type}_manifest.json')
             
             status['processed_files'][pdf_type] = os.path.exists(json_path)
-            status['embeddings_available'][pdf_type] = os.path.exists(embeddings_path)
+            status['embeddings_available'][pdf_type] = os.path.exists(manifest_path)
             
             if os.path.exists(json_path):
                 try:
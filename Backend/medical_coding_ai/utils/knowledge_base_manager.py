@@ -21,12 +21,16 @@ import json
 import pdfplumber
 import re
 from typing import List, Dict, Any, Optional
-# from sentence_transformers import SentenceTransformer
 import logging
 from pathlib import Path
 import yaml
 from datetime import datetime
 import hashlib
+import threading
+from functools import partial
+
+from .embedding_service import get_embedding_service
+from .pdf_ingestion import PDFIngestionPipeline, get_ingestion_tracker, write_json_atomically
 
 logger = logging.getLogger(__name__)
 
@@ -52,22 +56,9 @@ class KnowledgeBaseManager:
             logger.warning("Config file not found, using defaults")
             self.config = self._get_default_config()
         
-        # Initialize sentence transformer lazily
+        # Shared embedding service, resolved lazily
         self._encoder = None
         
-    @property
-    def encoder(self):
-        if self._encoder is None:
-            try:
-                logger.info("Initializing SentenceTransformer...")
-                from sentence_transformers import SentenceTransformer
-                self._encoder = SentenceTransformer('all-MiniLM-L6-v2')
-                logger.info("SentenceTransformer initialized")
-            except Exception as e:
-                logger.error(f"Error loading sentence transformer: {e}")
-                self._encoder = None
-        return self._encoder
-        
         # PDF file mappings
         self.pdf_files = {
             'icd10': self.base_dir / 'icd10_codes.pdf',
@@ -88,6 +79,27 @@ class KnowledgeBaseManager:
             'cpt': self.processed_dir / 'cpt_metadata.json',
             'hcpcs': self.processed_dir / 'hcpcs_metadata.json'
         }
+        
+        # Sharded, checkpointed PDF extraction
+        self.ingestion = PDFIngestionPipeline.from_config(self.config, self.processed_dir / 'checkpoints')
+        self._background_thread = None
+    
+    def __getstate__(self):
+        # Extraction methods are pickled into ingestion workers; the shared
+        # encoder, the pipeline and the background thread stay in this process
+        state = self.__dict__.copy()
+        state['_encoder'] = None
+        state['ingestion'] = None
+        state['_background_thread'] = None
+        return state
+    
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            service = get_embedding_service(self.config)
+            if service.is_available():
+                self._encoder = service
+        return self._encoder
     
     def _get_default_config(self):
         """Get default configuration"""
@@ -124,6 +136,18 @@ class KnowledgeBaseManager:
         
         return results
     
+    def start_background_processing(self) -> threading.Thread:
+        """Run check_and_process_pdfs in a daemon thread so start-up is not blocked.
+        
+        Progress is reported by get_ingestion_tracker().
+        """
+        if self._background_thread is None or not self._background_thread.is_alive():
+            self._background_thread = threading.Thread(
+                target=self.check_and_process_pdfs, name='kb-ingestion', daemon=True
+            )
+            self._background_thread.start()
+        return self._background_thread
+    
     def _needs_processing(self, code_type: str, pdf_path: Path) -> bool:
         """Check if PDF needs to be processed"""
         json_path = self.json_files[code_type]
@@ -162,49 +186,15 @@ class KnowledgeBaseManager:
         try:
             logger.info(f"Starting processing of {code_type.upper()} PDF: {pdf_path}")
             
-            codes = []
-            batch_size = self.config.get('knowledge_base', {}).get('batch_size', 100)
             max_pages_per_batch = self.config.get('knowledge_base', {}).get('max_pages_per_batch', 50)
+            file_hash = self._get_file_hash(pdf_path)
             
-            with pdfplumber.open(pdf_path) as pdf:
-                total_pages = len(pdf.pages)
-                logger.info(f"Processing {total_pages} pages for {code_type.upper()}")
-                
-                batch_text = ""
-                pages_in_batch = 0
-                
-                for page_num, page in enumerate(pdf.pages):
-                    try:
-                        page_text = page.extract_text() or ""
-                        batch_text += page_text + "\n"
-                        pages_in_batch += 1
-                        
-                        # Process batch when it reaches the limit
-                        if pages_in_batch >= max_pages_per_batch:
-                            batch_codes = self._extract_codes_from_text(batch_text, code_type)
-                            codes.extend(batch_codes)
-                            
-                            logger.info(f"Processed pages {page_num - pages_in_batch + 1}-{page_num + 1}, "
-                                      f"extracted {len(batch_codes)} codes (total: {len(codes)})")
-                            
-                            # Reset batch
-                            batch_text = ""
-                            pages_in_batch = 0
-                        
-                        # Progress logging
-                        if (page_num + 1) % 100 == 0:
-                            progress = ((page_num + 1) / total_pages) * 100
-                            logger.info(f"Progress: {progress:.1f}% ({page_num + 1}/{total_pages} pages)")
-                    
-                    except Exception as e:
-                        logger.warning(f"Error processing page {page_num + 1}: {e}")
-                        continue
-                
-                # Process remaining text
-                if batch_text.strip():
-                    batch_codes = self._extract_codes_from_text(batch_text, code_type)
-                    codes.extend(batch_codes)
-                    logger.info(f"Processed final batch, extracted {len(batch_codes)} codes")
+            # Page ranges are extracted in parallel worker processes, in
+            # batches of max_pages_per_batch pages as before
+            codes = self.ingestion.run(
+                code_type, pdf_path, partial(self._extract_page_batch, code_type), file_hash,
+                pages_per_chunk=max_pages_per_batch
+            )
             
             # Generate embeddings if encoder is available
             if self.encoder and codes:
@@ -212,7 +202,8 @@ class KnowledgeBaseManager:
                 codes = self._generate_embeddings(codes)
             
             # Save processed data
-            self._save_processed_data(code_type, codes, pdf_path)
+            self._save_processed_data(code_type, codes, pdf_path, file_hash)
+            self.ingestion.clear_checkpoints(code_type)
             
             logger.info(f"Successfully processed {code_type.upper()}: {len(codes)} codes extracted")
             return True
@@ -221,6 +212,10 @@ class KnowledgeBaseManager:
             logger.error(f"Error processing {code_type} PDF: {e}")
             return False
     
+    def _extract_page_batch(self, code_type: str, text: str, first_page: int) -> List[Dict[str, Any]]:
+        """Extractor for PDFIngestionPipeline (runs in worker processes)"""
+        return self._extract_codes_from_text(text, code_type)
+    
     def _extract_codes_from_text(self, text: str, code_type: str) -> List[Dict[str, Any]]:
         """Extract medical codes from text based on type"""
         if code_type == 'icd10':
@@ -474,18 +469,18 @@ class KnowledgeBaseManager:
         
         return codes
     
-    def _save_processed_data(self, code_type: str, codes: List[Dict[str, Any]], pdf_path: Path):
+    def _save_processed_data(self, code_type: str, codes: List[Dict[str, Any]], pdf_path: Path,
+                             file_hash: Optional[str] = None):
         """Save processed codes to JSON"""
         json_path = self.json_files[code_type]
         metadata_path = self.metadata_files[code_type]
         
-        # Save codes
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(codes, f, indent=2, ensure_ascii=False)
+        # Save codes (compact; the file is only read back by the loader)
+        write_json_atomically(json_path, codes)
         
         # Save metadata
         metadata = {
-            'file_hash': self._get_file_hash(pdf_path),
+            'file_hash': file_hash or self._get_file_hash(pdf_path),
             'processed_at': datetime.now().isoformat(),
             'total_codes': len(codes),
             'pdf_path': str(pdf_path),
@@ -534,7 +529,8 @@ class KnowledgeBaseManager:
         stats = {
             'pdf_files': {},
             'processed_files': {},
-            'total_codes': 0
+            'total_codes': 0,
+            'ingestion': get_ingestion_tracker().get_status()
         }
         
         for code_type in ['icd10', 'cpt', 'hcpcs']:
@@ -0,0 +1,247 @@
+"""
+LLM Response Cache
+
+Content-addressed cache for LLM chat responses. Identical prompts (re-running
+an analysis on the same session, verifying the same code twice, the fixed
+code context sent by the agents) are answered from the cache instead of
+another Ollama round-trip.
+
+Entries are keyed by (model name, system prompt, SHA-256 of the user prompt)
+and live in two tiers:
+
+- an in-process LRU with a TTL
+- an optional Redis tier shared between workers (utils/redis_client.get_redis)
+
+The tenant a lookup is made for and whether the cache is bypassed are carried
+in context variables, so request handlers can set them once and every agent
+call made while handling that request (including concurrent fan-out tasks)
+picks them up.
+"""
+
+import contextvars
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    # Always the package module, even when this one is imported as utils.llm_cache
+    # (by the agents), so there is one Redis pool and close_redis() closes it
+    from medical_coding_ai.utils.redis_client import get_redis
+except ImportError:
+    # Streamlit UI, where only medical_coding_ai/ is on sys.path
+    from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+# After Redis is found unavailable, wait this long before trying again
+REDIS_RETRY_SECONDS = 60
+
+_cache_tenant: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('llm_cache_tenant', default=None)
+_cache_bypass: contextvars.ContextVar[bool] = contextvars.ContextVar('llm_cache_bypass', default=False)
+
+
+def set_cache_tenant(tenant_id: Optional[Any]) -> contextvars.Token:
+    """Attribute cache lookups in the current context to a tenant"""
+    return _cache_tenant.set(str(tenant_id) if tenant_id is not None else None)
+
+
+@contextmanager
+def bypass_llm_cache(bypass: bool = True):
+    """Skip cache reads (e.g. forced re-analysis); fresh responses are still stored"""
+    token = _cache_bypass.set(bypass)
+    try:
+        yield
+    finally:
+        _cache_bypass.reset(token)
+
+
+class LLMResponseCache:
+    """Two-tier (in-process LRU + optional Redis) cache for LLM responses"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                 redis_enabled: bool = False, key_prefix: str = 'llm_cache:'):
+        """
+        Args:
+            max_entries: Maximum entries kept in the in-process LRU
+            ttl_seconds: Time-to-live of a cached response in both tiers
+            redis_enabled: Also read/write the shared Redis tier
+            key_prefix: Prefix of Redis keys
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = int(ttl_seconds)
+        self.redis_enabled = redis_enabled
+        self.key_prefix = key_prefix
+
+        self._entries: 'OrderedDict[str, Tuple[float, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis_retry_at = 0.0
+
+        # Metrics
+        self.metrics = {
+            'hits': 0,
+            'misses': 0,
+            'memory_hits': 0,
+            'redis_hits': 0,
+            'bypassed': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'redis_errors': 0,
+            'tenants': {},
+        }
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> 'LLMResponseCache':
+        """Create a cache from the ``llm_cache`` section of config.yaml"""
+        cache_config = (config or {}).get('llm_cache', {}) or {}
+        return cls(
+            max_entries=cache_config.get('max_entries', DEFAULT_MAX_ENTRIES),
+            ttl_seconds=cache_config.get('ttl_seconds', DEFAULT_TTL_SECONDS),
+            redis_enabled=cache_config.get('redis_enabled', False)
+        )
+
+    @staticmethod
+    def make_key(model_name: str, system_prompt: str, user_prompt: str) -> str:
+        """Content address of a chat request"""
+        prompt_hash = hashlib.sha256(user_prompt.encode('utf-8')).hexdigest()
+        key_source = '\x00'.join([model_name, system_prompt, prompt_hash])
+        return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Look a response up, honouring the bypass flag of the current context"""
+        if _cache_bypass.get():
+            self.metrics['bypassed'] += 1
+            return None
+
+        value = self._get_memory(key)
+        if value is not None:
+            self.metrics['memory_hits'] += 1
+            self._record(hit=True)
+            return value
+
+        value = await self._get_redis(key)
+        if value is not None:
+            self.metrics['redis_hits'] += 1
+            self._set_memory(key, value)
+            self._record(hit=True)
+            return value
+
+        self._record(hit=False)
+        return None
+
+    async def set(self, key: str, value: str):
+        """Store a response in every enabled tier"""
+        self._set_memory(key, value)
+        self.metrics['stores'] += 1
+
+        redis_client = await self._redis()
+        if redis_client:
+            try:
+                await redis_client.setex(self.key_prefix + key, self.ttl_seconds, value)
+            except Exception as e:
+                self._redis_failed(e)
+
+    def clear(self):
+        """Drop all in-process entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get cache configuration, size and metrics"""
+        metrics = self.metrics.copy()
+        metrics['tenants'] = {tenant: counts.copy() for tenant, counts in self.metrics['tenants'].items()}
+        lookups = metrics['hits'] + metrics['misses']
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'redis_enabled': self.redis_enabled,
+            'hit_rate': metrics['hits'] / lookups if lookups else 0.0,
+            'metrics': metrics,
+        }
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.metrics['expirations'] += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_memory(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.metrics['evictions'] += 1
+
+    async def _get_redis(self, key: str) -> Optional[str]:
+        redis_client = await self._redis()
+        if not redis_client:
+            return None
+        try:
+            return await redis_client.get(self.key_prefix + key)
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+
+    async def _redis(self):
+        """Redis client, or None when disabled or recently unavailable"""
+        if not self.redis_enabled or time.monotonic() < self._redis_retry_at:
+            return None
+        redis_client = await get_redis()
+        if redis_client is None:
+            # get_redis retries the connection on every call; don't pay its
+            # connect timeout on each LLM lookup while Redis is down
+            self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+        return redis_client
+
+    def _redis_failed(self, error: Exception):
+        self.metrics['redis_errors'] += 1
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+        logger.warning(f"LLM cache Redis tier unavailable: {error}")
+
+    def _record(self, hit: bool):
+        field = 'hits' if hit else 'misses'
+        self.metrics[field] += 1
+        tenant = _cache_tenant.get() or 'unknown'
+        counts = self.metrics['tenants'].setdefault(tenant, {'hits': 0, 'misses': 0})
+        counts[field] += 1
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache(config: Optional[Dict[str, Any]] = None) -> Optional[LLMResponseCache]:
+    """Get or create the process-wide LLM response cache.
+
+    Returns None when ``llm_cache.enabled`` is false in the config used to
+    create it.
+    """
+    global _llm_cache
+
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                if not ((config or {}).get('llm_cache', {}) or {}).get('enabled', True):
+                    return None
+                _llm_cache = LLMResponseCache.from_config(config)
+                logger.info(
+                    f"LLM response cache initialized (max_entries={_llm_cache.max_entries}, "
+                    f"ttl={_llm_cache.ttl_seconds}s, redis={_llm_cache.redis_enabled})"
+                )
+
+    return _llm_cache
@@ -0,0 +1,210 @@
+"""
+LLM Client
+
+asyncio-native client for the Ollama chat API used by the coding agents.
+
+The synchronous ``ollama.chat`` call blocks the uvicorn event loop for the
+whole LLM round-trip. This client awaits ``ollama.AsyncClient`` instead and
+adds:
+
+- a semaphore capping concurrent requests to the Ollama server
+- a per-call timeout (``ollama.timeout`` in config.yaml)
+- cooperative cancellation: cancelling the awaiting task (e.g. when the HTTP
+  client disconnects) aborts the in-flight request and frees its slot
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import ollama
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = 'http://localhost:11434'
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+class LLMTimeoutError(Exception):
+    """Raised when an LLM call exceeds its timeout"""
+    pass
+
+
+class ClientDisconnectedError(Exception):
+    """Raised when the HTTP client went away before the work finished"""
+    pass
+
+
+class AsyncLLMClient:
+    """Concurrency-limited async client for the Ollama /api/chat endpoint"""
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, timeout: float = DEFAULT_TIMEOUT,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        """
+        Args:
+            base_url: Ollama server URL
+            timeout: Default per-call timeout in seconds
+            max_concurrency: Maximum concurrent requests to the server
+        """
+        self.base_url = base_url
+        self.timeout = float(timeout)
+        self.max_concurrency = max(1, int(max_concurrency))
+
+        # The underlying HTTP connection pool and semaphore are bound to the
+        # event loop they are first used on, so keep one pair per loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[ollama.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        # Metrics
+        self.metrics = {
+            'requests': 0,
+            'successes': 0,
+            'failures': 0,
+            'timeouts': 0,
+            'cancelled': 0,
+            'in_flight': 0,
+            'waiting': 0,
+            'total_latency_ms': 0,
+            'last_latency_ms': 0,
+        }
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> 'AsyncLLMClient':
+        """Create a client from the ``ollama`` section of config.yaml"""
+        ollama_config = (config or {}).get('ollama', {}) or {}
+        return cls(
+            base_url=ollama_config.get('base_url', DEFAULT_BASE_URL),
+            timeout=ollama_config.get('timeout', DEFAULT_TIMEOUT),
+            max_concurrency=ollama_config.get('max_concurrent_requests', DEFAULT_MAX_CONCURRENCY)
+        )
+
+    async def chat(self, model: str, messages: List[Dict[str, str]],
+                   timeout: Optional[float] = None, **kwargs) -> str:
+        """Send a chat request and return the assistant message content.
+
+        Args:
+            model: Ollama model name
+            messages: Chat messages ({'role': ..., 'content': ...})
+            timeout: Override the default timeout (seconds) for this call.
+                Time spent waiting for a concurrency slot counts as well.
+
+        Raises:
+            LLMTimeoutError: The call did not finish within the timeout
+            asyncio.CancelledError: The awaiting task was cancelled
+        """
+        timeout = self.timeout if timeout is None else timeout
+        client, semaphore = self._get_loop_resources()
+
+        self.metrics['requests'] += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(
+                self._chat_limited(client, semaphore, model, messages, kwargs),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            self.metrics['timeouts'] += 1
+            raise LLMTimeoutError(f"LLM call to {model} timed out after {timeout:.0f}s")
+        except asyncio.CancelledError:
+            self.metrics['cancelled'] += 1
+            logger.info(f"LLM call to {model} cancelled")
+            raise
+        except Exception:
+            self.metrics['failures'] += 1
+            raise
+        finally:
+            latency_ms = (time.perf_counter() - start) * 1000
+            self.metrics['last_latency_ms'] = latency_ms
+            self.metrics['total_latency_ms'] += latency_ms
+
+    async def _chat_limited(self, client: ollama.AsyncClient, semaphore: asyncio.Semaphore,
+                            model: str, messages: List[Dict[str, str]],
+                            kwargs: Dict[str, Any]) -> str:
+        self.metrics['waiting'] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.metrics['waiting'] -= 1
+
+        self.metrics['in_flight'] += 1
+        try:
+            response = await client.chat(model=model, messages=messages, **kwargs)
+            self.metrics['successes'] += 1
+            return response['message']['content']
+        finally:
+            self.metrics['in_flight'] -= 1
+            semaphore.release()
+
+    def _get_loop_resources(self):
+        """Get the HTTP client and semaphore for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._client = ollama.AsyncClient(host=self.base_url, timeout=self.timeout)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client, self._semaphore
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get client configuration and metrics"""
+        return {
+            'base_url': self.base_url,
+            'timeout': self.timeout,
+            'max_concurrency': self.max_concurrency,
+            'metrics': self.metrics.copy(),
+        }
+
+
+async def cancel_on_disconnect(awaitable: Awaitable[Any],
+                               is_disconnected: Callable[[], Awaitable[bool]],
+                               poll_interval: float = 0.5) -> Any:
+    """Await work, cancelling it as soon as the HTTP client disconnects.
+
+    Args:
+        awaitable: The work to run, e.g. an agent analysis coroutine
+        is_disconnected: Async check such as starlette's Request.is_disconnected
+        poll_interval: Seconds between disconnect checks
+
+    Raises:
+        ClientDisconnectedError: The client disconnected; the work was cancelled
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await is_disconnected():
+                raise ClientDisconnectedError("Client disconnected before the request completed")
+    finally:
+        if not task.done():
+            task.cancel()
+            # Let the cancelled work unwind (release semaphores, close sockets)
+            await asyncio.wait({task})
+
+
+_llm_client: Optional[AsyncLLMClient] = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client(config: Optional[Dict[str, Any]] = None) -> AsyncLLMClient:
+    """Get or create the process-wide LLM client.
+
+    Args:
+        config: Parsed config.yaml, only used when the client is first created
+    """
+    global _llm_client
+
+    if _llm_client is None:
+        with _llm_client_lock:
+            if _llm_client is None:
+                _llm_client = AsyncLLMClient.from_config(config)
+                logger.info(
+                    f"LLM client initialized for {_llm_client.base_url} "
+                    f"(max_concurrency={_llm_client.max_concurrency}, timeout={_llm_client.timeout:.0f}s)"
+                )
+
+    return _llm_client
@@ -0,0 +1,332 @@
+"""
+Parallel PDF Ingestion
+
+Turns a large coding manual (4,000+ pages) into extracted code records by
+sharding its page ranges across a process pool:
+
+- each shard opens the PDF itself, parses only its own pages and streams them
+  through the caller's extractor ``pages_per_chunk`` pages at a time, closing
+  every page as soon as its text is read
+- each finished shard is checkpointed to disk, so an interrupted run resumes
+  with the shards that are still missing (checkpoints are keyed by the PDF
+  hash, so a changed PDF never reuses them)
+- shard results are merged in page order and deduplicated by code (first
+  occurrence wins), so the output does not depend on worker scheduling
+
+Progress is published to a process-wide IngestionTracker, which the
+``/api/knowledge-base/status`` endpoint reports.
+
+    knowledge_base:
+      ingestion_workers: 0        # worker processes (0 = one per CPU)
+      pages_per_shard: 100        # pages per worker task and checkpoint
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import pdfplumber
+
+logger = logging.getLogger(__name__)
+
+# extract(text, first_page_number) -> code records; must be picklable
+Extractor = Callable[[str, int], List[Dict[str, Any]]]
+
+DEFAULT_PAGES_PER_SHARD = 100
+
+
+def write_json_atomically(path: Union[str, Path], data: Any):
+    """Write compact JSON to a temporary file and move it into place"""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def plan_shards(total_pages: int, pages_per_shard: int, pages_per_chunk: int = 1) -> List[Tuple[int, int]]:
+    """Split [0, total_pages) into page ranges.
+
+    Shards are rounded up to whole chunks so every chunk the extractor sees
+    is the same as in a serial run.
+    """
+    pages_per_chunk = max(1, pages_per_chunk)
+    shard_size = max(pages_per_chunk, -(-max(1, pages_per_shard) // pages_per_chunk) * pages_per_chunk)
+    return [(start, min(start + shard_size, total_pages)) for start in range(0, total_pages, shard_size)]
+
+
+def extract_shard(pdf_path: str, start: int, end: int, pages_per_chunk: int, extract: Extractor,
+                  checkpoint_path: Optional[str] = None) -> Dict[str, Any]:
+    """Extract codes from pages [start, end) of a PDF (runs in a worker process)"""
+    codes: List[Dict[str, Any]] = []
+    page_errors = 0
+    chunk: List[str] = []
+    chunk_first_page = start + 1
+    pages_in_chunk = 0
+
+    with pdfplumber.open(pdf_path, pages=list(range(start + 1, end + 1))) as pdf:
+        for page in pdf.pages:
+            try:
+                chunk.append(page.extract_text() or "")
+            except Exception as e:
+                logger.warning(f"Error processing page {page.page_number}: {e}")
+                page_errors += 1
+            finally:
+                # Drop the parsed layout objects so memory stays flat per shard
+                page.close()
+            pages_in_chunk += 1
+
+            if pages_in_chunk >= pages_per_chunk or page.page_number == end:
+                text = "\n".join(chunk)
+                if text.strip():
+                    codes.extend(extract(text + "\n", chunk_first_page))
+                chunk = []
+                pages_in_chunk = 0
+                chunk_first_page = page.page_number + 1
+
+    result = {'start': start, 'end': end, 'pages_per_chunk': pages_per_chunk,
+              'page_errors': page_errors, 'codes': codes}
+    if checkpoint_path:
+        write_json_atomically(checkpoint_path, result)
+    return result
+
+
+def merge_shards(shard_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Concatenate shard codes in page order, keeping the first record per code"""
+    seen_codes = set()
+    merged = []
+    for result in sorted(shard_results, key=lambda r: r['start']):
+        for code_data in result['codes']:
+            code = code_data.get('code', '')
+            if code and code not in seen_codes:
+                seen_codes.add(code)
+                merged.append(code_data)
+    return merged
+
+
+class IngestionTracker:
+    """Thread-safe progress of running and finished ingestion jobs"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def start(self, code_type: str, source: str, total_pages: int, shards: int, workers: int):
+        with self._lock:
+            self._jobs[code_type] = {
+                'status': 'running',
+                'source': source,
+                'total_pages': total_pages,
+                'pages_done': 0,
+                'shards_total': shards,
+                'shards_done': 0,
+                'shards_resumed': 0,
+                'codes_extracted': 0,
+                'page_errors': 0,
+                'workers': workers,
+                'progress': 0.0,
+                'started_at': datetime.now().isoformat(),
+                'finished_at': None,
+                'elapsed_seconds': 0.0,
+                'error': None,
+                '_started': time.monotonic(),
+            }
+
+    def shard_done(self, code_type: str, result: Dict[str, Any], resumed: bool = False):
+        with self._lock:
+            job = self._jobs.get(code_type)
+            if job is None:
+                return
+            job['shards_done'] += 1
+            job['shards_resumed'] += int(resumed)
+            job['pages_done'] += result['end'] - result['start']
+            job['codes_extracted'] += len(result['codes'])
+            job['page_errors'] += result.get('page_errors', 0)
+            job['progress'] = round(job['pages_done'] / job['total_pages'] * 100, 1) if job['total_pages'] else 100.0
+            job['elapsed_seconds'] = round(time.monotonic() - job['_started'], 1)
+
+    def finish(self, code_type: str, total_codes: int):
+        self._end(code_type, 'completed', codes_merged=total_codes)
+
+    def fail(self, code_type: str, error: str):
+        self._end(code_type, 'failed', error=error)
+
+    def _end(self, code_type: str, status: str, **fields):
+        with self._lock:
+            job = self._jobs.get(code_type)
+            if job is None:
+                return
+            job.update(fields)
+            job['status'] = status
+            job['finished_at'] = datetime.now().isoformat()
+            job['elapsed_seconds'] = round(time.monotonic() - job['_started'], 1)
+
+    def is_running(self, code_type: str) -> bool:
+        with self._lock:
+            return self._jobs.get(code_type, {}).get('status') == 'running'
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """Copy of every job's progress, keyed by code type"""
+        with self._lock:
+            return {
+                code_type: {key: value for key, value in job.items() if not key.startswith('_')}
+                for code_type, job in self._jobs.items()
+            }
+
+
+class PDFIngestionPipeline:
+    """Sharded, resumable PDF code extraction over a process pool"""
+
+    def __init__(self, checkpoint_dir: Union[str, Path], workers: int = 0,
+                 pages_per_shard: int = DEFAULT_PAGES_PER_SHARD,
+                 tracker: Optional[IngestionTracker] = None):
+        """
+        Args:
+            checkpoint_dir: Directory for per-shard checkpoints
+            workers: Worker processes (0 = one per CPU, 1 = run in-process)
+            pages_per_shard: Pages per worker task and checkpoint
+            tracker: Progress tracker (defaults to the shared one)
+        """
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+        self.pages_per_shard = max(1, int(pages_per_shard))
+        self.tracker = tracker or get_ingestion_tracker()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], checkpoint_dir: Union[str, Path]) -> 'PDFIngestionPipeline':
+        """Create a pipeline from the ``knowledge_base`` section of config.yaml"""
+        kb_config = (config or {}).get('knowledge_base', {}) or {}
+        return cls(
+            checkpoint_dir,
+            workers=kb_config.get('ingestion_workers', 0),
+            pages_per_shard=kb_config.get('pages_per_shard', DEFAULT_PAGES_PER_SHARD)
+        )
+
+    def run(self, code_type: str, pdf_path: Union[str, Path], extract: Extractor, source_hash: str,
+            pages_per_chunk: int = 1, progress_callback: Optional[Callable[[str], None]] = None) -> List[Dict[str, Any]]:
+        """Extract, merge and deduplicate the codes of one PDF.
+
+        Raises:
+            RuntimeError: If any shard failed; finished shards stay
+                checkpointed and are skipped by the next run
+        """
+        pdf_path = str(pdf_path)
+        with pdfplumber.open(pdf_path) as pdf:
+            total_pages = len(pdf.pages)
+
+        shards = plan_shards(total_pages, self.pages_per_shard, pages_per_chunk)
+        job_dir = self._job_dir(code_type, source_hash)
+        workers = max(1, min(self.workers, len(shards)))
+        self.tracker.start(code_type, pdf_path, total_pages, len(shards), workers)
+        logger.info(f"Ingesting {total_pages} pages of {code_type.upper()} in {len(shards)} shards "
+                    f"with {workers} worker(s)")
+
+        results = []
+        pending = []
+        for start, end in shards:
+            checkpoint = self._load_checkpoint(job_dir, start, end, pages_per_chunk)
+            if checkpoint is not None:
+                results.append(checkpoint)
+                self.tracker.shard_done(code_type, checkpoint, resumed=True)
+            else:
+                pending.append((start, end))
+
+        if results:
+            logger.info(f"Resuming {code_type.upper()}: {len(results)} of {len(shards)} shards already done")
+
+        failures = []
+
+        def collect(result):
+            results.append(result)
+            self.tracker.shard_done(code_type, result)
+            if progress_callback:
+                status = self.tracker.get_status()[code_type]
+                progress_callback(f"Processed {status['pages_done']}/{total_pages} pages "
+                                  f"({status['progress']:.1f}%)")
+
+        def shard_args(start, end):
+            return (pdf_path, start, end, pages_per_chunk, extract,
+                    str(self._checkpoint_path(job_dir, start, end)))
+
+        if workers == 1 or len(pending) <= 1:
+            for start, end in pending:
+                try:
+                    collect(extract_shard(*shard_args(start, end)))
+                except Exception as e:
+                    logger.error(f"Error processing pages {start + 1}-{end} of {code_type.upper()}: {e}")
+                    failures.append((start, end))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(extract_shard, *shard_args(start, end)): (start, end)
+                           for start, end in pending}
+                for future in as_completed(futures):
+                    start, end = futures[future]
+                    try:
+                        collect(future.result())
+                    except Exception as e:
+                        logger.error(f"Error processing pages {start + 1}-{end} of {code_type.upper()}: {e}")
+                        failures.append((start, end))
+
+        if failures:
+            message = f"{len(failures)} of {len(shards)} shards failed; finished shards are checkpointed"
+            self.tracker.fail(code_type, message)
+            raise RuntimeError(message)
+
+        codes = merge_shards(results)
+        self.tracker.finish(code_type, len(codes))
+        logger.info(f"Ingested {code_type.upper()}: {len(codes)} unique codes from {total_pages} pages")
+        return codes
+
+    def clear_checkpoints(self, code_type: str):
+        """Remove the checkpoints of a code type once its output is saved"""
+        for job_dir in self.checkpoint_dir.glob(f"{code_type}_*"):
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+    def _job_dir(self, code_type: str, source_hash: str) -> Path:
+        job_dir = self.checkpoint_dir / f"{code_type}_{source_hash}"
+        # Checkpoints of an older version of the PDF can never be resumed
+        for stale_dir in self.checkpoint_dir.glob(f"{code_type}_*"):
+            if stale_dir != job_dir:
+                shutil.rmtree(stale_dir, ignore_errors=True)
+        job_dir.mkdir(parents=True, exist_ok=True)
+        return job_dir
+
+    @staticmethod
+    def _checkpoint_path(job_dir: Path, start: int, end: int) -> Path:
+        return job_dir / f"shard_{start:06d}_{end:06d}.json"
+
+    def _load_checkpoint(self, job_dir: Path, start: int, end: int, pages_per_chunk: int) -> Optional[Dict[str, Any]]:
+        path = self._checkpoint_path(job_dir, start, end)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('pages_per_chunk') == pages_per_chunk:
+                return checkpoint
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+        return None
+
+
+_ingestion_tracker: Optional[IngestionTracker] = None
+_ingestion_tracker_lock = threading.Lock()
+
+
+def get_ingestion_tracker() -> IngestionTracker:
+    """Get the process-wide ingestion progress tracker"""
+    global _ingestion_tracker
+
+    if _ingestion_tracker is None:
+        with _ingestion_tracker_lock:
+            if _ingestion_tracker is None:
+                _ingestion_tracker = IngestionTracker()
+
+    return _ingestion_tracker
@@ -2,10 +2,11 @@ import pdfplumber
 import re
 import yaml
 from typing import List, Dict, Any
-# from sentence_transformers import SentenceTransformer
 import logging
 import os
 
+from .embedding_service import get_embedding_service
+
 logger = logging.getLogger(__name__)
 
 class PDFKnowledgeProcessor:
@@ -22,21 +23,19 @@ class PDFKnowledgeProcessor:
             logger.warning("Config file not found, using defaults")
             self.config = {'knowledge_base': {'chunk_size': 1000, 'chunk_overlap': 200}}
         
+        # Shared embedding service, resolved lazily
         self._encoder = None
+        
+        self.chunk_size = self.config.get('knowledge_base', {}).get('chunk_size', 1000)
+        self.chunk_overlap = self.config.get('knowledge_base', {}).get('chunk_overlap', 200)
 
     @property
     def encoder(self):
         if self._encoder is None:
-            try:
-                from sentence_transformers import SentenceTransformer
-                self._encoder = SentenceTransformer('all-MiniLM-L6-v2')
-            except Exception as e:
-                logger.error(f"Error loading sentence transformer: {e}")
-                self._encoder = None
+            service = get_embedding_service(self.config)
+            if service.is_available():
+                self._encoder = service
         return self._encoder
-        
-        self.chunk_size = self.config.get('knowledge_base', {}).get('chunk_size', 1000)
-        self.chunk_overlap = self.config.get('knowledge_base', {}).get('chunk_overlap', 200)
     
     def process_icd10_pdf(self, pdf_path: str) -> List[Dict[str, Any]]:
         """Process ICD-10 PDF and extract code mappings"""
@@ -0,0 +1,199 @@
+"""
+Streaming PDF Text Extraction
+
+Yields the text of an uploaded document page by page, as each page is parsed,
+instead of running layout analysis over the whole file first:
+
+- pages are read from pdfium's text layer (pypdfium2, installed with
+  pdfplumber) at a fraction of the cost of layout analysis, and normalised
+  to the text pdfplumber's extract_text gives for the same page
+- pdfium keeps content-stream order and turns TJ kerning gaps into spaces,
+  so a page whose lines do not run top to bottom, or that kerns text within
+  X_TOLERANCE, is read with pdfplumber instead
+- pages that draw table rules (``table_path_objects`` or more path objects)
+  are read with pdfplumber, whose layout analysis keeps table cells on their
+  rows; pdfplumber opens the document only once such a page is needed
+- the page count is checked before any page is parsed, so documents over the
+  upload budget are rejected without extracting anything
+- every page is closed as soon as its text is read
+
+Pages without a text layer (scans) yield nothing; there is no OCR. Without
+pypdfium2, or for files pdfium cannot open, every page goes through
+pdfplumber.
+"""
+
+import itertools
+import logging
+import re
+from io import BytesIO
+from typing import Iterator, NamedTuple, Optional
+
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+
+logger = logging.getLogger(__name__)
+
+# Path objects (lines, rectangles) on a page before it is treated as a table
+DEFAULT_TABLE_PATH_OBJECTS = 8
+
+# pdfplumber's extract_text defaults: a gap wider than X_TOLERANCE between
+# characters is a space, tops within Y_TOLERANCE are one line
+X_TOLERANCE = 3
+Y_TOLERANCE = 3
+
+_TRAILING_SPACE = re.compile(r'[ \t]+(?=\r?\n|$)')
+
+
+class PDFPage(NamedTuple):
+    number: int   # 1-based page number
+    text: str
+    method: str   # 'text_layer' or 'layout'
+
+
+class PDFBudgetExceeded(ValueError):
+    """The document has more pages than allowed"""
+
+
+def _check_budget(page_count: int, max_pages: int):
+    if max_pages and page_count > max_pages:
+        raise PDFBudgetExceeded(f"PDF has {page_count} pages (limit {max_pages})")
+
+
+def _reads_in_order(textpage, text: str) -> bool:
+    """
+    Whether pdfium's text is the text pdfplumber's layout analysis gives:
+    each line starts below the one before it, and each space pdfium
+    generated inside a text object (a TJ adjustment) spans a gap wider than
+    X_TOLERANCE, which pdfplumber also reads as a space rather than kerning.
+
+    Spaces pdfium generates between text objects are kept as they are.
+    """
+    if len(text) != textpage.count_chars():
+        # Characters outside the BMP; indexes no longer line up
+        return False
+
+    last_top = None
+    for index, char in enumerate(text):
+        if index == 0 or text[index - 1] == '\n':
+            if char in '\r\n':
+                continue
+            top = textpage.get_charbox(index, loose=True)[3]
+            if last_top is not None and top > last_top - Y_TOLERANCE:
+                return False
+            last_top = top
+        elif (char == ' ' and index + 1 < len(text) and pypdfium2.raw.FPDFText_IsGenerated(textpage, index)
+              and textpage.get_textobj(index) is not None):
+            gap = (textpage.get_charbox(index + 1, loose=True)[0]
+                   - textpage.get_charbox(index - 1, loose=True)[2])
+            if gap <= X_TOLERANCE:
+                return False
+    return True
+
+
+def _text_layer(page, in_order_only: bool = True) -> Optional[str]:
+    """pdfium's text for a page, laid out as pdfplumber's extract_text; None if it reads out of order"""
+    textpage = page.get_textpage()
+    try:
+        text = textpage.get_text_range()
+        if in_order_only and not _reads_in_order(textpage, text):
+            return None
+    finally:
+        textpage.close()
+    return _TRAILING_SPACE.sub('', text).replace('\r\n', '\n')
+
+
+def _count_path_objects(page, limit: int) -> int:
+    """Path objects on a page, counting no further than limit"""
+    paths = page.get_objects(filter=(pypdfium2.raw.FPDF_PAGEOBJ_PATH,))
+    return sum(1 for _ in itertools.islice(paths, limit))
+
+
+def _layout_text(page) -> str:
+    try:
+        return page.extract_text() or ""
+    finally:
+        page.close()
+
+
+def _open_layout(source):
+    if pdfplumber is None:
+        raise ImportError("pdfplumber not available")
+    return pdfplumber.open(BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def _iter_layout_pages(source, max_pages: int) -> Iterator[PDFPage]:
+    with _open_layout(source) as pdf:
+        _check_budget(len(pdf.pages), max_pages)
+        for page in pdf.pages:
+            text = _layout_text(page)
+            if text:
+                yield PDFPage(page.page_number, text, 'layout')
+
+
+def _iter_pdfium_pages(document, source, max_pages: int, table_path_objects: int) -> Iterator[PDFPage]:
+    # Without pdfplumber there is nothing better than the text layer
+    has_layout = pdfplumber is not None
+    if not has_layout:
+        table_path_objects = 0
+    layout = None
+    try:
+        _check_budget(len(document), max_pages)
+        for index in range(len(document)):
+            page = document[index]
+            try:
+                is_table = (table_path_objects > 0 and
+                            _count_path_objects(page, table_path_objects) >= table_path_objects)
+                text = None if is_table else _text_layer(page, has_layout)
+            finally:
+                page.close()
+
+            method = 'text_layer'
+            if text is None:
+                if layout is None:
+                    layout = _open_layout(source)
+                text, method = _layout_text(layout.pages[index]), 'layout'
+            if text:
+                yield PDFPage(index + 1, text, method)
+    finally:
+        if layout is not None:
+            layout.close()
+        document.close()
+
+
+def iter_pdf_pages(source, max_pages: int = 0,
+                   table_path_objects: int = DEFAULT_TABLE_PATH_OBJECTS) -> Iterator[PDFPage]:
+    """
+    Yield the pages of a PDF that have text, in order.
+
+    Args:
+        source: Path, bytes or binary file object
+        max_pages: Largest page count accepted (0 = no limit)
+        table_path_objects: Path objects that mark a page as a table, which
+            is then read with pdfplumber (0 = never)
+
+    Raises:
+        PDFBudgetExceeded: Before the first page, if the PDF has more than max_pages
+        ImportError: If neither pypdfium2 nor pdfplumber is installed
+    """
+    if hasattr(source, 'read'):
+        # pdfium and pdfplumber would both move the file position; read it once
+        source = source.read()
+
+    document = None
+    if pypdfium2 is not None:
+        try:
+            document = pypdfium2.PdfDocument(source)
+        except pypdfium2.PdfiumError as e:
+            logger.warning(f"pdfium could not open the PDF, using pdfplumber: {e}")
+
+    if document is None:
+        yield from _iter_layout_pages(source, max_pages)
+    else:
+        yield from _iter_pdfium_pages(document, source, max_pages, table_path_objects)
@@ -0,0 +1,284 @@
+"""
+PHI Scrubber
+
+Compiled engine behind DataAnonymizer.anonymize_text. It produces exactly
+the output of the original implementation (pinned by the golden corpus in
+tests/fixtures/phi_golden), without its repeated passes over the document:
+
+- Rules are compiled once, and the name rules are rewritten so the regex
+  engine can skip to capitalized words instead of testing \\b everywhere
+- Contact, ID and address rules are merged into one alternation, so the
+  text is scanned and rebuilt once for all of them instead of once per rule
+- A name candidate used to be substituted with str.replace over the whole
+  document for every match, copying the text each time (O(matches x text)).
+  Each name rule now collects its distinct candidates, locates their
+  occurrences in the unmodified text, resolves overlaps the way the
+  sequential replaces did (earlier candidates win) and rebuilds once
+- The medical-term allowlist is one compiled alternation, checked once per
+  distinct candidate
+
+The name rules are still applied one after another: a later rule sees the
+placeholders of an earlier one (e.g. "Smith, John Doe" is masked by the
+"First Last" rule before the "Last, First" rule runs), and the output
+depends on that order.
+
+Placeholders are assumed not to be matched by the rules themselves, which
+holds for the bracketed defaults.
+"""
+
+import re
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_NAME_PLACEHOLDER = '[PATIENT_NAME]'
+DEFAULT_CONTACT_PLACEHOLDER = '[CONTACT_XXX]'
+DEFAULT_ID_PLACEHOLDER = '[ID_XXX]'
+DEFAULT_ADDRESS_PLACEHOLDER = '[ADDRESS]'
+ITEM_NAME_PLACEHOLDER = '[NAME]'
+
+# Rules in the order they are applied
+NAME_RULES = (
+    r'\b[A-Z][a-z]+ [A-Z][a-z]+\b',  # First Last
+    r'\b[A-Z][a-z]+, [A-Z][a-z]+\b',  # Last, First
+    r'\b[A-Z]{2,}\s+[A-Z]{2,}\b',    # ALL CAPS names
+    r"Patient's?\s+Name[:\s]*([A-Z\s]+)",
+    r"Patient[:\s]*([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
+)
+
+CONTACT_RULES = (
+    r'\b\d{3,5}[-\s]?\d{2}[-\s]?\d{6,7}\b',  # International format
+    r'\b\(\d{3}\)\s?\d{3}[-\s]?\d{4}\b',     # (123) 456-7890
+    r'\b\d{3}[-\s]?\d{3}[-\s]?\d{4}\b',      # 123-456-7890
+    r'\b\d{10,15}\b',                        # Long number sequences
+)
+
+ID_RULES = (
+    r'\b[A-Z]{2,3}\d{5,8}\b',                # Medical record patterns
+    r'\b\d{2,3}-\d{2}-\d{4}\b',              # SSN-like patterns
+    r'\bEH\d+\b',                            # Hospital account numbers
+    r'\b\d{6,}/[A-Z]{2}/[A-Z]{3}/\d{2}\b',   # Visit number patterns
+)
+
+# Matched case-insensitively
+ADDRESS_RULES = (
+    r'\b\d+\s+[A-Z][a-z]+\s+(?:Street|St|Avenue|Ave|Road|Rd|Lane|Ln|Drive|Dr|Boulevard|Blvd)\b',
+    r'\b[A-Z][a-z]+,\s+[A-Z]{2}\s+\d{5}\b',  # City, State ZIP
+    r'\bP\.?O\.?\s+Box\s+\d+\b',             # PO Box
+)
+
+# Name candidates containing any of these (as a substring, case-insensitive)
+# are treated as medical terms and left alone
+MEDICAL_KEYWORDS = frozenset([
+    'diagnosis', 'condition', 'disease', 'syndrome', 'disorder',
+    'treatment', 'procedure', 'surgery', 'operation', 'therapy',
+    'medication', 'drug', 'prescription', 'injection', 'infusion',
+    'examination', 'test', 'scan', 'x-ray', 'mri', 'ct', 'ultrasound',
+    'blood', 'urine', 'laboratory', 'pathology', 'biopsy',
+    'chronic', 'acute', 'severe', 'mild', 'moderate',
+    'primary', 'secondary', 'tertiary', 'bilateral', 'unilateral',
+    'anterior', 'posterior', 'superior', 'inferior', 'medial', 'lateral',
+])
+
+# A rule starting with \b before a character class, e.g. \b[A-Z]{2,}
+_LEADING_BOUNDARY = re.compile(r'\\b(\\d|\[A-Z\])(?:\{(\d+)(,?)(\d*)\}|(\+))?')
+
+
+def _fast_start(rule: str) -> str:
+    """
+    Rewrite a leading \\b before a character class as a lookbehind after its
+    first character (\\b[A-Z]{2,} -> [A-Z](?<!\\w[A-Z])[A-Z]{1,}). Same
+    matches, but the regex engine can then skip to the positions holding
+    that character class instead of testing \\b at every position.
+    """
+    match = _LEADING_BOUNDARY.match(rule)
+    if match is None:
+        return rule
+    token, low, comma, high, plus = match.groups()
+    head = f'{token}(?<!\\w{token})'
+    if plus:
+        head += f'{token}*'
+    elif low:
+        high = str(int(high) - 1) if high else ''
+        head += f'{token}{{{int(low) - 1}{comma}{high}}}'
+    return head + rule[match.end():]
+
+
+_NAME_PATTERNS = tuple(re.compile(_fast_start(rule)) for rule in NAME_RULES)
+_MEDICAL_TERM_PATTERN = re.compile('|'.join(map(re.escape, sorted(MEDICAL_KEYWORDS))))
+_ITEM_NAME_PATTERN = re.compile(NAME_RULES[0])
+
+
+class PHIScrubber:
+    """Masks names, contact numbers, IDs and addresses in clinical text"""
+
+    def __init__(self, name_placeholder: str = DEFAULT_NAME_PLACEHOLDER,
+                 contact_placeholder: str = DEFAULT_CONTACT_PLACEHOLDER,
+                 id_placeholder: str = DEFAULT_ID_PLACEHOLDER,
+                 address_placeholder: str = DEFAULT_ADDRESS_PLACEHOLDER,
+                 mask_names: bool = True, mask_contacts: bool = True,
+                 mask_ids: bool = True, mask_addresses: bool = True):
+        self.name_placeholder = name_placeholder
+        self.contact_placeholder = contact_placeholder
+        self.id_placeholder = id_placeholder
+        self.address_placeholder = address_placeholder
+        self.mask_names = mask_names
+
+        # One alternation of the contact, ID and address rules, in that order;
+        # the group that matched picks the placeholder
+        rules: List[Tuple[str, str]] = []
+        if mask_contacts:
+            rules += [(rule, contact_placeholder) for rule in CONTACT_RULES]
+        if mask_ids:
+            rules += [(rule, id_placeholder) for rule in ID_RULES]
+        if mask_addresses:
+            rules += [(f'(?i:{rule})', address_placeholder) for rule in ADDRESS_RULES]
+
+        self._rules = [(re.compile(rule), placeholder) for rule, placeholder in rules]
+        self._pattern = _alternation([rule for rule, _ in rules]) if rules else None
+        # Per rule, the alternation of the rules applied before it
+        self._earlier = [_alternation([rule for rule, _ in rules[:index]]) if index else None
+                         for index in range(len(rules))]
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> 'PHIScrubber':
+        """Create a scrubber from the ``anonymization`` section of config.yaml"""
+        anonymization = (config or {}).get('anonymization', {}) or {}
+        return cls(
+            name_placeholder=anonymization.get('placeholder_name', DEFAULT_NAME_PLACEHOLDER),
+            contact_placeholder=anonymization.get('placeholder_contact', DEFAULT_CONTACT_PLACEHOLDER),
+            id_placeholder=anonymization.get('placeholder_id', DEFAULT_ID_PLACEHOLDER),
+            address_placeholder=anonymization.get('placeholder_address', DEFAULT_ADDRESS_PLACEHOLDER),
+            mask_names=anonymization.get('mask_names', True),
+            mask_contacts=anonymization.get('mask_contacts', True),
+            mask_ids=anonymization.get('mask_ids', True),
+            mask_addresses=anonymization.get('mask_addresses', True),
+        )
+
+    def scrub(self, text: str) -> str:
+        """Mask personal information in raw text"""
+        if not text:
+            return text
+
+        if self.mask_names:
+            text = self._mask_names(text)
+        if self._pattern is not None:
+            text = self._mask_identifiers(text)
+        return text
+
+    def scrub_item(self, item: str) -> str:
+        """Mask "First Last" names in a short extracted item (condition, procedure, ...)"""
+        if not item:
+            return item
+        return _ITEM_NAME_PATTERN.sub(ITEM_NAME_PLACEHOLDER, item)
+
+    # =========================================================================
+    # CONTACTS, IDS AND ADDRESSES
+    # =========================================================================
+
+    def _mask_identifiers(self, text: str) -> str:
+        """
+        Apply the contact, ID and address rules in one scan.
+
+        The alternation takes the leftmost match, where applying the rules
+        one after another lets an earlier rule win. The two only differ when
+        an earlier rule matches inside a later rule's match, or a "(" right
+        after a match (the "(123)" rule needs a word character before it);
+        the rules are then applied one at a time.
+        """
+        spans = []
+        for match in self._pattern.finditer(text):
+            start, end = match.span()
+            index = match.lastindex - 1
+            earlier = self._earlier[index]
+            if text.startswith('(', end) or (earlier is not None and any(
+                    earlier.match(text, position) for position in range(start + 1, end))):
+                for pattern, placeholder in self._rules:
+                    text = pattern.sub(placeholder, text)
+                return text
+            spans.append((start, end, self._rules[index][1]))
+
+        return _rebuild(text, spans)
+
+    # =========================================================================
+    # NAMES
+    # =========================================================================
+
+    def _mask_names(self, text: str) -> str:
+        """Apply the name rules in order, each replacing its non-medical candidates"""
+        medical: Dict[str, bool] = {}
+        for pattern in _NAME_PATTERNS:
+            # Distinct candidates in order of first appearance
+            candidates: Dict[str, None] = {}
+            for match in pattern.finditer(text):
+                candidate = match.group(0)
+                if candidate not in candidates:
+                    if candidate not in medical:
+                        medical[candidate] = is_medical_term(candidate)
+                    candidates[candidate] = None
+
+            names = [candidate for candidate in candidates if not medical[candidate]]
+            if names:
+                text = self._replace_all(text, names)
+        return text
+
+    def _replace_all(self, text: str, candidates: List[str]) -> str:
+        """
+        Replace every occurrence of each candidate, with the result of
+        calling text.replace(candidate, placeholder) for each in turn: an
+        occurrence overlapping one already replaced is left alone.
+
+        Occurrences are searched in the unmodified text and replaced in one
+        rebuild, instead of copying the whole text per candidate.
+        """
+        starts: List[int] = []
+        ends: List[int] = []
+        for candidate in candidates:
+            length = len(candidate)
+            start = text.find(candidate)
+            while start != -1:
+                end = start + length
+                position = bisect_right(starts, start)
+                if (position and ends[position - 1] > start) or (position < len(starts) and starts[position] < end):
+                    start = text.find(candidate, start + 1)
+                    continue
+                starts.insert(position, start)
+                ends.insert(position, end)
+                start = text.find(candidate, end)
+
+        return _rebuild(text, [(start, end, self.name_placeholder) for start, end in zip(starts, ends)])
+
+
+def is_medical_term(text: str) -> bool:
+    """Check if text is likely a medical term rather than a name"""
+    return _MEDICAL_TERM_PATTERN.search(text.lower()) is not None
+
+
+def _alternation(rules: List[str]):
+    """
+    Compile rules into one alternation with a group per rule (rule i is
+    group i + 1). Every rule starts with \\b (after an optional inline flag
+    group), which is taken out and tested once per position; the lookahead
+    skips positions no rule can start at.
+    """
+    groups = []
+    for rule in rules:
+        ignore_case = rule.startswith('(?i:')
+        if ignore_case:
+            rule = rule[len('(?i:'):-1]
+        if not rule.startswith(r'\b'):
+            raise ValueError(f"Rule does not start at a word boundary: {rule}")
+        body = rule[len(r'\b'):]
+        groups.append(f'((?i:{body}))' if ignore_case else f'({body})')
+    return re.compile(r'(?=[\w(])\b(?:' + '|'.join(groups) + ')')
+
+
+def _rebuild(text: str, spans: List[Tuple[int, int, str]]) -> str:
+    """Replace sorted, non-overlapping (start, end, placeholder) spans of text"""
+    parts = []
+    last = 0
+    for start, end, placeholder in spans:
+        parts.append(text[last:start])
+        parts.append(placeholder)
+        last = end
+    parts.append(text[last:])
+    return ''.join(parts)
@@ -4,7 +4,9 @@ Handles connection to Redis for storing blacklisted JWT tokens
 """
 import os
 import logging
-from typing import Optional
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
 try:
     import redis.asyncio as aioredis
 except ImportError:
@@ -61,6 +63,34 @@ async def close_redis():
 # In-memory fallback for when Redis is not available
 _memory_blacklist: set = set()
 
+# Local front of the blacklist, checked before Redis:
+# - tokens known to be revoked (logged out through this process, or found in
+#   Redis), until their expiry
+# - tokens Redis recently reported as not revoked, for a few seconds, so
+#   revocations made through another worker are seen within that time
+BLACKLIST_CACHE_SECONDS = 5
+BLACKLIST_CACHE_SIZE = 10000
+_revoked_tokens: Dict[str, float] = {}
+_valid_tokens: 'OrderedDict[str, float]' = OrderedDict()
+
+
+def _remember_revoked(jti: str, exp: Optional[int]):
+    """Record a revoked token locally until its expiry"""
+    now = time.time()
+    if len(_revoked_tokens) >= BLACKLIST_CACHE_SIZE:
+        for expired in [key for key, expires in _revoked_tokens.items() if expires <= now]:
+            del _revoked_tokens[expired]
+    _revoked_tokens[jti] = exp if exp else now + 3600
+    _valid_tokens.pop(jti, None)
+
+
+def _remember_valid(jti: str):
+    """Record that Redis reported a token as not revoked"""
+    _valid_tokens[jti] = time.monotonic() + BLACKLIST_CACHE_SECONDS
+    _valid_tokens.move_to_end(jti)
+    while len(_valid_tokens) > BLACKLIST_CACHE_SIZE:
+        _valid_tokens.popitem(last=False)
+
 
 async def blacklist_token(jti: str, exp: int) -> bool:
     """
@@ -73,6 +103,7 @@ async def blacklist_token(jti: str, exp: int) -> bool:
     Returns:
         True if blacklisted successfully, False otherwise
     """
+    _remember_revoked(jti, exp)
     try:
         redis_client = await get_redis()
         
@@ -107,13 +138,25 @@ async def is_token_blacklisted(jti: str) -> bool:
     Returns:
         True if blacklisted, False otherwise
     """
+    # Local front: known revoked, or recently checked
+    expires = _revoked_tokens.get(jti)
+    if expires is not None and expires > time.time():
+        return True
+    checked_until = _valid_tokens.get(jti)
+    if checked_until is not None and checked_until > time.monotonic():
+        return False
+
     try:
         redis_client = await get_redis()
         
         if redis_client:
             # Check Redis
             exists = await redis_client.exists(f"blacklist:{jti}")
-            return exists > 0
+            if exists > 0:
+                _remember_revoked(jti, None)
+                return True
+            _remember_valid(jti)
+            return False
         else:
             # Check in-memory blacklist
             return jti in _memory_blacklist
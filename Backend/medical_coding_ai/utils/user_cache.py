@@ -0,0 +1,115 @@
+"""
+Authenticated User Cache
+
+Short-lived in-process cache of active User rows, keyed by user_id, so
+get_current_user does not SELECT the user on every authenticated request
+(dashboards poll several endpoints per second).
+
+Entries live for a few seconds and are invalidated explicitly when a user
+is deactivated, changes role, logs out or updates a field the API returns
+from the authenticated user (see invalidate_user). With several workers, a
+change made through another worker is seen within the TTL.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TTL_SECONDS = 30
+
+
+class UserCache:
+    """LRU of active User rows with a TTL"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        """
+        Args:
+            max_entries: Maximum users kept
+            ttl_seconds: Longest a user is served from the cache (0 disables caching)
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+
+        self._entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.metrics = {
+            'hits': 0,
+            'misses': 0,
+            'invalidations': 0,
+            'evictions': 0,
+        }
+
+    def get(self, user_id: Any) -> Optional[Any]:
+        """Cached user, or None if missing or expired"""
+        key = str(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.metrics['hits'] += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.metrics['misses'] += 1
+            return None
+
+    def put(self, user: Any):
+        """Cache an active user (inactive users are never cached)"""
+        if self.ttl_seconds <= 0 or not user.is_active:
+            return
+        key = str(user.user_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.metrics['evictions'] += 1
+
+    def invalidate(self, user_id: Any):
+        """Drop a user, so the next request reads it from the database"""
+        with self._lock:
+            if self._entries.pop(str(user_id), None) is not None:
+                self.metrics['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Cache size and metrics"""
+        with self._lock:
+            size = len(self._entries)
+        return {
+            'size': size,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'metrics': self.metrics.copy(),
+        }
+
+
+_user_cache: Optional[UserCache] = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache() -> UserCache:
+    """Get the process-wide authenticated user cache"""
+    global _user_cache
+
+    if _user_cache is None:
+        with _user_cache_lock:
+            if _user_cache is None:
+                _user_cache = UserCache()
+
+    return _user_cache
+
+
+def invalidate_user(user_id: Any):
+    """Drop a user from the authenticated user cache after changing it"""
+    get_user_cache().invalidate(user_id)
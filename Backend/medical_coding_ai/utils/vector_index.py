@@ -0,0 +1,223 @@
+"""
+Persisted Vector Index
+
+Build-once, load-many vector index for one code type. Encoding every code's
+text chunk with SentenceTransformer takes minutes for the full ICD-10 list, so
+the embeddings are computed once while the knowledge base is processed and
+written next to the processed JSON as:
+
+    embeddings/
+    ├── icd10.faiss              FAISS index of the L2-normalized embeddings
+                                 (type selected by vector_store.index_type)
+    ├── icd10_offsets.npy        int64 row offsets into the records file
+    ├── icd10_records.bin        UTF-8 JSON record per row (document + metadata)
+    └── icd10_manifest.json      source hash, model, dimension, count, index build
+
+The manifest is written last, so a build that fails halfway is never picked
+up. Loading memory-maps the index and the metadata table instead of reading
+them, so start-up cost does not grow with the number of codes and the agents
+of every worker process share the same page cache. Only the records of
+search hits are decoded.
+
+The index is read with IO_FLAG_MMAP_IFC, which maps the stored vectors, codes
+and HNSW links of every index type in place. Plain IO_FLAG_MMAP only maps
+IVF inverted lists and still copies flat and HNSW indexes into anonymous
+memory.
+"""
+
+import json
+import logging
+import mmap
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from .index_factory import DEFAULT_INDEX_PARAMS, build_index
+from .embedding_service import DEFAULT_EMBEDDING_MODEL
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# Zero-copy mapping of the whole index file where faiss supports it; older
+# releases can only map IVF inverted lists
+MMAP_FLAGS = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def _paths(directory: Path, code_type: str) -> Dict[str, Path]:
+    return {
+        'index': directory / f'{code_type}.faiss',
+        'offsets': directory / f'{code_type}_offsets.npy',
+        'records': directory / f'{code_type}_records.bin',
+        'manifest': directory / f'{code_type}_manifest.json',
+    }
+
+
+def _replace_atomically(path: Path, write):
+    tmp_path = path.with_name(path.name + '.tmp')
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class PersistedCodeIndex:
+    """Memory-mapped FAISS index plus metadata table for one code type"""
+
+    def __init__(self, index, offsets: np.ndarray, records, manifest: Dict[str, Any]):
+        self.index = index
+        self.manifest = manifest
+        self._offsets = offsets
+        self._records = records
+
+    def __len__(self) -> int:
+        return int(self.manifest['count'])
+
+    @property
+    def dimension(self) -> int:
+        return int(self.manifest['dimension'])
+
+    @property
+    def source_hash(self) -> Optional[str]:
+        return self.manifest.get('source_hash')
+
+    def get_record(self, row: int) -> Dict[str, Any]:
+        """Decode the document and metadata stored for one index row"""
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return json.loads(self._records[start:end].decode('utf-8'))
+
+    @classmethod
+    def build(cls, directory: Path, code_type: str, documents: List[str],
+              metadata: List[Dict[str, Any]], embeddings: np.ndarray,
+              source_hash: Optional[str], model_name: str = DEFAULT_EMBEDDING_MODEL,
+              index_params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Write the index, metadata table and manifest for one code type.
+
+        Args:
+            directory: Output directory (created if missing)
+            code_type: 'icd10', 'cpt' or 'hcpcs'
+            documents: Text that was embedded for each row
+            metadata: Metadata returned with each row
+            embeddings: Float matrix, one row per document
+            source_hash: Hash of the processed JSON the codes came from
+            model_name: Embedding model used for ``embeddings``
+            index_params: Index type and tuning (utils/index_factory.py);
+                defaults to an exact flat index
+
+        Returns:
+            The written manifest
+        """
+        if len(documents) != len(embeddings) or len(metadata) != len(embeddings):
+            raise ValueError("documents, metadata and embeddings must have the same length")
+
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = _paths(directory, code_type)
+
+        vectors = np.ascontiguousarray(embeddings, dtype='float32')
+        faiss.normalize_L2(vectors)
+        index, built = build_index(vectors, index_params or DEFAULT_INDEX_PARAMS)
+
+        records = [
+            json.dumps({'document': document, 'metadata': meta}, ensure_ascii=False).encode('utf-8')
+            for document, meta in zip(documents, metadata)
+        ]
+        offsets = np.zeros(len(records) + 1, dtype=np.int64)
+        np.cumsum([len(record) for record in records], out=offsets[1:])
+
+        def write_records(path):
+            with open(path, 'wb') as f:
+                for record in records:
+                    f.write(record)
+
+        def write_offsets(path):
+            with open(path, 'wb') as f:
+                np.save(f, offsets)
+
+        _replace_atomically(paths['index'], lambda path: faiss.write_index(index, str(path)))
+        _replace_atomically(paths['offsets'], write_offsets)
+        _replace_atomically(paths['records'], write_records)
+
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'code_type': code_type,
+            'source_hash': source_hash,
+            'model_name': model_name,
+            'dimension': int(vectors.shape[1]),
+            'count': len(records),
+            'index_type': type(index).__name__,
+            'index': built,
+            'built_at': datetime.now().isoformat(),
+        }
+
+        def write_manifest(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2)
+
+        _replace_atomically(paths['manifest'], write_manifest)
+
+        logger.info(f"Persisted {code_type.upper()} index with {len(records)} codes to {directory}")
+        return manifest
+
+    @classmethod
+    def load(cls, directory: Path, code_type: str, source_hash: Optional[str] = None,
+             model_name: str = DEFAULT_EMBEDDING_MODEL) -> Optional['PersistedCodeIndex']:
+        """Memory-map a persisted index if it exists and is current.
+
+        Args:
+            directory: Directory the index was built into
+            code_type: 'icd10', 'cpt' or 'hcpcs'
+            source_hash: Expected hash of the processed JSON; None skips the check
+            model_name: Embedding model queries will be encoded with
+
+        Returns:
+            The loaded index, or None when it is missing, stale or unreadable
+        """
+        paths = _paths(Path(directory), code_type)
+        if not paths['manifest'].exists():
+            return None
+
+        try:
+            with open(paths['manifest'], 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+
+            if manifest.get('format_version') != FORMAT_VERSION:
+                logger.info(f"Persisted {code_type.upper()} index has an old format, ignoring it")
+                return None
+            if source_hash is not None and manifest.get('source_hash') != source_hash:
+                logger.info(f"Persisted {code_type.upper()} index is stale (source changed), ignoring it")
+                return None
+            if manifest.get('model_name') != model_name:
+                logger.info(f"Persisted {code_type.upper()} index was built with "
+                            f"{manifest.get('model_name')}, not {model_name}, ignoring it")
+                return None
+
+            index = faiss.read_index(str(paths['index']), MMAP_FLAGS)
+            offsets = np.load(paths['offsets'], mmap_mode='r')
+            if index.ntotal != manifest['count'] or len(offsets) != manifest['count'] + 1:
+                logger.warning(f"Persisted {code_type.upper()} index does not match its manifest, ignoring it")
+                return None
+
+            records = b''
+            if manifest['count']:
+                with open(paths['records'], 'rb') as f:
+                    records = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            logger.info(f"Memory-mapped persisted {code_type.upper()} index ({manifest['count']} codes)")
+            return cls(index, offsets, records, manifest)
+
+        except Exception as e:
+            logger.error(f"Error loading persisted {code_type.upper()} index: {e}")
+            return None
+
+
+def code_documents(codes: List[Dict[str, Any]]):
+    """Text to embed and metadata to return for each code of a code list"""
+    documents = [code.get('text_chunk') or f"{code['code']}: {code['description']}" for code in codes]
+    metadata = [
+        {'code': code['code'], 'description': code['description'], 'type': code.get('type', '')}
+        for code in codes
+    ]
+    return documents, metadata
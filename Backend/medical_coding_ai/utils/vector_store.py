@@ -1,41 +1,65 @@
 import faiss
 import numpy as np
 import pickle
-# from sentence_transformers import SentenceTransformer
 from typing import List, Dict, Any, Optional
 import os
 import logging
 
+from .vector_index import PersistedCodeIndex
+from .index_factory import DEFAULT_INDEX_PARAMS, create_index, index_params_from_config, set_search_params
+from .embedding_service import get_embedding_service
+
 logger = logging.getLogger(__name__)
 
 class VectorStore:
     """FAISS-based vector store for medical codes"""
     
-    def __init__(self, dimension: int = 384, index_type: str = "flat"):
+    def __init__(self, dimension: int = 384, index_type: str = "flat", index_params: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            dimension: Embedding dimension
+            index_type: 'flat', 'hnsw', 'ivf_flat' or 'ivf_pq'
+            index_params: Tuning parameters (see utils/index_factory.py)
+        """
         self.dimension = dimension
+        self.index_params = index_params_from_config(
+            {'vector_store': {**DEFAULT_INDEX_PARAMS, **(index_params or {}), 'index_type': index_type}}
+        )
+        self.index_type = self.index_params['index_type']
         self._encoder = None
+        self._config: Optional[Dict[str, Any]] = None
         
-        # Initialize FAISS index
-        if index_type == "flat":
-            self.index = faiss.IndexFlatIP(dimension)  # Inner product for similarity
-        else:
-            self.index = faiss.IndexHNSWFlat(dimension, 32)
+        # Initialize FAISS index; IVF indexes are re-created sized to the
+        # corpus and trained on the first add_documents call
+        self.index = self._create_index()
             
         self.documents = []
         self.metadata = []
         self.is_trained = False
+        # Set when serving from a memory-mapped index built by the KB manager
+        self._persisted: Optional[PersistedCodeIndex] = None
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> 'VectorStore':
+        """Create a vector store from the ``vector_store`` section of config.yaml"""
+        params = index_params_from_config(config)
+        dimension = ((config or {}).get('vector_store', {}) or {}).get('dimension', 384)
+        store = cls(dimension=dimension, index_type=params['index_type'], index_params=params)
+        store._config = config
+        return store
+
+    def _create_index(self, n_vectors: Optional[int] = None):
+        # Inner product on normalized vectors for cosine similarity
+        index, self.index_build = create_index(self.dimension, self.index_params, n_vectors)
+        return index
 
     @property
     def encoder(self):
+        """The process-wide embedding service, or None if no model is available"""
         if self._encoder is None:
-            try:
-                logger.info("Initializing SentenceTransformer in VectorStore...")
-                from sentence_transformers import SentenceTransformer
-                self._encoder = SentenceTransformer('all-MiniLM-L6-v2')
-                logger.info("SentenceTransformer initialized in VectorStore")
-            except Exception as e:
-                logger.error(f"Error loading sentence transformer: {e}")
-                self._encoder = None
+            service = get_embedding_service(self._config)
+            if service.is_available():
+                self._encoder = service
         return self._encoder
     
     def add_documents(self, documents: List[str], metadata: List[Dict] = None):
@@ -43,16 +67,25 @@ class VectorStore:
         if not documents:
             logger.warning("No documents provided to add")
             return
+        if self._persisted is not None:
+            raise ValueError("Vector store is serving a read-only persisted index")
             
         try:
             # Generate embeddings
             embeddings = self.encoder.encode(documents, show_progress_bar=True)
             
             # Normalize embeddings for cosine similarity
+            embeddings = np.ascontiguousarray(embeddings, dtype='float32')
             faiss.normalize_L2(embeddings)
             
+            # Train on the corpus when the index type needs it
+            if not self.index.is_trained:
+                self.index = self._create_index(len(embeddings))
+                if not self.index.is_trained:
+                    self.index.train(embeddings)
+            
             # Add to FAISS index
-            self.index.add(embeddings.astype('float32'))
+            self.index.add(embeddings)
             
             # Store documents and metadata
             self.documents.extend(documents)
@@ -76,28 +109,63 @@ class VectorStore:
             return []
             
         try:
-            # Generate query embedding
-            query_embedding = self.encoder.encode([query])
+            # Generate query embedding (cached / micro-batched with concurrent searches)
+            query_embedding = self.encoder.encode_queries([query])
             faiss.normalize_L2(query_embedding)
             
             # Search
             scores, indices = self.index.search(query_embedding.astype('float32'), k)
             
-            results = []
-            for score, idx in zip(scores[0], indices[0]):
-                if idx < len(self.documents) and idx >= 0:  # Valid index
-                    results.append({
-                        'document': self.documents[idx],
-                        'metadata': self.metadata[idx] if idx < len(self.metadata) else {},
-                        'score': float(score)
-                    })
-            
-            return results
+            return [
+                self._get_entry(idx, score)
+                for score, idx in zip(scores[0], indices[0])
+                if 0 <= idx < self.count()  # Valid index
+            ]
             
         except Exception as e:
             logger.error(f"Error searching vector store: {e}")
             return []
     
+    def _get_entry(self, idx: int, score: float) -> Dict[str, Any]:
+        """Search result for one index row"""
+        if self._persisted is not None:
+            record = self._persisted.get_record(idx)
+            return {'document': record['document'], 'metadata': record['metadata'], 'score': float(score)}
+        return {
+            'document': self.documents[idx],
+            'metadata': self.metadata[idx] if idx < len(self.metadata) else {},
+            'score': float(score)
+        }
+    
+    def count(self) -> int:
+        """Number of searchable documents"""
+        if self._persisted is not None:
+            return len(self._persisted)
+        return len(self.documents)
+    
+    def load_persisted(self, directory: str, code_type: str, source_hash: Optional[str] = None) -> bool:
+        """Serve searches from a persisted index instead of encoding documents.
+        
+        The index and metadata table are memory-mapped, so this is cheap
+        regardless of the number of codes. Returns False when no current
+        index exists for ``source_hash`` and the configured embedding model.
+        """
+        model_name = (self._encoder or get_embedding_service(self._config)).model_name
+        persisted = PersistedCodeIndex.load(directory, code_type, source_hash, model_name)
+        if persisted is None:
+            return False
+        
+        self._persisted = persisted
+        self.index = persisted.index
+        # Query-time tuning comes from config, not from when the index was built
+        set_search_params(self.index, self.index_params)
+        self.index_build = persisted.manifest.get('index', {'index_type': 'flat'})
+        self.dimension = persisted.dimension
+        self.documents = []
+        self.metadata = []
+        self.is_trained = True
+        return True
+    
     def search_with_threshold(self, query: str, k: int = 5, threshold: float = 0.7) -> List[Dict[str, Any]]:
         """Search with similarity threshold"""
         results = self.search(query, k)
@@ -152,15 +220,22 @@ class VectorStore:
         """Get vector store statistics"""
         return {
             'dimension': self.dimension,
-            'total_documents': len(self.documents),
+            'total_documents': self.count(),
             'total_vectors': self.index.ntotal,
             'is_trained': self.is_trained,
-            'index_type': type(self.index).__name__
+            'index_type': type(self.index).__name__,
+            'index_build': dict(self.index_build),
+            'persisted': self._persisted is not None
         }
     
     def clear(self):
         """Clear all data from vector store"""
-        self.index.reset()
+        if self._persisted is not None:
+            # The memory-mapped index is read-only; start a fresh one
+            self._persisted = None
+            self.index = self._create_index()
+        else:
+            self.index.reset()
         self.documents.clear()
         self.metadata.clear()
         self.is_trained = False
@@ -173,7 +248,7 @@ class VectorStore:
             
         try:
             # Generate embeddings for all queries
-            query_embeddings = self.encoder.encode(queries)
+            query_embeddings = self.encoder.encode_queries(queries)
             faiss.normalize_L2(query_embeddings)
             
             # Batch search
@@ -181,15 +256,11 @@ class VectorStore:
             
             all_results = []
             for i in range(len(queries)):
-                query_results = []
-                for score, idx in zip(scores[i], indices[i]):
-                    if idx < len(self.documents) and idx >= 0:
-                        query_results.append({
-                            'document': self.documents[idx],
-                            'metadata': self.metadata[idx] if idx < len(self.metadata) else {},
-                            'score': float(score)
-                        })
-                all_results.append(query_results)
+                all_results.append([
+                    self._get_entry(idx, score)
+                    for score, idx in zip(scores[i], indices[i])
+                    if 0 <= idx < self.count()
+                ])
             
             return all_results
             
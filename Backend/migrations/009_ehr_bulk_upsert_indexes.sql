@@ -0,0 +1,59 @@
+-- =============================================================================
+-- MIGRATION: 009_ehr_bulk_upsert_indexes.sql
+-- Purpose: Unique keys for set-based EHR sync upserts (INSERT ... ON CONFLICT)
+-- Date: 2026-10-17
+-- =============================================================================
+--
+-- The pollers upsert patients and encounters on (tenant_id, fhir_id) and
+-- diagnoses/procedures on (encounter_id, fhir_id), the same keys the per-row
+-- upsert_from_ehr lookups use. ON CONFLICT needs a unique index on exactly
+-- those columns. Rows entered manually have no fhir_id, so the indexes are
+-- partial (WHERE fhir_id IS NOT NULL).
+
+-- ==============================================
+-- DUPLICATE CHECK
+-- ==============================================
+-- Refuse to continue if earlier per-row syncs left duplicate keys behind;
+-- they have to be merged before the unique indexes can be built.
+DO $$
+DECLARE
+    duplicates INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO duplicates FROM (
+        SELECT 1 FROM patients WHERE fhir_id IS NOT NULL
+        GROUP BY tenant_id, fhir_id HAVING COUNT(*) > 1
+        UNION ALL
+        SELECT 1 FROM encounters WHERE fhir_id IS NOT NULL
+        GROUP BY tenant_id, fhir_id HAVING COUNT(*) > 1
+        UNION ALL
+        SELECT 1 FROM encounter_diagnoses WHERE fhir_id IS NOT NULL
+        GROUP BY encounter_id, fhir_id HAVING COUNT(*) > 1
+        UNION ALL
+        SELECT 1 FROM encounter_procedures WHERE fhir_id IS NOT NULL
+        GROUP BY encounter_id, fhir_id HAVING COUNT(*) > 1
+    ) AS duplicate_keys;
+
+    IF duplicates > 0 THEN
+        RAISE EXCEPTION 'Migration 009: % duplicate EHR fhir_id keys found, merge them first', duplicates;
+    END IF;
+END $$;
+
+-- ==============================================
+-- UPSERT CONFLICT TARGETS
+-- ==============================================
+CREATE UNIQUE INDEX IF NOT EXISTS uq_patients_tenant_fhir_id
+    ON patients(tenant_id, fhir_id) WHERE fhir_id IS NOT NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_encounters_tenant_fhir_id
+    ON encounters(tenant_id, fhir_id) WHERE fhir_id IS NOT NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_encounter_diagnoses_encounter_fhir_id
+    ON encounter_diagnoses(encounter_id, fhir_id) WHERE fhir_id IS NOT NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_encounter_procedures_encounter_fhir_id
+    ON encounter_procedures(encounter_id, fhir_id) WHERE fhir_id IS NOT NULL;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Migration 009_ehr_bulk_upsert_indexes completed successfully';
+END $$;
@@ -0,0 +1,42 @@
+-- =============================================================================
+-- MIGRATION: 010_poller_leases.sql
+-- Purpose: Distributed leasing of EHR connections between poller workers
+-- Date: 2026-10-17
+-- =============================================================================
+--
+-- Poller workers (python -m pollers.worker, or API processes running with
+-- POLLER_MODE=worker) register a heartbeat in poller_workers and take a
+-- time-limited lease per EHR connection in poller_leases. A worker only
+-- polls the connections it holds a lease for, renews them every heartbeat,
+-- and leases of a crashed worker expire and are taken over by the others.
+-- The lease row also carries manual sync requests and the holder's poller
+-- status, so any API process can route to the worker holding a connection.
+
+CREATE TABLE IF NOT EXISTS poller_workers (
+    worker_id VARCHAR(100) PRIMARY KEY,
+    hostname VARCHAR(255),
+    pid INTEGER,
+    started_at TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc'),
+    heartbeat_at TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc')
+);
+
+CREATE INDEX IF NOT EXISTS idx_poller_workers_heartbeat_at ON poller_workers(heartbeat_at);
+
+CREATE TABLE IF NOT EXISTS poller_leases (
+    connection_id UUID PRIMARY KEY REFERENCES ehr_connections(connection_id) ON DELETE CASCADE,
+    worker_id VARCHAR(100) NOT NULL,
+
+    -- Lease Timing (database clock, UTC)
+    lease_expires_at TIMESTAMP NOT NULL,
+    acquired_at TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc'),
+    renewed_at TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc'),
+
+    -- Routing
+    sync_requested_at TIMESTAMP,
+    status JSONB
+);
+
+CREATE INDEX IF NOT EXISTS idx_poller_leases_worker_id ON poller_leases(worker_id);
+
+COMMENT ON TABLE poller_workers IS 'Live poller worker processes (heartbeat)';
+COMMENT ON TABLE poller_leases IS 'Which poller worker owns each EHR connection';
@@ -0,0 +1,21 @@
+-- =============================================================================
+-- MIGRATION: 011_ehr_source_hash.sql
+-- Purpose: Content hashes for EHR sync, so unchanged FHIR resources are not rewritten
+-- Date: 2026-10-17
+-- =============================================================================
+--
+-- The pollers store a SHA-256 of each FHIR resource (without its meta
+-- element) in source_hash. The bulk upsert only updates an existing row
+-- when the hash differs, so re-fetched but unchanged resources cost no row
+-- write. sync_state.records_skipped counts them per resource type.
+-- Existing rows start with a NULL hash and are rewritten once.
+
+ALTER TABLE patients ADD COLUMN IF NOT EXISTS source_hash VARCHAR(64);
+ALTER TABLE encounters ADD COLUMN IF NOT EXISTS source_hash VARCHAR(64);
+ALTER TABLE encounter_diagnoses ADD COLUMN IF NOT EXISTS source_hash VARCHAR(64);
+ALTER TABLE encounter_procedures ADD COLUMN IF NOT EXISTS source_hash VARCHAR(64);
+
+ALTER TABLE sync_state ADD COLUMN IF NOT EXISTS records_skipped INTEGER DEFAULT 0;
+
+COMMENT ON COLUMN patients.source_hash IS 'SHA-256 of the FHIR Patient content (without meta)';
+COMMENT ON COLUMN sync_state.records_skipped IS 'Records unchanged since the previous sync, not written';
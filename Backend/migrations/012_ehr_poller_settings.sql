@@ -0,0 +1,15 @@
+-- =============================================================================
+-- MIGRATION: 012_ehr_poller_settings.sql
+-- Purpose: Per-connection poller tuning for EHR connections
+-- Date: 2026-10-17
+-- =============================================================================
+--
+-- poller_settings holds the options a connection's poller takes beyond its
+-- own columns, e.g. {"bulk_export": true, "bulk_export_group_id": "..."} to
+-- run full syncs through FHIR Bulk Data $export. The scheduler merges the
+-- keys listed in pollers.base_poller.POLLER_SETTINGS into the poller config
+-- and ignores any others. Existing connections start with no settings.
+
+ALTER TABLE ehr_connections ADD COLUMN IF NOT EXISTS poller_settings JSONB NOT NULL DEFAULT '{}'::jsonb;
+
+COMMENT ON COLUMN ehr_connections.poller_settings IS 'Poller tuning merged into the poller config (bulk_export, batch sizes, ...)';
@@ -0,0 +1,35 @@
+-- =============================================================================
+-- MIGRATION: 013_ehr_patient_connection.sql
+-- Purpose: Record which EHR connection synced each patient
+-- Date: 2026-10-17
+-- =============================================================================
+--
+-- Incremental syncs search for the updated encounters, conditions and
+-- procedures of the patients already synced through a connection. Scoping
+-- them by tenant and EHR type alone made two connections of the same type
+-- on one tenant search each other's patients. The pollers now store their
+-- connection in source_connection_id on every patient write.
+--
+-- Existing patients are assigned to their connection when the tenant has a
+-- single connection of the patient's EHR type. The rest stay NULL, are
+-- searched by every connection of that type, and are claimed by the first
+-- connection that writes them again.
+
+ALTER TABLE patients ADD COLUMN IF NOT EXISTS source_connection_id UUID
+    REFERENCES ehr_connections(connection_id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS idx_patients_source_connection_id ON patients(source_connection_id);
+
+UPDATE patients p
+SET source_connection_id = c.connection_id
+FROM ehr_connections c
+WHERE p.source_connection_id IS NULL
+  AND p.fhir_id IS NOT NULL
+  AND c.tenant_id = p.tenant_id
+  AND c.ehr_type = p.source_ehr
+  AND (
+      SELECT COUNT(*) FROM ehr_connections other
+      WHERE other.tenant_id = p.tenant_id AND other.ehr_type = p.source_ehr
+  ) = 1;
+
+COMMENT ON COLUMN patients.source_connection_id IS 'EHR connection that last synced the patient';
@@ -90,7 +90,8 @@ class AthenaPoller(BasePoller):
     async def fetch_conditions(
         self,
         patient_ids: Optional[List[str]] = None,
-        encounter_ids: Optional[List[str]] = None
+        encounter_ids: Optional[List[str]] = None,
+        last_sync: Optional[datetime] = None
     ) -> List[Dict]:
         """Fetch conditions from athenahealth."""
         if self.use_mock_data:
@@ -100,7 +101,8 @@ class AthenaPoller(BasePoller):
     async def fetch_procedures(
         self,
         patient_ids: Optional[List[str]] = None,
-        encounter_ids: Optional[List[str]] = None
+        encounter_ids: Optional[List[str]] = None,
+        last_sync: Optional[datetime] = None
     ) -> List[Dict]:
         """Fetch procedures from athenahealth."""
         if self.use_mock_data:
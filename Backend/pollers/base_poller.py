@@ -4,18 +4,29 @@ Base Poller Abstract Class
 Defines the interface that all EHR pollers must implement.
 Provides shared functionality for:
 - Sync state management
+- Pipelined fetch/write sync cycle
+- FHIR Bulk Data $export backfills for full syncs
+- Pooled HTTP client per EHR host
 - Error handling and logging
 - Metrics tracking
 - Database operations
 """
 
 from abc import ABC, abstractmethod
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+from contextlib import aclosing
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, AsyncIterator
 from uuid import UUID
+import hashlib
+import json
 import logging
 import asyncio
 
+from .bulk_export import EXPORT_SETTINGS, BulkExportClient, export_options
+from .fhir_mapping import MAPPING_VERSION
+from .http_pool import POOL_SETTINGS, get_http_registry, pool_options
+from .rate_limiter import LIMITER_SETTINGS, get_rate_limiter, limiter_options
+
 logger = logging.getLogger(__name__)
 
 # Import repository classes for database operations
@@ -25,13 +36,48 @@ try:
     from medical_coding_ai.repositories.condition_repository import ConditionRepository
     from medical_coding_ai.repositories.procedure_repository import ProcedureRepository
     from medical_coding_ai.repositories.sync_state_repository import SyncStateRepository
-    from medical_coding_ai.models.ehr_models import SyncState
-    from sqlalchemy import select
     REPOSITORIES_AVAILABLE = True
 except ImportError as e:
     logger.warning(f"Repository classes not available: {e}. Database operations will be skipped.")
     REPOSITORIES_AVAILABLE = False
 
+# Resource types synced each cycle, each with its own watermark in sync_state
+SYNC_RESOURCE_TYPES = {
+    'patient': 'Patient',
+    'encounter': 'Encounter',
+    'condition': 'Condition',
+    'procedure': 'Procedure',
+}
+
+# Keys of a connection's poller_settings (ehr_connections.poller_settings)
+# that are passed on in the poller config; see BasePoller.__init__
+POLLER_SETTINGS = frozenset({
+    'upsert_batch_size', 'fetch_chunk_size', 'fetch_concurrency',
+    'pipeline_queue_size', 'watermark_overlap_seconds', 'known_patient_sweep_seconds',
+    'poll_jitter_seconds',
+}) | EXPORT_SETTINGS | POOL_SETTINGS | LIMITER_SETTINGS
+
+# sync_state resource type whose watermark is the last sweep of known patients
+KNOWN_PATIENT_SWEEP = 'KnownPatients'
+
+# Tokens without a reported lifetime are assumed valid this long
+DEFAULT_TOKEN_LIFETIME = timedelta(hours=1)
+# Re-authenticate this long before the token expires
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+
+def content_hash(resource: Dict, mapping_version: str = '') -> str:
+    """
+    SHA-256 of a FHIR resource without its meta element (versionId/lastUpdated)
+    and of the version of the mapping that transforms it, so a mapping change
+    re-maps resources whose content has not changed.
+    """
+    content = {key: value for key, value in resource.items() if key != 'meta'}
+    return hashlib.sha256(
+        mapping_version.encode()
+        + json.dumps(content, sort_keys=True, separators=(',', ':'), default=str).encode()
+    ).hexdigest()
+
 
 class BasePoller(ABC):
     """
@@ -41,6 +87,9 @@ class BasePoller(ABC):
     and implement the abstract methods for authentication and data fetching.
     """
 
+    # EHR type identifier ('epic', 'athena', ...), set by each poller
+    EHR_TYPE: Optional[str] = None
+
     def __init__(
         self,
         connection_id: UUID,
@@ -61,6 +110,30 @@ class BasePoller(ABC):
                 - private_key: JWT signing key (for Epic)
                 - poll_interval_seconds: Polling interval (default 30)
                 - use_mock_data: Whether to use mock FHIR data
+                The options below come from the connection's poller_settings
+                (keys in POLLER_SETTINGS):
+                - upsert_batch_size: Rows per bulk upsert statement (default 500)
+                - fetch_chunk_size: Patient IDs per encounter fetch (default 50)
+                - fetch_concurrency: Patient chunks fetched at once (default 4)
+                - pipeline_queue_size: Fetched chunks waiting to be written (default 8)
+                - watermark_overlap_seconds: Re-fetch window before each watermark,
+                  covering clock skew with the EHR (default 60)
+                - known_patient_sweep_seconds: Minimum time between searches for the
+                  changes of known patients (default 0, every cycle; see
+                  _known_patient_sweep_since)
+                - bulk_export: Run full syncs through FHIR Bulk Data $export (default False)
+                - bulk_export_group_id, bulk_export_batch_size, bulk_export_poll_seconds,
+                  bulk_export_timeout_seconds: Bulk export tuning (see bulk_export)
+                - http_max_connections, http_max_keepalive_connections,
+                  http_keepalive_expiry, http2: HTTP pool tuning (see http_pool);
+                  pools are shared per host, so the first poller registered for
+                  a host sets them
+                - rate_limit_per_second, rate_limit_burst, rate_limit_min_per_second,
+                  rate_limit_max_per_second: Per-host rate limit tuning (see rate_limiter);
+                  the limiter is shared per host, so the first poller registered
+                  for a host sets it
+                - poll_jitter_seconds: Random delay added to each scheduled sync
+                  (default a tenth of the poll interval, see scheduler)
             db_session_factory: SQLAlchemy async session factory
         """
         self.connection_id = connection_id
@@ -72,9 +145,34 @@ class BasePoller(ABC):
         self.poll_interval = config.get('poll_interval_seconds', 30)
         self.use_mock_data = config.get('use_mock_data', True)
         self.base_url = config.get('base_url', '')
+        self.upsert_batch_size = config.get('upsert_batch_size', 500)
+
+        # Sync pipeline configuration
+        self.fetch_chunk_size = max(1, config.get('fetch_chunk_size', 50))
+        self.fetch_concurrency = max(1, config.get('fetch_concurrency', 4))
+        self.pipeline_queue_size = max(1, config.get('pipeline_queue_size', 8))
+        self.watermark_overlap = timedelta(seconds=config.get('watermark_overlap_seconds', 60))
+        self.known_patient_sweep = timedelta(seconds=config.get('known_patient_sweep_seconds', 0))
+
+        # Bulk export configuration
+        self.bulk_export = config.get('bulk_export', False)
+        self.bulk_export_options = export_options(config)
+
+        # Long-lived HTTP client shared with other connections to the same host
+        self.http = (
+            get_http_registry().acquire(connection_id, self.base_url, **pool_options(config))
+            if self.base_url else None
+        )
+
+        # Request rate limit shared with other connections to the same host
+        self.rate_limiter = (
+            get_rate_limiter(self.base_url, **limiter_options(config))
+            if self.base_url else None
+        )
 
         # State
         self._is_running = False
+        self._sync_task: Optional[asyncio.Task] = None
         self._access_token: Optional[str] = None
         self._token_expires_at: Optional[datetime] = None
 
@@ -86,9 +184,16 @@ class BasePoller(ABC):
             'records_processed': 0,
             'records_created': 0,
             'records_updated': 0,
+            'records_written': 0,
+            'records_skipped': 0,
+            'token_refreshes': 0,
+            'pipeline_batches': 0,
+            'bulk_exports': 0,
             'last_sync_duration_ms': 0,
             'last_error': None,
         }
+        # Per resource type counts of the current (or last) sync cycle
+        self.cycle_counts: Dict[str, Dict[str, int]] = {}
 
         logger.info(
             f"Initialized {self.__class__.__name__} for connection {connection_id}, "
@@ -147,7 +252,8 @@ class BasePoller(ABC):
     async def fetch_conditions(
         self,
         patient_ids: Optional[List[str]] = None,
-        encounter_ids: Optional[List[str]] = None
+        encounter_ids: Optional[List[str]] = None,
+        last_sync: Optional[datetime] = None
     ) -> List[Dict]:
         """
         Fetch conditions (diagnoses) from the EHR.
@@ -155,6 +261,7 @@ class BasePoller(ABC):
         Args:
             patient_ids: Optional list of patient FHIR IDs
             encounter_ids: Optional list of encounter FHIR IDs
+            last_sync: Only fetch conditions updated after this time
 
         Returns:
             List of FHIR Condition resources
@@ -165,7 +272,8 @@ class BasePoller(ABC):
     async def fetch_procedures(
         self,
         patient_ids: Optional[List[str]] = None,
-        encounter_ids: Optional[List[str]] = None
+        encounter_ids: Optional[List[str]] = None,
+        last_sync: Optional[datetime] = None
     ) -> List[Dict]:
         """
         Fetch procedures from the EHR.
@@ -173,12 +281,37 @@ class BasePoller(ABC):
         Args:
             patient_ids: Optional list of patient FHIR IDs
             encounter_ids: Optional list of encounter FHIR IDs
+            last_sync: Only fetch procedures updated after this time
 
         Returns:
             List of FHIR Procedure resources
         """
         pass
 
+    async def iter_patient_pages(self, last_sync: Optional[datetime] = None) -> AsyncIterator[List[Dict]]:
+        """
+        Yield patients one page at a time, for the sync pipeline.
+
+        The default yields fetch_patients() as a single page. Pollers for
+        paginated APIs override this so encounter fetches start as soon as
+        the first page arrives.
+
+        Args:
+            last_sync: Only fetch patients updated after this time
+
+        Yields:
+            Lists of FHIR Patient resources
+        """
+        yield await self.fetch_patients(last_sync)
+
+    def bulk_export_client(self) -> Optional[BulkExportClient]:
+        """
+        Bulk Data client for full syncs, or None to always use paged searches.
+
+        Pollers for FHIR servers supporting $export override this.
+        """
+        return None
+
     @abstractmethod
     def transform_patient(self, fhir_resource: Dict) -> Dict:
         """
@@ -213,24 +346,82 @@ class BasePoller(ABC):
         """
         pass
 
+    def transform_batch(self, resource: str, resources: List[Dict]) -> List[Dict]:
+        """
+        Transform a list of FHIR resources of one type to canonical format.
+
+        Calls transform_<resource>() for each one; pollers with compiled
+        mappings (see pollers.fhir_mapping) override this to map the whole list.
+
+        Args:
+            resource: 'patient', 'encounter', 'condition' or 'procedure'
+            resources: FHIR resources of that type
+
+        Returns:
+            Canonical dicts, in the same order
+        """
+        transform = getattr(self, f'transform_{resource}')
+        return [transform(fhir_resource) for fhir_resource in resources]
+
+    def mapping_version(self, resource: str) -> str:
+        """
+        Version of the transform for one resource type, hashed into source_hash.
+
+        Pollers with compiled mappings return the mapping's own version;
+        hand-written transforms change with MAPPING_VERSION.
+        """
+        return str(MAPPING_VERSION)
+
     # =========================================================================
     # SYNC CYCLE - Main polling logic
     # =========================================================================
 
     async def sync_cycle(self):
         """
-        Main sync cycle - called by APScheduler at configured interval.
+        Run one sync cycle as a task that stop() can cancel.
+
+        Called by APScheduler at the configured interval and by manual
+        triggers. A call while a cycle is running waits for that cycle
+        instead of starting a second one.
+        """
+        task = self._sync_task
+        if task is None or task.done():
+            task = self._sync_task = asyncio.create_task(self._sync_cycle())
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise  # The caller was cancelled; the sync carries on
+            logger.info(f"Sync cycle for connection {self.connection_id} cancelled")
+
+    async def _sync_cycle(self):
+        """
+        Main sync cycle.
 
         Flow:
-        1. Get last sync time from sync_state table
-        2. Fetch patients updated since last sync
-        3. For each patient, fetch encounters, conditions, procedures
-        4. Transform FHIR → Canonical format
-        5. Upsert into database
-        6. Update sync_state with new timestamp
+        1. Get the watermark (last successful sync time) of each resource type
+        2. Stream pages of patients updated since their watermark (or, for a
+           full sync with bulk_export enabled, run a Bulk Data $export and
+           stream its files instead of steps 2-3)
+        3. First sync: for each chunk of patients, fetch encounters, then
+           conditions and procedures (several chunks in flight at once).
+           Later syncs: the same for patients not yet in the database; for
+           the connection's known patients, fetch encounters, conditions and
+           procedures updated since the last sweep, a chunk of patients per
+           search (at most every known_patient_sweep_seconds, never for
+           mock data)
+        4. Transform FHIR → Canonical format and bulk upsert each chunk while
+           later chunks are still being fetched; resources whose content hash
+           is unchanged are not rewritten
+        5. Advance every watermark to the start of this cycle, and the
+           known patient sweep's if this cycle covered them
         """
         start_time = datetime.utcnow()
         self.metrics['total_syncs'] += 1
+        self.cycle_counts = {
+            resource_type: {'processed': 0, 'created': 0, 'updated': 0, 'skipped': 0}
+            for resource_type in SYNC_RESOURCE_TYPES.values()
+        }
 
         logger.info(f"Starting sync cycle for connection {self.connection_id}")
 
@@ -238,53 +429,24 @@ class BasePoller(ABC):
             # Step 1: Authenticate (refresh token if needed)
             await self._ensure_authenticated()
 
-            # Step 2: Get last sync time
-            last_sync = await self._get_last_sync_time('Patient')
-
-            # Step 3: Fetch patients
-            patients = await self.fetch_patients(last_sync)
-            logger.info(f"Fetched {len(patients)} patients")
-
-            # Step 4: Process patients
-            patient_ids = []
-            for patient_fhir in patients:
-                canonical = self.transform_patient(patient_fhir)
-                canonical['tenant_id'] = self.tenant_id
-                await self._upsert_patient(canonical)
-                patient_ids.append(patient_fhir.get('id'))
-                self.metrics['records_processed'] += 1
-
-            # Step 5: Fetch and process encounters for these patients
-            if patient_ids:
-                encounters = await self.fetch_encounters(patient_ids=patient_ids, last_sync=last_sync)
-                logger.info(f"Fetched {len(encounters)} encounters")
-
-                encounter_ids = []
-                for encounter_fhir in encounters:
-                    canonical = self.transform_encounter(encounter_fhir)
-                    canonical['tenant_id'] = self.tenant_id
-                    await self._upsert_encounter(canonical)
-                    encounter_ids.append(encounter_fhir.get('id'))
-                    self.metrics['records_processed'] += 1
-
-                # Step 6: Fetch conditions and procedures
-                if encounter_ids:
-                    conditions = await self.fetch_conditions(encounter_ids=encounter_ids)
-                    for condition_fhir in conditions:
-                        canonical = self.transform_condition(condition_fhir)
-                        canonical['tenant_id'] = self.tenant_id
-                        await self._upsert_condition(canonical)
-                        self.metrics['records_processed'] += 1
-
-                    procedures = await self.fetch_procedures(encounter_ids=encounter_ids)
-                    for procedure_fhir in procedures:
-                        canonical = self.transform_procedure(procedure_fhir)
-                        canonical['tenant_id'] = self.tenant_id
-                        await self._upsert_procedure(canonical)
-                        self.metrics['records_processed'] += 1
-
-            # Step 7: Update sync state
-            await self._update_sync_state('Patient', 'success', datetime.utcnow())
+            # Step 2: Get per-resource watermarks
+            watermarks = {
+                resource_type: await self._get_last_sync_time(resource_type)
+                for resource_type in SYNC_RESOURCE_TYPES.values()
+            }
+
+            # Steps 3-4: Fetch, transform and upsert through the pipeline
+            if self._use_bulk_export(watermarks):
+                await self._run_bulk_export()
+                swept = True
+            else:
+                swept = await self._run_pipeline(watermarks)
+
+            # Step 5: Advance the watermarks; changes made during the cycle are re-fetched next time
+            for resource_type in SYNC_RESOURCE_TYPES.values():
+                await self._update_sync_state(resource_type, 'success', start_time)
+            if swept:
+                await self._update_sync_state(KNOWN_PATIENT_SWEEP, 'success', start_time)
 
             # Update metrics
             duration_ms = (datetime.utcnow() - start_time).total_seconds() * 1000
@@ -300,43 +462,323 @@ class BasePoller(ABC):
             self.metrics['failed_syncs'] += 1
             self.metrics['last_error'] = str(e)
             logger.error(f"Sync cycle failed: {e}", exc_info=True)
-            await self._update_sync_state('Patient', 'error', error_message=str(e))
+            for resource_type in SYNC_RESOURCE_TYPES.values():
+                await self._update_sync_state(resource_type, 'error', error_message=str(e))
+
+    # =========================================================================
+    # SYNC PIPELINE - Streaming fetch → transform → write
+    # =========================================================================
+
+    async def _run_pipeline(self, watermarks: Optional[Dict[str, Optional[datetime]]] = None) -> bool:
+        """
+        Run one sync as a producer/consumer pipeline.
+
+        Fetch: patient pages are split into chunks of fetch_chunk_size
+        patients. Each chunk fetches its encounters, then its conditions and
+        procedures concurrently. Up to fetch_concurrency chunks are in flight
+        while the next patient page is requested.
+
+        Once every resource type has a watermark the sync is incremental:
+        chunks carry the updated patients, with the encounters, conditions
+        and procedures of only those not in the database yet. After the
+        patient pages, when a sweep is due (see _known_patient_sweep_since),
+        the connection's known patients are split into chunks whose
+        encounters, conditions and procedures updated since the last sweep
+        are searched for. Searches are always scoped to patients:
+        EHRs such as Epic reject searches by _lastUpdated alone, and others
+        would return patients outside the connection.
+
+        Write: a single consumer transforms and bulk upserts each fetched
+        chunk in dependency order (patients, encounters, conditions,
+        procedures), overlapping with the fetches of later chunks.
+
+        The queue between the stages holds at most pipeline_queue_size
+        chunks. A chunk keeps its fetch slot until it is queued, so slow
+        writes stall fetching instead of buffering the whole sync in memory.
+
+        Returns:
+            Whether the children of every known patient were covered: a
+            full sync or a known patient sweep
+        """
+        since = {
+            resource_type: watermark - self.watermark_overlap if watermark else None
+            for resource_type, watermark in (watermarks or {}).items()
+        }
+        incremental = all(since.get(resource_type) for resource_type in SYNC_RESOURCE_TYPES.values())
+
+        known = set(await self._get_known_patient_ids()) if incremental else None
+        sweep_since = await self._known_patient_sweep_since(since) if incremental else None
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.pipeline_queue_size)
+        slots = asyncio.Semaphore(self.fetch_concurrency)
+        writer = asyncio.create_task(self._write_stage(queue))
+        fetches = set()
+
+        try:
+            async for page in self.iter_patient_pages(since.get('Patient')):
+                logger.info(f"Fetched page of {len(page)} patients")
+                for start in range(0, len(page), self.fetch_chunk_size):
+                    await slots.acquire()
+                    self._raise_failed_fetches(fetches)
+                    fetches.add(asyncio.create_task(self._fetch_chunk(
+                        page[start:start + self.fetch_chunk_size], since, queue, writer, slots, known
+                    )))
+
+            known_ids = sorted(known or ()) if sweep_since else []
+            for start in range(0, len(known_ids), self.fetch_chunk_size):
+                await slots.acquire()
+                self._raise_failed_fetches(fetches)
+                fetches.add(asyncio.create_task(self._fetch_changed(
+                    known_ids[start:start + self.fetch_chunk_size], sweep_since, queue, writer, slots
+                )))
+
+            await asyncio.gather(*fetches)
+            await self._enqueue(queue, None, writer)
+            await writer
+        finally:
+            tasks = [*fetches, writer]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return not incremental or sweep_since is not None
+
+    async def _known_patient_sweep_since(
+        self,
+        since: Dict[str, Optional[datetime]]
+    ) -> Optional[Dict[str, Optional[datetime]]]:
+        """
+        Watermarks for this cycle's sweep of known patients, or None to skip it.
+
+        A sweep costs three searches per fetch_chunk_size known patients,
+        whether or not anything changed, so its request volume grows with
+        the patients synced rather than with the changes. With
+        known_patient_sweep_seconds set it runs at most that often and
+        covers everything since the previous sweep: fewer requests, but
+        new encounters, conditions and procedures of existing patients
+        arrive up to that much later. Mock data never changes upstream
+        (each fetch generates new resources), so mock connections skip it.
+        """
+        if self.use_mock_data:
+            return None
+
+        last_sweep = await self._get_last_sync_time(KNOWN_PATIENT_SWEEP)
+        if last_sweep is None:
+            return since
+        if datetime.utcnow() - last_sweep < self.known_patient_sweep:
+            logger.debug(f"Known patient sweep not due (last at {last_sweep})")
+            return None
+        return {resource_type: last_sweep - self.watermark_overlap for resource_type in since}
+
+    def _use_bulk_export(self, watermarks: Dict[str, Optional[datetime]]) -> bool:
+        """Full syncs (a resource type without watermark) use $export when enabled and supported."""
+        return (
+            self.bulk_export
+            and not all(watermarks.get(resource_type) for resource_type in SYNC_RESOURCE_TYPES.values())
+            and self.bulk_export_client() is not None
+        )
+
+    async def _run_bulk_export(self):
+        """
+        Run a full sync through FHIR Bulk Data $export.
+
+        The export's NDJSON files are streamed and parsed line by line into
+        batches of bulk_export_batch_size resources, which go through the
+        same write stage as the search pipeline. Files arrive in dependency
+        order (patients first) and references to rows written by earlier
+        batches are resolved by the repositories. The write queue bounds how
+        many batches are held in memory; a slow database stalls the download.
+        """
+        client = self.bulk_export_client()
+        batch_keys = {resource_type: resource + 's' for resource, resource_type in SYNC_RESOURCE_TYPES.items()}
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.pipeline_queue_size)
+        writer = asyncio.create_task(self._write_stage(queue))
+        try:
+            export = client.export(
+                self._current_token, list(SYNC_RESOURCE_TYPES.values()), **self.bulk_export_options
+            )
+            async with aclosing(export):
+                async for resource_type, resources in export:
+                    batch = {key: [] for key in batch_keys.values()}
+                    batch[batch_keys[resource_type]] = resources
+                    await self._enqueue(queue, batch, writer)
+
+            await self._enqueue(queue, None, writer)
+            await writer
+            self.metrics['bulk_exports'] += 1
+        finally:
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+
+    async def _current_token(self) -> str:
+        """Valid access token for long-running requests, refreshed when close to expiry."""
+        await self._ensure_authenticated()
+        return self._access_token
+
+    async def _fetch_chunk(
+        self,
+        patients: List[Dict],
+        since: Dict[str, Optional[datetime]],
+        queue: asyncio.Queue,
+        writer: asyncio.Task,
+        slots: asyncio.Semaphore,
+        known: Optional[set] = None
+    ):
+        """
+        Fetch the encounters, conditions and procedures of one patient chunk and queue them.
+
+        In an incremental sync (known is set) only the patients not in known
+        get their children here; _fetch_changed covers the others.
+        """
+        try:
+            batch = {'patients': patients, 'encounters': [], 'conditions': [], 'procedures': []}
+
+            patient_ids = [patient.get('id') for patient in patients]
+            if known is not None:
+                # New patients: everything they have, whatever the watermarks
+                patient_ids = [patient_id for patient_id in patient_ids if patient_id not in known]
+                since = {}
+            if patient_ids:
+                batch['encounters'] = await self.fetch_encounters(
+                    patient_ids=patient_ids, last_sync=since.get('Encounter')
+                )
+
+            encounter_ids = [encounter.get('id') for encounter in batch['encounters']]
+            if encounter_ids:
+                batch['conditions'], batch['procedures'] = await asyncio.gather(
+                    self.fetch_conditions(encounter_ids=encounter_ids, last_sync=since.get('Condition')),
+                    self.fetch_procedures(encounter_ids=encounter_ids, last_sync=since.get('Procedure'))
+                )
+
+            await self._enqueue(queue, batch, writer)
+        finally:
+            slots.release()
+
+    async def _fetch_changed(
+        self,
+        patient_ids: List[str],
+        since: Dict[str, Optional[datetime]],
+        queue: asyncio.Queue,
+        writer: asyncio.Task,
+        slots: asyncio.Semaphore
+    ):
+        """Fetch the encounters, conditions and procedures of known patients updated since the last sweep."""
+        try:
+            encounters, conditions, procedures = await asyncio.gather(
+                self.fetch_encounters(patient_ids=patient_ids, last_sync=since['Encounter']),
+                self.fetch_conditions(patient_ids=patient_ids, last_sync=since['Condition']),
+                self.fetch_procedures(patient_ids=patient_ids, last_sync=since['Procedure'])
+            )
+            logger.debug(
+                f"Fetched {len(encounters)} encounters, {len(conditions)} conditions and "
+                f"{len(procedures)} procedures updated for {len(patient_ids)} known patients"
+            )
+            await self._enqueue(queue, {
+                'patients': [], 'encounters': encounters, 'conditions': conditions, 'procedures': procedures
+            }, writer)
+        finally:
+            slots.release()
+
+    @staticmethod
+    async def _enqueue(queue: asyncio.Queue, batch: Optional[Dict], writer: asyncio.Task):
+        """Put a batch on the write queue, failing fast if the writer has died."""
+        put = asyncio.ensure_future(queue.put(batch))
+        await asyncio.wait({put, writer}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            writer.result()
+            raise RuntimeError("Sync writer stopped before all batches were written")
+
+    @staticmethod
+    def _raise_failed_fetches(fetches: set):
+        """Drop finished fetch tasks, re-raising the first error."""
+        for task in [task for task in fetches if task.done()]:
+            task.result()
+            fetches.discard(task)
+
+    async def _write_stage(self, queue: asyncio.Queue):
+        """Consume fetched chunks until the end-of-sync marker (None)."""
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                return
+            await self._write_batch(batch)
+            self.metrics['pipeline_batches'] += 1
+
+    async def _write_batch(self, batch: Dict[str, List[Dict]]):
+        """Transform and upsert one fetched chunk, parents before children."""
+        patients = self._transform_all('patient', batch['patients'])
+        patient_db_ids = await self._upsert_patients(patients)
+
+        encounters = self._transform_all('encounter', batch['encounters'])
+        encounter_db_ids = await self._upsert_encounters(encounters, patient_db_ids)
+
+        conditions = self._transform_all('condition', batch['conditions'])
+        await self._upsert_conditions(conditions, encounter_db_ids)
+
+        procedures = self._transform_all('procedure', batch['procedures'])
+        await self._upsert_procedures(procedures, encounter_db_ids)
+
+        self.metrics['records_processed'] += len(patients) + len(encounters) + len(conditions) + len(procedures)
+
+    def _transform_all(self, resource: str, resources: List[Dict]) -> List[Dict]:
+        """Transform FHIR resources to canonical dicts for this tenant, with their content hash."""
+        canonical = self.transform_batch(resource, resources)
+        tenant_id = self.tenant_id
+        version = self.mapping_version(resource)
+        for record, fhir_resource in zip(canonical, resources):
+            record['tenant_id'] = tenant_id
+            record['source_hash'] = content_hash(fhir_resource, version)
+        return canonical
 
     # =========================================================================
     # HELPER METHODS
     # =========================================================================
 
+    def token_expires_at(self) -> Optional[datetime]:
+        """
+        Expiry of the token last returned by authenticate(), if the EHR reported one.
+
+        Pollers whose auth flow returns expires_in override this; otherwise
+        tokens are assumed to last DEFAULT_TOKEN_LIFETIME.
+        """
+        return None
+
     async def _ensure_authenticated(self):
-        """Ensure we have a valid access token."""
+        """Ensure we have a valid access token, re-authenticating shortly before it expires."""
         if self._access_token and self._token_expires_at:
-            if datetime.utcnow() < self._token_expires_at:
+            if datetime.utcnow() < self._token_expires_at - TOKEN_REFRESH_MARGIN:
                 return  # Token still valid
 
         self._access_token = await self.authenticate()
-        # Most tokens are valid for 1 hour, refresh 5 minutes early
-        self._token_expires_at = datetime.utcnow()
+        self._token_expires_at = self.token_expires_at() or datetime.utcnow() + DEFAULT_TOKEN_LIFETIME
+        self.metrics['token_refreshes'] += 1
+
+    async def _get_known_patient_ids(self) -> List[str]:
+        """FHIR IDs of the patients synced through this connection, for incremental child searches."""
+        if not REPOSITORIES_AVAILABLE or not self.db_session_factory:
+            logger.debug(f"Skipping known patient query (repositories unavailable)")
+            return []
+
+        # Errors propagate: without the known patients the cycle would miss their changes
+        async with self.db_session_factory() as session:
+            return await PatientRepository(session).get_fhir_ids(self.tenant_id, self.EHR_TYPE, self.connection_id)
 
     async def _get_last_sync_time(self, resource_type: str) -> Optional[datetime]:
-        """Get last sync time for a resource type from sync_state table."""
+        """Get the watermark (last successful sync time) of a resource type from sync_state."""
         if not REPOSITORIES_AVAILABLE or not self.db_session_factory:
             logger.debug(f"Skipping sync state query (repositories unavailable)")
             return None
 
         try:
             async with self.db_session_factory() as session:
-                query = select(SyncState).where(
-                    SyncState.connection_id == self.connection_id,
-                    SyncState.resource_type == resource_type
-                )
-                result = await session.execute(query)
-                sync_state = result.scalar_one_or_none()
-
-                if sync_state and sync_state.last_sync_time:
-                    logger.debug(f"Found last sync time for {resource_type}: {sync_state.last_sync_time}")
-                    return sync_state.last_sync_time
-
-                logger.debug(f"No previous sync found for {resource_type}")
-                return None
+                last_sync = await SyncStateRepository(session).get_last_sync_time(self.connection_id, resource_type)
+                if last_sync:
+                    logger.debug(f"Found last sync time for {resource_type}: {last_sync}")
+                else:
+                    logger.debug(f"No previous sync found for {resource_type}")
+                return last_sync
 
         except Exception as e:
             logger.error(f"Failed to get sync state for {resource_type}: {e}")
@@ -349,133 +791,119 @@ class BasePoller(ABC):
         sync_time: Optional[datetime] = None,
         error_message: Optional[str] = None
     ):
-        """Update sync state in database."""
+        """
+        Record a sync result for one resource type in sync_state.
+
+        On success sync_time becomes the resource type's new watermark and
+        this cycle's counts are added; on error the watermark is kept.
+        """
         if not REPOSITORIES_AVAILABLE or not self.db_session_factory:
             logger.debug(f"Skipping sync state update (repositories unavailable)")
             return
 
+        counts = self.cycle_counts.get(resource_type, {})
         try:
             async with self.db_session_factory() as session:
-                # Try to find existing sync state
-                query = select(SyncState).where(
-                    SyncState.connection_id == self.connection_id,
-                    SyncState.resource_type == resource_type
-                )
-                result = await session.execute(query)
-                sync_state = result.scalar_one_or_none()
-
-                if sync_state:
-                    # Update existing record
-                    sync_state.last_sync_status = status
-                    sync_state.last_sync_time = sync_time or datetime.utcnow()
-                    sync_state.updated_at = datetime.utcnow()
-                    sync_state.records_processed = self.metrics.get('records_processed', 0)
-                    sync_state.records_created = self.metrics.get('records_created', 0)
-                    sync_state.records_updated = self.metrics.get('records_updated', 0)
-
-                    if error_message:
-                        sync_state.last_error_message = error_message
-                        sync_state.error_count = (sync_state.error_count or 0) + 1
-                    elif status == 'success':
-                        sync_state.error_count = 0
-                        sync_state.last_error_message = None
-
-                else:
-                    # Create new sync state record
-                    import uuid as uuid_module
-                    sync_state = SyncState(
-                        sync_id=uuid_module.uuid4(),
-                        connection_id=self.connection_id,
-                        resource_type=resource_type,
-                        last_sync_status=status,
-                        last_sync_time=sync_time or datetime.utcnow(),
-                        records_processed=self.metrics.get('records_processed', 0),
-                        records_created=self.metrics.get('records_created', 0),
-                        records_updated=self.metrics.get('records_updated', 0),
-                        error_count=1 if error_message else 0,
-                        last_error_message=error_message,
+                repo = SyncStateRepository(session)
+                if status == 'success':
+                    await repo.update_sync_success(
+                        self.connection_id,
+                        resource_type,
+                        records_processed=counts.get('processed', 0),
+                        records_created=counts.get('created', 0),
+                        records_updated=counts.get('updated', 0),
+                        records_skipped=counts.get('skipped', 0),
+                        sync_time=sync_time,
                     )
-                    session.add(sync_state)
-
+                else:
+                    await repo.update_sync_error(self.connection_id, resource_type, error_message or status)
                 await session.commit()
                 logger.info(f"Updated sync state: {resource_type} = {status}, "
-                           f"records={self.metrics.get('records_processed', 0)}")
+                           f"records={counts.get('processed', 0)}, skipped={counts.get('skipped', 0)}")
 
         except Exception as e:
             logger.error(f"Failed to update sync state for {resource_type}: {e}", exc_info=True)
 
-    async def _upsert_patient(self, patient_data: Dict):
-        """Upsert patient record using fhir_id for conflict resolution."""
-        if not REPOSITORIES_AVAILABLE or not self.db_session_factory:
-            logger.debug(f"Skipping patient upsert (repositories unavailable): {patient_data.get('fhir_id')}")
-            return
-
-        async with self.db_session_factory() as session:
-            try:
-                repo = PatientRepository(session)
-                patient = await repo.upsert_from_ehr(patient_data)
-                await session.commit()
-                self.metrics['records_created'] += 1
-                logger.debug(f"Upserted patient: {patient.patient_id} (fhir_id: {patient_data.get('fhir_id')})")
-            except Exception as e:
-                await session.rollback()
-                logger.error(f"Failed to upsert patient {patient_data.get('fhir_id')}: {e}")
-                raise
+    async def _upsert_patients(self, patients: List[Dict]) -> Dict[str, UUID]:
+        """Bulk upsert patient records using (tenant_id, fhir_id) for conflict resolution."""
+        for patient in patients:
+            patient['source_connection_id'] = self.connection_id
+        return await self._bulk_upsert('patient', patients)
 
-    async def _upsert_encounter(self, encounter_data: Dict):
-        """Upsert encounter record."""
-        if not REPOSITORIES_AVAILABLE or not self.db_session_factory:
-            logger.debug(f"Skipping encounter upsert (repositories unavailable): {encounter_data.get('fhir_id')}")
-            return
+    async def _upsert_encounters(
+        self,
+        encounters: List[Dict],
+        patient_ids: Optional[Dict[str, UUID]] = None
+    ) -> Dict[str, UUID]:
+        """Bulk upsert encounter records, resolving patients from this cycle's upserts."""
+        return await self._bulk_upsert('encounter', encounters, patient_ids=patient_ids)
 
-        async with self.db_session_factory() as session:
-            try:
-                repo = EncounterRepository(session)
-                encounter = await repo.upsert_from_ehr(encounter_data)
-                await session.commit()
-                self.metrics['records_created'] += 1
-                logger.debug(f"Upserted encounter: {encounter.encounter_id} (fhir_id: {encounter_data.get('fhir_id')})")
-            except Exception as e:
-                await session.rollback()
-                logger.error(f"Failed to upsert encounter {encounter_data.get('fhir_id')}: {e}")
-                raise
+    async def _upsert_conditions(
+        self,
+        conditions: List[Dict],
+        encounter_ids: Optional[Dict[str, UUID]] = None
+    ) -> Dict[str, UUID]:
+        """Bulk upsert condition records, resolving encounters from this cycle's upserts."""
+        return await self._bulk_upsert('condition', conditions, encounter_ids=encounter_ids)
 
-    async def _upsert_condition(self, condition_data: Dict):
-        """Upsert condition record."""
-        if not REPOSITORIES_AVAILABLE or not self.db_session_factory:
-            logger.debug(f"Skipping condition upsert (repositories unavailable): {condition_data.get('fhir_id')}")
-            return
+    async def _upsert_procedures(
+        self,
+        procedures: List[Dict],
+        encounter_ids: Optional[Dict[str, UUID]] = None
+    ) -> Dict[str, UUID]:
+        """Bulk upsert procedure records, resolving encounters from this cycle's upserts."""
+        return await self._bulk_upsert('procedure', procedures, encounter_ids=encounter_ids)
 
-        async with self.db_session_factory() as session:
-            try:
-                repo = ConditionRepository(session)
-                condition = await repo.upsert_from_ehr(condition_data)
-                await session.commit()
-                self.metrics['records_created'] += 1
-                logger.debug(f"Upserted condition: {condition.diagnosis_id} (fhir_id: {condition_data.get('fhir_id')})")
-            except Exception as e:
-                await session.rollback()
-                logger.error(f"Failed to upsert condition {condition_data.get('fhir_id')}: {e}")
-                raise
+    async def _bulk_upsert(self, resource: str, records: List[Dict], **references) -> Dict[str, UUID]:
+        """
+        Upsert one resource type in a single session and transaction.
 
-    async def _upsert_procedure(self, procedure_data: Dict):
-        """Upsert procedure record."""
+        Returns fhir_id -> database ID of the upserted records, which the next
+        resource type uses to resolve its references without a lookup.
+        """
+        if not records:
+            return {}
         if not REPOSITORIES_AVAILABLE or not self.db_session_factory:
-            logger.debug(f"Skipping procedure upsert (repositories unavailable): {procedure_data.get('fhir_id')}")
-            return
+            logger.debug(f"Skipping {len(records)} {resource} upserts (repositories unavailable)")
+            return {}
+
+        repository_class = {
+            'patient': PatientRepository,
+            'encounter': EncounterRepository,
+            'condition': ConditionRepository,
+            'procedure': ProcedureRepository,
+        }[resource]
 
         async with self.db_session_factory() as session:
             try:
-                repo = ProcedureRepository(session)
-                procedure = await repo.upsert_from_ehr(procedure_data)
+                repo = repository_class(session)
+                result = await repo.bulk_upsert_from_ehr(records, batch_size=self.upsert_batch_size, **references)
                 await session.commit()
-                self.metrics['records_created'] += 1
-                logger.debug(f"Upserted procedure: {procedure.procedure_id} (fhir_id: {procedure_data.get('fhir_id')})")
             except Exception as e:
                 await session.rollback()
-                logger.error(f"Failed to upsert procedure {procedure_data.get('fhir_id')}: {e}")
+                logger.error(f"Failed to upsert {len(records)} {resource} records: {e}")
                 raise
 
+        unchanged = result.get('unchanged', 0)
+        self.metrics['records_created'] += result['created']
+        self.metrics['records_updated'] += result['updated']
+        self.metrics['records_written'] += result['created'] + result['updated']
+        self.metrics['records_skipped'] += unchanged
+
+        counts = self.cycle_counts.get(SYNC_RESOURCE_TYPES[resource])
+        if counts is not None:
+            counts['processed'] += len(records)
+            counts['created'] += result['created']
+            counts['updated'] += result['updated']
+            counts['skipped'] += unchanged
+
+        logger.debug(
+            f"Upserted {len(records)} {resource} records: {result['created']} created, "
+            f"{result['updated']} updated, {unchanged} unchanged, "
+            f"{len(result.get('skipped', []))} skipped (missing reference)"
+        )
+        return result['ids']
+
     # =========================================================================
     # LIFECYCLE METHODS
     # =========================================================================
@@ -486,22 +914,39 @@ class BasePoller(ABC):
         logger.info(f"Poller {self.connection_id} started")
 
     def stop(self):
-        """Mark poller as stopped."""
+        """Mark poller as stopped and cancel the sync in flight, if any (see wait_stopped)."""
         self._is_running = False
+        if self.is_syncing:
+            self._sync_task.cancel()
         logger.info(f"Poller {self.connection_id} stopped")
 
+    async def wait_stopped(self):
+        """Wait for a sync cancelled by stop() to unwind, e.g. before its lease or HTTP pool is released."""
+        if self._sync_task is not None:
+            await asyncio.gather(self._sync_task, return_exceptions=True)
+
     @property
     def is_running(self) -> bool:
         """Check if poller is running."""
         return self._is_running
 
+    @property
+    def is_syncing(self) -> bool:
+        """Whether a sync cycle is in flight."""
+        return self._sync_task is not None and not self._sync_task.done()
+
     def get_status(self) -> Dict:
         """Get current poller status and metrics."""
         return {
             'connection_id': str(self.connection_id),
             'tenant_id': str(self.tenant_id),
             'is_running': self._is_running,
+            'is_syncing': self.is_syncing,
             'use_mock_data': self.use_mock_data,
             'poll_interval_seconds': self.poll_interval,
             'metrics': self.metrics.copy(),
+            'last_sync_counts': {resource_type: counts.copy() for resource_type, counts in self.cycle_counts.items()},
+            'http_pool': self.http.get_status() if self.http else None,
+            'rate_limit': self.rate_limiter.get_status() if self.rate_limiter else None,
+            'bulk_export': client.get_status() if (client := self.bulk_export_client()) else None,
         }
@@ -0,0 +1,312 @@
+"""
+FHIR Bulk Data Export ($export)
+
+Backfills a connection through the FHIR Bulk Data Access API instead of
+paged searches, for initial onboarding of large organizations. Includes:
+- Kick-off of a Group or Patient level $export (Prefer: respond-async)
+- Polling of the status URL, honouring Retry-After and X-Progress
+- Streaming download of the NDJSON output files, parsed line by line
+- Batches of bulk_export_batch_size resources, so memory stays bounded
+  however large the files are
+
+Reference: https://hl7.org/fhir/uv/bulkdata/export.html
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, List, AsyncIterator, Awaitable, Callable, Tuple
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from .http_pool import PooledHTTPClient
+from .rate_limiter import AdaptiveTokenBucket, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable per connection config (see BasePoller)
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_POLL_SECONDS = 10.0
+MAX_POLL_SECONDS = 300.0
+DEFAULT_TIMEOUT_SECONDS = 6 * 3600
+
+# Returns a valid access token, refreshing it if needed (exports can outlive a token)
+TokenProvider = Callable[[], Awaitable[str]]
+
+
+class BulkExportClient:
+    """
+    Client for one FHIR server's Bulk Data $export operation.
+
+    export() runs a whole export and yields the resources of the output
+    files in batches, in the order of the requested resource types.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        http: Optional[PooledHTTPClient] = None,
+        limiter: Optional[AdaptiveTokenBucket] = None,
+        tenant_id: Any = None
+    ):
+        """
+        Initialize the bulk export client.
+
+        Args:
+            base_url: FHIR base URL
+            http: Pooled HTTP client for the FHIR host (a private pool if omitted)
+            limiter: Shared rate limiter for the host, applied to kick-off and status requests
+            tenant_id: Tenant the export is made for, used for fair sharing of the limiter
+        """
+        self.base_url = base_url.rstrip('/') if base_url else ''
+        self.http = http or PooledHTTPClient(self.base_url)
+        self.limiter = limiter
+        self.tenant_id = tenant_id
+
+        self.metrics = {
+            'exports': 0,
+            'status_polls': 0,
+            'files_downloaded': 0,
+            'resources_parsed': 0,
+            'last_export_duration_ms': 0,
+        }
+
+        if httpx is None:
+            logger.warning("httpx not installed. Install with: pip install httpx")
+
+    # =========================================================================
+    # EXPORT
+    # =========================================================================
+
+    async def export(
+        self,
+        token: TokenProvider,
+        resource_types: List[str],
+        group_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        poll_interval: float = DEFAULT_POLL_SECONDS,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS
+    ) -> AsyncIterator[Tuple[str, List[Dict]]]:
+        """
+        Run an export and stream its output.
+
+        Output files are read one at a time, ordered by resource_types, so a
+        caller writing the batches as they arrive sees parents (e.g. Patient)
+        before the resources referencing them. The server is told to delete
+        the files once the export has been read, or abandoned.
+
+        Args:
+            token: Async callable returning a valid access token
+            resource_types: FHIR resource types to export, in the order to yield them
+            group_id: Export the patients of this Group (Patient level export if omitted)
+            since: Only export resources updated after this time
+            batch_size: Resources per yielded batch
+            poll_interval: Seconds between status polls when the server sends no Retry-After
+            timeout: Seconds to wait for the export to complete
+
+        Yields:
+            (resource_type, resources) tuples of at most batch_size resources
+        """
+        start = time.perf_counter()
+        status_url = await self.kick_off(await token(), resource_types, group_id, since)
+        try:
+            manifest = await self.wait_for_manifest(status_url, token, poll_interval, timeout)
+
+            order = {resource_type: index for index, resource_type in enumerate(resource_types)}
+            outputs = sorted(
+                (output for output in manifest.get('output', []) if output.get('type') in order),
+                key=lambda output: order[output['type']]
+            )
+            if manifest.get('error'):
+                logger.warning(f"Bulk export reported {len(manifest['error'])} error files; "
+                               f"resources in them were not exported")
+
+            requires_token = manifest.get('requiresAccessToken', True)
+            for output in outputs:
+                batch = []
+                async for resource in self.iter_ndjson(output['url'], token if requires_token else None):
+                    batch.append(resource)
+                    if len(batch) >= batch_size:
+                        yield output['type'], batch
+                        batch = []
+                if batch:
+                    yield output['type'], batch
+
+            self.metrics['exports'] += 1
+            self.metrics['last_export_duration_ms'] = (time.perf_counter() - start) * 1000
+        finally:
+            await self.delete(status_url, token)
+
+    async def kick_off(
+        self,
+        access_token: str,
+        resource_types: List[str],
+        group_id: Optional[str] = None,
+        since: Optional[datetime] = None
+    ) -> str:
+        """
+        Start an export.
+
+        Returns:
+            Status URL (Content-Location) to poll
+
+        Raises:
+            BulkExportError: If the server does not accept the export
+        """
+        path = f"/Group/{group_id}/$export" if group_id else "/Patient/$export"
+        params = {'_type': ','.join(resource_types)}
+        if since:
+            params['_since'] = since.isoformat()
+
+        response = await self._request(
+            'GET', f"{self.base_url}{path}", access_token, params=params, headers={'Prefer': 'respond-async'}
+        )
+        status_url = response.headers.get('Content-Location')
+        if response.status_code != 202 or not status_url:
+            raise BulkExportError(
+                f"Bulk export kick-off failed: {response.status_code}",
+                status_code=response.status_code,
+                response_body=response.text
+            )
+
+        logger.info(f"Started bulk export of {','.join(resource_types)} ({path})")
+        return status_url
+
+    async def wait_for_manifest(
+        self,
+        status_url: str,
+        token: TokenProvider,
+        poll_interval: float = DEFAULT_POLL_SECONDS,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS
+    ) -> Dict[str, Any]:
+        """
+        Poll the status URL until the export completes.
+
+        Returns:
+            The completion manifest (transactionTime, output, error, ...)
+
+        Raises:
+            BulkExportError: If the export fails or does not complete within timeout
+        """
+        deadline = time.monotonic() + timeout
+
+        while True:
+            response = await self._request('GET', status_url, await token())
+            self.metrics['status_polls'] += 1
+
+            if response.status_code == 200:
+                return response.json()
+
+            if response.status_code not in (202, 429):
+                raise BulkExportError(
+                    f"Bulk export failed: {response.status_code}",
+                    status_code=response.status_code,
+                    response_body=response.text
+                )
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            delay = min(poll_interval if retry_after is None else retry_after, MAX_POLL_SECONDS)
+            if time.monotonic() + delay > deadline:
+                raise BulkExportError(f"Bulk export did not complete within {timeout:.0f}s")
+
+            if response.status_code == 202:
+                logger.info(f"Bulk export in progress ({response.headers.get('X-Progress', 'no progress reported')})")
+            await asyncio.sleep(delay)
+
+    async def iter_ndjson(self, url: str, token: Optional[TokenProvider] = None) -> AsyncIterator[Dict]:
+        """
+        Stream one NDJSON output file, yielding a resource per line.
+
+        Args:
+            url: Output file URL from the manifest
+            token: Access token provider, when the manifest requires one
+        """
+        headers = {'Accept': 'application/fhir+ndjson'}
+        if token:
+            headers['Authorization'] = f'Bearer {await token()}'
+
+        async with self.http.stream('GET', url, headers=headers) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise BulkExportError(
+                    f"Bulk export download failed: {response.status_code}",
+                    status_code=response.status_code,
+                    response_body=response.text
+                )
+
+            async for line in response.aiter_lines():
+                if line.strip():
+                    self.metrics['resources_parsed'] += 1
+                    yield json.loads(line)
+
+        self.metrics['files_downloaded'] += 1
+
+    async def delete(self, status_url: str, token: TokenProvider):
+        """Tell the server the export's files can be removed (best effort)."""
+        try:
+            await self._request('DELETE', status_url, await token())
+        except Exception as e:
+            logger.warning(f"Failed to delete bulk export {status_url}: {e}")
+
+    # =========================================================================
+    # HELPERS
+    # =========================================================================
+
+    async def _request(self, method: str, url: str, access_token: str, headers=None, **kwargs):
+        """Send a rate limited request with the FHIR and authorization headers."""
+        if self.limiter:
+            await self.limiter.acquire(self.tenant_id)
+        response = await self.http.request(
+            method,
+            url,
+            headers={
+                'Accept': 'application/fhir+json',
+                'Authorization': f'Bearer {access_token}',
+                **(headers or {}),
+            },
+            **kwargs
+        )
+        if self.limiter:
+            self.limiter.on_response(response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+        return response
+
+    def get_status(self) -> Dict[str, Any]:
+        """Bulk export metrics."""
+        return {'metrics': self.metrics.copy()}
+
+
+# Connection poller settings read by export_options, plus the switch itself
+EXPORT_SETTINGS = frozenset({
+    'bulk_export', 'bulk_export_group_id', 'bulk_export_batch_size',
+    'bulk_export_poll_seconds', 'bulk_export_timeout_seconds',
+})
+
+
+def export_options(config: Dict[str, Any]) -> Dict[str, Any]:
+    """BulkExportClient.export() options from a poller connection config."""
+    return {
+        'group_id': config.get('bulk_export_group_id'),
+        'batch_size': max(1, config.get('bulk_export_batch_size', DEFAULT_BATCH_SIZE)),
+        'poll_interval': config.get('bulk_export_poll_seconds', DEFAULT_POLL_SECONDS),
+        'timeout': config.get('bulk_export_timeout_seconds', DEFAULT_TIMEOUT_SECONDS),
+    }
+
+
+class BulkExportError(Exception):
+    """Raised when a bulk export cannot be started, fails or times out."""
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        response_body: Optional[str] = None
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response_body = response_body
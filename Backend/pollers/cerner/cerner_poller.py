@@ -28,6 +28,7 @@ from typing import List, Dict, Any, Optional
 from uuid import UUID
 
 from ..base_poller import BasePoller
+from ..fhir_mapping import FHIRMappers
 
 logger = logging.getLogger(__name__)
 
@@ -54,6 +55,9 @@ class CernerPoller(BasePoller):
             "Set use_mock_data=True for testing or implement methods for production."
         )
 
+        # Cerner resources follow the standard FHIR R4 specs
+        self.mappers = FHIRMappers()
+
     async def authenticate(self) -> str:
         """
         Authenticate with Cerner using OAuth2.
@@ -90,7 +94,8 @@ class CernerPoller(BasePoller):
     async def fetch_conditions(
         self,
         patient_ids: Optional[List[str]] = None,
-        encounter_ids: Optional[List[str]] = None
+        encounter_ids: Optional[List[str]] = None,
+        last_sync: Optional[datetime] = None
     ) -> List[Dict]:
         """Fetch conditions from Cerner FHIR API."""
         if self.use_mock_data:
@@ -100,7 +105,8 @@ class CernerPoller(BasePoller):
     async def fetch_procedures(
         self,
         patient_ids: Optional[List[str]] = None,
-        encounter_ids: Optional[List[str]] = None
+        encounter_ids: Optional[List[str]] = None,
+        last_sync: Optional[datetime] = None
     ) -> List[Dict]:
         """Fetch procedures from Cerner FHIR API."""
         if self.use_mock_data:
@@ -108,18 +114,25 @@ class CernerPoller(BasePoller):
         raise NotImplementedError("Cerner procedure fetch not implemented")
 
     def transform_patient(self, fhir_resource: Dict) -> Dict:
-        """Transform FHIR Patient from Cerner to canonical format."""
-        # Cerner uses standard FHIR, can reuse Epic mappers with minor adjustments
-        raise NotImplementedError("Cerner patient transform not implemented")
+        """Transform FHIR Patient to canonical format."""
+        return self.mappers.map_patient(fhir_resource, self.EHR_TYPE)
 
     def transform_encounter(self, fhir_resource: Dict) -> Dict:
-        """Transform FHIR Encounter from Cerner to canonical format."""
-        raise NotImplementedError("Cerner encounter transform not implemented")
+        """Transform FHIR Encounter to canonical format."""
+        return self.mappers.map_encounter(fhir_resource, self.EHR_TYPE)
 
     def transform_condition(self, fhir_resource: Dict) -> Dict:
-        """Transform FHIR Condition from Cerner to canonical format."""
-        raise NotImplementedError("Cerner condition transform not implemented")
+        """Transform FHIR Condition to canonical format."""
+        return self.mappers.map_condition(fhir_resource, self.EHR_TYPE)
 
     def transform_procedure(self, fhir_resource: Dict) -> Dict:
-        """Transform FHIR Procedure from Cerner to canonical format."""
-        raise NotImplementedError("Cerner procedure transform not implemented")
+        """Transform FHIR Procedure to canonical format."""
+        return self.mappers.map_procedure(fhir_resource, self.EHR_TYPE)
+
+    def transform_batch(self, resource: str, resources: List[Dict]) -> List[Dict]:
+        """Transform a list of FHIR resources of one type with the compiled mappings."""
+        return self.mappers.map_batch(resource, resources, self.EHR_TYPE)
+
+    def mapping_version(self, resource: str) -> str:
+        """Version of the compiled mapping for this resource type."""
+        return self.mappers.version(resource)
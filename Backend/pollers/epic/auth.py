@@ -25,6 +25,8 @@ try:
 except ImportError:
     httpx = None
 
+from ..http_pool import PooledHTTPClient
+
 logger = logging.getLogger(__name__)
 
 
@@ -47,7 +49,8 @@ class EpicAuth:
         base_url: str,
         client_id: str,
         private_key: Optional[str] = None,
-        public_key_id: Optional[str] = None
+        public_key_id: Optional[str] = None,
+        http: Optional[PooledHTTPClient] = None
     ):
         """
         Initialize Epic authentication.
@@ -57,11 +60,13 @@ class EpicAuth:
             client_id: Epic client ID (from App Orchard registration)
             private_key: RSA private key in PEM format
             public_key_id: Key ID if required by Epic
+            http: Pooled HTTP client for the Epic host (a private pool if omitted)
         """
         self.base_url = base_url.rstrip('/') if base_url else ''
         self.client_id = client_id
         self.private_key = private_key
         self.public_key_id = public_key_id
+        self.http = http or PooledHTTPClient(self.base_url)
 
         # Token cache
         self._access_token: Optional[str] = None
@@ -108,33 +113,32 @@ class EpicAuth:
         # Exchange JWT for access token
         token_url = f"{self.base_url}{self.TOKEN_ENDPOINT}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                token_url,
-                data={
-                    "grant_type": "client_credentials",
-                    "client_assertion_type": "urn:ietf:params:oauth:client-assertion-type:jwt-bearer",
-                    "client_assertion": jwt_assertion,
-                },
-                headers={
-                    "Content-Type": "application/x-www-form-urlencoded"
-                }
-            )
-
-            if response.status_code != 200:
-                error_msg = f"Epic token request failed: {response.status_code} - {response.text}"
-                logger.error(error_msg)
-                raise AuthenticationError(error_msg)
-
-            token_data = response.json()
-
-            # Cache the token
-            self._access_token = token_data.get("access_token")
-            expires_in = token_data.get("expires_in", 3600)  # Default 1 hour
-            self._token_expires_at = datetime.utcnow() + timedelta(seconds=expires_in)
-
-            logger.info(f"Obtained Epic access token, expires in {expires_in}s")
-            return self._access_token
+        response = await self.http.post(
+            token_url,
+            data={
+                "grant_type": "client_credentials",
+                "client_assertion_type": "urn:ietf:params:oauth:client-assertion-type:jwt-bearer",
+                "client_assertion": jwt_assertion,
+            },
+            headers={
+                "Content-Type": "application/x-www-form-urlencoded"
+            }
+        )
+
+        if response.status_code != 200:
+            error_msg = f"Epic token request failed: {response.status_code} - {response.text}"
+            logger.error(error_msg)
+            raise AuthenticationError(error_msg)
+
+        token_data = response.json()
+
+        # Cache the token
+        self._access_token = token_data.get("access_token")
+        expires_in = token_data.get("expires_in", 3600)  # Default 1 hour
+        self._token_expires_at = datetime.utcnow() + timedelta(seconds=expires_in)
+
+        logger.info(f"Obtained Epic access token, expires in {expires_in}s")
+        return self._access_token
 
     def _generate_jwt_assertion(self) -> str:
         """
@@ -176,6 +180,11 @@ class EpicAuth:
 
         return token
 
+    @property
+    def expires_at(self) -> Optional[datetime]:
+        """Expiry of the cached access token (from the token response's expires_in)."""
+        return self._token_expires_at
+
     def clear_cache(self):
         """Clear the cached access token."""
         self._access_token = None
@@ -5,12 +5,13 @@ Handles HTTP communication with Epic FHIR R4 API.
 Includes:
 - Automatic retry with exponential backoff
 - Rate limiting handling
-- Pagination support
+- Pagination support (streamed, with next-page prefetch)
 - Error handling
+- Pooled keep-alive connections (see pollers/http_pool.py)
 """
 
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, AsyncIterator
 import asyncio
 
 try:
@@ -18,6 +19,9 @@ try:
 except ImportError:
     httpx = None
 
+from ..http_pool import PooledHTTPClient
+from ..rate_limiter import AdaptiveTokenBucket, parse_retry_after
+
 logger = logging.getLogger(__name__)
 
 
@@ -39,14 +43,26 @@ class EpicClient:
     # Request timeout
     TIMEOUT_SECONDS = 30
 
-    def __init__(self, base_url: str):
+    def __init__(
+        self,
+        base_url: str,
+        http: Optional[PooledHTTPClient] = None,
+        limiter: Optional[AdaptiveTokenBucket] = None,
+        tenant_id: Any = None
+    ):
         """
         Initialize the Epic FHIR client.
 
         Args:
             base_url: Epic FHIR base URL (e.g., https://fhir.epic.com/interconnect-fhir-oauth/api/FHIR/R4)
+            http: Pooled HTTP client for the Epic host (a private pool if omitted)
+            limiter: Shared rate limiter for the Epic host (no client-side limit if omitted)
+            tenant_id: Tenant the requests are made for, used for fair sharing of the limiter
         """
         self.base_url = base_url.rstrip('/') if base_url else ''
+        self.http = http or PooledHTTPClient(self.base_url, timeout=self.TIMEOUT_SECONDS)
+        self.limiter = limiter
+        self.tenant_id = tenant_id
 
         if httpx is None:
             logger.warning("httpx not installed. Install with: pip install httpx")
@@ -76,27 +92,32 @@ class EpicClient:
 
         for attempt in range(self.MAX_RETRIES):
             try:
-                async with httpx.AsyncClient(timeout=self.TIMEOUT_SECONDS) as client:
-                    response = await client.get(url, params=params, headers=headers)
-
-                    # Handle rate limiting
-                    if response.status_code == 429:
-                        retry_after = int(response.headers.get('Retry-After', 60))
+                if self.limiter:
+                    await self.limiter.acquire(self.tenant_id)
+                response = await self.http.get(url, params=params, headers=headers)
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if self.limiter:
+                    self.limiter.on_response(response.status_code, retry_after)
+
+                # Handle rate limiting (the shared limiter pauses every tenant on this host)
+                if response.status_code == 429:
+                    if not self.limiter:
+                        retry_after = 60 if retry_after is None else retry_after
                         logger.warning(f"Rate limited. Waiting {retry_after}s before retry")
                         await asyncio.sleep(retry_after)
-                        continue
+                    continue
 
-                    # Handle success
-                    if response.status_code == 200:
-                        return response.json()
+                # Handle success
+                if response.status_code == 200:
+                    return response.json()
 
-                    # Handle errors
-                    if response.status_code >= 400:
-                        raise EpicApiError(
-                            f"API request failed: {response.status_code}",
-                            status_code=response.status_code,
-                            response_body=response.text
-                        )
+                # Handle errors
+                if response.status_code >= 400:
+                    raise EpicApiError(
+                        f"API request failed: {response.status_code}",
+                        status_code=response.status_code,
+                        response_body=response.text
+                    )
 
             except httpx.TimeoutException:
                 logger.warning(f"Request timeout (attempt {attempt + 1}/{self.MAX_RETRIES})")
@@ -114,12 +135,63 @@ class EpicClient:
 
         raise EpicApiError("Max retries exceeded")
 
+    async def iter_pages(
+        self,
+        path: str,
+        params: Optional[Dict[str, str]] = None,
+        token: Optional[str] = None,
+        max_pages: Optional[int] = 100
+    ) -> AsyncIterator[List[Dict]]:
+        """
+        Yield the resources of each page of a FHIR Bundle response.
+
+        The next page is requested before the current one is yielded, so
+        whatever the caller does with a page overlaps with downloading the
+        next one.
+
+        Args:
+            path: API path
+            params: Initial query parameters
+            token: OAuth access token
+            max_pages: Maximum number of pages to fetch (None = no limit)
+
+        Yields:
+            List of resources from one page
+
+        Raises:
+            EpicApiError: If the response has more than max_pages pages
+        """
+        response = await self.get(path, params, token)
+        page_count = 1
+
+        while True:
+            # Start the next request before handing this page over
+            next_link = self._get_next_link(response)
+            next_page = None
+            if next_link and max_pages is not None and page_count >= max_pages:
+                # Stopping here would pass a truncated result off as complete
+                raise EpicApiError(f"{path} has more than {max_pages} pages")
+            if next_link:
+                next_page = asyncio.ensure_future(self.get(next_link.replace(self.base_url, ''), None, token))
+
+            try:
+                yield [entry['resource'] for entry in response.get('entry', []) if 'resource' in entry]
+            except BaseException:
+                if next_page:
+                    next_page.cancel()
+                raise
+
+            if next_page is None:
+                break
+            response = await next_page
+            page_count += 1
+
     async def get_all_pages(
         self,
         path: str,
         params: Optional[Dict[str, str]] = None,
         token: Optional[str] = None,
-        max_pages: int = 100
+        max_pages: Optional[int] = 100
     ) -> List[Dict]:
         """
         Fetch all pages of a FHIR Bundle response.
@@ -128,34 +200,21 @@ class EpicClient:
             path: API path
             params: Initial query parameters
             token: OAuth access token
-            max_pages: Maximum number of pages to fetch
+            max_pages: Maximum number of pages to fetch (None = no limit)
 
         Returns:
             List of all resources from all pages
+
+        Raises:
+            EpicApiError: If the response has more than max_pages pages
         """
         all_resources = []
         page_count = 0
 
-        while page_count < max_pages:
-            response = await self.get(path, params, token)
-
-            # Extract resources from bundle
-            entries = response.get('entry', [])
-            for entry in entries:
-                if 'resource' in entry:
-                    all_resources.append(entry['resource'])
-
+        async for resources in self.iter_pages(path, params, token, max_pages):
+            all_resources.extend(resources)
             page_count += 1
 
-            # Check for next page
-            next_link = self._get_next_link(response)
-            if not next_link:
-                break
-
-            # Update URL for next page
-            path = next_link.replace(self.base_url, '')
-            params = None  # URL already contains params
-
         logger.info(f"Fetched {len(all_resources)} resources across {page_count} pages")
         return all_resources
 
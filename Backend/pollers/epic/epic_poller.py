@@ -7,16 +7,19 @@ Stores data in Panaceon database with team_id isolation.
 Supports:
 - Mock FHIR data for testing (no real Epic connection needed)
 - Real Epic Backend Services JWT authentication
-- Incremental sync using _lastUpdated parameter
+- Incremental sync using _lastUpdated parameter, scoped to patients
+- Paged patient streaming into the BasePoller sync pipeline
+- Bulk Data $export backfills for full syncs (bulk_export config)
 """
 
 import logging
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from uuid import UUID, uuid4
 import random
 
 from ..base_poller import BasePoller
+from ..bulk_export import BulkExportClient
 from .auth import EpicAuth
 from .client import EpicClient
 from .mappers import EpicMappers
@@ -43,9 +46,19 @@ class EpicPoller(BasePoller):
             base_url=config.get('base_url'),
             client_id=config.get('client_id'),
             private_key=config.get('private_key'),
+            http=self.http,
         )
         self.client = EpicClient(
             base_url=config.get('base_url'),
+            http=self.http,
+            limiter=self.rate_limiter,
+            tenant_id=tenant_id,
+        )
+        self.bulk_client = BulkExportClient(
+            base_url=config.get('base_url'),
+            http=self.http,
+            limiter=self.rate_limiter,
+            tenant_id=tenant_id,
         )
         self.mappers = EpicMappers()
 
@@ -72,6 +85,10 @@ class EpicPoller(BasePoller):
             logger.error(f"Epic authentication failed: {e}")
             raise
 
+    def token_expires_at(self) -> Optional[datetime]:
+        """Token expiry from Epic's expires_in (None in mock mode)."""
+        return None if self.use_mock_data else self.auth.expires_at
+
     # =========================================================================
     # DATA FETCHING
     # =========================================================================
@@ -86,17 +103,66 @@ class EpicPoller(BasePoller):
             return self._generate_mock_patients()
 
         try:
-            params = {'_count': '100'}
-            if last_sync:
-                params['_lastUpdated'] = f'ge{last_sync.isoformat()}'
+            return await self.client.get_all_pages(
+                '/Patient', params=self._patient_params(last_sync), token=self._access_token
+            )
+        except Exception as e:
+            logger.error(f"Failed to fetch patients: {e}")
+            raise
+
+    async def iter_patient_pages(self, last_sync: Optional[datetime] = None) -> AsyncIterator[List[Dict]]:
+        """
+        Stream patients page by page, following the Bundle's next links.
+
+        Encounter fetches for one page run while the next page downloads.
+        Pages are not held in memory, so there is no page limit.
+        """
+        if self.use_mock_data:
+            yield await self.fetch_patients(last_sync)
+            return
 
-            response = await self.client.get('/Patient', params=params, token=self._access_token)
-            entries = response.get('entry', [])
-            return [entry.get('resource', {}) for entry in entries]
+        try:
+            async for page in self.client.iter_pages(
+                '/Patient', params=self._patient_params(last_sync), token=self._access_token, max_pages=None
+            ):
+                yield page
         except Exception as e:
             logger.error(f"Failed to fetch patients: {e}")
             raise
 
+    def _patient_params(self, last_sync: Optional[datetime]) -> Dict[str, str]:
+        """Patient search parameters, incremental when last_sync is set."""
+        return self._search_params(last_sync)
+
+    @staticmethod
+    def _search_params(last_sync: Optional[datetime], **filters: Optional[List[str]]) -> Dict[str, str]:
+        """Search parameters: _count, comma-joined reference filters, and _lastUpdated when incremental."""
+        params = {'_count': '100'}
+        for name, values in filters.items():
+            if values:
+                params[name] = ','.join(values)
+        if last_sync:
+            params['_lastUpdated'] = f'ge{last_sync.isoformat()}'
+        return params
+
+    def _child_params(
+        self,
+        last_sync: Optional[datetime],
+        patient_ids: Optional[List[str]] = None,
+        encounter_ids: Optional[List[str]] = None
+    ) -> Dict[str, str]:
+        """
+        Search parameters for encounters, conditions or procedures.
+
+        Epic rejects these searches without a patient (or encounter), so an
+        unscoped search is an error rather than a request.
+        """
+        if encounter_ids:
+            return self._search_params(last_sync, encounter=encounter_ids)
+        if patient_ids:
+            return self._search_params(last_sync, patient=patient_ids)
+        raise ValueError("Epic clinical searches need patient or encounter IDs")
+
     async def fetch_encounters(
         self,
         patient_ids: Optional[List[str]] = None,
@@ -107,15 +173,8 @@ class EpicPoller(BasePoller):
             return self._generate_mock_encounters(patient_ids or [])
 
         try:
-            params = {'_count': '100'}
-            if patient_ids:
-                params['patient'] = ','.join(patient_ids)
-            if last_sync:
-                params['_lastUpdated'] = f'ge{last_sync.isoformat()}'
-
-            response = await self.client.get('/Encounter', params=params, token=self._access_token)
-            entries = response.get('entry', [])
-            return [entry.get('resource', {}) for entry in entries]
+            params = self._child_params(last_sync, patient_ids=patient_ids)
+            return await self.client.get_all_pages('/Encounter', params=params, token=self._access_token)
         except Exception as e:
             logger.error(f"Failed to fetch encounters: {e}")
             raise
@@ -123,22 +182,17 @@ class EpicPoller(BasePoller):
     async def fetch_conditions(
         self,
         patient_ids: Optional[List[str]] = None,
-        encounter_ids: Optional[List[str]] = None
+        encounter_ids: Optional[List[str]] = None,
+        last_sync: Optional[datetime] = None
     ) -> List[Dict]:
         """Fetch conditions (diagnoses) from Epic FHIR API."""
         if self.use_mock_data:
             return self._generate_mock_conditions(encounter_ids or [])
 
         try:
-            params = {'_count': '100'}
-            if encounter_ids:
-                params['encounter'] = ','.join(encounter_ids)
-            elif patient_ids:
-                params['patient'] = ','.join(patient_ids)
-
-            response = await self.client.get('/Condition', params=params, token=self._access_token)
-            entries = response.get('entry', [])
-            return [entry.get('resource', {}) for entry in entries]
+            params = self._child_params(last_sync, patient_ids, encounter_ids)
+
+            return await self.client.get_all_pages('/Condition', params=params, token=self._access_token)
         except Exception as e:
             logger.error(f"Failed to fetch conditions: {e}")
             raise
@@ -146,26 +200,30 @@ class EpicPoller(BasePoller):
     async def fetch_procedures(
         self,
         patient_ids: Optional[List[str]] = None,
-        encounter_ids: Optional[List[str]] = None
+        encounter_ids: Optional[List[str]] = None,
+        last_sync: Optional[datetime] = None
     ) -> List[Dict]:
         """Fetch procedures from Epic FHIR API."""
         if self.use_mock_data:
             return self._generate_mock_procedures(encounter_ids or [])
 
         try:
-            params = {'_count': '100'}
-            if encounter_ids:
-                params['encounter'] = ','.join(encounter_ids)
-            elif patient_ids:
-                params['patient'] = ','.join(patient_ids)
-
-            response = await self.client.get('/Procedure', params=params, token=self._access_token)
-            entries = response.get('entry', [])
-            return [entry.get('resource', {}) for entry in entries]
+            params = self._child_params(last_sync, patient_ids, encounter_ids)
+
+            return await self.client.get_all_pages('/Procedure', params=params, token=self._access_token)
         except Exception as e:
             logger.error(f"Failed to fetch procedures: {e}")
             raise
 
+    def bulk_export_client(self) -> Optional[BulkExportClient]:
+        """
+        Bulk Data client for full syncs (None in mock mode).
+
+        Epic only supports Group level exports, so bulk_export_group_id
+        should name the Group of patients registered for the connection.
+        """
+        return None if self.use_mock_data else self.bulk_client
+
     # =========================================================================
     # TRANSFORMATIONS
     # =========================================================================
@@ -186,6 +244,14 @@ class EpicPoller(BasePoller):
         """Transform FHIR Procedure to canonical format."""
         return self.mappers.map_procedure(fhir_resource, self.EHR_TYPE)
 
+    def transform_batch(self, resource: str, resources: List[Dict]) -> List[Dict]:
+        """Transform a list of FHIR resources of one type with the compiled mappings."""
+        return self.mappers.map_batch(resource, resources, self.EHR_TYPE)
+
+    def mapping_version(self, resource: str) -> str:
+        """Version of the compiled mapping for this resource type."""
+        return self.mappers.version(resource)
+
     # =========================================================================
     # MOCK DATA GENERATION
     # =========================================================================
@@ -0,0 +1,689 @@
+"""
+Compiled FHIR to Canonical Mappings
+
+Declarative field specs that map FHIR R4 resources to the canonical format
+used by Panaceon's database schema. Each mapping is compiled once into the
+source of a plain Python function, which maps a whole batch of resources
+with inlined dict lookups and builds each record in a single dict display.
+Includes:
+- Spec primitives: Path, Reference, Lookup, Coalesce, Select, Const, Raw
+  and SyncTime; any callable taking the resource also works as a spec
+- Select predicates: equals, contains, has_code, is_in, any_of
+- compile_mapping(): turns a {column: spec} dict into a ResourceMapping
+  with map(), map_batch() and a version that changes with the mapping
+- The standard FHIR R4 specs for Patient, Encounter, Condition and
+  Procedure, and FHIRMappers, shared by the FHIR pollers
+
+A Select writes several columns from one list element (e.g. the official
+name); its key in the spec only names the group. An EHR needing different
+fields compiles its own mapping from the standard specs, e.g.
+compile_mapping({**PATIENT_SPEC, 'mrn': Path('identifier.1.value')});
+plain columns take precedence over columns written by a Select.
+
+Resources are expected as parsed JSON (plain dicts and lists); values of
+other types along a path read as missing.
+"""
+
+import hashlib
+import logging
+import operator
+from datetime import datetime, date
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Callable, Iterable, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Part of every mapping's version, which pollers fold into source_hash so a
+# mapping change re-maps stored records. Bump when a converter (fhir_date,
+# reference_id, ...) or anything else outside the specs' own values changes.
+MAPPING_VERSION = 1
+
+
+# =============================================================================
+# VALUE CONVERSIONS
+# =============================================================================
+
+@lru_cache(maxsize=8192)
+def fhir_date(value: str) -> Optional[date]:
+    """
+    Date part of a FHIR date or dateTime ('2024-01-15', '2024-01-15T08:00:00Z').
+
+    The date is taken as written, in the value's own offset. Partial dates
+    ('2024', '2024-01') and invalid values give None.
+    """
+    try:
+        return date.fromisoformat(value[:10])
+    except (ValueError, TypeError):
+        logger.warning(f"Failed to parse date: {value}")
+        return None
+
+
+def reference_id(reference: str) -> Optional[str]:
+    """Resource ID of a FHIR reference ('Patient/123' → '123')."""
+    return reference.rsplit('/', 1)[-1] if reference else None
+
+
+# =============================================================================
+# PATHS
+# =============================================================================
+
+Step = Union[str, int]
+
+
+def parse_path(path: str) -> Tuple[Step, ...]:
+    """Steps of a dotted path; numeric parts index lists ('name.0.given.1')."""
+    return tuple(int(part) if part.isdigit() else part for part in path.split('.'))
+
+
+def get_path(value: Any, steps: Tuple[Step, ...]) -> Any:
+    """Value at a parsed path, or None where a key, index or container is missing."""
+    for step in steps:
+        if step.__class__ is int:
+            if value.__class__ is not list or len(value) <= step:
+                return None
+            value = value[step]
+        elif value.__class__ is dict:
+            value = value.get(step)
+        else:
+            return None
+    return value
+
+
+def _contains(value: Any, text: str) -> bool:
+    return value.__class__ is str and text in value.lower()
+
+
+def _has_code(codings: Any, code: str) -> bool:
+    if codings.__class__ is not list:
+        return False
+    for coding in codings:
+        if coding.__class__ is dict and coding.get('code') == code:
+            return True
+    return False
+
+
+class _Source:
+    """Python source of a compiled mapping and the objects it references."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.namespace: Dict[str, Any] = {
+            'dict': dict, 'list': list, 'get_path': get_path,
+            '_contains': _contains, '_has_code': _has_code,
+        }
+        self._count = 0
+
+    def name(self, prefix: str) -> str:
+        """A fresh variable name."""
+        self._count += 1
+        return f"{prefix}{self._count}"
+
+    def ref(self, value: Any) -> str:
+        """Expression for a value: a literal, or a name bound in the namespace."""
+        if value is None or value.__class__ in (bool, int, float, str):
+            return repr(value)
+        name = self.name('_c')
+        self.namespace[name] = value
+        return name
+
+    def line(self, indent: int, text: str):
+        self.lines.append('    ' * indent + text)
+
+    def path(self, source: str, steps: Tuple[Step, ...], target: str, indent: int, source_is_dict: bool = False):
+        """Statements assigning the value at steps of source to target."""
+        current = source
+        for position, step in enumerate(steps):
+            if step.__class__ is int:
+                self.line(indent, f"{target} = {current}[{step}] "
+                                  f"if {current}.__class__ is list and len({current}) > {step} else None")
+            elif position == 0 and source_is_dict:
+                self.line(indent, f"{target} = {current}.get({step!r})")
+            else:
+                self.line(indent, f"{target} = {current}.get({step!r}) if {current}.__class__ is dict else None")
+            current = target
+        if not steps:
+            self.line(indent, f"{target} = {source}")
+
+    def path_expression(self, source: str, steps: Tuple[Step, ...]) -> str:
+        """A single expression for the value at steps of source (used in predicates)."""
+        if len(steps) == 1 and steps[0].__class__ is str:
+            return f"({source}.get({steps[0]!r}) if {source}.__class__ is dict else None)"
+        return f"get_path({source}, {self.ref(steps)})"
+
+
+# =============================================================================
+# SPECS
+# =============================================================================
+
+class Path:
+    """Value at a path, converted when present, else default."""
+
+    def __init__(self, path: str, convert: Optional[Callable] = None, default: Any = None):
+        self.steps = parse_path(path)
+        self.convert = convert
+        self.default = default
+
+    def emit(self, code: _Source, source: str, target: str, indent: int, source_is_dict: bool = False):
+        code.path(source, self.steps, target, indent, source_is_dict)
+        self.emit_convert(code, target, indent)
+
+    def emit_convert(self, code: _Source, target: str, indent: int):
+        if self.convert is not None and self.default is not None:
+            code.line(indent, f"{target} = {code.ref(self.default)} if {target} is None "
+                              f"else {code.ref(self.convert)}({target})")
+        elif self.convert is not None:
+            code.line(indent, f"if {target} is not None: {target} = {code.ref(self.convert)}({target})")
+        elif self.default is not None:
+            code.line(indent, f"if {target} is None: {target} = {code.ref(self.default)}")
+
+
+class Reference(Path):
+    """Resource ID of the reference at a path ('subject' → patient FHIR ID)."""
+
+    def __init__(self, path: str):
+        super().__init__(f"{path}.reference", convert=reference_id)
+
+
+class Lookup(Path):
+    """Code at a path mapped through a table (None is the key for a missing code)."""
+
+    def __init__(self, path: str, table: Dict[Any, Any], default: Any = None):
+        super().__init__(path)
+        self.table = table
+        self.lookup_default = default
+
+    def emit(self, code: _Source, source: str, target: str, indent: int, source_is_dict: bool = False):
+        code.path(source, self.steps, target, indent, source_is_dict)
+        code.line(indent, f"{target} = {code.ref(self.table)}.get({target}, {code.ref(self.lookup_default)})")
+
+
+class Coalesce:
+    """First truthy value of several specs (like 'a or b'), converted when present."""
+
+    def __init__(self, *specs, convert: Optional[Callable] = None):
+        self.specs = specs
+        self.convert = convert
+
+    def emit(self, code: _Source, source: str, target: str, indent: int, source_is_dict: bool = False):
+        for position, spec in enumerate(self.specs):
+            if position:
+                code.line(indent + position - 1, f"if not {target}:")
+            emit_spec(code, spec, source, target, indent + position, source_is_dict)
+        if self.convert is not None:
+            code.line(indent, f"if {target} is not None: {target} = {code.ref(self.convert)}({target})")
+
+
+class Const:
+    """The same value for every resource (shared, so use immutable values)."""
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+class Raw:
+    """The FHIR resource itself (fhir_raw)."""
+
+
+class SyncTime:
+    """Time of the mapping call; one value for a whole batch."""
+
+
+def emit_spec(code: _Source, spec, source: str, target: str, indent: int, source_is_dict: bool = False):
+    """Statements assigning the value of a column spec, read from source, to target."""
+    if isinstance(spec, Const):
+        code.line(indent, f"{target} = {code.ref(spec.value)}")
+    elif isinstance(spec, Raw):
+        code.line(indent, f"{target} = {source}")
+    elif isinstance(spec, SyncTime):
+        code.line(indent, f"{target} = synced_at")
+    elif hasattr(spec, 'emit'):
+        spec.emit(code, source, target, indent, source_is_dict)
+    elif callable(spec):
+        code.line(indent, f"{target} = {code.ref(spec)}({source})")
+    else:
+        raise TypeError(f"Unsupported mapping spec: {spec!r}")
+
+
+# Predicates for Select.prefer
+
+class Predicate:
+    """Test on a list element, compiled to an expression."""
+
+    def expression(self, code: _Source, element: str) -> str:
+        raise NotImplementedError
+
+
+class equals(Predicate):
+    """Element whose value at path equals expected."""
+
+    def __init__(self, path: str, expected: Any):
+        self.steps, self.expected = parse_path(path), expected
+
+    def expression(self, code, element):
+        return f"{code.path_expression(element, self.steps)} == {code.ref(self.expected)}"
+
+
+class is_in(Predicate):
+    """Element whose value at path is one of values (a set or dict)."""
+
+    def __init__(self, path: str, values):
+        self.steps, self.values = parse_path(path), values
+
+    def expression(self, code, element):
+        return f"{code.path_expression(element, self.steps)} in {code.ref(self.values)}"
+
+
+class contains(Predicate):
+    """Element whose string at path contains text, ignoring case."""
+
+    def __init__(self, path: str, text: str):
+        self.steps, self.text = parse_path(path), text.lower()
+
+    def expression(self, code, element):
+        return f"_contains({code.path_expression(element, self.steps)}, {self.text!r})"
+
+
+class has_code(Predicate):
+    """Element with a coding in the list at path (e.g. 'type.coding') whose code is code."""
+
+    def __init__(self, path: str, code: str):
+        self.steps, self.code = parse_path(path), code
+
+    def expression(self, code, element):
+        return f"_has_code({code.path_expression(element, self.steps)}, {self.code!r})"
+
+
+class any_of(Predicate):
+    """Element matching any of the predicates."""
+
+    def __init__(self, *predicates: Predicate):
+        self.predicates = predicates
+
+    def expression(self, code, element):
+        return '(' + ' or '.join(predicate_expression(code, p, element) for p in self.predicates) + ')'
+
+
+def predicate_expression(code: _Source, predicate, element: str) -> str:
+    """Expression for a Predicate, or a call of a plain callable."""
+    if predicate is None:
+        return 'True'
+    if isinstance(predicate, Predicate):
+        return predicate.expression(code, element)
+    return f"{code.ref(predicate)}({element})"
+
+
+class Select:
+    """
+    One element of a list (e.g. the official name), read into several columns.
+
+    The element is the first one matching prefer, else the first element
+    when fallback_first is set. One '*' in the path flattens nested lists,
+    so 'category.*.coding' searches every coding of every category.
+    Columns are read from the element with their own specs, evaluated on
+    None when no element was selected, except those listed in otherwise,
+    which are then read from the resource instead.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        columns: Dict[str, Any],
+        prefer=None,
+        fallback_first: bool = True,
+        otherwise: Optional[Dict[str, Any]] = None
+    ):
+        outer, _, inner = path.partition('*')
+        self.outer = parse_path(outer.strip('.'))
+        self.inner = parse_path(inner.strip('.')) if inner else None
+        if self.inner is not None and fallback_first:
+            raise ValueError("fallback_first is not supported with '*' paths")
+        self.columns = columns
+        self.prefer = prefer
+        self.fallback_first = fallback_first
+        self.otherwise = otherwise or {}
+
+    def emit_columns(self, code: _Source, source: str, targets: Dict[str, str], indent: int):
+        """Statements selecting the element and assigning each column to targets[column]."""
+        selected, items = code.name('_s'), code.name('_l')
+        element = code.name('_e')
+        test = predicate_expression(code, self.prefer, element)
+
+        code.line(indent, f"{selected} = None")
+        if self.inner is None:
+            code.path(source, self.outer, items, indent, source_is_dict=True)
+            code.line(indent, f"if {items}.__class__ is list:")
+            code.line(indent + 1, f"for {element} in {items}:")
+            code.line(indent + 2, f"if {test}:")
+            code.line(indent + 3, f"{selected} = {element}")
+            code.line(indent + 3, "break")
+            if self.fallback_first:
+                code.line(indent + 1, "else:")
+                code.line(indent + 2, f"if {items}: {selected} = {items}[0]")
+        else:
+            outer, parent = code.name('_l'), code.name('_p')
+            code.path(source, self.outer, outer, indent, source_is_dict=True)
+            code.line(indent, f"if {outer}.__class__ is list:")
+            code.line(indent + 1, f"for {parent} in {outer}:")
+            code.path(parent, self.inner, items, indent + 2)
+            code.line(indent + 2, f"if {items}.__class__ is list:")
+            code.line(indent + 3, f"for {element} in {items}:")
+            code.line(indent + 4, f"if {test}:")
+            code.line(indent + 5, f"{selected} = {element}")
+            code.line(indent + 5, "break")
+            code.line(indent + 3, f"if {selected} is not None: break")
+
+        for column, spec in self.columns.items():
+            if column in self.otherwise:
+                code.line(indent, f"if {selected} is None:")
+                emit_spec(code, self.otherwise[column], source, targets[column], indent + 1, source_is_dict=True)
+                code.line(indent, "else:")
+                emit_spec(code, spec, selected, targets[column], indent + 1)
+            else:
+                emit_spec(code, spec, selected, targets[column], indent)
+
+
+# =============================================================================
+# COMPILED MAPPINGS
+# =============================================================================
+
+class ResourceMapping:
+    """
+    A {column: spec} mapping for one resource type, compiled to a function.
+
+    The generated source is kept in .source for debugging. .version hashes
+    MAPPING_VERSION, the source and the lookup tables and constants it
+    references, so it changes whenever the records it produces may.
+    """
+
+    def __init__(self, spec: Dict[str, Any], name: str = 'resource'):
+        code = _Source()
+        targets: Dict[str, str] = {}
+        body = _Source()
+        body.namespace = code.namespace
+
+        # Columns of a Select are written first so plain columns override them
+        for group, field in spec.items():
+            if isinstance(field, Select):
+                group_targets = {column: targets.setdefault(column, body.name('v')) for column in field.columns}
+                field.emit_columns(body, 'resource', group_targets, 2)
+        for column, field in spec.items():
+            if isinstance(field, Const):
+                targets[column] = body.ref(field.value)
+            elif not isinstance(field, Select):
+                targets[column] = body.name('v')
+                emit_spec(body, field, 'resource', targets[column], 2, source_is_dict=True)
+
+        record = ', '.join(f"{column!r}: {target}" for column, target in targets.items())
+        code.line(0, f"def map_{name}_batch(resources, source_ehr, synced_at):")
+        code.line(1, "records = []")
+        code.line(1, "append = records.append")
+        code.line(1, "for resource in resources:")
+        code.lines.extend(body.lines)
+        code.line(2, f"append({{{record}, 'source_ehr': source_ehr}})")
+        code.line(1, "return records")
+
+        self.columns = list(targets) + ['source_ehr']
+        self._timed = any(isinstance(field, SyncTime) for field in spec.values())
+        self.source = '\n'.join(code.lines)
+        self.version = _mapping_version(self.source, code.namespace)
+        exec(compile(self.source, f"<fhir mapping {name}>", 'exec'), code.namespace)
+        self._map_batch = code.namespace[f"map_{name}_batch"]
+
+    def map(self, resource: Dict, source_ehr: str) -> Dict:
+        """Canonical record for one resource."""
+        return self._map_batch((resource,), source_ehr, datetime.utcnow() if self._timed else None)[0]
+
+    def map_batch(self, resources: Iterable[Dict], source_ehr: str) -> List[Dict]:
+        """Canonical records for a list of resources of this type, in order."""
+        return self._map_batch(resources, source_ehr, datetime.utcnow() if self._timed else None)
+
+
+def _mapping_version(source: str, namespace: Dict[str, Any]) -> str:
+    """SHA-256 of MAPPING_VERSION, a mapping's source and the data it references."""
+    # Lookup tables and constants are bound by name; callables are covered by MAPPING_VERSION
+    data = {name: repr(value) for name, value in namespace.items() if isinstance(value, (dict, list, tuple))}
+    content = f"{MAPPING_VERSION}\n{source}\n{sorted(data.items())}"
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def compile_mapping(spec: Dict[str, Any], name: str = 'resource') -> ResourceMapping:
+    """Compile a {column: spec} dict into a ResourceMapping."""
+    return ResourceMapping(spec, name)
+
+
+# =============================================================================
+# FHIR R4 SPECS
+# =============================================================================
+
+GENDERS = {'male': 'M', 'female': 'F', 'other': 'O', 'unknown': 'U'}
+
+# Database constraint: 'Office Visit', 'Inpatient', 'Emergency', 'Telemedicine',
+# 'Observation', 'Outpatient Surgery', 'Other'
+ENCOUNTER_TYPES = {
+    None: 'Office Visit',  # No class: treated as ambulatory
+    'AMB': 'Office Visit',
+    'EMER': 'Emergency',
+    'IMP': 'Inpatient',
+    'OBSENC': 'Observation',
+    'SS': 'Outpatient Surgery',  # Short stay
+}
+
+# CMS place of service codes
+PLACES_OF_SERVICE = {
+    'AMB': '11',     # Office
+    'EMER': '23',    # Emergency Room
+    'IMP': '21',     # Inpatient Hospital
+    'OBSENC': '22',  # Outpatient Hospital
+}
+
+# Database constraint: 'Scheduled', 'In Progress', 'Completed', 'Cancelled', 'No Show'
+ENCOUNTER_STATUSES = {
+    'planned': 'Scheduled',
+    'arrived': 'In Progress',
+    'triaged': 'In Progress',
+    'in-progress': 'In Progress',
+    'onleave': 'In Progress',
+    'finished': 'Completed',
+    'cancelled': 'Cancelled',
+    'entered-in-error': 'Cancelled',
+}
+
+# Database constraint: 'Primary', 'Secondary', 'Admitting', 'Complication', 'Comorbidity'
+DIAGNOSIS_TYPES = {
+    'encounter-diagnosis': 'Primary',
+    'problem-list-item': 'Secondary',
+}
+
+
+def procedure_code_type(system: str) -> str:
+    """CPT unless the coding system is HCPCS."""
+    system = system.lower()
+    if 'cpt' in system or 'ama-assn' in system:
+        return 'CPT'
+    return 'HCPCS' if 'hcpcs' in system else 'CPT'
+
+
+PATIENT_SPEC = {
+    'fhir_id': Path('id'),
+    'source_organization_id': Reference('managingOrganization'),
+    'fhir_raw': Raw(),
+    'last_synced_at': SyncTime(),
+
+    # Patient Identifiers (MRN falls back to the first identifier)
+    'mrn_identifier': Select('identifier', {'mrn': Path('value')}, prefer=has_code('type.coding', 'MR')),
+    'ssn_identifier': Select(
+        'identifier', {'ssn': Path('value')},
+        prefer=any_of(has_code('type.coding', 'SS'), contains('system', 'ssn')), fallback_first=False
+    ),
+    'external_patient_id': Path('id'),
+
+    # Demographics (official name, else the first one)
+    'official_name': Select('name', {
+        'first_name': Path('given.0', default=''),
+        'middle_name': Path('given.1', default=''),
+        'last_name': Path('family', default=''),
+    }, prefer=equals('use', 'official')),
+    'date_of_birth': Path('birthDate', convert=fhir_date),
+    'gender': Lookup('gender', GENDERS, default='U'),
+
+    # Contact
+    'phone_telecom': Select('telecom', {'phone_primary': Path('value')}, prefer=equals('system', 'phone'),
+                     fallback_first=False),
+    'email_telecom': Select('telecom', {'email': Path('value')}, prefer=equals('system', 'email'),
+                     fallback_first=False),
+
+    # Address (home address, else the first one)
+    'home_address': Select('address', {
+        'address_line1': Path('line.0'),
+        'address_line2': Path('line.1'),
+        'city': Path('city'),
+        'state': Path('state'),
+        'zip_code': Path('postalCode'),
+        'country': Path('country'),
+    }, prefer=equals('use', 'home'), otherwise={'country': Const('USA')}),
+
+    # Status
+    'is_active': Path('deceasedBoolean', convert=operator.not_, default=True),
+    'is_deceased': Path('deceasedBoolean', default=False),
+    'deceased_date': Path('deceasedDateTime', convert=fhir_date),
+}
+
+ENCOUNTER_SPEC = {
+    'fhir_id': Path('id'),
+    'source_organization_id': Reference('serviceProvider'),
+    'fhir_raw': Raw(),
+    'last_synced_at': SyncTime(),
+
+    # Link to patient by FHIR ID (resolved to patient_id in the database)
+    'patient_fhir_id': Reference('subject'),
+
+    # Encounter Identification
+    'encounter_number': Coalesce(Path('identifier.0.value'), Path('id')),
+    'external_encounter_id': Path('id'),
+
+    # Encounter Details
+    'encounter_type': Lookup('class.code', ENCOUNTER_TYPES, default='Other'),
+    'encounter_class': Path('class.display'),
+    'service_date': Path('period.start', convert=fhir_date),
+    'service_end_date': Path('period.end', convert=fhir_date),
+
+    # Location
+    'facility_name': Path('location.0.location.display'),
+    'place_of_service': Lookup('class.code', PLACES_OF_SERVICE, default='11'),
+
+    # Status
+    'encounter_status': Lookup('status', ENCOUNTER_STATUSES, default='In Progress'),
+    'coding_status': Const('Not Started'),
+    'billing_status': Const('Not Ready'),
+}
+
+CONDITION_SPEC = {
+    'fhir_id': Path('id'),
+    'fhir_raw': Raw(),
+
+    # Link to encounter by FHIR ID
+    'encounter_fhir_id': Reference('encounter'),
+
+    # Diagnosis Code (ICD-10 coding, else the first one, else the text)
+    'icd10_coding': Select('code.coding', {
+        'icd10_code': Path('code'),
+        'diagnosis_description': Path('display'),
+    }, prefer=contains('system', 'icd-10'), otherwise={'diagnosis_description': Path('code.text')}),
+
+    # Diagnosis Details
+    'diagnosis_category': Select('category.*.coding', {
+        'diagnosis_type': Lookup('code', DIAGNOSIS_TYPES, default='Secondary'),
+    }, prefer=is_in('code', DIAGNOSIS_TYPES), fallback_first=False),
+    'present_on_admission': Const(None),
+    'diagnosis_order': Const(1),
+
+    # AI fields
+    'ai_suggested': Const(False),
+    'ai_confidence_score': Const(None),
+    'ai_reasoning': Const(None),
+}
+
+PROCEDURE_SPEC = {
+    'fhir_id': Path('id'),
+    'fhir_raw': Raw(),
+
+    # Link to encounter by FHIR ID
+    'encounter_fhir_id': Reference('encounter'),
+
+    # Procedure Code (CPT or HCPCS coding, else the first one, else the text)
+    'procedure_coding': Select('code.coding', {
+        'procedure_code': Path('code'),
+        'code_type': Path('system', convert=procedure_code_type, default='CPT'),
+        'procedure_description': Path('display'),
+    }, prefer=any_of(contains('system', 'cpt'), contains('system', 'ama-assn'), contains('system', 'hcpcs')),
+        otherwise={'code_type': Const('CPT'), 'procedure_description': Path('code.text')}),
+
+    # Procedure Details
+    'procedure_date': Coalesce(Path('performedDateTime'), Path('performedPeriod.start'), convert=fhir_date),
+    'quantity': Const(1),
+    'units': Const(1.0),
+
+    # Modifiers (may be in extensions)
+    'modifier_1': Const(None),
+    'modifier_2': Const(None),
+    'modifier_3': Const(None),
+    'modifier_4': Const(None),
+
+    # AI fields
+    'ai_suggested': Const(False),
+    'ai_confidence_score': Const(None),
+    'ai_reasoning': Const(None),
+}
+
+FHIR_R4_MAPPINGS = {
+    'patient': compile_mapping(PATIENT_SPEC, 'patient'),
+    'encounter': compile_mapping(ENCOUNTER_SPEC, 'encounter'),
+    'condition': compile_mapping(CONDITION_SPEC, 'condition'),
+    'procedure': compile_mapping(PROCEDURE_SPEC, 'procedure'),
+}
+
+
+class FHIRMappers:
+    """
+    FHIR R4 to canonical mappers built on compiled mappings.
+
+    Pollers for standard FHIR servers use the shared FHIR_R4_MAPPINGS;
+    pass mappings compiled from adjusted specs for EHR-specific fields.
+    """
+
+    def __init__(self, mappings: Optional[Dict[str, ResourceMapping]] = None):
+        self.mappings = {**FHIR_R4_MAPPINGS, **(mappings or {})}
+
+    def map_patient(self, fhir_patient: Dict, source_ehr: str) -> Dict:
+        """Transform a FHIR Patient resource to a canonical patient dict."""
+        return self.mappings['patient'].map(fhir_patient, source_ehr)
+
+    def map_encounter(self, fhir_encounter: Dict, source_ehr: str) -> Dict:
+        """Transform a FHIR Encounter resource to a canonical encounter dict."""
+        return self.mappings['encounter'].map(fhir_encounter, source_ehr)
+
+    def map_condition(self, fhir_condition: Dict, source_ehr: str) -> Dict:
+        """Transform a FHIR Condition resource to a canonical diagnosis dict."""
+        return self.mappings['condition'].map(fhir_condition, source_ehr)
+
+    def map_procedure(self, fhir_procedure: Dict, source_ehr: str) -> Dict:
+        """Transform a FHIR Procedure resource to a canonical procedure dict."""
+        return self.mappings['procedure'].map(fhir_procedure, source_ehr)
+
+    def version(self, resource: str) -> str:
+        """Version of the mapping for 'patient', 'encounter', 'condition' or 'procedure'."""
+        return self.mappings[resource].version
+
+    def map_batch(self, resource: str, resources: Iterable[Dict], source_ehr: str) -> List[Dict]:
+        """
+        Transform a list of resources of one type.
+
+        Args:
+            resource: 'patient', 'encounter', 'condition' or 'procedure'
+            resources: FHIR resources of that type
+            source_ehr: Source EHR identifier
+
+        Returns:
+            Canonical dicts, in the same order
+        """
+        return self.mappings[resource].map_batch(resources, source_ehr)
@@ -0,0 +1,293 @@
+"""
+Pooled HTTP Clients for EHR and Clearinghouse Connectors
+
+Keeps one long-lived httpx.AsyncClient per remote host instead of opening a
+new client (TCP + TLS handshake) for every request. Includes:
+- HTTP/2 when the h2 package is installed
+- Connection limits and keep-alive tuning per host
+- Request latency histogram and open connection counts per host
+- Reference counting per connection, and a clean shutdown of all clients
+
+Pollers talking to the same host (e.g. several tenants on Epic's public
+endpoint) share one pool, so its connection limit is a limit per host.
+"""
+
+import importlib.util
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Set
+from urllib.parse import urlsplit
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
+# Pool defaults, overridable per connection config
+DEFAULT_MAX_CONNECTIONS = 10
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 5
+DEFAULT_KEEPALIVE_EXPIRY = 60.0  # seconds an idle connection is kept open
+DEFAULT_TIMEOUT = 30.0
+
+# Request latency histogram bucket upper bounds (milliseconds)
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """Request latency histogram with fixed (non-cumulative) buckets."""
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, seconds: float):
+        """Record one request duration."""
+        ms = seconds * 1000
+        index = next((i for i, bound in enumerate(self.buckets_ms) if ms <= bound), len(self.buckets_ms))
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Bucket counts keyed by upper bound, plus count and average."""
+        labels = [f"le_{bound}ms" for bound in self.buckets_ms] + ['gt_%dms' % self.buckets_ms[-1]]
+        return {
+            'buckets': dict(zip(labels, self.counts)),
+            'count': self.count,
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else 0.0,
+        }
+
+
+class PooledHTTPClient:
+    """
+    Long-lived HTTP client for one host.
+
+    The underlying httpx.AsyncClient is created on first use, so pollers in
+    mock mode never open connections.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        timeout: float = DEFAULT_TIMEOUT,
+        http2: bool = True
+    ):
+        """
+        Initialize the pooled client.
+
+        Args:
+            base_url: Any URL on the host; only the origin is used for reporting
+            max_connections: Maximum open connections to the host
+            max_keepalive_connections: Idle connections kept open for reuse
+            keepalive_expiry: Seconds before an idle connection is closed
+            timeout: Request timeout in seconds
+            http2: Use HTTP/2 if the h2 package is installed
+        """
+        self.origin = host_key(base_url)
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.http2 = http2 and HTTP2_AVAILABLE
+
+        self._client = None
+        self.latency = LatencyHistogram()
+        self.metrics = {
+            'requests': 0,
+            'errors': 0,
+            'clients_opened': 0,
+        }
+
+    def _get_client(self):
+        """Create the httpx client on first use."""
+        if self._client is None or self._client.is_closed:
+            if httpx is None:
+                raise ImportError("httpx is required for EHR connections. Install with: pip install httpx")
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+            )
+            self.metrics['clients_opened'] += 1
+            logger.info(f"Opened HTTP pool for {self.origin} (http2={self.http2}, "
+                        f"max_connections={self.max_connections})")
+        return self._client
+
+    async def request(self, method: str, url: str, **kwargs):
+        """Send a request over the pooled connections, recording its latency."""
+        client = self._get_client()
+        start = time.perf_counter()
+        try:
+            return await client.request(method, url, **kwargs)
+        except Exception:
+            self.metrics['errors'] += 1
+            raise
+        finally:
+            self.metrics['requests'] += 1
+            self.latency.observe(time.perf_counter() - start)
+
+    async def get(self, url: str, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs):
+        """
+        Send a request whose body is read incrementally, e.g. a large download.
+
+        The latency recorded is the time to the response headers.
+        """
+        client = self._get_client()
+        start = time.perf_counter()
+        try:
+            async with client.stream(method, url, **kwargs) as response:
+                self.latency.observe(time.perf_counter() - start)
+                yield response
+        except Exception:
+            self.metrics['errors'] += 1
+            raise
+        finally:
+            self.metrics['requests'] += 1
+
+    async def aclose(self):
+        """Close all pooled connections."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info(f"Closed HTTP pool for {self.origin}")
+        self._client = None
+
+    def _connection_counts(self) -> Dict[str, int]:
+        """Open and idle connections, read from the transport's connection pool."""
+        transport = getattr(self._client, '_transport', None)
+        connections = getattr(getattr(transport, '_pool', None), 'connections', None) or []
+        open_connections = [connection for connection in connections if not connection.is_closed()]
+        return {
+            'open_connections': len(open_connections),
+            'idle_connections': sum(1 for connection in open_connections if connection.is_idle()),
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        """Pool configuration, connection counts, metrics and latency histogram."""
+        return {
+            'origin': self.origin,
+            'http2': self.http2,
+            'max_connections': self.max_connections,
+            'max_keepalive_connections': self.max_keepalive_connections,
+            'keepalive_expiry': self.keepalive_expiry,
+            **self._connection_counts(),
+            'metrics': self.metrics.copy(),
+            'latency': self.latency.snapshot(),
+        }
+
+
+class HTTPClientRegistry:
+    """
+    Registry of pooled clients, one per host, shared by the connections using it.
+
+    Connections acquire a client when their poller is created and release it
+    when the poller is removed; the last release closes the pool.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, PooledHTTPClient] = {}
+        self._owners: Dict[str, Set[Any]] = {}
+
+    def acquire(self, owner: Any, base_url: str, **options) -> PooledHTTPClient:
+        """
+        Get the pooled client for base_url's host on behalf of owner.
+
+        Args:
+            owner: Connection ID (or other key) holding the client
+            base_url: URL on the remote host
+            **options: PooledHTTPClient options, applied when the pool is created
+
+        Returns:
+            The shared PooledHTTPClient for the host
+        """
+        key = host_key(base_url)
+        if key not in self._clients:
+            self._clients[key] = PooledHTTPClient(base_url, **options)
+            self._owners[key] = set()
+        self._owners[key].add(owner)
+        return self._clients[key]
+
+    async def release(self, owner: Any):
+        """Drop owner's references and close pools nobody uses any more."""
+        for key in [key for key, owners in self._owners.items() if owner in owners]:
+            self._owners[key].discard(owner)
+            if not self._owners[key]:
+                del self._owners[key]
+                await self._clients.pop(key).aclose()
+
+    async def close_all(self):
+        """Close every pool, e.g. on application shutdown."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        self._owners.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close HTTP pool for {client.origin}: {e}")
+
+    def get_status(self) -> Dict[str, Any]:
+        """Status of every pool."""
+        return {
+            'http2_available': HTTP2_AVAILABLE,
+            'pools': {
+                key: {**client.get_status(), 'owners': len(self._owners.get(key, ()))}
+                for key, client in self._clients.items()
+            },
+        }
+
+
+def host_key(url: str) -> str:
+    """scheme://host[:port] of a URL, the unit of connection pooling."""
+    parts = urlsplit(url or '')
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+# Connection config keys read by pool_options
+POOL_SETTINGS = frozenset({
+    'http_max_connections', 'http_max_keepalive_connections',
+    'http_keepalive_expiry', 'http2',
+})
+
+
+def pool_options(config: Dict[str, Any]) -> Dict[str, Any]:
+    """PooledHTTPClient options from a poller connection config."""
+    return {
+        'max_connections': config.get('http_max_connections', DEFAULT_MAX_CONNECTIONS),
+        'max_keepalive_connections': config.get('http_max_keepalive_connections', DEFAULT_MAX_KEEPALIVE_CONNECTIONS),
+        'keepalive_expiry': config.get('http_keepalive_expiry', DEFAULT_KEEPALIVE_EXPIRY),
+        'http2': config.get('http2', True),
+    }
+
+
+# Global registry instance
+_http_registry: Optional[HTTPClientRegistry] = None
+
+
+def get_http_registry() -> HTTPClientRegistry:
+    """Get or create the global HTTP client registry."""
+    global _http_registry
+    if _http_registry is None:
+        _http_registry = HTTPClientRegistry()
+    return _http_registry
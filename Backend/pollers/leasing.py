@@ -0,0 +1,349 @@
+"""
+Distributed Leasing of EHR Connections
+
+Lets several poller workers (processes or replicas) split the EHR
+connections between them instead of each polling all of them. Includes:
+- Worker heartbeats in poller_workers, used to size each worker's fair share
+- A time-limited lease per connection in poller_leases, renewed every
+  heartbeat and taken over by another worker once it expires
+- Rebalancing: a worker holding more than its share releases the surplus
+  when new workers join, once the pollers of those connections have
+  stopped and never while one of them is syncing
+- Routing: manual sync requests and published poller status live on the
+  lease row, so any API process can reach the worker holding a connection
+
+All timestamps use the database clock (UTC) so workers never compare
+their own, possibly skewed, clocks.
+"""
+
+import json
+import logging
+import math
+import os
+import random
+import socket
+import uuid
+from datetime import timedelta
+from typing import Dict, Any, List, Optional, Iterable, Set
+from uuid import UUID
+
+logger = logging.getLogger(__name__)
+
+try:
+    from sqlalchemy import select, update, delete, func
+    from sqlalchemy.dialects.postgresql import insert
+    from medical_coding_ai.models.ehr_models import PollerLease, PollerWorker
+    LEASING_AVAILABLE = True
+except ImportError as e:
+    logger.warning(f"Lease models not available: {e}. Distributed poller leasing disabled.")
+    LEASING_AVAILABLE = False
+
+# Defaults, overridable through the environment (see scheduler)
+DEFAULT_LEASE_SECONDS = 30
+DEFAULT_HEARTBEAT_SECONDS = 10
+
+
+def db_now():
+    """Current database time as naive UTC, matching the DateTime columns."""
+    return func.timezone('utc', func.now())
+
+
+def fair_share(connection_count: int, worker_count: int) -> int:
+    """Connections each live worker should hold (rounded up)."""
+    return math.ceil(connection_count / max(1, worker_count))
+
+
+def default_worker_id() -> str:
+    """hostname-pid-suffix, unique per process."""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class LeaseManager:
+    """
+    Heartbeats and connection leases for one poller worker.
+
+    A worker calls claim() every heartbeat with the active connection IDs
+    and polls exactly the connections returned. API processes that run no
+    pollers use the same class read-only, for routing.
+    """
+
+    def __init__(
+        self,
+        db_session_factory,
+        worker_id: Optional[str] = None,
+        lease_seconds: int = DEFAULT_LEASE_SECONDS
+    ):
+        """
+        Initialize the lease manager.
+
+        Args:
+            db_session_factory: SQLAlchemy async session factory
+            worker_id: Stable worker name (default hostname-pid-suffix)
+            lease_seconds: Lease lifetime; a crashed worker's connections move after this long
+        """
+        if not LEASING_AVAILABLE:
+            raise ImportError("Distributed poller leasing requires the EHR models and SQLAlchemy")
+        self.db_session_factory = db_session_factory
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.held: Set[UUID] = set()
+        # Leases given up by claim(), deleted by release_surplus() once their pollers stop
+        self.surplus: Set[UUID] = set()
+
+        self.metrics = {
+            'heartbeats': 0,
+            'leases_acquired': 0,
+            'leases_lost': 0,
+            'leases_released': 0,
+            'sync_requests': 0,
+        }
+
+    # =========================================================================
+    # WORKERS
+    # =========================================================================
+
+    def _heartbeat_statement(self):
+        statement = insert(PollerWorker).values(
+            worker_id=self.worker_id,
+            hostname=socket.gethostname(),
+            pid=os.getpid(),
+            started_at=db_now(),
+            heartbeat_at=db_now(),
+        )
+        return statement.on_conflict_do_update(
+            index_elements=[PollerWorker.worker_id],
+            set_={'heartbeat_at': db_now()},
+        )
+
+    def _live_after(self):
+        return db_now() - timedelta(seconds=self.lease_seconds)
+
+    async def heartbeat(self) -> int:
+        """
+        Record this worker as alive and drop workers that stopped heartbeating.
+
+        Returns:
+            Number of live workers, including this one
+        """
+        async with self.db_session_factory() as db:
+            await db.execute(self._heartbeat_statement())
+            await db.execute(delete(PollerWorker).where(PollerWorker.heartbeat_at < self._live_after()))
+            result = await db.execute(select(func.count()).select_from(PollerWorker))
+            await db.commit()
+            self.metrics['heartbeats'] += 1
+            return max(1, result.scalar() or 0)
+
+    # =========================================================================
+    # LEASES
+    # =========================================================================
+
+    def _expires(self):
+        return db_now() + timedelta(seconds=self.lease_seconds)
+
+    def _renew_statement(self, connection_ids: Iterable[UUID]):
+        return (
+            update(PollerLease)
+            .where(PollerLease.worker_id == self.worker_id, PollerLease.connection_id.in_(list(connection_ids)))
+            .values(lease_expires_at=self._expires(), renewed_at=db_now())
+            .returning(PollerLease.connection_id)
+        )
+
+    def _acquire_statement(self, connection_ids: Iterable[UUID]):
+        """Insert leases, or take over expired ones; rows held by live workers are left alone."""
+        statement = insert(PollerLease).values([
+            {
+                'connection_id': connection_id,
+                'worker_id': self.worker_id,
+                'lease_expires_at': self._expires(),
+                'acquired_at': db_now(),
+                'renewed_at': db_now(),
+            }
+            for connection_id in connection_ids
+        ])
+        return statement.on_conflict_do_update(
+            index_elements=[PollerLease.connection_id],
+            set_={
+                'worker_id': statement.excluded.worker_id,
+                'lease_expires_at': statement.excluded.lease_expires_at,
+                'acquired_at': statement.excluded.acquired_at,
+                'renewed_at': statement.excluded.renewed_at,
+                'status': None,
+            },
+            where=PollerLease.lease_expires_at < db_now(),
+        ).returning(PollerLease.connection_id)
+
+    async def claim(self, connection_ids: Iterable[UUID], busy: Iterable[UUID] = ()) -> Set[UUID]:
+        """
+        Renew this worker's leases and take free ones up to its fair share.
+
+        Leases over the fair share are left out of the result and kept in
+        surplus; the caller stops their pollers, then calls release_surplus().
+
+        Args:
+            connection_ids: All active connection IDs
+            busy: Connections with a sync in flight, never released as surplus
+
+        Returns:
+            Connection IDs this worker now holds
+        """
+        connection_ids = set(connection_ids)
+        workers = await self.heartbeat()
+        share = fair_share(len(connection_ids), workers)
+
+        async with self.db_session_factory() as db:
+            held = set()
+            if self.held & connection_ids:
+                result = await db.execute(self._renew_statement(self.held & connection_ids))
+                held = set(result.scalars().all())
+
+            # Busy connections are released on a later heartbeat, once their sync is done
+            excess = len(held) - share
+            surplus = sorted(held - set(busy), key=str)[-excess:] if excess > 0 else []
+            if surplus:
+                held -= set(surplus)
+                logger.info(f"Worker {self.worker_id} releasing {len(surplus)} leases for rebalancing")
+
+            free = await self._free_connections(db, connection_ids - held)
+            wanted = random.sample(free, min(len(free), share - len(held))) if len(held) < share else []
+            if wanted:
+                result = await db.execute(self._acquire_statement(wanted))
+                acquired = set(result.scalars().all())
+                held |= acquired
+                self.metrics['leases_acquired'] += len(acquired)
+
+            await db.commit()
+
+        lost = self.held - held - set(surplus)
+        if lost:
+            self.metrics['leases_lost'] += len(lost)
+            logger.warning(f"Worker {self.worker_id} lost leases for {len(lost)} connections")
+        self.held = held
+        self.surplus = set(surplus)
+        return set(held)
+
+    async def _free_connections(self, db, connection_ids: Set[UUID]) -> List[UUID]:
+        """Connections without a lease, or whose lease has expired."""
+        if not connection_ids:
+            return []
+        result = await db.execute(
+            select(PollerLease.connection_id)
+            .where(PollerLease.connection_id.in_(list(connection_ids)), PollerLease.lease_expires_at >= db_now())
+        )
+        taken = set(result.scalars().all())
+        return sorted(connection_ids - taken, key=str)
+
+    def _release_statement(self, connection_ids: Iterable[UUID]):
+        return delete(PollerLease).where(
+            PollerLease.worker_id == self.worker_id,
+            PollerLease.connection_id.in_(list(connection_ids)),
+        )
+
+    async def release_surplus(self):
+        """Delete the surplus leases of the last claim(), whose pollers have stopped."""
+        if not self.surplus:
+            return
+        async with self.db_session_factory() as db:
+            await db.execute(self._release_statement(self.surplus))
+            await db.commit()
+        self.metrics['leases_released'] += len(self.surplus)
+        self.surplus = set()
+
+    async def release_all(self):
+        """Give up every lease and deregister, e.g. on shutdown, so others take over at once."""
+        async with self.db_session_factory() as db:
+            await db.execute(delete(PollerLease).where(PollerLease.worker_id == self.worker_id))
+            await db.execute(delete(PollerWorker).where(PollerWorker.worker_id == self.worker_id))
+            await db.commit()
+        self.metrics['leases_released'] += len(self.held) + len(self.surplus)
+        self.held = set()
+        self.surplus = set()
+
+    # =========================================================================
+    # ROUTING
+    # =========================================================================
+
+    async def publish_status(self, statuses: Dict[UUID, Dict[str, Any]]):
+        """Store the status of this worker's pollers on their lease rows."""
+        if not statuses:
+            return
+        async with self.db_session_factory() as db:
+            for connection_id, status in statuses.items():
+                await db.execute(
+                    update(PollerLease)
+                    .where(PollerLease.connection_id == connection_id, PollerLease.worker_id == self.worker_id)
+                    .values(status=json.loads(json.dumps(status, default=str)))
+                )
+            await db.commit()
+
+    async def request_sync(self, connection_id: UUID) -> Optional[str]:
+        """
+        Ask the worker holding connection_id to sync it now.
+
+        Returns:
+            The holder's worker ID, or None if no live worker holds the connection
+        """
+        async with self.db_session_factory() as db:
+            result = await db.execute(
+                update(PollerLease)
+                .where(PollerLease.connection_id == connection_id, PollerLease.lease_expires_at >= db_now())
+                .values(sync_requested_at=db_now())
+                .returning(PollerLease.worker_id)
+            )
+            worker_id = result.scalar()
+            await db.commit()
+            return worker_id
+
+    async def take_sync_requests(self) -> List[UUID]:
+        """Pending manual sync requests for this worker's connections (cleared once taken)."""
+        async with self.db_session_factory() as db:
+            result = await db.execute(
+                update(PollerLease)
+                .where(PollerLease.worker_id == self.worker_id, PollerLease.sync_requested_at.isnot(None))
+                .values(sync_requested_at=None)
+                .returning(PollerLease.connection_id)
+            )
+            connection_ids = list(result.scalars().all())
+            await db.commit()
+        self.metrics['sync_requests'] += len(connection_ids)
+        return connection_ids
+
+    async def get_cluster(self) -> Dict[str, Any]:
+        """Live workers and every lease with its holder's published status."""
+        async with self.db_session_factory() as db:
+            workers = (await db.execute(
+                select(PollerWorker).where(PollerWorker.heartbeat_at >= self._live_after())
+            )).scalars().all()
+            leases = (await db.execute(
+                select(PollerLease).where(PollerLease.lease_expires_at >= db_now())
+            )).scalars().all()
+
+        return {
+            'workers': [
+                {
+                    'worker_id': worker.worker_id,
+                    'hostname': worker.hostname,
+                    'pid': worker.pid,
+                    'heartbeat_at': worker.heartbeat_at.isoformat() if worker.heartbeat_at else None,
+                    'leases': sum(1 for lease in leases if lease.worker_id == worker.worker_id),
+                }
+                for worker in workers
+            ],
+            'leases': [
+                {
+                    'connection_id': str(lease.connection_id),
+                    'worker_id': lease.worker_id,
+                    'lease_expires_at': lease.lease_expires_at.isoformat(),
+                    'status': lease.status,
+                }
+                for lease in leases
+            ],
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        """This worker's ID, held leases and metrics."""
+        return {
+            'worker_id': self.worker_id,
+            'lease_seconds': self.lease_seconds,
+            'held_leases': len(self.held),
+            'metrics': self.metrics.copy(),
+        }
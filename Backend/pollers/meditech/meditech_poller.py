@@ -30,6 +30,7 @@ from typing import List, Dict, Any, Optional
 from uuid import UUID
 
 from ..base_poller import BasePoller
+from ..fhir_mapping import FHIRMappers
 
 logger = logging.getLogger(__name__)
 
@@ -58,6 +59,7 @@ class MeditechPoller(BasePoller):
 
         # Meditech can use FHIR or HL7v2
         self.interface_type = config.get('interface_type', 'fhir')  # 'fhir' or 'hl7v2'
+        self.mappers = FHIRMappers()
 
         logger.warning("MeditechPoller is a stub implementation. Real integration not yet available.")
 
@@ -102,7 +104,8 @@ class MeditechPoller(BasePoller):
     async def fetch_conditions(
         self,
         patient_ids: Optional[List[str]] = None,
-        encounter_ids: Optional[List[str]] = None
+        encounter_ids: Optional[List[str]] = None,
+        last_sync: Optional[datetime] = None
     ) -> List[Dict]:
         """Fetch conditions from Meditech."""
         if self.use_mock_data:
@@ -112,7 +115,8 @@ class MeditechPoller(BasePoller):
     async def fetch_procedures(
         self,
         patient_ids: Optional[List[str]] = None,
-        encounter_ids: Optional[List[str]] = None
+        encounter_ids: Optional[List[str]] = None,
+        last_sync: Optional[datetime] = None
     ) -> List[Dict]:
         """Fetch procedures from Meditech."""
         if self.use_mock_data:
@@ -120,20 +124,28 @@ class MeditechPoller(BasePoller):
         raise NotImplementedError("Meditech procedure fetch not implemented")
 
     def transform_patient(self, resource: Dict) -> Dict:
-        """Transform Meditech patient to canonical format."""
-        raise NotImplementedError("Meditech patient transform not implemented")
+        """Transform Meditech Expanse FHIR Patient to canonical format."""
+        return self.mappers.map_patient(resource, self.EHR_TYPE)
 
     def transform_encounter(self, resource: Dict) -> Dict:
-        """Transform Meditech encounter to canonical format."""
-        raise NotImplementedError("Meditech encounter transform not implemented")
+        """Transform Meditech Expanse FHIR Encounter to canonical format."""
+        return self.mappers.map_encounter(resource, self.EHR_TYPE)
 
     def transform_condition(self, resource: Dict) -> Dict:
-        """Transform Meditech condition to canonical format."""
-        raise NotImplementedError("Meditech condition transform not implemented")
+        """Transform Meditech Expanse FHIR Condition to canonical format."""
+        return self.mappers.map_condition(resource, self.EHR_TYPE)
 
     def transform_procedure(self, resource: Dict) -> Dict:
-        """Transform Meditech procedure to canonical format."""
-        raise NotImplementedError("Meditech procedure transform not implemented")
+        """Transform Meditech Expanse FHIR Procedure to canonical format."""
+        return self.mappers.map_procedure(resource, self.EHR_TYPE)
+
+    def transform_batch(self, resource: str, resources: List[Dict]) -> List[Dict]:
+        """Transform a list of FHIR resources of one type with the compiled mappings."""
+        return self.mappers.map_batch(resource, resources, self.EHR_TYPE)
+
+    def mapping_version(self, resource: str) -> str:
+        """Version of the compiled mapping for this resource type."""
+        return self.mappers.version(resource)
 
 
 # ============================================================================
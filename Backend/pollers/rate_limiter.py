@@ -0,0 +1,250 @@
+"""
+Adaptive Rate Limiting for EHR Pollers
+
+One token bucket per EHR host, shared by every poller (tenant) that talks
+to it, so many tenants on the same Epic instance cannot stampede it.
+Includes:
+- AIMD rate control: the rate grows additively while requests succeed and
+  is cut multiplicatively on 429, honouring Retry-After
+- Per-tenant fairness: waiting tenants are served round-robin, one token
+  each, so a large backfill cannot starve a small tenant's sync
+- Rate, throttling and per-tenant grant metrics
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional, Deque
+
+from .http_pool import host_key
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable per connection config
+DEFAULT_RATE = 10.0           # requests/second to start with
+DEFAULT_MIN_RATE = 0.5        # floor after repeated 429s
+DEFAULT_MAX_RATE = 50.0       # ceiling for additive increase
+DEFAULT_BURST = 10            # bucket capacity
+DEFAULT_INCREASE_STEP = 1.0   # requests/second gained per second of successes
+DEFAULT_DECREASE_FACTOR = 0.5 # rate multiplier on 429
+DEFAULT_RETRY_AFTER = 1.0     # pause when a 429 has no Retry-After header
+
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket with AIMD-adjusted refill rate and round-robin tenant fairness.
+
+    acquire() returns immediately while tokens are available and nobody is
+    waiting. Otherwise the caller joins its tenant's queue and a dispatcher
+    hands out tokens as they refill, one tenant at a time in turn.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float = DEFAULT_RATE,
+        burst: int = DEFAULT_BURST,
+        min_rate: float = DEFAULT_MIN_RATE,
+        max_rate: float = DEFAULT_MAX_RATE,
+        increase_step: float = DEFAULT_INCREASE_STEP,
+        decrease_factor: float = DEFAULT_DECREASE_FACTOR
+    ):
+        """
+        Initialize the bucket.
+
+        Args:
+            name: Label for logs and status (the EHR host)
+            rate: Initial refill rate in requests/second
+            burst: Maximum tokens held
+            min_rate: Lowest rate AIMD may decrease to
+            max_rate: Highest rate AIMD may increase to
+            increase_step: Additive increase, in requests/second per second of successes
+            decrease_factor: Multiplicative decrease applied on 429
+        """
+        self.name = name
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.burst = max(1, burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiters: 'OrderedDict[Any, Deque[asyncio.Future]]' = OrderedDict()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self.metrics = {
+            'granted': 0,
+            'waited': 0,
+            'throttled': 0,
+            'rate_increases': 0,
+            'rate_decreases': 0,
+        }
+        self.tenant_grants: Dict[str, int] = {}
+
+    # =========================================================================
+    # TOKENS
+    # =========================================================================
+
+    async def acquire(self, tenant_id: Any = None):
+        """
+        Wait for a request token on behalf of tenant_id.
+
+        Args:
+            tenant_id: Fairness key; tenants waiting at the same time are served in turn
+        """
+        self._refill()
+        if not self._waiters and self._tokens >= 1 and time.monotonic() >= self._blocked_until:
+            self._tokens -= 1
+            self._grant(tenant_id)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(tenant_id, deque()).append(future)
+        self.metrics['waited'] += 1
+        if (self._dispatcher is None or self._dispatcher.done()
+                or self._dispatcher.get_loop() is not asyncio.get_running_loop()):
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._discard(tenant_id, future)
+            raise
+
+    async def _dispatch(self):
+        """Hand out tokens to waiting tenants round-robin until nobody waits."""
+        while self._waiters:
+            self._refill()
+            now = time.monotonic()
+            if now < self._blocked_until:
+                await asyncio.sleep(self._blocked_until - now)
+                continue
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                continue
+
+            # Next tenant in turn gets one token, then goes to the back of the line
+            tenant_id, queue = next(iter(self._waiters.items()))
+            future = queue.popleft()
+            if queue:
+                self._waiters.move_to_end(tenant_id)
+            else:
+                del self._waiters[tenant_id]
+
+            if not future.done():
+                self._tokens -= 1
+                self._grant(tenant_id)
+                future.set_result(None)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _grant(self, tenant_id: Any):
+        self.metrics['granted'] += 1
+        key = str(tenant_id)
+        self.tenant_grants[key] = self.tenant_grants.get(key, 0) + 1
+
+    def _discard(self, tenant_id: Any, future: asyncio.Future):
+        queue = self._waiters.get(tenant_id)
+        if queue and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self._waiters[tenant_id]
+
+    # =========================================================================
+    # AIMD FEEDBACK
+    # =========================================================================
+
+    def on_response(self, status_code: int, retry_after: Optional[float] = None):
+        """
+        Adjust the rate from a response.
+
+        Success adds increase_step/rate, i.e. about increase_step requests/s
+        per second of successful traffic. A 429 multiplies the rate by
+        decrease_factor, empties the bucket and pauses all tenants for
+        Retry-After seconds.
+
+        Args:
+            status_code: HTTP status code
+            retry_after: Seconds from the Retry-After header, if any
+        """
+        if status_code == 429:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = 0.0
+            pause = retry_after if retry_after is not None else DEFAULT_RETRY_AFTER
+            self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+            self.metrics['throttled'] += 1
+            self.metrics['rate_decreases'] += 1
+            logger.warning(f"Rate limited by {self.name}: rate lowered to {self.rate:.2f} req/s, "
+                           f"pausing {pause:.1f}s")
+        elif status_code < 400 and self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.increase_step / self.rate)
+            self.metrics['rate_increases'] += 1
+
+    def get_status(self) -> Dict[str, Any]:
+        """Current rate, tokens, waiting tenants and metrics."""
+        self._refill()
+        return {
+            'name': self.name,
+            'rate': round(self.rate, 3),
+            'burst': self.burst,
+            'tokens': round(self._tokens, 3),
+            'blocked_for_seconds': round(max(0.0, self._blocked_until - time.monotonic()), 3),
+            'waiting_tenants': len(self._waiters),
+            'metrics': self.metrics.copy(),
+            'tenant_grants': self.tenant_grants.copy(),
+        }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After header in seconds; None for a missing or HTTP-date value."""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+# Connection config keys read by limiter_options
+LIMITER_SETTINGS = frozenset({
+    'rate_limit_per_second', 'rate_limit_burst',
+    'rate_limit_min_per_second', 'rate_limit_max_per_second',
+})
+
+
+def limiter_options(config: Dict[str, Any]) -> Dict[str, Any]:
+    """AdaptiveTokenBucket options from a poller connection config."""
+    return {
+        'rate': config.get('rate_limit_per_second', DEFAULT_RATE),
+        'burst': config.get('rate_limit_burst', DEFAULT_BURST),
+        'min_rate': config.get('rate_limit_min_per_second', DEFAULT_MIN_RATE),
+        'max_rate': config.get('rate_limit_max_per_second', DEFAULT_MAX_RATE),
+    }
+
+
+# Global limiters, one per EHR host
+_rate_limiters: Dict[str, AdaptiveTokenBucket] = {}
+
+
+def get_rate_limiter(base_url: str, **options) -> AdaptiveTokenBucket:
+    """
+    Get or create the shared limiter for base_url's host.
+
+    Options only apply when the limiter is created by the first poller for
+    that host.
+    """
+    key = host_key(base_url)
+    if key not in _rate_limiters:
+        _rate_limiters[key] = AdaptiveTokenBucket(key, **options)
+    return _rate_limiters[key]
+
+
+def get_rate_limiter_status() -> Dict[str, Any]:
+    """Status of every limiter."""
+    return {key: limiter.get_status() for key, limiter in _rate_limiters.items()}
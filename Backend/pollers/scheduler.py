@@ -3,9 +3,19 @@ APScheduler Integration for EHR Pollers
 
 Manages scheduling and lifecycle of all EHR pollers.
 Integrates with FastAPI startup/shutdown events.
+
+Where pollers run is set by POLLER_MODE:
+- embedded (default): this process polls every active connection
+- worker: this process polls only the connections it holds a lease for,
+  sharing them with other workers (see leasing.py and worker.py)
+- api: this process polls nothing and routes status and manual sync
+  requests to the workers holding the leases
 """
 
 import logging
+import os
+import random
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
 from uuid import UUID
 
@@ -13,8 +23,26 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.jobstores.memory import MemoryJobStore
 
+from .base_poller import POLLER_SETTINGS
+from .http_pool import get_http_registry
+from .leasing import LeaseManager, DEFAULT_LEASE_SECONDS, DEFAULT_HEARTBEAT_SECONDS
+from .rate_limiter import get_rate_limiter_status
+
 logger = logging.getLogger(__name__)
 
+POLLER_MODES = ('embedded', 'worker', 'api')
+POLLER_MODE = os.getenv('POLLER_MODE', 'embedded')
+LEASE_SECONDS = int(os.getenv('POLLER_LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+HEARTBEAT_SECONDS = int(os.getenv('POLLER_HEARTBEAT_SECONDS', DEFAULT_HEARTBEAT_SECONDS))
+LEASE_JOB_ID = 'poller_leases'
+
+# Mode of this process, set by start_pollers
+poller_mode = POLLER_MODE
+
+# Connection leases (worker and api modes)
+_lease_manager: Optional[LeaseManager] = None
+_last_claim_at: Optional[datetime] = None
+
 # Global scheduler instance
 scheduler: Optional[AsyncIOScheduler] = None
 
@@ -39,7 +67,7 @@ def get_scheduler() -> AsyncIOScheduler:
     return scheduler
 
 
-async def start_pollers(db_session_factory=None):
+async def start_pollers(db_session_factory=None, mode: Optional[str] = None):
     """
     Start all configured EHR pollers.
 
@@ -47,27 +75,57 @@ async def start_pollers(db_session_factory=None):
 
     Args:
         db_session_factory: SQLAlchemy async session factory for database access
+        mode: 'embedded', 'worker' or 'api' (default: POLLER_MODE environment variable)
     """
-    global active_pollers, _db_session_factory
+    global active_pollers, _db_session_factory, poller_mode, _lease_manager
 
-    logger.info("Starting EHR poller scheduler...")
+    poller_mode = mode or POLLER_MODE
+    if poller_mode not in POLLER_MODES:
+        raise ValueError(f"Unknown poller mode '{poller_mode}', expected one of {POLLER_MODES}")
+
+    logger.info(f"Starting EHR poller scheduler (mode={poller_mode})...")
 
     # Store db_session_factory globally for later use (trigger_sync, reload_connections)
     if db_session_factory:
         _db_session_factory = db_session_factory
 
-    sched = get_scheduler()
+    if poller_mode != 'embedded':
+        if not db_session_factory:
+            logger.error(f"Poller mode '{poller_mode}' needs a database for leases - no pollers started")
+            return
+        _lease_manager = LeaseManager(
+            db_session_factory,
+            worker_id=os.getenv('POLLER_WORKER_ID'),
+            lease_seconds=LEASE_SECONDS,
+        )
 
-    try:
-        # Get all active EHR connections from database
-        connections = await _get_active_connections(db_session_factory)
+    if poller_mode == 'api':
+        logger.info("Pollers run in separate workers; this process only routes to them")
+        return
 
-        if not connections:
-            logger.info("No active EHR connections found - scheduler will start but no pollers registered")
-            logger.info("Create an EHR connection via Admin > EHR Connections to start polling")
+    sched = get_scheduler()
 
-        for conn in connections:
-            await _register_poller(conn, db_session_factory)
+    try:
+        if poller_mode == 'worker':
+            # Claim a share of the connections now, then renew every heartbeat
+            await _lease_cycle()
+            sched.add_job(
+                _lease_cycle,
+                trigger=IntervalTrigger(seconds=HEARTBEAT_SECONDS),
+                id=LEASE_JOB_ID,
+                name="Poller lease heartbeat",
+                replace_existing=True,
+            )
+        else:
+            # Get all active EHR connections from database
+            connections = await _get_active_connections(db_session_factory)
+
+            if not connections:
+                logger.info("No active EHR connections found - scheduler will start but no pollers registered")
+                logger.info("Create an EHR connection via Admin > EHR Connections to start polling")
+
+            for conn in connections:
+                await _register_poller(conn, db_session_factory)
 
         # Start the scheduler
         if not sched.running:
@@ -84,7 +142,7 @@ async def stop_pollers():
 
     This should be called from FastAPI's shutdown event.
     """
-    global scheduler, active_pollers
+    global scheduler, active_pollers, _lease_manager
 
     logger.info("Stopping EHR poller scheduler...")
 
@@ -92,11 +150,24 @@ async def stop_pollers():
         scheduler.shutdown(wait=False)
         logger.info("Scheduler stopped")
 
-    # Stop all active pollers
+    # Stop all active pollers and let their syncs unwind before the leases and pools go
     for poller in active_pollers.values():
         poller.stop()
+    for poller in active_pollers.values():
+        await poller.wait_stopped()
 
     active_pollers.clear()
+
+    # Hand our connections to the other workers straight away
+    if _lease_manager and poller_mode == 'worker':
+        try:
+            await _lease_manager.release_all()
+        except Exception as e:
+            logger.warning(f"Failed to release poller leases: {e}")
+    _lease_manager = None
+
+    # Close pooled HTTP connections (EHR and clearinghouse)
+    await get_http_registry().close_all()
     logger.info("All pollers stopped")
 
 
@@ -122,15 +193,7 @@ async def _register_poller(connection: Dict, db_session_factory=None):
         return
 
     # Create poller instance
-    config = {
-        'base_url': connection.get('base_url'),
-        'client_id': connection.get('client_id'),
-        'client_secret': connection.get('client_secret'),
-        'private_key': connection.get('private_key'),
-        'poll_interval_seconds': poll_interval,
-        'use_mock_data': connection.get('use_mock_data', True),
-    }
-
+    config = _poller_config(connection)
     poller = poller_class(
         connection_id=connection_id,
         tenant_id=tenant_id,
@@ -144,7 +207,7 @@ async def _register_poller(connection: Dict, db_session_factory=None):
 
     sched.add_job(
         poller.sync_cycle,
-        trigger=IntervalTrigger(seconds=poll_interval),
+        trigger=_poll_trigger(poll_interval, config.get('poll_jitter_seconds')),
         id=job_id,
         name=f"{ehr_type.capitalize()} Sync - {connection_id}",
         replace_existing=True,
@@ -159,6 +222,96 @@ async def _register_poller(connection: Dict, db_session_factory=None):
     )
 
 
+async def _lease_cycle():
+    """
+    Renew and claim connection leases, then start and stop pollers to match.
+
+    Runs every HEARTBEAT_SECONDS in worker mode. Also starts syncs requested
+    through trigger_sync on other processes.
+    """
+    global _last_claim_at
+
+    try:
+        connections = {conn['connection_id']: conn for conn in await _get_active_connections(_db_session_factory)}
+        busy = {cid for cid, poller in active_pollers.items() if poller.is_syncing}
+        held = await _lease_manager.claim(connections, busy)
+        _last_claim_at = datetime.now(timezone.utc)
+    except Exception as e:
+        logger.error(f"Poller lease cycle failed: {e}", exc_info=True)
+        # Without renewals our leases expire and another worker takes over; stop before that
+        if _last_claim_at and datetime.now(timezone.utc) - _last_claim_at > timedelta(seconds=LEASE_SECONDS):
+            for connection_id in list(active_pollers):
+                await remove_poller(connection_id)
+        return
+
+    # A lost lease may already be held elsewhere: remove_poller cancels the sync in flight
+    for connection_id in [cid for cid in active_pollers if cid not in held]:
+        await remove_poller(connection_id)
+        logger.info(f"Stopped polling connection {connection_id}: lease released or lost")
+
+    try:
+        # Only now that their pollers have stopped can other workers take the surplus
+        await _lease_manager.release_surplus()
+    except Exception as e:
+        logger.warning(f"Failed to release surplus poller leases: {e}")
+
+    for connection_id in held - active_pollers.keys():
+        await _register_poller(connections[connection_id], _db_session_factory)
+
+    try:
+        await _lease_manager.publish_status({cid: poller.get_status() for cid, poller in active_pollers.items()})
+        for connection_id in await _lease_manager.take_sync_requests():
+            if connection_id in active_pollers:
+                logger.info(f"Running requested sync for connection {connection_id}")
+                get_scheduler().modify_job(f"ehr_sync_{connection_id}", next_run_time=datetime.now(timezone.utc))
+    except Exception as e:
+        logger.warning(f"Failed to publish poller status or take sync requests: {e}")
+
+
+def _poller_config(connection: Dict) -> Dict:
+    """
+    Poller config for a connection: its poller_settings, then its own columns.
+
+    Keys of poller_settings outside POLLER_SETTINGS are ignored.
+    """
+    settings = connection.get('poller_settings') or {}
+    unknown = sorted(set(settings) - POLLER_SETTINGS)
+    if unknown:
+        logger.warning(f"Ignoring unknown poller settings for connection {connection['connection_id']}: {unknown}")
+
+    config = {key: value for key, value in settings.items() if key in POLLER_SETTINGS}
+    config.update({
+        'base_url': connection.get('base_url'),
+        'client_id': connection.get('client_id'),
+        'client_secret': connection.get('client_secret'),
+        'private_key': connection.get('private_key'),
+        'poll_interval_seconds': connection.get('poll_interval_seconds', 30),
+        'use_mock_data': connection.get('use_mock_data', True),
+    })
+    return config
+
+
+def _poll_trigger(poll_interval: int, jitter: Optional[float] = None) -> IntervalTrigger:
+    """
+    Interval trigger with a random first run and per-run jitter.
+
+    Pollers registered together at startup would otherwise all fire on the
+    same second and hit shared EHR hosts in bursts.
+
+    Args:
+        poll_interval: Seconds between syncs
+        jitter: Maximum random delay added to each run (default 10% of the interval, at least 1s)
+    """
+    if jitter is None:
+        jitter = max(1, poll_interval // 10)
+    offset = timedelta(seconds=random.uniform(0, poll_interval))
+    return IntervalTrigger(
+        seconds=poll_interval,
+        jitter=jitter,
+        start_date=datetime.now(timezone.utc) + offset,
+    )
+
+
 def _get_poller_class(ehr_type: str):
     """
     Get the poller class for an EHR type.
@@ -220,6 +373,7 @@ async def _get_active_connections(db_session_factory=None) -> List[Dict]:
                             'private_key': conn.private_key,
                             'poll_interval_seconds': conn.poll_interval_seconds or 30,
                             'use_mock_data': conn.use_mock_data if conn.use_mock_data is not None else True,
+                            'poller_settings': conn.poller_settings or {},
                             'is_active': conn.is_active,
                         }
                         for conn in connections
@@ -258,6 +412,19 @@ async def trigger_sync(connection_id: UUID) -> Dict:
     """
     global active_pollers
 
+    if connection_id not in active_pollers and _lease_manager:
+        # Another worker polls this connection; it picks the request up on its next heartbeat
+        worker_id = await _lease_manager.request_sync(connection_id)
+        if worker_id:
+            logger.info(f"Queued manual sync for connection {connection_id} on worker {worker_id}")
+            return {
+                'success': True,
+                'queued': True,
+                'message': f'Sync queued on poller worker {worker_id}',
+                'connection_id': str(connection_id),
+                'worker_id': worker_id,
+            }
+
     if connection_id not in active_pollers:
         logger.warning(f"No active poller for connection {connection_id}")
         return {
@@ -310,6 +477,21 @@ async def reload_connections(db_session_factory=None) -> Dict:
     if not factory:
         return {'success': False, 'error': 'No database session factory available'}
 
+    if poller_mode == 'api':
+        # Workers pick up new and removed connections on their next heartbeat
+        return {'success': True, 'mode': poller_mode, 'active_pollers': 0, 'added': 0, 'removed': 0}
+
+    if poller_mode == 'worker' and _lease_manager:
+        before = set(active_pollers)
+        await _lease_cycle()
+        return {
+            'success': True,
+            'mode': poller_mode,
+            'active_pollers': len(active_pollers),
+            'added': len(set(active_pollers) - before),
+            'removed': len(before - set(active_pollers)),
+        }
+
     try:
         # Get current connections from database
         connections = await _get_active_connections(factory)
@@ -362,6 +544,9 @@ async def remove_poller(connection_id: UUID) -> bool:
     """
     Remove a poller for an EHR connection.
 
+    Its scheduled job is removed and a sync in flight is cancelled and
+    awaited before the connection's HTTP pool is released.
+
     Args:
         connection_id: UUID of the connection
 
@@ -372,14 +557,17 @@ async def remove_poller(connection_id: UUID) -> bool:
 
     if connection_id in active_pollers:
         poller = active_pollers[connection_id]
-        poller.stop()
 
         # Remove from scheduler
         sched = get_scheduler()
         job_id = f"ehr_sync_{connection_id}"
         sched.remove_job(job_id)
 
+        poller.stop()
+        await poller.wait_stopped()
+
         del active_pollers[connection_id]
+        await get_http_registry().release(connection_id)
         logger.info(f"Removed poller for connection {connection_id}")
         return True
 
@@ -402,7 +590,44 @@ def get_poller_status(connection_id: Optional[UUID] = None) -> Dict:
         return {'error': 'Poller not found'}
 
     return {
+        'mode': poller_mode,
         'scheduler_running': scheduler.running if scheduler else False,
         'active_pollers': len(active_pollers),
-        'pollers': [p.get_status() for p in active_pollers.values()]
+        'pollers': [p.get_status() for p in active_pollers.values()],
+        'http_pools': get_http_registry().get_status(),
+        'rate_limiters': get_rate_limiter_status(),
+        'lease': _lease_manager.get_status() if _lease_manager else None,
+    }
+
+
+async def get_cluster_status(connection_id: Optional[UUID] = None) -> Dict:
+    """
+    Get status of poller(s) across all workers.
+
+    Without leasing this is get_poller_status(). With leasing, pollers run on
+    whichever worker holds their lease, so their status is read from the
+    lease table, where each worker publishes it every heartbeat.
+
+    Args:
+        connection_id: Optional specific connection ID, or None for all
+
+    Returns:
+        Status dict
+    """
+    if not _lease_manager or (connection_id and connection_id in active_pollers):
+        return get_poller_status(connection_id)
+
+    cluster = await _lease_manager.get_cluster()
+    if connection_id:
+        for lease in cluster['leases']:
+            if lease['connection_id'] == str(connection_id):
+                return {**(lease['status'] or {}), 'worker_id': lease['worker_id']}
+        return {'error': 'Poller not found'}
+
+    local = get_poller_status()
+    return {
+        **local,
+        'active_pollers': len(cluster['leases']),
+        'pollers': [{**(lease['status'] or {}), 'worker_id': lease['worker_id']} for lease in cluster['leases']],
+        'workers': cluster['workers'],
     }
@@ -0,0 +1,53 @@
+"""
+Standalone EHR Poller Worker
+
+Runs EHR pollers outside the API process. Start as many workers as needed;
+they split the active connections between them through leases in the
+database and take over a stopped worker's connections once its leases
+expire. Run the API processes with POLLER_MODE=api so they route to the
+workers instead of polling themselves.
+
+Usage (from Backend/):
+    POLLER_WORKER_ID=poller-1 python -m pollers.worker
+
+Environment:
+    POLLER_WORKER_ID: Worker name shown in status (default hostname-pid-suffix)
+    POLLER_LEASE_SECONDS: Lease lifetime, i.e. failover delay (default 30)
+    POLLER_HEARTBEAT_SECONDS: Lease renewal interval (default 10)
+"""
+
+import asyncio
+import logging
+import signal
+
+from .scheduler import start_pollers, stop_pollers
+
+logger = logging.getLogger(__name__)
+
+
+async def run_worker():
+    """Poll leased connections until SIGINT or SIGTERM."""
+    from medical_coding_ai.utils.db import AsyncSessionLocal
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except NotImplementedError:
+            # Windows: KeyboardInterrupt still stops the worker
+            pass
+
+    await start_pollers(db_session_factory=AsyncSessionLocal, mode='worker')
+    try:
+        await stopping.wait()
+    finally:
+        await stop_pollers()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    try:
+        asyncio.run(run_worker())
+    except KeyboardInterrupt:
+        pass
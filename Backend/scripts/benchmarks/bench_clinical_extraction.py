@@ -0,0 +1,97 @@
+"""
+Benchmark: shared clinical extraction vs. per-consumer full scans
+
+Extracts the text of the sample physician reports (../sample-data/*.pdf, or
+--pdf), optionally repeated --scale times into one document, and reports:
+
+- upload: DocumentProcessor's extraction, every rule scanned over the whole
+  text as the original methods did, vs. the anchored engine (which now also
+  covers the agents and the analysis plan)
+- analysis: what the ICD-10, CPT and HCPCS agents and the analysis plan
+  rescanned on every run, vs. reusing the extraction cached on the
+  processed document
+
+Outputs of both modes are compared, so the run fails if they ever differ.
+
+Usage (from Backend/):
+    python scripts/benchmarks/bench_clinical_extraction.py
+    python scripts/benchmarks/bench_clinical_extraction.py --scale 20 --repeat 5
+"""
+import argparse
+import glob
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+from medical_coding_ai.utils import clinical_extraction as ce
+from medical_coding_ai.utils.document_processor import DocumentProcessor
+
+
+def processor_scan(text):
+    """DocumentProcessor's share of the original extraction"""
+    index = ce.TextIndex(text, anchored=False)
+    return (ce.split_sections(index), ce.extract_demographics(index),
+            ce.extract_vital_signs(index), ce.extract_document_lists(index))
+
+
+def agents_scan(text):
+    """The agents' and analysis plan's share, rescanned on every analysis"""
+    return (ce.extract_icd10_entities(ce.TextIndex(text, anchored=False)),
+            ce.extract_cpt_entities(ce.TextIndex(text, anchored=False)),
+            ce.extract_hcpcs_entities(ce.TextIndex(text, anchored=False)),
+            ce.find_indicators(ce.TextIndex(text, anchored=False)))
+
+
+def best_ms(fn, repeat):
+    """Best time over repeat runs, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shared clinical extraction")
+    parser.add_argument('--pdf', nargs='*', help='Reports to extract (default: ../sample-data/*.pdf)')
+    parser.add_argument('--scale', type=int, default=1, help='Copies of each report per document')
+    parser.add_argument('--repeat', type=int, default=10, help='Timed runs (best is reported)')
+    args = parser.parse_args()
+
+    paths = args.pdf or sorted(glob.glob('../sample-data/*.pdf'))
+    if not paths:
+        parser.error("No reports found; pass --pdf")
+
+    processor = DocumentProcessor()
+
+    print("=" * 96)
+    print(f"Clinical extraction benchmark: {len(paths)} reports x{args.scale}, best of {args.repeat}")
+    print("=" * 96)
+    print(f"{'report':<36}{'KB':>6}{'upload scan ms':>16}{'engine ms':>11}"
+          f"{'analysis scan ms':>18}{'reuse ms':>10}")
+
+    for path in paths:
+        with open(path, 'rb') as f:
+            text = processor.extract_text_from_pdf(f)
+        text = '\n'.join([text] * args.scale)
+
+        if ce.extract_clinical_entities(text) != ce.extract_clinical_entities(text, anchored=False):
+            sys.exit(f"Anchored extraction differs from the full scan for {path}")
+
+        extractor = ce.ClinicalExtractor(cache_size=0)
+        cached = ce.extract_clinical_entities(text)
+
+        upload_scan = best_ms(lambda: processor_scan(text), args.repeat)
+        engine = best_ms(lambda: ce.extract_clinical_entities(text), args.repeat)
+        analysis_scan = best_ms(lambda: agents_scan(text), args.repeat)
+        reuse = best_ms(lambda: extractor.extract(text, cached), args.repeat)
+
+        name = path.rsplit('/', 1)[-1][:34]
+        print(f"{name:<36}{len(text.encode('utf-8')) / 1024:>6.0f}{upload_scan:>16.2f}{engine:>11.2f}"
+              f"{analysis_scan:>18.2f}{reuse:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: CodeSearcher.search latency, legacy full scan vs. inverted index
+
+Builds a synthetic corpus (default 100k codes) and reports p50/p99 latency for
+a mix of code, prefix, keyword and multi-word queries.
+
+Usage (from Backend/):
+    python scripts/benchmarks/bench_code_search.py --codes 100000 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, '.')
+sys.path.insert(0, os.path.join('.', 'tests'))
+
+from medical_coding_ai.utils.code_searcher import CodeSearcher
+from test_code_search_index import brute_force_search, make_synthetic_codes
+
+QUERIES = [
+    "E11.9", "e1", "11.4", "99213", "L30",
+    "diabetes", "diab", "kidney disease", "knee joint left",
+    "type 2 diabetes mellitus with complications", "office visit established patient",
+    "hypertension", "oxygen supply", "zzzz",
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def time_queries(search_fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        for query in QUERIES:
+            start = time.perf_counter()
+            search_fn(query)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark code search latency")
+    parser.add_argument('--codes', type=int, default=100000, help='Number of synthetic codes')
+    parser.add_argument('--repeat', type=int, default=5, help='Passes over the query mix')
+    parser.add_argument('--skip-legacy', action='store_true', help='Only time the index')
+    args = parser.parse_args()
+
+    searcher = CodeSearcher()
+    codes = make_synthetic_codes(args.codes)
+    searcher.icd10_codes = codes["icd10"]
+    searcher.cpt_codes = codes["cpt"]
+    searcher.hcpcs_codes = codes["hcpcs"]
+
+    start = time.perf_counter()
+    searcher._get_index()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print("=" * 80)
+    print(f"Code search benchmark: {args.codes} codes, {len(QUERIES)} queries x {args.repeat}")
+    print("=" * 80)
+    print(f"Index build: {build_ms:.0f} ms")
+
+    rows = [("index", time_queries(searcher.search, args.repeat))]
+    if not args.skip_legacy:
+        rows.append(("legacy scan", time_queries(lambda q: brute_force_search(searcher, q), args.repeat)))
+
+    for name, samples in rows:
+        print(f"{name:<12} p50={percentile(samples, 50):8.2f} ms  "
+              f"p99={percentile(samples, 99):8.2f} ms  mean={statistics.mean(samples):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
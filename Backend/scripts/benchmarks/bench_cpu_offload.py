@@ -0,0 +1,140 @@
+"""
+Load test: API latency of other endpoints while documents are being processed
+
+Serves a small app with the real document processing job and a trivial
+/ping endpoint, keeps --uploads documents in flight at once, and pings every
+--ping-interval seconds meanwhile. Reports ping latency with documents
+processed inline on the event loop (as before) and through the CPU executor.
+
+Documents are a synthetic clinical note repeated to --note-kb, or the PDF
+given with --pdf.
+
+Usage (from Backend/):
+    python scripts/benchmarks/bench_cpu_offload.py --uploads 8 --rounds 3
+    python scripts/benchmarks/bench_cpu_offload.py --pdf "../sample-data/Sample Physician Summary Report 1.pdf"
+"""
+import argparse
+import asyncio
+import sys
+import threading
+import time
+
+sys.path.insert(0, '.')
+
+import httpx
+from fastapi import FastAPI, Request
+
+from medical_coding_ai.utils.cpu_executor import CPUExecutor
+from medical_coding_ai.utils.document_processor import process_document_job
+
+NOTE = """Patient Name: John Smith
+DOB: 01/02/1960  MRN: 12345678  Phone: (555) 123-4567
+Address: 123 Main Street, Springfield, IL 62701
+Chief Complaint: Chest pain and shortness of breath for two days.
+History of Present Illness: 64 year old male with hypertension, type 2 diabetes mellitus
+and hyperlipidemia presents with substernal chest pain radiating to the left arm.
+Medications: Metformin 500 mg twice daily, Lisinopril 10 mg daily, Atorvastatin 40 mg.
+Allergies: Penicillin, sulfa drugs.
+Vital Signs: BP 150/95, HR 98, RR 20, Temp 98.6 F, SpO2 95%.
+Assessment: Acute coronary syndrome, rule out myocardial infarction. Diabetes mellitus.
+Plan: Cardiac catheterization, echocardiogram, ECG, troponin every 6 hours.
+Procedures: Electrocardiogram performed. Chest x-ray performed.
+
+"""
+
+
+def build_app(executor):
+    app = FastAPI()
+
+    @app.get('/ping')
+    async def ping():
+        return {'ok': True}
+
+    @app.post('/upload')
+    async def upload(request: Request):
+        content = await request.body()
+        filename = request.headers['x-filename']
+        if executor is None:
+            text, _ = process_document_job(content, filename)
+        else:
+            text, _ = await executor.run(process_document_job, content, filename)
+        return {'text_length': len(text)}
+
+    return app
+
+
+async def measure(app, content, filename, uploads, rounds, ping_interval):
+    """Ping latencies (ms) and upload wall time (s) with uploads in flight"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=600) as client:
+        async def upload():
+            response = await client.post('/upload', content=content, headers={'x-filename': filename})
+            response.raise_for_status()
+
+        def pinger(loop, done, latencies):
+            # Pings are sent from another thread on a fixed schedule, so time
+            # spent waiting for a blocked event loop counts towards latency
+            while not done.is_set():
+                start = time.perf_counter()
+                asyncio.run_coroutine_threadsafe(client.get('/ping'), loop).result()
+                latencies.append((time.perf_counter() - start) * 1000)
+                time.sleep(ping_interval)
+
+        await upload()  # warm up (worker start-up, regex compilation)
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(rounds):
+            done = threading.Event()
+            pings = threading.Thread(target=pinger, args=(asyncio.get_running_loop(), done, latencies))
+            pings.start()
+            await asyncio.gather(*(upload() for _ in range(uploads)))
+            done.set()
+            await asyncio.to_thread(pings.join)
+        return latencies, time.perf_counter() - start
+
+
+def report(label, latencies, elapsed, documents):
+    latencies = sorted(latencies)
+    p50, p95 = (latencies[int((len(latencies) - 1) * q)] for q in (0.5, 0.95))
+    print(f"{label:<10}{len(latencies):>8}{p50:>10.1f}{p95:>10.1f}"
+          f"{latencies[-1]:>10.1f}{documents / elapsed:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API latency while documents are processed")
+    parser.add_argument('--uploads', type=int, default=8, help='Documents in flight at once')
+    parser.add_argument('--rounds', type=int, default=3, help='Batches of concurrent uploads')
+    parser.add_argument('--note-kb', type=int, default=256, help='Size of the synthetic note (KB)')
+    parser.add_argument('--pdf', help='Upload this PDF instead of the synthetic note')
+    parser.add_argument('--workers', type=int, default=0, help='Executor worker processes (0 = one per CPU)')
+    parser.add_argument('--ping-interval', type=float, default=0.01, help='Seconds between pings')
+    args = parser.parse_args()
+
+    if args.pdf:
+        with open(args.pdf, 'rb') as f:
+            content, filename = f.read(), 'document.pdf'
+    else:
+        content = (NOTE * (args.note_kb * 1024 // len(NOTE) + 1)).encode('utf-8')
+        filename = 'document.txt'
+
+    executor = CPUExecutor(workers=args.workers, max_queue=args.uploads)
+    documents = args.uploads * args.rounds
+
+    print("=" * 80)
+    print(f"CPU offload load test: {documents} documents of {len(content) / 1024:.0f} KB, "
+          f"{args.uploads} in flight, {executor.workers} workers")
+    print("=" * 80)
+    print(f"{'mode':<10}{'pings':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'docs/s':>12}")
+
+    try:
+        for label, mode in (('inline', None), ('executor', executor)):
+            latencies, elapsed = asyncio.run(
+                measure(build_app(mode), content, filename, args.uploads, args.rounds, args.ping_interval)
+            )
+            report(label, latencies, elapsed, documents)
+    finally:
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Benchmark: shared embedding service vs. per-component models
+
+Measures the two things utils/embedding_service.py changes:
+
+- memory: resident set size after loading one model per component (the old
+  behaviour: each VectorStore / knowledge base manager / PDF processor held
+  its own SentenceTransformer) vs. one shared service
+- query throughput: concurrent single-query encodes issued directly to the
+  model vs. through the service's micro-batcher, with and without repeated
+  queries hitting the LRU cache
+
+By default the model is simulated: each encode call costs a fixed overhead
+plus a per-text cost on a single compute lock (like a CPU-bound forward pass),
+and each model copy allocates --model-mb of weights. Pass --live to load the
+real model (needs sentence-transformers), optionally with --backend onnx.
+
+Usage (from Backend/):
+    python scripts/benchmarks/bench_embeddings.py
+    python scripts/benchmarks/bench_embeddings.py --live --backend onnx --onnx-file onnx/model_qint8_avx2.onnx
+"""
+import argparse
+import gc
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import psutil
+
+sys.path.insert(0, '.')
+
+from medical_coding_ai.utils.embedding_service import DEFAULT_EMBEDDING_MODEL, EmbeddingService
+
+DIMENSION = 384
+
+
+class SimulatedModel:
+    """Encode cost = call overhead + per-text cost, serialized like a CPU forward pass"""
+
+    compute_lock = threading.Lock()
+
+    def __init__(self, model_mb, call_overhead_ms, per_text_ms):
+        # Touch every page so the weights count towards RSS
+        self.weights = np.ones(int(model_mb * 1e6 / 4), dtype='float32')
+        self.call_overhead = call_overhead_ms / 1000
+        self.per_text = per_text_ms / 1000
+
+    def encode(self, texts, **kwargs):
+        with self.compute_lock:
+            time.sleep(self.call_overhead + self.per_text * len(texts))
+        rng = np.random.default_rng(abs(hash(tuple(texts))) % (2 ** 32))
+        return rng.standard_normal((len(texts), DIMENSION)).astype('float32')
+
+
+def model_loader(args):
+    if args.live:
+        def load():
+            service = EmbeddingService(args.model, backend=args.backend, onnx_file_name=args.onnx_file)
+            return service.model
+        return load
+    return lambda: SimulatedModel(args.model_mb, args.call_overhead_ms, args.per_text_ms)
+
+
+def rss_mb():
+    return psutil.Process().memory_info().rss / 1e6
+
+
+def measure_memory(loader, copies):
+    gc.collect()
+    baseline = rss_mb()
+    models = [loader() for _ in range(copies)]
+    per_component = rss_mb() - baseline
+    del models
+    gc.collect()
+
+    baseline = rss_mb()
+    shared = EmbeddingService(loader=loader)
+    shared.is_available()
+    shared_mb = rss_mb() - baseline
+    return per_component, shared_mb
+
+
+def query_texts(n_queries, distinct):
+    return [f"patient presents with condition {i % distinct} and follow-up visit" for i in range(n_queries)]
+
+
+def run_direct(model, texts, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda text: model.encode([text]), texts))
+    return len(texts) / (time.perf_counter() - start)
+
+
+def run_service(service, texts, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(service.encode_query, texts))
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared embedding service")
+    parser.add_argument('--copies', type=int, default=6,
+                        help='Model copies in the per-component setup (3 agent stores, 2 KB managers, PDF processor)')
+    parser.add_argument('--queries', type=int, default=600, help='Query encodes per run')
+    parser.add_argument('--threads', type=int, default=12, help='Concurrent callers')
+    parser.add_argument('--distinct', type=int, default=150, help='Distinct query texts in the cached run')
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--model-mb', type=float, default=90.0, help='Simulated model size')
+    parser.add_argument('--call-overhead-ms', type=float, default=4.0, help='Simulated fixed cost per encode call')
+    parser.add_argument('--per-text-ms', type=float, default=0.4, help='Simulated cost per text')
+    parser.add_argument('--live', action='store_true', help='Load the real sentence-transformers model')
+    parser.add_argument('--model', default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument('--backend', default='torch', choices=['torch', 'onnx'])
+    parser.add_argument('--onnx-file', default=None, help='ONNX export for --backend onnx')
+    args = parser.parse_args()
+
+    loader = model_loader(args)
+    mode = f"live {args.model} ({args.backend})" if args.live else "simulated model"
+
+    print("=" * 72)
+    print(f"Embedding service benchmark: {mode}, {args.threads} callers, {args.queries} queries")
+    print("=" * 72)
+
+    per_component_mb, shared_mb = measure_memory(loader, args.copies)
+    print("\nResident memory")
+    print(f"  {args.copies} per-component models: {per_component_mb:>8.1f} MB")
+    print(f"  one shared service:       {shared_mb:>8.1f} MB")
+
+    model = loader()
+    unique = query_texts(args.queries, args.queries)
+    repeated = query_texts(args.queries, args.distinct)
+
+    def service(cache_size):
+        return EmbeddingService(loader=lambda: model, max_batch_size=args.max_batch_size,
+                                max_wait_ms=args.max_wait_ms, cache_size=cache_size)
+
+    print("\nQuery throughput (queries/s)")
+    direct_qps = run_direct(model, unique, args.threads)
+    print(f"  direct model.encode per call:          {direct_qps:>8.1f}")
+
+    batched = service(cache_size=0)
+    batched_qps = run_service(batched, unique, args.threads)
+    status = batched.get_status()
+    print(f"  micro-batched service:                 {batched_qps:>8.1f}  "
+          f"(avg batch {status['avg_batch_size']:.1f}, {status['metrics']['batches']} model calls)")
+
+    cached = service(cache_size=4096)
+    cached_qps = run_service(cached, repeated, args.threads)
+    status = cached.get_status()
+    print(f"  micro-batched + cache ({args.distinct} distinct):   {cached_qps:>8.1f}  "
+          f"(hit rate {status['cache_hit_rate']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: streaming exports vs. the original pandas/BytesIO exports
+
+Generates --rows session code rows and writes them with the original export
+code (pandas DataFrame, then to_csv / to_excel into a BytesIO) and with the
+streaming writers (utils/export_stream.py), fed in EXPORT_BATCH_ROWS batches
+as a server-side cursor would. Reports time, output size and peak traced
+memory for each; the streamed CSV is compared with pandas' output.
+
+Usage (from Backend/):
+    python scripts/benchmarks/bench_export_stream.py
+    python scripts/benchmarks/bench_export_stream.py --rows 100000 --formats xlsx
+"""
+import argparse
+import asyncio
+import hashlib
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+import pandas as pd
+
+sys.path.insert(0, '.')
+
+from medical_coding_ai.utils.export_stream import (
+    EXPORT_BATCH_ROWS, SESSION_EXPORT_FIELDS, csv_chunks, ndjson_chunks, xlsx_chunks
+)
+
+
+def make_row(i):
+    return {
+        'Session': f"6f1c2d3e-0000-4000-8000-{i // 5:012d}",
+        'Created': '2026-01-05T09:30:00',
+        'Sno': i % 5 + 1,
+        'Code': f"M{i % 100:02d}.{i % 10}",
+        'AI confidence score/Manual Code': f"{i % 100}%",
+        'Validation score': '85%',
+        'Reason': "Issue: laterality not documented | Recommendation: confirm side",
+    }
+
+
+async def row_batches(n_rows):
+    for start in range(0, n_rows, EXPORT_BATCH_ROWS):
+        yield [make_row(i) for i in range(start, min(start + EXPORT_BATCH_ROWS, n_rows))]
+
+
+def pandas_export(n_rows, fmt):
+    """The original export: every row in a DataFrame, the whole file in memory"""
+    df = pd.DataFrame([make_row(i) for i in range(n_rows)])
+    if fmt == 'csv':
+        return df.to_csv(index=False).encode('utf-8')
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='Medical Codes')
+    return buffer.getvalue()
+
+
+async def streamed_export(n_rows, fmt):
+    if fmt == 'csv':
+        chunks = csv_chunks(row_batches(n_rows), SESSION_EXPORT_FIELDS)
+    elif fmt == 'ndjson':
+        chunks = ndjson_chunks(row_batches(n_rows))
+    else:
+        chunks = xlsx_chunks(row_batches(n_rows), SESSION_EXPORT_FIELDS, 'Medical Codes')
+
+    size = 0
+    digest = hashlib.sha256()
+    async for chunk in chunks:
+        size += len(chunk)
+        digest.update(chunk)
+    return size, digest.hexdigest()
+
+
+def measure(fn):
+    """(seconds, peak traced MB, result)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return time.perf_counter() - start, peak / 1e6, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming exports")
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Rows to export')
+    parser.add_argument('--formats', nargs='*', default=['csv', 'ndjson'],
+                        help='csv, ndjson, xlsx (xlsx is slow at 1M rows)')
+    parser.add_argument('--baseline-rows', type=int, default=0,
+                        help='Rows for the pandas exports (default: --rows)')
+    args = parser.parse_args()
+    baseline_rows = args.baseline_rows or args.rows
+
+    print("=" * 84)
+    print(f"Export benchmark: {args.rows:,} rows streamed, {baseline_rows:,} rows through pandas")
+    print("=" * 84)
+    print(f"{'export':<24}{'rows':>12}{'seconds':>10}{'output MB':>12}{'peak traced MB':>18}")
+
+    for fmt in args.formats:
+        if fmt in ('csv', 'xlsx'):
+            seconds, peak, output = measure(lambda: pandas_export(baseline_rows, fmt))
+            print(f"{'pandas ' + fmt:<24}{baseline_rows:>12,}{seconds:>10.1f}{len(output) / 1e6:>12.1f}{peak:>18.1f}")
+            expected = hashlib.sha256(output).hexdigest() if fmt == 'csv' and baseline_rows == args.rows else None
+            del output
+        else:
+            expected = None
+
+        seconds, peak, (size, digest) = measure(lambda: asyncio.run(streamed_export(args.rows, fmt)))
+        print(f"{'streamed ' + fmt:<24}{args.rows:>12,}{seconds:>10.1f}{size / 1e6:>12.1f}{peak:>18.1f}")
+        if expected is not None and digest != expected:
+            sys.exit("Streamed CSV differs from the pandas export")
+
+
+if __name__ == "__main__":
+    main()
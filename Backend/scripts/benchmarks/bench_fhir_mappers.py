@@ -0,0 +1,57 @@
+"""
+Benchmark: FHIR to canonical mapping throughput, per resource vs. batch
+
+Generates the mock FHIR fixtures and reports resources/sec for each resource
+type, mapping one resource per call (transform_<resource>) and a whole list
+per call (transform_batch).
+
+Usage (from Backend/):
+    python scripts/benchmarks/bench_fhir_mappers.py --patients 1000 --repeat 5
+"""
+import argparse
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+from pollers.fhir_mapping import FHIRMappers
+from tests.fixtures.generate_mock_fhir import generate_full_test_data
+
+RESOURCES = ['patient', 'encounter', 'condition', 'procedure']
+
+
+def best_rate(fn, count, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FHIR to canonical mapping throughput")
+    parser.add_argument('--patients', type=int, default=1000, help='Mock patients to generate')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed passes (best is reported)')
+    args = parser.parse_args()
+
+    data = generate_full_test_data(
+        patient_count=args.patients, encounters_per_patient=3, conditions_per_encounter=3, procedures_per_encounter=2
+    )
+    mappers = FHIRMappers()
+
+    print("=" * 80)
+    print(f"FHIR mapping benchmark: {args.patients} patients, best of {args.repeat}")
+    print("=" * 80)
+    print(f"{'resource':<12}{'count':>8}{'per resource/s':>18}{'batch/s':>14}")
+
+    for resource in RESOURCES:
+        resources = data[f'{resource}s']
+        map_one = getattr(mappers, f'map_{resource}')
+        single = best_rate(lambda: [map_one(r, 'epic') for r in resources], len(resources), args.repeat)
+        batch = best_rate(lambda: mappers.map_batch(resource, resources, 'epic'), len(resources), args.repeat)
+        print(f"{resource:<12}{len(resources):>8}{single:>18,.0f}{batch:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
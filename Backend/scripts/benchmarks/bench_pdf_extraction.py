@@ -0,0 +1,92 @@
+"""
+Benchmark: streaming page extraction vs. pdfplumber over the whole document
+
+Extracts the sample physician reports (../sample-data/*.pdf, or --pdf) with
+the original DocumentProcessor.extract_text_from_pdf loop (pdfplumber layout
+analysis for every page, text built with +=) and with the streaming
+extractor (utils/pdf_text.py), and reports the time to the whole text and
+to the first page. Outputs are compared, so the run fails if they differ.
+
+Usage (from Backend/):
+    python scripts/benchmarks/bench_pdf_extraction.py
+    python scripts/benchmarks/bench_pdf_extraction.py --pdf big.pdf --repeat 3
+"""
+import argparse
+import glob
+import sys
+import time
+from io import BytesIO
+
+import pdfplumber
+
+sys.path.insert(0, '.')
+
+from medical_coding_ai.utils.pdf_text import iter_pdf_pages
+
+
+def pdfplumber_text(content):
+    """The original extract_text_from_pdf"""
+    text = ""
+    with pdfplumber.open(BytesIO(content)) as pdf:
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text += page_text + "\n\n"
+    return text
+
+
+def streamed_text(content):
+    return "".join(page.text + "\n\n" for page in iter_pdf_pages(content))
+
+
+def first_page(content):
+    pages = iter_pdf_pages(content)
+    try:
+        return next(pages)
+    finally:
+        pages.close()
+
+
+def best_ms(fn, content, repeat):
+    """Best time over repeat runs in milliseconds, and the output"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = fn(content)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming PDF extraction")
+    parser.add_argument('--pdf', nargs='*', help='PDFs to extract (default: ../sample-data/*.pdf)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs (best is reported)')
+    args = parser.parse_args()
+
+    paths = args.pdf or sorted(glob.glob('../sample-data/*.pdf'))
+    if not paths:
+        parser.error("No PDFs found; pass --pdf")
+
+    print("=" * 90)
+    print(f"PDF extraction benchmark: {len(paths)} documents, best of {args.repeat}")
+    print("=" * 90)
+    print(f"{'document':<36}{'pages':>6}{'pdfplumber ms':>15}{'streamed ms':>13}{'speed-up':>10}{'first page ms':>15}")
+
+    for path in paths:
+        with open(path, 'rb') as f:
+            content = f.read()
+        with pdfplumber.open(BytesIO(content)) as pdf:
+            n_pages = len(pdf.pages)
+
+        baseline, expected = best_ms(pdfplumber_text, content, args.repeat)
+        streamed, output = best_ms(streamed_text, content, args.repeat)
+        first, _ = best_ms(first_page, content, args.repeat)
+        if output != expected:
+            sys.exit(f"Streamed text differs from pdfplumber for {path}")
+
+        name = path.rsplit('/', 1)[-1][:34]
+        print(f"{name:<36}{n_pages:>6}{baseline:>15.1f}{streamed:>13.1f}{baseline / streamed:>9.1f}x{first:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
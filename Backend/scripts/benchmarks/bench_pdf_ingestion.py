@@ -0,0 +1,108 @@
+"""
+Benchmark: serial vs. sharded parallel PDF ingestion
+
+Generates a synthetic ICD-10 style manual and runs it through
+utils/pdf_ingestion.py with one worker (the old serial walk) and with a
+process pool, reporting wall time, pages/s and extracted codes. A resumed run
+(all shards checkpointed) is timed as well.
+
+Speed-up is bounded by the number of CPUs; pass --pdf to use a real manual.
+
+Usage (from Backend/):
+    python scripts/benchmarks/bench_pdf_ingestion.py --pages 400 --workers 4
+    python scripts/benchmarks/bench_pdf_ingestion.py --pdf ../knowledge_base_pdfs/icd10.pdf
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+
+sys.path.insert(0, '.')
+
+from medical_coding_ai.utils.knowledge_base_manager import KnowledgeBaseManager
+from medical_coding_ai.utils.pdf_ingestion import IngestionTracker, PDFIngestionPipeline
+
+
+def write_manual(path, n_pages, lines_per_page):
+    """Minimal text PDF with ICD-10 style 'CODE description' lines"""
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = len(objects) + 1 + 2 * n_pages
+    page_ids = []
+    for page in range(n_pages):
+        lines = [f"{chr(65 + page // 1000 % 26)}{page % 100:02d}.{line} Disease of chapter {page} "
+                 f"variant {line}, with complications" for line in range(lines_per_page)]
+        stream = ("BT /F1 9 Tf 12 TL 40 760 Td " + "".join(f"({line}) Tj T* " for line in lines) + "ET").encode()
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+                            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content, font)))
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % i for i in page_ids), n_pages))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    Path(path).write_bytes(bytes(out))
+
+
+def timed_run(pdf_path, checkpoint_dir, workers, pages_per_shard, extract, pages_per_chunk):
+    pipeline = PDFIngestionPipeline(checkpoint_dir, workers=workers, pages_per_shard=pages_per_shard,
+                                    tracker=IngestionTracker())
+    start = time.perf_counter()
+    codes = pipeline.run('icd10', pdf_path, extract, 'bench', pages_per_chunk=pages_per_chunk)
+    return time.perf_counter() - start, len(codes), pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sharded PDF ingestion")
+    parser.add_argument('--pdf', help='Real manual to ingest instead of a synthetic one')
+    parser.add_argument('--pages', type=int, default=400, help='Synthetic manual pages')
+    parser.add_argument('--lines-per-page', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--pages-per-shard', type=int, default=100)
+    parser.add_argument('--pages-per-batch', type=int, default=50, help='Pages per extraction batch')
+    args = parser.parse_args()
+
+    manager = KnowledgeBaseManager()
+    extract = partial(manager._extract_page_batch, 'icd10')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf or os.path.join(tmp, 'icd10.pdf')
+        if not args.pdf:
+            write_manual(pdf_path, args.pages, args.lines_per_page)
+
+        print("=" * 72)
+        print(f"PDF ingestion benchmark: {pdf_path} ({os.path.getsize(pdf_path) / 1e6:.1f} MB), "
+              f"{os.cpu_count()} CPU(s)")
+        print("=" * 72)
+        print(f"{'run':<28} {'workers':>8} {'seconds':>9} {'pages/s':>9} {'codes':>8}")
+
+        runs = [('serial', 1, 'serial'), ('parallel', args.workers, 'parallel')]
+        for label, workers, checkpoint in runs:
+            seconds, n_codes, pipeline = timed_run(pdf_path, os.path.join(tmp, checkpoint), workers,
+                                                   args.pages_per_shard, extract, args.pages_per_batch)
+            pages = pipeline.tracker.get_status()['icd10']['total_pages']
+            print(f"{label:<28} {workers:>8} {seconds:>9.2f} {pages / seconds:>9.1f} {n_codes:>8}")
+
+        # Same checkpoint directory again: every shard is resumed from disk
+        seconds, n_codes, _ = timed_run(pdf_path, os.path.join(tmp, 'parallel'), args.workers,
+                                        args.pages_per_shard, extract, args.pages_per_batch)
+        print(f"{'resumed from checkpoints':<28} {args.workers:>8} {seconds:>9.2f} {'-':>9} {n_codes:>8}")
+
+
+if __name__ == "__main__":
+    main()
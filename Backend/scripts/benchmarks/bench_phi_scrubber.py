@@ -0,0 +1,89 @@
+"""
+Benchmark: PHI scrubber throughput (MB/s) vs. the original multi-pass anonymizer
+
+Extracts the text of the sample physician reports (../sample-data/*.pdf, or
+--pdf), optionally repeated --scale times into one document, and reports
+MB/s of the compiled scrubber (utils/phi_scrubber.py) and of the original
+implementation, reproduced below as the baseline. Outputs are compared, so
+the run fails if they ever differ.
+
+Usage (from Backend/):
+    python scripts/benchmarks/bench_phi_scrubber.py
+    python scripts/benchmarks/bench_phi_scrubber.py --scale 50 --repeat 3
+"""
+import argparse
+import glob
+import re
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+from medical_coding_ai.utils.document_processor import DocumentProcessor
+from medical_coding_ai.utils.phi_scrubber import (
+    ADDRESS_RULES, CONTACT_RULES, ID_RULES, MEDICAL_KEYWORDS, NAME_RULES, PHIScrubber
+)
+
+
+def multipass_anonymize(text):
+    """The original DataAnonymizer.anonymize_text, default settings"""
+    for pattern in NAME_RULES:
+        for match in re.finditer(pattern, text):
+            candidate = match.group(0)
+            if not any(keyword in candidate.lower() for keyword in MEDICAL_KEYWORDS):
+                text = text.replace(candidate, '[PATIENT_NAME]')
+    for pattern in CONTACT_RULES:
+        text = re.sub(pattern, '[CONTACT_XXX]', text)
+    for pattern in ID_RULES:
+        text = re.sub(pattern, '[ID_XXX]', text)
+    for pattern in ADDRESS_RULES:
+        text = re.sub(pattern, '[ADDRESS]', text, flags=re.IGNORECASE)
+    return text
+
+
+def best_rate(fn, text, repeat):
+    """Best MB/s over repeat runs, and the output"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return len(text.encode('utf-8')) / best / 1e6, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PHI scrubber throughput")
+    parser.add_argument('--pdf', nargs='*', help='Reports to scrub (default: ../sample-data/*.pdf)')
+    parser.add_argument('--scale', type=int, default=1, help='Copies of each report per document')
+    parser.add_argument('--repeat', type=int, default=10, help='Timed runs (best is reported)')
+    args = parser.parse_args()
+
+    paths = args.pdf or sorted(glob.glob('../sample-data/*.pdf'))
+    if not paths:
+        parser.error("No reports found; pass --pdf")
+
+    processor = DocumentProcessor()
+    scrubber = PHIScrubber()
+
+    print("=" * 80)
+    print(f"PHI scrubber benchmark: {len(paths)} reports x{args.scale}, best of {args.repeat}")
+    print("=" * 80)
+    print(f"{'report':<40}{'KB':>8}{'multi-pass MB/s':>18}{'compiled MB/s':>16}{'speed-up':>10}")
+
+    for path in paths:
+        with open(path, 'rb') as f:
+            text = processor.extract_text_from_pdf(f)
+        text = '\n'.join([text] * args.scale)
+
+        baseline, expected = best_rate(multipass_anonymize, text, args.repeat)
+        compiled, output = best_rate(scrubber.scrub, text, args.repeat)
+        if output != expected:
+            sys.exit(f"Output differs from the multi-pass anonymizer for {path}")
+
+        name = path.rsplit('/', 1)[-1][:38]
+        print(f"{name:<40}{len(text.encode('utf-8')) / 1024:>8.0f}{baseline:>18.2f}{compiled:>16.2f}"
+              f"{compiled / baseline:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
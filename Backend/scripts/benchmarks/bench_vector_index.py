@@ -0,0 +1,142 @@
+"""
+Benchmark: recall@k vs. latency of the vector_store index types
+
+Builds every index type from utils/index_factory.py over the same corpus and
+compares it against the exact flat index: build time, index size, recall@k
+and single-query latency (agents search one query at a time). Query-time
+parameters are swept on one built index, so each line is an operating point
+that can be copied into config.yaml ``vector_store``.
+
+By default the corpus is synthetic: clustered unit vectors sized like the full
+ICD-10 + CPT + HCPCS code set (~87k), with queries drawn near corpus points.
+Pass --codes-json with a processed knowledge base file to embed real code
+descriptions instead (needs sentence-transformers).
+
+Usage (from Backend/):
+    python scripts/benchmarks/bench_vector_index.py --vectors 87000 --queries 500
+    python scripts/benchmarks/bench_vector_index.py --codes-json medical_coding_ai/data/knowledge_base/icd10_processed.json
+"""
+import argparse
+import json
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, '.')
+
+from medical_coding_ai.utils.index_factory import DEFAULT_INDEX_PARAMS, build_index, set_search_params
+from medical_coding_ai.utils.vector_index import DEFAULT_EMBEDDING_MODEL, code_documents
+
+# Index builds use every core; queries use --threads
+BUILD_THREADS = faiss.omp_get_max_threads()
+
+# (build parameters, query-time sweep)
+CONFIGS = [
+    ({'index_type': 'hnsw', 'hnsw_m': 32, 'ef_construction': 200}, ('ef_search', [16, 32, 64, 128, 256])),
+    ({'index_type': 'ivf_flat', 'nlist': 1024}, ('nprobe', [1, 4, 16, 32, 64, 128])),
+    ({'index_type': 'ivf_pq', 'nlist': 1024, 'pq_m': 48, 'pq_nbits': 8}, ('nprobe', [4, 16, 32, 64, 128])),
+]
+
+
+def synthetic_corpus(n_vectors, n_queries, dimension, clusters, spread, seed):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype('float32')
+    assignment = rng.integers(0, clusters, n_vectors)
+    # Wide clusters overlap like related code descriptions do, so the nearest
+    # neighbours of a query are spread over several IVF cells
+    corpus = centers[assignment] + spread * rng.standard_normal((n_vectors, dimension)).astype('float32')
+    picked = rng.integers(0, n_vectors, n_queries)
+    queries = corpus[picked] + 0.5 * spread * rng.standard_normal((n_queries, dimension)).astype('float32')
+    return corpus, queries
+
+
+def embedded_corpus(path, n_queries, seed):
+    from sentence_transformers import SentenceTransformer
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    codes = data.get('codes', []) if isinstance(data, dict) else data
+    documents, metadata = code_documents(codes)
+    encoder = SentenceTransformer(DEFAULT_EMBEDDING_MODEL)
+    corpus = encoder.encode(documents, batch_size=256, show_progress_bar=True)
+    # Descriptions alone are a reasonable stand-in for clinical query text
+    rng = np.random.default_rng(seed)
+    picked = rng.integers(0, len(codes), n_queries)
+    queries = encoder.encode([metadata[i]['description'] for i in picked])
+    return np.asarray(corpus, dtype='float32'), np.asarray(queries, dtype='float32')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def measure(index, queries, truth, k, threads):
+    faiss.omp_set_num_threads(threads)
+    latencies = []
+    hits = 0
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        _, ids = index.search(queries[i:i + 1], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(ids[0]) & set(truth[i]))
+    faiss.omp_set_num_threads(BUILD_THREADS)
+    return hits / (len(queries) * k), percentile(latencies, 50), percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector index recall vs latency")
+    parser.add_argument('--vectors', type=int, default=87000, help='Synthetic corpus size')
+    parser.add_argument('--queries', type=int, default=500, help='Number of queries')
+    parser.add_argument('--dimension', type=int, default=384, help='Synthetic embedding dimension')
+    parser.add_argument('--clusters', type=int, default=2000, help='Synthetic topic clusters')
+    parser.add_argument('--spread', type=float, default=1.0, help='Synthetic cluster spread (higher is harder)')
+    parser.add_argument('--k', type=int, default=15, help='Results per query (agents use 15)')
+    parser.add_argument('--codes-json', help='Embed a processed knowledge base file instead')
+    parser.add_argument('--threads', type=int, default=1, help='FAISS OpenMP threads while querying')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    if args.codes_json:
+        corpus, queries = embedded_corpus(args.codes_json, args.queries, args.seed)
+    else:
+        corpus, queries = synthetic_corpus(args.vectors, args.queries, args.dimension, args.clusters,
+                                           args.spread, args.seed)
+    faiss.normalize_L2(corpus)
+    faiss.normalize_L2(queries)
+
+    print("=" * 88)
+    print(f"Vector index benchmark: {len(corpus)} vectors x {corpus.shape[1]} dims, "
+          f"{len(queries)} queries, recall@{args.k}, {args.threads} query thread(s)")
+    print("=" * 88)
+    print(f"{'index':<10} {'build':<34} {'query param':<14} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'build s':>8} {'size MB':>8}")
+
+    start = time.perf_counter()
+    flat, _ = build_index(corpus, {'index_type': 'flat'})
+    flat_build = time.perf_counter() - start
+    _, truth = flat.search(queries, args.k)
+    recall, p50, p95 = measure(flat, queries, truth, args.k, args.threads)
+    size_mb = len(faiss.serialize_index(flat)) / 1e6
+    print(f"{'flat':<10} {'exact':<34} {'-':<14} {recall:>7.3f} {p50:>8.3f} {p95:>8.3f} "
+          f"{flat_build:>8.2f} {size_mb:>8.1f}")
+
+    for build_params, (param_name, values) in CONFIGS:
+        params = dict(DEFAULT_INDEX_PARAMS, **build_params)
+        start = time.perf_counter()
+        index, built = build_index(corpus, params)
+        build_seconds = time.perf_counter() - start
+        size_mb = len(faiss.serialize_index(index)) / 1e6
+        build_label = ' '.join(f"{key}={value}" for key, value in built.items() if key != 'index_type')
+
+        for value in values:
+            set_search_params(index, dict(params, **{param_name: value}))
+            recall, p50, p95 = measure(index, queries, truth, args.k, args.threads)
+            print(f"{built['index_type']:<10} {build_label:<34} {f'{param_name}={value}':<14} "
+                  f"{recall:>7.3f} {p50:>8.3f} {p95:>8.3f} {build_seconds:>8.2f} {size_mb:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark: MasterAgent.verify_codes, per-code prompts vs. batched prompts
+
+Counts LLM calls and wall-clock latency for both verification modes. By
+default the LLM is simulated: each call costs a fixed round-trip plus a cost
+per prompt character, which approximates a local Ollama model where prompt
+processing dominates. Pass --live to call the Ollama server from config.yaml.
+
+Usage (from Backend/):
+    python scripts/benchmarks/bench_verification.py --codes 15
+    python scripts/benchmarks/bench_verification.py --codes 15 --live
+"""
+import argparse
+import asyncio
+import re
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+from medical_coding_ai.agents.master_agent import MasterAgent
+
+DOCUMENT = (
+    "Patient is a 58 year old with type 2 diabetes mellitus with diabetic chronic kidney "
+    "disease, essential hypertension and hyperlipidemia. Presents for an established patient "
+    "office visit of moderate complexity. Comprehensive metabolic panel and venipuncture "
+    "performed. Blood glucose test strips dispensed for home monitoring. "
+) * 10
+
+ICD10 = [("E11.22", "Type 2 diabetes mellitus with diabetic chronic kidney disease"),
+         ("I10", "Essential hypertension"),
+         ("E78.5", "Hyperlipidemia, unspecified"),
+         ("N18.3", "Chronic kidney disease, stage 3"),
+         ("Z79.4", "Long term (current) use of insulin")]
+CPT = [("99214", "Office or other outpatient visit for established patient, moderate complexity"),
+       ("80053", "Comprehensive metabolic panel"),
+       ("36415", "Collection of venous blood by venipuncture")]
+HCPCS = [("A4253", "Blood glucose test or reagent strips for home blood glucose monitor, per 50 strips")]
+
+
+def make_codes(count):
+    pool = [(c, d, 'ICD-10') for c, d in ICD10] + [(c, d, 'CPT') for c, d in CPT] + \
+           [(c, d, 'HCPCS') for c, d in HCPCS]
+    codes = []
+    for i in range(count):
+        code, description, agent = pool[i % len(pool)]
+        suffix = '' if i < len(pool) else str(i // len(pool))
+        codes.append({'code': code + suffix, 'description': description, 'agent': agent,
+                      'confidence': 0.85, 'reasoning': 'Documented in the note'})
+    return codes
+
+
+class SimulatedLLM:
+    """Answers verification prompts with a latency model and counts calls"""
+
+    def __init__(self, base_ms, ms_per_kchar):
+        self.base_ms = base_ms
+        self.ms_per_kchar = ms_per_kchar
+        self.calls = 0
+        self.prompt_chars = 0
+
+    async def __call__(self, prompt, context_codes=None):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        await asyncio.sleep((self.base_ms + self.ms_per_kchar * len(prompt) / 1000) / 1000)
+
+        batch_codes = re.findall(r'^\s*\d+\. Code: (\S+) \|', prompt, re.MULTILINE)
+        answer = "APPROPRIATE: Yes\nCONFIDENCE: 88\nCONCERNS: None\nRECOMMENDATIONS: Code approved as documented\n"
+        if batch_codes:
+            return "\n".join(f"CODE: {code}\n{answer}" for code in batch_codes)
+        return answer
+
+
+class CountingLLM:
+    """Wraps the real LLM call to count calls"""
+
+    def __init__(self, query):
+        self.query = query
+        self.calls = 0
+        self.prompt_chars = 0
+
+    async def __call__(self, prompt, context_codes=None):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        return await self.query(prompt, context_codes)
+
+
+async def run_mode(agent, mode, codes, document_data, live, args):
+    agent.config.setdefault('agents', {})
+    agent.config['agents']['verification_mode'] = mode
+    agent.config['agents']['verification_batch_size'] = args.batch_size
+
+    if live:
+        llm = CountingLLM(agent.__class__.query_llm_with_context.__get__(agent))
+    else:
+        llm = SimulatedLLM(args.base_ms, args.ms_per_kchar)
+    agent.query_llm_with_context = llm
+
+    start = time.perf_counter()
+    results = await agent.verify_codes([dict(code) for code in codes], document_data)
+    elapsed = time.perf_counter() - start
+
+    parsed = sum(1 for r in results if r['status'] not in ('error',))
+    return llm.calls, llm.prompt_chars, elapsed, parsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched code verification")
+    parser.add_argument('--codes', type=int, default=15, help='Number of codes to verify')
+    parser.add_argument('--batch-size', type=int, default=10, help='verification_batch_size')
+    parser.add_argument('--base-ms', type=float, default=400, help='Simulated fixed cost per call')
+    parser.add_argument('--ms-per-kchar', type=float, default=150, help='Simulated cost per 1k prompt chars')
+    parser.add_argument('--live', action='store_true', help='Call the configured Ollama server')
+    args = parser.parse_args()
+
+    agent = MasterAgent()
+    codes = make_codes(args.codes)
+    document_data = {'anonymized_text': DOCUMENT, 'patient_data': {}, 'processed': True}
+
+    print("=" * 80)
+    print(f"Verification benchmark: {args.codes} codes, batch size {args.batch_size}, "
+          f"{'live Ollama' if args.live else 'simulated LLM'}")
+    print("=" * 80)
+    print(f"{'mode':<10} {'llm calls':>10} {'prompt chars':>14} {'latency':>10} {'verified':>9}")
+
+    for mode in ('per_code', 'batched'):
+        calls, chars, elapsed, parsed = await run_mode(agent, mode, codes, document_data, args.live, args)
+        print(f"{mode:<10} {calls:>10} {chars:>14} {elapsed:>9.2f}s {parsed:>9}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -323,6 +323,11 @@ def generate_full_test_data(
     }
 
 
+def to_ndjson(resources: List[Dict[str, Any]]) -> str:
+    """Serialize resources as NDJSON, the Bulk Data $export file format."""
+    return "".join(json.dumps(resource) + "\n" for resource in resources)
+
+
 if __name__ == "__main__":
     # Generate test data
     test_data = generate_full_test_data()
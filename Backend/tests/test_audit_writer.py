@@ -0,0 +1,235 @@
+"""
+Audit Writer Tests
+
+Tests for the write-behind audit log writer: batching on size and time,
+multi-row INSERTs, spilling when the queue is full or the database fails,
+replay of spilled entries, isolating rows the database rejects, flushing on
+stop, and AuditMiddleware queueing entries instead of writing them.
+"""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from medical_coding_ai.middleware.audit import AuditMiddleware
+from sqlalchemy.exc import DataError
+
+from medical_coding_ai.utils.audit_writer import AuditWriter
+
+
+def compile_postgres(statement):
+    """Render a statement as PostgreSQL SQL"""
+    from sqlalchemy.dialects import postgresql
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+class FakeDatabase:
+    """Async session factory recording executed statements, optionally failing"""
+
+    def __init__(self):
+        self.statements = []
+        self.failing = False
+        self.rejected_endpoints = set()
+
+    def __call__(self):
+        session = MagicMock()
+        session.__aenter__ = AsyncMock(return_value=session)
+        session.__aexit__ = AsyncMock(return_value=False)
+        session.execute = AsyncMock(side_effect=self.execute)
+        session.commit = AsyncMock()
+        return session
+
+    async def execute(self, statement):
+        if self.failing:
+            raise ConnectionError("database unavailable")
+        params = statement.compile().params
+        if any(params[name] in self.rejected_endpoints for name in params if name.startswith('api_endpoint')):
+            raise DataError("INSERT INTO audit_logs", {}, Exception("value too long for type"))
+        self.statements.append(statement)
+
+    @property
+    def rows(self):
+        return [sum(1 for name in statement.compile().params if name.startswith('api_endpoint'))
+                for statement in self.statements]
+
+
+def entry(number):
+    return {'action_type': 'request', 'action_category': 'data_access', 'api_endpoint': f'/api/{number}'}
+
+
+@pytest.fixture
+def database():
+    return FakeDatabase()
+
+
+class TestAuditWriter:
+    """Batching, spilling and flushing"""
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_written_in_one_insert(self, database):
+        writer = AuditWriter(database, batch_size=3, flush_interval=60)
+
+        for number in range(3):
+            assert writer.record(**entry(number))
+        await asyncio.sleep(0.05)
+
+        assert database.rows == [3]
+        sql = compile_postgres(database.statements[0])
+        assert sql.startswith('INSERT INTO audit_logs') and sql.count('VALUES') == 1
+        assert writer.get_status()['queue_depth'] == 0
+        assert writer.metrics['written'] == 3 and writer.metrics['batches'] == 1
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_partial_batch_is_written_after_the_interval(self, database):
+        writer = AuditWriter(database, batch_size=100, flush_interval=0.05)
+
+        writer.record(**entry(1))
+        writer.record(**entry(2))
+        assert database.rows == []
+        await asyncio.sleep(0.15)
+
+        assert database.rows == [2]
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_queued_entries(self, database):
+        writer = AuditWriter(database, batch_size=2, flush_interval=60)
+        for number in range(5):
+            writer.record(**entry(number))
+
+        await writer.stop()
+
+        assert sum(database.rows) == 5
+        assert not writer.get_status()['running']
+        # Entries recorded after shutdown are not left in memory
+        assert not writer.record(**entry(6))
+        assert writer.metrics['dropped'] == 1
+
+    @pytest.mark.asyncio
+    async def test_full_queue_spills_or_drops(self, database, tmp_path):
+        spill_path = tmp_path / 'audit_spill.jsonl'
+        spilling = AuditWriter(database, max_queue_size=2, flush_interval=60, spill_path=spill_path)
+        dropping = AuditWriter(database, max_queue_size=2, flush_interval=60)
+
+        for number in range(5):
+            spilling.record(**entry(number))
+            dropping.record(**entry(number))
+
+        assert spilling.metrics['spilled'] == 3 and spilling.metrics['dropped'] == 0
+        assert [json.loads(line)['api_endpoint'] for line in spill_path.read_text().splitlines()] == \
+            ['/api/2', '/api/3', '/api/4']
+        assert dropping.metrics['dropped'] == 3
+        assert dropping.get_status()['queue_depth'] == 2
+        await spilling.stop()
+        await dropping.stop()
+
+    @pytest.mark.asyncio
+    async def test_failed_writes_spill_and_replay_after_recovery(self, database, tmp_path):
+        spill_path = tmp_path / 'audit_spill.jsonl'
+        writer = AuditWriter(database, batch_size=2, flush_interval=60, spill_path=spill_path)
+        database.failing = True
+
+        writer.record(**entry(1))
+        writer.record(**entry(2))
+        await asyncio.sleep(0.05)
+
+        assert writer.metrics['write_errors'] == 1 and writer.metrics['spilled'] == 2
+        assert len(spill_path.read_text().splitlines()) == 2
+
+        database.failing = False
+        writer._replay_after = 0
+        writer.record(**entry(3))
+        writer.record(**entry(4))
+        await asyncio.sleep(0.05)
+
+        assert writer.metrics['replayed'] == 2
+        assert sorted(database.rows) == [2, 2]
+        assert not spill_path.exists()
+        replayed = database.statements[1].compile().params
+        assert replayed['api_endpoint_m0'] == '/api/1'
+        assert replayed['created_at_m0'].year >= 2024
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_client_controlled_fields_are_truncated(self, database):
+        writer = AuditWriter(database, batch_size=1, flush_interval=60)
+
+        writer.record(**entry(1), user_agent='Mozilla/5.0 ' * 200)
+        writer.record(action_type='request', action_category='data_access', api_endpoint='/api/' + 'x' * 1000)
+        await writer.stop()
+
+        first, second = (statement.compile().params for statement in database.statements)
+        assert len(first['user_agent_m0']) == 512
+        assert len(second['api_endpoint_m0']) == 255
+
+    @pytest.mark.asyncio
+    async def test_rejected_rows_are_isolated_and_dead_lettered(self, database, tmp_path):
+        spill_path = tmp_path / 'audit_spill.jsonl'
+        dead_letter_path = tmp_path / 'audit_rejected.jsonl'
+        writer = AuditWriter(database, batch_size=8, flush_interval=60, spill_path=spill_path,
+                             dead_letter_path=dead_letter_path)
+        database.rejected_endpoints = {'/api/5'}
+
+        for number in range(8):
+            writer.record(**entry(number))
+        await writer.stop()
+
+        assert sum(database.rows) == 7
+        assert writer.metrics['written'] == 7 and writer.metrics['rejected'] == 1
+        assert writer.metrics['spilled'] == 0 and not spill_path.exists()
+        rejected = [json.loads(line) for line in dead_letter_path.read_text().splitlines()]
+        assert [row['api_endpoint'] for row in rejected] == ['/api/5']
+        assert 'value too long' in rejected[0]['error']
+
+    @pytest.mark.asyncio
+    async def test_rejected_spilled_row_does_not_block_replay(self, database, tmp_path):
+        spill_path = tmp_path / 'audit_spill.jsonl'
+        dead_letter_path = tmp_path / 'audit_rejected.jsonl'
+        writer = AuditWriter(database, batch_size=4, flush_interval=60, spill_path=spill_path,
+                             dead_letter_path=dead_letter_path)
+        database.failing = True
+        for number in range(4):
+            writer.record(**entry(number))
+        await asyncio.sleep(0.05)
+        assert writer.metrics['spilled'] == 4
+
+        database.failing = False
+        database.rejected_endpoints = {'/api/2'}
+        writer._replay_after = 0
+        await writer._replay_spill()
+
+        assert writer.metrics['replayed'] == 3 and writer.metrics['rejected'] == 1
+        assert not spill_path.exists()
+        assert len(dead_letter_path.read_text().splitlines()) == 1
+
+        # Nothing left to replay
+        await writer._replay_spill()
+        assert writer.metrics['replayed'] == 3
+        await writer.stop()
+
+
+class TestAuditMiddleware:
+    """Requests queue entries for the writer"""
+
+    def test_request_is_queued_not_written(self):
+        writer = MagicMock()
+        app = FastAPI()
+        app.add_middleware(AuditMiddleware)
+
+        @app.get('/api/ping')
+        async def ping():
+            return {'ok': True}
+
+        with patch('medical_coding_ai.middleware.audit.get_audit_writer', return_value=writer):
+            response = TestClient(app).get('/api/ping', headers={'User-Agent': 'tests'})
+
+        assert response.status_code == 200
+        writer.record.assert_called_once()
+        fields = writer.record.call_args.kwargs
+        assert fields['api_endpoint'] == '/api/ping' and fields['http_method'] == 'GET'
+        assert fields['user_agent'] == 'tests' and fields['user_id'] is None
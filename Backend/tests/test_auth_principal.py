@@ -0,0 +1,168 @@
+"""
+Authenticated Principal Tests
+
+Tests for decoding the JWT once per request (AuditMiddleware stores the
+principal, get_current_user reuses it), the short-lived cache of active
+users and its invalidation, and the local front of the token blacklist.
+"""
+
+import uuid
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from medical_coding_ai.api import deps
+from medical_coding_ai.api.auth import create_access_token
+from medical_coding_ai.api.deps import get_current_user
+from medical_coding_ai.middleware.audit import AuditMiddleware
+from medical_coding_ai.utils import redis_client
+from medical_coding_ai.utils.db import get_db
+from medical_coding_ai.utils.user_cache import UserCache, get_user_cache, invalidate_user
+
+
+def make_user(active=True):
+    return SimpleNamespace(user_id=uuid.uuid4(), tenant_id=uuid.uuid4(), role='coder', is_active=active)
+
+
+@pytest.fixture
+def api():
+    """App with the audit middleware and a mocked database returning one user"""
+    user = make_user()
+    session = MagicMock()
+    result = MagicMock()
+    result.scalar_one_or_none.side_effect = lambda: user
+    session.execute = AsyncMock(return_value=result)
+
+    app = FastAPI()
+    app.add_middleware(AuditMiddleware)
+
+    @app.get('/api/me')
+    async def me(current_user=Depends(get_current_user)):
+        return {'user_id': str(current_user.user_id), 'role': current_user.role}
+
+    async def database():
+        yield session
+
+    app.dependency_overrides[get_db] = database
+    token = create_access_token({'sub': str(user.user_id), 'tenant_id': str(user.tenant_id)})
+    get_user_cache().clear()
+
+    with patch('medical_coding_ai.middleware.audit.get_audit_writer'), \
+            patch.object(deps, 'is_token_blacklisted', AsyncMock(return_value=False)):
+        yield TestClient(app), {'Authorization': f'Bearer {token}'}, user, session
+    get_user_cache().clear()
+
+
+class TestRequestPrincipal:
+    """One JWT decode per request and cached users"""
+
+    def test_token_is_decoded_once_per_request(self, api):
+        client, headers, user, _ = api
+
+        with patch.object(deps, 'decode_principal', wraps=deps.decode_principal) as decode:
+            response = client.get('/api/me', headers=headers)
+
+        assert response.status_code == 200
+        assert response.json()['user_id'] == str(user.user_id)
+        assert decode.call_count == 1
+
+    def test_user_is_read_once_then_cached_until_invalidated(self, api):
+        client, headers, user, session = api
+
+        for _ in range(3):
+            assert client.get('/api/me', headers=headers).status_code == 200
+        assert session.execute.await_count == 1
+
+        user.role = 'admin'
+        invalidate_user(user.user_id)
+        assert client.get('/api/me', headers=headers).json()['role'] == 'admin'
+        assert session.execute.await_count == 2
+
+    def test_deactivated_user_is_rejected_after_invalidation(self, api):
+        client, headers, user, session = api
+        assert client.get('/api/me', headers=headers).status_code == 200
+
+        user.is_active = False
+        invalidate_user(user.user_id)
+
+        assert client.get('/api/me', headers=headers).status_code == 401
+        assert client.get('/api/me', headers=headers).status_code == 401
+        assert session.execute.await_count == 3
+
+    def test_invalid_token_is_rejected(self, api):
+        client, _, _, session = api
+
+        response = client.get('/api/me', headers={'Authorization': 'Bearer not-a-jwt'})
+
+        assert response.status_code == 401
+        session.execute.assert_not_awaited()
+
+
+class TestUserCache:
+    """TTL and LRU bounds"""
+
+    def test_entries_expire_and_are_bounded(self):
+        cache = UserCache(max_entries=2, ttl_seconds=60)
+        users = [make_user() for _ in range(3)]
+        for user in users:
+            cache.put(user)
+
+        assert cache.get(users[0].user_id) is None
+        assert cache.get(str(users[2].user_id)) is users[2]
+        assert cache.metrics['evictions'] == 1
+
+        expired = UserCache(ttl_seconds=0)
+        expired.put(users[0])
+        assert expired.get(users[0].user_id) is None
+
+    def test_inactive_users_are_not_cached(self):
+        cache = UserCache()
+        user = make_user(active=False)
+
+        cache.put(user)
+
+        assert cache.get(user.user_id) is None
+
+
+class TestBlacklistFront:
+    """Local checks in front of the Redis blacklist"""
+
+    @pytest.fixture(autouse=True)
+    def local_state(self):
+        redis_client._revoked_tokens.clear()
+        redis_client._valid_tokens.clear()
+        yield
+        redis_client._revoked_tokens.clear()
+        redis_client._valid_tokens.clear()
+
+    @pytest.mark.asyncio
+    async def test_recent_negative_checks_skip_redis(self):
+        redis = MagicMock()
+        redis.exists = AsyncMock(return_value=0)
+
+        with patch.object(redis_client, 'get_redis', AsyncMock(return_value=redis)):
+            assert not await redis_client.is_token_blacklisted('jti-1')
+            assert not await redis_client.is_token_blacklisted('jti-1')
+
+        assert redis.exists.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_revoked_tokens_are_known_locally(self):
+        redis = MagicMock()
+        redis.exists = AsyncMock(side_effect=[0, 1])
+        redis.setex = AsyncMock()
+
+        with patch.object(redis_client, 'get_redis', AsyncMock(return_value=redis)):
+            # Logged out through this process: revoked at once, despite the cached check
+            assert not await redis_client.is_token_blacklisted('jti-1')
+            assert await redis_client.blacklist_token('jti-1', 4102444800)
+            assert await redis_client.is_token_blacklisted('jti-1')
+
+            # Revoked through another worker: found in Redis, then known locally
+            assert await redis_client.is_token_blacklisted('jti-2')
+            assert await redis_client.is_token_blacklisted('jti-2')
+
+        assert redis.exists.await_count == 2
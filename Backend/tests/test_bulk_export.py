@@ -0,0 +1,297 @@
+"""
+Bulk Export Tests
+
+Tests for FHIR Bulk Data $export ingestion against a local stub server that
+serves NDJSON fixtures: kick-off, status polling, streamed downloads in
+resource type order, cleanup, failures and timeouts, full syncs of the
+Epic poller through the bulk path with bounded memory, and turning the bulk
+path on through a connection's stored poller settings.
+"""
+
+import asyncio
+import json
+import threading
+import uuid
+import pytest
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock
+from urllib.parse import urlsplit, parse_qs
+
+import pollers.scheduler as scheduler_module
+from pollers.bulk_export import BulkExportClient, BulkExportError, export_options
+from pollers.epic.epic_poller import EpicPoller
+from pollers.http_pool import get_http_registry
+from tests.fixtures.generate_mock_fhir import generate_full_test_data, to_ndjson
+
+FILES = {
+    # Listed out of dependency order; encounters split over two files
+    'Procedure.ndjson': ('Procedure', 'procedures', slice(None)),
+    'Encounter-2.ndjson': ('Encounter', 'encounters', slice(10, None)),
+    'Patient.ndjson': ('Patient', 'patients', slice(None)),
+    'Encounter-1.ndjson': ('Encounter', 'encounters', slice(0, 10)),
+    'Condition.ndjson': ('Condition', 'conditions', slice(None)),
+    'Observation.ndjson': ('Observation', 'patients', slice(0, 0)),
+}
+
+
+class BulkHandler(BaseHTTPRequestHandler):
+    """Bulk Data endpoint: Group kick-off, status URL and NDJSON files"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        server.requests.append((url.path, self.headers.get('Authorization')))
+
+        if url.path.endswith('/$export'):
+            server.kick_off_params = parse_qs(url.query)
+            server.prefer = self.headers.get('Prefer')
+            self.respond(202, headers={'Content-Location': f'{server.origin}/bulk/status/1'})
+        elif url.path == '/bulk/status/1':
+            if server.status_code:
+                self.respond(server.status_code, {'resourceType': 'OperationOutcome'})
+            elif server.pending_polls:
+                server.pending_polls -= 1
+                self.respond(202, headers={'Retry-After': '0', 'X-Progress': 'exporting'})
+            else:
+                self.respond(200, {
+                    'transactionTime': '2026-10-17T00:00:00Z',
+                    'requiresAccessToken': True,
+                    'output': [
+                        {'type': resource_type, 'url': f'{server.origin}/bulk/files/{name}'}
+                        for name, (resource_type, _, _) in FILES.items()
+                    ],
+                    'error': [],
+                })
+        elif url.path.startswith('/bulk/files/'):
+            _, key, part = FILES[url.path.rsplit('/', 1)[-1]]
+            self.respond(200, body=to_ndjson(server.data[key][part]).encode(),
+                         content_type='application/fhir+ndjson')
+        else:
+            self.respond(404, {'resourceType': 'OperationOutcome'})
+
+    def do_DELETE(self):
+        self.server.deleted.append(self.path)
+        self.respond(202)
+
+    def respond(self, status, payload=None, headers=None, body=None, content_type='application/fhir+json'):
+        body = body if body is not None else (json.dumps(payload).encode() if payload is not None else b'')
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def bulk_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), BulkHandler)
+    server.origin = f"http://127.0.0.1:{server.server_address[1]}"
+    server.data = generate_full_test_data(
+        patient_count=8, encounters_per_patient=2, conditions_per_encounter=2, procedures_per_encounter=1
+    )
+    server.pending_polls = 2
+    server.status_code = None
+    server.requests = []
+    server.deleted = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"{server.origin}/api/FHIR/R4"
+    server.shutdown()
+    server.server_close()
+
+
+async def token():
+    return 'bulk-token'
+
+
+class TestBulkExportClient:
+    """Kick-off, polling and streamed NDJSON output"""
+
+    @pytest.mark.asyncio
+    async def test_export_streams_files_in_resource_type_order(self, bulk_server):
+        server, base_url = bulk_server
+        client = BulkExportClient(base_url)
+
+        batches = [
+            batch async for batch in client.export(
+                token, ['Patient', 'Encounter', 'Condition', 'Procedure'],
+                group_id='g1', batch_size=7, poll_interval=0
+            )
+        ]
+
+        types = [resource_type for resource_type, _ in batches]
+        assert types == sorted(types, key=['Patient', 'Encounter', 'Condition', 'Procedure'].index)
+        assert all(len(resources) <= 7 for _, resources in batches)
+        exported = {}
+        for resource_type, resources in batches:
+            exported.setdefault(resource_type, []).extend(resource['id'] for resource in resources)
+        assert exported['Patient'] == [patient['id'] for patient in server.data['patients']]
+        assert sorted(exported['Encounter']) == sorted(encounter['id'] for encounter in server.data['encounters'])
+        assert len(exported['Condition']) == 32 and len(exported['Procedure']) == 16
+
+        assert server.prefer == 'respond-async'
+        assert server.kick_off_params['_type'] == ['Patient,Encounter,Condition,Procedure']
+        assert server.requests[0][0] == '/api/FHIR/R4/Group/g1/$export'
+        assert all(auth == 'Bearer bulk-token' for _, auth in server.requests)
+        assert not any('Observation' in path for path, _ in server.requests)
+        assert server.deleted == ['/bulk/status/1']
+        assert client.metrics['status_polls'] == 3
+        assert client.metrics['files_downloaded'] == 5
+        assert client.metrics['resources_parsed'] == 8 + 16 + 32 + 16
+        await client.http.aclose()
+
+    @pytest.mark.asyncio
+    async def test_failed_export_raises_and_cleans_up(self, bulk_server):
+        server, base_url = bulk_server
+        server.status_code = 500
+        client = BulkExportClient(base_url)
+
+        with pytest.raises(BulkExportError) as error:
+            async for _ in client.export(token, ['Patient'], poll_interval=0):
+                pass
+
+        assert error.value.status_code == 500
+        assert server.requests[0][0] == '/api/FHIR/R4/Patient/$export'
+        assert server.deleted == ['/bulk/status/1']
+        await client.http.aclose()
+
+    @pytest.mark.asyncio
+    async def test_export_times_out(self, bulk_server):
+        server, base_url = bulk_server
+        server.pending_polls = 1000
+        client = BulkExportClient(base_url)
+
+        with pytest.raises(BulkExportError, match='did not complete'):
+            await client.wait_for_manifest(f'{server.origin}/bulk/status/1', token, poll_interval=0.05, timeout=0.2)
+        await client.http.aclose()
+
+    def test_export_options(self):
+        options = export_options({'bulk_export_group_id': 'g1', 'bulk_export_batch_size': 0})
+
+        assert options['group_id'] == 'g1'
+        assert options['batch_size'] == 1
+
+
+class RecordingEpicPoller(EpicPoller):
+    """Epic poller against the stub server, recording upserts instead of writing them"""
+
+    def __init__(self, base_url, write_delay=0.0, **config):
+        super().__init__(uuid.uuid4(), uuid.uuid4(), {
+            'base_url': base_url,
+            'use_mock_data': False,
+            'bulk_export': True,
+            'bulk_export_group_id': 'g1',
+            'bulk_export_poll_seconds': 0,
+            **config,
+        })
+        self.write_delay = write_delay
+        self.writes = []
+        self.authenticate = AsyncMock(return_value='bulk-token')
+        self._get_last_sync_time = AsyncMock(return_value=None)
+        self._update_sync_state = AsyncMock()
+
+    async def _bulk_upsert(self, resource, records, **references):
+        if records:
+            await asyncio.sleep(self.write_delay)
+            self.writes.append((resource, len(records), self.bulk_client.metrics['resources_parsed']))
+        return {record['fhir_id']: uuid.uuid4() for record in records}
+
+
+@pytest.fixture
+async def bulk_poller(bulk_server):
+    pollers = []
+
+    def create(**config):
+        pollers.append(RecordingEpicPoller(bulk_server[1], **config))
+        return pollers[-1]
+
+    yield create
+    for poller in pollers:
+        await get_http_registry().release(poller.connection_id)
+
+
+class TestBulkSync:
+    """Full syncs through the bulk export path"""
+
+    @pytest.mark.asyncio
+    async def test_full_sync_writes_every_exported_resource(self, bulk_server, bulk_poller):
+        server, _ = bulk_server
+        poller = bulk_poller(bulk_export_batch_size=10)
+
+        await poller.sync_cycle()
+
+        assert poller.metrics['successful_syncs'] == 1
+        assert poller.metrics['bulk_exports'] == 1
+        assert poller.metrics['records_processed'] == 8 + 16 + 32 + 16
+        written = {}
+        for resource, count, _ in poller.writes:
+            written[resource] = written.get(resource, 0) + count
+        assert written == {'patient': 8, 'encounter': 16, 'condition': 32, 'procedure': 16}
+        # Parents are written before any resource referencing them
+        order = [resource for resource, _, _ in poller.writes]
+        assert order == sorted(order, key=['patient', 'encounter', 'condition', 'procedure'].index)
+        # No searches were made
+        assert not any(path.endswith(('/Patient', '/Encounter')) for path, _ in server.requests)
+        assert poller.get_status()['bulk_export']['metrics']['exports'] == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_writes_bound_the_parsed_backlog(self, bulk_poller):
+        poller = bulk_poller(write_delay=0.01, bulk_export_batch_size=4, pipeline_queue_size=1)
+
+        await poller.sync_cycle()
+
+        # At most the queued batch, the batch being put and the batch being built are ahead of the writer
+        written = 0
+        for _, count, parsed in poller.writes:
+            assert parsed - written <= 4 * 3
+            written += count
+        assert written == 72
+
+    @pytest.mark.asyncio
+    async def test_incremental_and_mock_syncs_use_searches(self, bulk_poller):
+        poller = bulk_poller()
+        watermarks = {resource_type: None for resource_type in ('Patient', 'Encounter', 'Condition', 'Procedure')}
+        assert poller._use_bulk_export(watermarks)
+
+        synced = {resource_type: datetime(2026, 10, 1) for resource_type in watermarks}
+        assert not poller._use_bulk_export(synced)
+
+        poller.use_mock_data = True
+        assert not poller._use_bulk_export(watermarks)
+
+
+class TestConnectionSettings:
+    """Bulk export is enabled per connection through ehr_connections.poller_settings"""
+
+    @pytest.mark.asyncio
+    async def test_poller_settings_reach_the_poller(self):
+        connection_id = uuid.uuid4()
+        connection = {
+            'connection_id': connection_id,
+            'tenant_id': uuid.uuid4(),
+            'ehr_type': 'epic',
+            'base_url': 'https://fhir.example.org/api/FHIR/R4',
+            'poll_interval_seconds': 60,
+            'use_mock_data': False,
+            'poller_settings': {'bulk_export': True, 'bulk_export_group_id': 'g1',
+                                'base_url': 'https://elsewhere.example.org', 'not_a_setting': 1},
+        }
+
+        await scheduler_module._register_poller(connection)
+        try:
+            poller = scheduler_module.active_pollers[connection_id]
+            assert poller.bulk_export is True
+            assert poller.bulk_export_options['group_id'] == 'g1'
+            # Settings never override the connection's own columns, and unknown keys are dropped
+            assert poller.base_url == connection['base_url']
+            assert 'not_a_setting' not in poller.config
+        finally:
+            await scheduler_module.remove_poller(connection_id)
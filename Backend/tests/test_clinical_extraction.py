@@ -0,0 +1,131 @@
+"""
+Clinical Extraction Tests
+
+Tests for the shared extraction engine: output of the original per-consumer
+methods on the golden corpus (tests/fixtures/clinical_extraction, generated
+by the original DocumentProcessor and agent code from the phi_golden
+documents), anchored matching against full scans, and reuse of cached
+extractions.
+"""
+
+import json
+import pytest
+from pathlib import Path
+
+from medical_coding_ai.utils.clinical_extraction import (
+    ClinicalExtractor, Rule, TextIndex, _literal_prefixes, extract_clinical_entities, text_fingerprint
+)
+from medical_coding_ai.utils.document_processor import DocumentProcessor
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+GOLDEN_DOCUMENTS = sorted((FIXTURES / 'clinical_extraction').glob('*.json'))
+
+
+def read_document(expected_path):
+    return (FIXTURES / 'phi_golden' / f'{expected_path.stem}.txt').read_text(encoding='utf-8')
+
+
+@pytest.mark.parametrize('expected_path', GOLDEN_DOCUMENTS, ids=lambda path: path.stem)
+def test_golden_corpus_is_unchanged(expected_path):
+    text = read_document(expected_path)
+    expected = json.loads(expected_path.read_text(encoding='utf-8'))
+
+    extraction = extract_clinical_entities(text)
+    patient_data = DocumentProcessor()._extract_patient_data(text, extraction)
+    patient_data.pop('text')
+
+    assert patient_data == expected['patient_data']
+    assert extraction['icd10'] == expected['icd10']
+    assert extraction['cpt'] == expected['cpt']
+    assert extraction['hcpcs'] == expected['hcpcs']
+
+
+@pytest.mark.parametrize('expected_path', GOLDEN_DOCUMENTS, ids=lambda path: path.stem)
+def test_anchored_matching_equals_full_scan(expected_path):
+    text = read_document(expected_path)
+
+    assert extract_clinical_entities(text) == extract_clinical_entities(text, anchored=False)
+
+
+class TestMatching:
+    """Rules are tried only where their literal occurs"""
+
+    def test_literal_prefixes(self):
+        assert _literal_prefixes(r'(?:CHIEF COMPLAINT|CC)[:\s]*([^\n]+)') == ('CHIEF COMPLAINT', 'CC')
+        assert _literal_prefixes(r'\b(pain|discomfort)\b[^.]*') == ('pain', 'discomfort')
+        # An optional last character is not part of the literal
+        assert _literal_prefixes(r'(?:DIAGNOSES?)[:\s]*') == ('DIAGNOSE',)
+        assert _literal_prefixes(r'condition(?:s)? of ([^\n.;]+)') == ('condition',)
+        assert _literal_prefixes(r'(?:below|above) knee amputation') == ('below', 'above')
+        # Matches that can start anywhere are scanned for
+        assert _literal_prefixes(r'(\d+)\s*bpm') is None
+        assert _literal_prefixes(r'\b(\w+itis|pain)\b') is None
+        assert _literal_prefixes(r'(pain)?\s*score') is None
+
+    def test_rule_anchors_are_minimal_and_lower_cased(self):
+        assert Rule(r'(?:ASSESSMENT AND PLAN|ASSESSMENT)[:\s]*([^\n]+)').anchors == ('assessment',)
+        assert Rule(r'\b[A-Z]\d{2}\b', flags=0).anchors is None
+
+    def test_findall_and_search_match_the_re_module(self):
+        text = "Pain: severe pain in the knee. PAIN SCORE 7. Spain trip; painful."
+        index = TextIndex(text)
+        for pattern in (r'(pain[^,\.\n]*)', r'\b(pain|score)\b', r'(pa)(in)', r'pain'):
+            rule = Rule(pattern)
+            assert rule.anchors is not None
+            assert index.findall(rule) == rule.regex.findall(text)
+            assert index.search(rule).span() == rule.regex.search(text).span()
+
+    def test_case_folding_mismatch_falls_back_to_full_scan(self):
+        # U+017F matches "s" under re.IGNORECASE but does not lower-case to it
+        text = "ſymptoms: shortness of breath\nPlan: follow up in 2 weeks"
+
+        assert not TextIndex(text).anchored
+        assert extract_clinical_entities(text)['icd10']['symptoms'] == ['shortness of breath']
+        assert extract_clinical_entities(text) == extract_clinical_entities(text, anchored=False)
+
+
+class TestClinicalExtractor:
+    """Extractions are made once per document and shared"""
+
+    TEXT = "Chief Complaint: knee pain for 3 weeks\nAssessment: osteoarthritis of the right knee"
+
+    def test_extraction_contents(self):
+        extraction = ClinicalExtractor().extract(self.TEXT)
+
+        assert extraction['fingerprint'] == text_fingerprint(self.TEXT)
+        assert extraction['sections']['chief_complaint'] == 'knee pain for 3 weeks'
+        assert extraction['sections']['assessment'] == 'osteoarthritis of the right knee'
+        assert 'assessment' in extraction['indicators']['diagnosis']
+        assert json.loads(json.dumps(extraction)) == extraction
+
+    def test_cached_extraction_is_reused_only_for_its_text(self):
+        extractor = ClinicalExtractor(cache_size=0)
+        cached = extract_clinical_entities(self.TEXT)
+
+        assert extractor.extract(self.TEXT, cached) is cached
+        assert extractor.extract(self.TEXT + " (edited)", cached) is not cached
+        assert extractor.extract(self.TEXT, {'fingerprint': 'stale'}) is not cached
+        status = extractor.get_status()
+        assert status['reused'] == 1
+        assert status['extractions'] == 2
+
+    def test_recent_extractions_are_shared(self):
+        extractor = ClinicalExtractor(cache_size=1)
+
+        first = extractor.extract(self.TEXT)
+        assert extractor.extract(self.TEXT) is first
+        extractor.extract("Plan: physical therapy twice a week")
+        assert extractor.extract(self.TEXT) is not first
+
+        status = extractor.get_status()
+        assert status['cache_hits'] == 1
+        assert status['extractions'] == 3
+        assert status['cached_documents'] == 1
+
+    def test_processed_document_carries_its_extraction(self):
+        processed = DocumentProcessor().process_medical_text(self.TEXT)
+
+        extraction = processed['clinical_extraction']
+        assert extraction['fingerprint'] == text_fingerprint(processed['text'])
+        assert processed['patient_data']['chiefComplaint'] == extraction['sections']['chief_complaint']
+        assert processed['conditions'] == extraction['conditions']
@@ -0,0 +1,211 @@
+"""
+Code Catalog Tests
+
+Unit tests for the shared, versioned in-memory code catalog: change detection,
+atomic snapshot swaps, reload metrics and CodeSearcher integration.
+"""
+
+import json
+import os
+import pytest
+
+from medical_coding_ai.utils.code_catalog import CodeCatalog, SAMPLE_CPT_CODES
+
+
+def write_codes(path, codes, wrap=True):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'codes': codes} if wrap else codes, f)
+
+
+def bump_mtime(path):
+    """Force a new mtime even on filesystems with coarse timestamps"""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def kb_dir(tmp_path):
+    write_codes(tmp_path / 'icd10_processed.json', [
+        {"code": "E11.9", "description": "Type 2 diabetes mellitus without complications", "type": "ICD-10"}
+    ])
+    write_codes(tmp_path / 'hcpcs_processed.json', [
+        {"code": "K0001", "description": "Standard wheelchair", "type": "HCPCS"}
+    ], wrap=False)
+    return tmp_path
+
+
+@pytest.fixture
+def catalog(kb_dir):
+    return CodeCatalog(data_dir=kb_dir, check_interval=0)
+
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+class TestCatalogLoading:
+    """Tests for initial catalog loading"""
+
+    def test_loads_processed_files_and_falls_back_to_samples(self, catalog):
+        snapshot = catalog.get_snapshot()
+
+        assert snapshot.version == 1
+        assert [c['code'] for c in snapshot.get_codes('icd10')] == ['E11.9']
+        assert [c['code'] for c in snapshot.get_codes('hcpcs')] == ['K0001']
+        assert len(snapshot.get_codes('cpt')) == len(SAMPLE_CPT_CODES)
+        assert snapshot.sources['cpt'] == 'builtin_sample'
+
+    def test_sample_icd10_file_used_when_processed_missing(self, tmp_path):
+        write_codes(tmp_path / 'sample_icd10_codes.json', [
+            {"code": "I10", "description": "Essential hypertension", "type": "ICD-10"}
+        ], wrap=False)
+
+        catalog = CodeCatalog(data_dir=tmp_path, check_interval=0)
+
+        assert catalog.get_snapshot().sources['icd10'] == 'sample_icd10_codes.json'
+
+    def test_invalid_json_falls_back_to_samples(self, tmp_path):
+        (tmp_path / 'cpt_processed.json').write_text('{not json', encoding='utf-8')
+
+        catalog = CodeCatalog(data_dir=tmp_path, check_interval=0)
+
+        assert catalog.get_snapshot().sources['cpt'] == 'builtin_sample'
+
+
+# ============================================================================
+# CHANGE DETECTION
+# ============================================================================
+
+class TestCatalogReload:
+    """Tests for mtime/hash based reloads"""
+
+    def test_unchanged_files_are_not_reloaded(self, catalog):
+        first = catalog.get_snapshot()
+
+        for _ in range(5):
+            assert catalog.get_snapshot() is first
+        assert catalog.metrics['reload_count'] == 1
+
+    def test_changed_file_is_reloaded(self, catalog, kb_dir):
+        first = catalog.get_snapshot()
+        path = kb_dir / 'icd10_processed.json'
+        write_codes(path, [
+            {"code": "I10", "description": "Essential hypertension", "type": "ICD-10"}
+        ])
+        bump_mtime(path)
+
+        second = catalog.get_snapshot()
+
+        assert second.version == first.version + 1
+        assert [c['code'] for c in second.get_codes('icd10')] == ['I10']
+        # Unchanged code types keep the same list objects
+        assert second.get_codes('hcpcs') is first.get_codes('hcpcs')
+        # Readers holding the old snapshot are unaffected
+        assert [c['code'] for c in first.get_codes('icd10')] == ['E11.9']
+        assert catalog.metrics['reload_count'] == 2
+
+    def test_touched_file_with_same_content_is_not_reloaded(self, catalog, kb_dir):
+        first = catalog.get_snapshot()
+        bump_mtime(kb_dir / 'icd10_processed.json')
+
+        assert catalog.get_snapshot() is first
+        assert catalog.metrics['reload_count'] == 1
+
+    def test_new_file_is_picked_up(self, catalog, kb_dir):
+        catalog.get_snapshot()
+        write_codes(kb_dir / 'cpt_processed.json', [
+            {"code": "99213", "description": "Office visit", "type": "CPT"}
+        ])
+
+        snapshot = catalog.get_snapshot()
+
+        assert snapshot.sources['cpt'] == 'cpt_processed.json'
+
+    def test_check_interval_throttles_stat_calls(self, kb_dir):
+        catalog = CodeCatalog(data_dir=kb_dir, check_interval=3600)
+        first = catalog.get_snapshot()
+        path = kb_dir / 'icd10_processed.json'
+        write_codes(path, [])
+        bump_mtime(path)
+
+        assert catalog.get_snapshot() is first
+        # An explicit refresh still sees the change
+        assert catalog.refresh().version == first.version + 1
+
+    def test_forced_refresh_always_swaps(self, catalog):
+        first = catalog.get_snapshot()
+
+        second = catalog.refresh(force=True)
+
+        assert second is not first
+        assert second.version == first.version + 1
+        assert catalog.metrics['reload_count'] == 2
+
+    def test_failed_reload_keeps_current_snapshot(self, catalog, monkeypatch):
+        first = catalog.get_snapshot()
+
+        def boom(code_type):
+            raise RuntimeError("disk error")
+
+        monkeypatch.setattr(catalog, '_load_code_type', boom)
+
+        assert catalog.refresh(force=True) is first
+        assert catalog.metrics['failed_reloads'] == 1
+
+    def test_status_reports_metrics(self, catalog):
+        catalog.get_snapshot()
+
+        status = catalog.get_status()
+
+        assert status['version'] == 1
+        assert status['counts']['icd10'] == 1
+        assert status['metrics']['reload_count'] == 1
+        assert status['metrics']['total_reload_duration_ms'] >= 0
+
+
+# ============================================================================
+# CODE SEARCHER INTEGRATION
+# ============================================================================
+
+class TestCodeSearcherCatalog:
+    """CodeSearcher reads from the catalog instead of parsing files itself"""
+
+    def test_searchers_share_catalog_lists(self, catalog):
+        from medical_coding_ai.utils.code_searcher import CodeSearcher
+
+        first = CodeSearcher(catalog)
+        second = CodeSearcher(catalog)
+
+        assert first.icd10_codes is second.icd10_codes
+        assert catalog.metrics['reload_count'] == 1
+
+    def test_search_does_not_reparse_files(self, catalog, monkeypatch):
+        from medical_coding_ai.utils.code_searcher import CodeSearcher
+        searcher = CodeSearcher(catalog)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("knowledge base re-parsed")
+
+        monkeypatch.setattr(json, 'load', fail)
+
+        for _ in range(3):
+            assert searcher.search("E11.9")[0]['code'] == 'E11.9'
+
+    def test_search_follows_new_catalog_version(self, catalog, kb_dir):
+        from medical_coding_ai.utils.code_searcher import CodeSearcher
+        searcher = CodeSearcher(catalog)
+        path = kb_dir / 'hcpcs_processed.json'
+        write_codes(path, [{"code": "E0130", "description": "Walker, rigid", "type": "HCPCS"}])
+        bump_mtime(path)
+
+        results = searcher.search("walker", "hcpcs")
+
+        assert [r['code'] for r in results] == ['E0130']
+
+    def test_reload_forces_catalog_refresh(self, catalog):
+        from medical_coding_ai.utils.code_searcher import CodeSearcher
+        searcher = CodeSearcher(catalog)
+
+        searcher.reload_knowledge_base()
+
+        assert catalog.metrics['reload_count'] == 2
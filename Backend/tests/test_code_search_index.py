@@ -0,0 +1,199 @@
+"""
+Code Search Index Tests
+
+Parity tests for the inverted index behind CodeSearcher.search. Every query is
+checked against the legacy full scan that scores each code with
+CodeSearcher._calculate_relevance.
+"""
+
+import random
+import pytest
+from unittest.mock import patch
+
+
+def brute_force_search(searcher, query, code_type="all", max_results=20):
+    """Reference implementation: the original full-scan search"""
+    if not query or len(query.strip()) < 2:
+        return []
+
+    query_lower = query.lower().strip()
+    results = []
+    for database in searcher._get_search_databases(code_type):
+        for code_data in database:
+            relevance_score = searcher._calculate_relevance(query_lower, code_data)
+            if relevance_score > 0:
+                result = code_data.copy()
+                result['relevance_score'] = relevance_score
+                results.append(result)
+
+    results.sort(key=lambda x: x['relevance_score'], reverse=True)
+    return results[:max_results]
+
+
+def assert_parity(searcher, query, code_type="all", max_results=20):
+    expected = brute_force_search(searcher, query, code_type, max_results)
+    actual = searcher.search(query, code_type, max_results)
+    assert actual == expected, f"Mismatch for query {query!r} ({code_type})"
+
+
+def make_synthetic_codes(count, seed=7):
+    """Generate a synthetic ICD-10/CPT/HCPCS corpus with realistic descriptions"""
+    rng = random.Random(seed)
+    words = [
+        "type", "2", "diabetes", "mellitus", "with", "without", "complications",
+        "chronic", "acute", "kidney", "disease", "left", "right", "bilateral",
+        "knee", "hip", "joint", "artificial", "presence", "of", "unspecified",
+        "fracture", "initial", "encounter", "subsequent", "office", "visit",
+        "established", "patient", "new", "low", "moderate", "high", "complexity",
+        "wheelchair", "walker", "oxygen", "supply", "each", "per", "cm", "2.5",
+        "hypertension", "essential", "heart", "failure", "asthma", "mild",
+    ]
+    codes = {"icd10": [], "cpt": [], "hcpcs": []}
+    for i in range(count):
+        bucket = rng.random()
+        description = " ".join(rng.choice(words) for _ in range(rng.randint(2, 9)))
+        if rng.random() < 0.3:
+            description = description.replace(" with", ", with")
+        if bucket < 0.7:
+            letter = rng.choice("ABCDEIJKMNSTZ")
+            code = f"{letter}{rng.randint(0, 99):02d}.{rng.randint(0, 9999)}"
+            codes["icd10"].append({"code": code, "description": description.capitalize(), "type": "ICD-10"})
+        elif bucket < 0.9:
+            codes["cpt"].append({"code": f"{rng.randint(10000, 99999)}", "description": description, "type": "CPT"})
+        else:
+            code = f"{rng.choice('AEKL')}{rng.randint(0, 9999):04d}"
+            codes["hcpcs"].append({"code": code, "description": description, "type": "HCPCS"})
+    return codes
+
+
+@pytest.fixture
+def searcher():
+    """CodeSearcher with the bundled sample data"""
+    with patch('os.makedirs'):
+        from medical_coding_ai.utils.code_searcher import CodeSearcher
+        searcher = CodeSearcher()
+    searcher.load_sample_icd10_codes()
+    searcher.load_sample_cpt_codes()
+    searcher.load_sample_hcpcs_codes()
+    return searcher
+
+
+@pytest.fixture
+def synthetic_searcher(searcher):
+    """CodeSearcher over a synthetic corpus plus the sample codes"""
+    codes = make_synthetic_codes(3000)
+    searcher.icd10_codes = searcher.icd10_codes + codes["icd10"]
+    searcher.cpt_codes = searcher.cpt_codes + codes["cpt"]
+    searcher.hcpcs_codes = searcher.hcpcs_codes + codes["hcpcs"]
+    return searcher
+
+
+# ============================================================================
+# PARITY WITH THE LEGACY SCORER
+# ============================================================================
+
+class TestSearchParity:
+    """Index-backed search must return exactly what the full scan returns"""
+
+    @pytest.mark.parametrize("query", [
+        "E11.9",          # exact code
+        "e11",            # code prefix
+        "11.9",           # partial code (not a prefix)
+        "99213",
+        "Z966",
+        "diabetes",       # whole word
+        "diab",           # substring of a word
+        "betes mel",      # spans a word boundary
+        "type 2 diabetes mellitus",  # multi-word overlap
+        "Essential hypertension",    # exact description
+        "mellitus, with",            # punctuation inside the query
+        "knee joint bilateral",
+        "  walker  ",                # surrounding whitespace
+        "(cbc)",
+        "2.5 cm",
+        "zzzz",           # no matches apart from popular codes
+        "--",             # no word characters at all
+        "a",              # too short
+        "",
+    ])
+    def test_sample_queries(self, searcher, query):
+        assert_parity(searcher, query)
+
+    @pytest.mark.parametrize("code_type", ["all", "icd10", "ICD-10", "cpt", "hcpcs", "unknown"])
+    def test_code_type_filters(self, searcher, code_type):
+        for query in ["diabetes", "99", "e0", "patient visit", "knee"]:
+            assert_parity(searcher, query, code_type)
+
+    @pytest.mark.parametrize("max_results", [1, 5, 20, 500])
+    def test_max_results(self, synthetic_searcher, max_results):
+        for query in ["kidney", "joint left", "e1"]:
+            assert_parity(synthetic_searcher, query, "all", max_results)
+
+    def test_random_queries_on_synthetic_corpus(self, synthetic_searcher):
+        """Random slices of codes and descriptions, including odd boundaries"""
+        rng = random.Random(42)
+        all_codes = (synthetic_searcher.icd10_codes + synthetic_searcher.cpt_codes +
+                     synthetic_searcher.hcpcs_codes)
+
+        queries = []
+        for _ in range(150):
+            entry = rng.choice(all_codes)
+            source = entry['description'] if rng.random() < 0.7 else entry['code']
+            start = rng.randint(0, max(len(source) - 2, 0))
+            end = rng.randint(start + 2, min(len(source), start + 25) + 1)
+            query = source[start:end]
+            if rng.random() < 0.2:
+                query = query.upper()
+            queries.append(query)
+
+        for query in queries:
+            assert_parity(synthetic_searcher, query, rng.choice(["all", "icd10", "cpt", "hcpcs"]))
+
+    def test_popular_codes_always_included(self, searcher):
+        """Popular codes get a bonus, so the legacy scan returns them for any query"""
+        results = searcher.search("qqqq")
+
+        assert {r['code'] for r in results} >= {'E11.9', 'I10', '99213'}
+        assert all(r['relevance_score'] == 5.0 for r in results)
+
+
+# ============================================================================
+# INDEX MAINTENANCE
+# ============================================================================
+
+class TestIndexMaintenance:
+    """The index must follow changes to the underlying code lists"""
+
+    def test_index_rebuilt_when_lists_replaced(self, searcher):
+        assert searcher.search("unicorn") == brute_force_search(searcher, "unicorn")
+
+        searcher.cpt_codes = searcher.cpt_codes + [
+            {"code": "00001", "description": "Unicorn horn removal", "type": "CPT"}
+        ]
+
+        results = searcher.search("unicorn")
+        assert results[0]['code'] == '00001'
+        assert_parity(searcher, "unicorn")
+
+    def test_index_rebuilt_when_list_appended(self, searcher):
+        searcher.hcpcs_codes.append({"code": "Q9999", "description": "Dragon scale dressing", "type": "HCPCS"})
+
+        results = searcher.search("dragon")
+        assert results[0]['code'] == 'Q9999'
+
+    def test_index_reset_on_reload(self, searcher):
+        searcher._get_index()
+        searcher.reload_knowledge_base()
+
+        assert searcher._index is None
+
+    def test_results_are_copies(self, searcher):
+        result = searcher.search("E11.9")[0]
+        result['description'] = 'changed'
+
+        assert searcher.search("E11.9")[0]['description'] != 'changed'
+
+    def test_search_by_code_matches_first_entry(self, searcher):
+        assert searcher.search_by_code(" e11.9 ") is searcher.icd10_codes[0]
+        assert searcher.search_by_code("99213")['type'] == 'CPT'
+        assert searcher.search_by_code("NOPE1") is None
@@ -0,0 +1,127 @@
+"""
+CPU Executor Tests
+
+Tests for the process pool that runs document extraction and anonymization:
+the event loop stays responsive while jobs run, the number of accepted jobs
+is bounded, timeouts count from when a job starts, timed-out jobs have their
+pool replaced, and a crashing worker does not take down the API process or
+later jobs.
+"""
+
+import asyncio
+import os
+import time
+import pytest
+
+from medical_coding_ai.utils.cpu_executor import (
+    CPUExecutor, CPUExecutorFull, CPUTaskCrashed, CPUTaskTimeout
+)
+
+
+# Jobs are module-level so they can be pickled to the worker processes
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+    return os.getpid()
+
+
+def crash():
+    os._exit(1)
+
+
+def fail():
+    raise ValueError("malformed document")
+
+
+@pytest.fixture
+def executor():
+    executor = CPUExecutor(workers=2, max_queue=1, timeout_seconds=10)
+    yield executor
+    executor.shutdown()
+
+
+class TestCPUExecutor:
+    """Offloading, bounds, timeouts and crash isolation"""
+
+    @pytest.mark.asyncio
+    async def test_event_loop_stays_responsive_during_jobs(self, executor):
+        await executor.run(busy, 0)  # start the workers
+
+        jobs = asyncio.gather(executor.run(busy, 0.5), executor.run(busy, 0.5))
+        lags = []
+        while not jobs.done():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - start - 0.01)
+        pids = await jobs
+
+        assert max(lags) < 0.2
+        assert os.getpid() not in pids
+        assert executor.metrics['completed'] == 3
+
+    @pytest.mark.asyncio
+    async def test_excess_jobs_are_rejected(self, executor):
+        jobs = [asyncio.ensure_future(executor.run(busy, 0.3)) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(CPUExecutorFull):
+            await executor.run(busy, 0)
+
+        await asyncio.gather(*jobs)
+        assert executor.metrics['rejected'] == 1
+        assert executor.get_status()['jobs'] == 0
+
+    @pytest.mark.asyncio
+    async def test_timed_out_job_is_killed_and_pool_replaced(self, executor):
+        with pytest.raises(CPUTaskTimeout):
+            await executor.run(busy, 30, timeout=0.3)
+
+        assert executor.metrics['timeouts'] == 1 and executor.metrics['pool_restarts'] == 1
+        assert await executor.run(busy, 0)
+
+    @pytest.mark.asyncio
+    async def test_time_waiting_for_a_worker_is_not_part_of_the_timeout(self, executor):
+        await executor.run(busy, 0)  # start the workers
+
+        pids = await asyncio.gather(*(executor.run(busy, 0.6, timeout=1.0) for _ in range(3)))
+
+        assert len(pids) == 3
+        assert executor.metrics['timeouts'] == 0 and executor.metrics['pool_restarts'] == 0
+
+    @pytest.mark.asyncio
+    async def test_job_that_never_started_is_rejected_without_killing_the_pool(self, executor):
+        running = [asyncio.ensure_future(executor.run(busy, 1.0)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(CPUExecutorFull):
+            await executor.run(busy, 0, timeout=0.3)
+
+        assert len(await asyncio.gather(*running)) == 2
+        assert executor.metrics['queue_timeouts'] == 1
+        assert executor.metrics['timeouts'] == 0 and executor.metrics['pool_restarts'] == 0
+
+    @pytest.mark.asyncio
+    async def test_jobs_on_a_killed_pool_are_retried_not_counted_as_crashes(self, executor):
+        await executor.run(busy, 0)  # start the workers
+
+        stuck = asyncio.ensure_future(executor.run(busy, 30, timeout=0.5))
+        healthy = asyncio.ensure_future(executor.run(busy, 1.0))
+
+        with pytest.raises(CPUTaskTimeout):
+            await stuck
+        assert await healthy
+        assert executor.metrics['crashes'] == 0 and executor.metrics['completed'] == 2
+
+    @pytest.mark.asyncio
+    async def test_crashing_job_is_isolated(self, executor):
+        with pytest.raises(CPUTaskCrashed):
+            await executor.run(crash)
+
+        assert executor.metrics['crashes'] == 2
+        assert await executor.run(busy, 0)
+
+        with pytest.raises(ValueError, match="malformed"):
+            await executor.run(fail)
+        assert executor.metrics['failed'] == 2
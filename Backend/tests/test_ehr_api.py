@@ -202,6 +202,18 @@ class TestCreateEHRConnection:
         assert invalid_high > max_interval
 
 
+    def test_unknown_poller_settings_are_rejected(self):
+        """Test poller_settings keys are checked against the pollers' settings"""
+        from medical_coding_ai.api.ehr import _validate_poller_settings
+
+        _validate_poller_settings({'bulk_export': True, 'bulk_export_group_id': 'g1'})
+        _validate_poller_settings(None)
+        with pytest.raises(HTTPException) as error:
+            _validate_poller_settings({'bulk_exprot': True})
+        assert error.value.status_code == 400
+        assert 'bulk_exprot' in error.value.detail
+
+
 class TestGetEHRConnection:
     """Tests for GET /api/ehr/connections/{id}"""
 
@@ -606,6 +606,43 @@ class TestSyncCycle:
 
         assert epic_poller.metrics['last_sync_duration_ms'] > 0
 
+    @pytest.mark.asyncio
+    async def test_sync_cycle_bulk_upserts_each_resource_type(self, epic_config):
+        """One bulk upsert per resource type, with IDs passed down to the next type"""
+        session = AsyncMock()
+        session_factory = MagicMock()
+        session_factory.return_value.__aenter__ = AsyncMock(return_value=session)
+        session_factory.return_value.__aexit__ = AsyncMock(return_value=False)
+        poller = EpicPoller(uuid.uuid4(), uuid.uuid4(), {**epic_config, 'upsert_batch_size': 50}, session_factory)
+        poller._get_last_sync_time = AsyncMock(return_value=None)
+        poller._update_sync_state = AsyncMock()
+
+        calls = []
+
+        def fake_bulk_upsert(resource, created):
+            async def bulk_upsert_from_ehr(self, records, batch_size, **references):
+                calls.append((resource, len(records), batch_size, references))
+                ids = {record['fhir_id']: uuid.uuid4() for record in records}
+                return {'ids': ids, 'created': created, 'updated': len(records) - created}
+            return bulk_upsert_from_ehr
+
+        with patch('pollers.base_poller.PatientRepository.bulk_upsert_from_ehr', fake_bulk_upsert('Patient', 1)), \
+             patch('pollers.base_poller.EncounterRepository.bulk_upsert_from_ehr', fake_bulk_upsert('Encounter', 0)), \
+             patch('pollers.base_poller.ConditionRepository.bulk_upsert_from_ehr', fake_bulk_upsert('Condition', 0)), \
+             patch('pollers.base_poller.ProcedureRepository.bulk_upsert_from_ehr', fake_bulk_upsert('Procedure', 0)):
+            await poller.sync_cycle()
+
+        assert poller.metrics['successful_syncs'] == 1
+        assert [call[0] for call in calls] == ['Patient', 'Encounter', 'Condition', 'Procedure']
+        assert all(call[2] == 50 for call in calls)
+        assert session.commit.await_count == 4
+        assert 'patient_ids' in calls[1][3]
+        assert 'encounter_ids' in calls[2][3]
+        total = sum(call[1] for call in calls)
+        assert poller.metrics['records_processed'] == total
+        assert poller.metrics['records_created'] == 1
+        assert poller.metrics['records_updated'] == total - 1
+
 
 # ============================================================================
 # Scheduler Tests
@@ -0,0 +1,231 @@
+"""
+Embedding Service Tests
+
+Tests for the process-wide embedding service: model sharing, micro-batching
+of concurrent queries, the query-embedding LRU cache and backend selection.
+"""
+
+import sys
+import threading
+import time
+import types
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+from medical_coding_ai.utils import embedding_service as embedding_service_module
+from medical_coding_ai.utils.embedding_service import EmbeddingService, get_embedding_service
+from medical_coding_ai.utils.vector_store import VectorStore
+
+
+class RecordingModel:
+    """Model stand-in that records the size of every encode call"""
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return np.array([[float(len(text)), 1.0, 0.0, 0.0] for text in texts], dtype='float32')
+
+
+def make_service(model=None, **kwargs):
+    model = model or RecordingModel()
+    return EmbeddingService(loader=lambda: model, **kwargs), model
+
+
+def encode_concurrently(service, texts):
+    results = {}
+
+    def worker(text):
+        results[text] = service.encode_query(text)
+
+    threads = [threading.Thread(target=worker, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+# ============================================================================
+# MICRO-BATCHING
+# ============================================================================
+
+class TestMicroBatching:
+    """Concurrent query encodes are coalesced"""
+
+    def test_concurrent_queries_share_batches(self):
+        service, model = make_service(RecordingModel(delay=0.02), max_wait_ms=50)
+        texts = [f"query {i}" * (i + 1) for i in range(8)]
+
+        results = encode_concurrently(service, texts)
+
+        assert len(model.calls) < len(texts)
+        assert service.metrics['max_batch_size_seen'] > 1
+        assert all(results[text][0] == len(text) for text in texts)
+
+    def test_batch_size_is_capped(self):
+        service, model = make_service(RecordingModel(delay=0.02), max_wait_ms=100, max_batch_size=3)
+
+        encode_concurrently(service, [f"q{i}" for i in range(9)])
+
+        assert max(len(call) for call in model.calls) <= 3
+        assert service.metrics['batched_queries'] == 9
+
+    def test_identical_queries_in_a_batch_are_encoded_once(self):
+        service, model = make_service(max_wait_ms=50, cache_size=0)
+
+        results = encode_concurrently(service, ['same'] * 1 + ['other'])
+        service.encode_queries(['dup', 'dup'])
+
+        assert sum(call.count('dup') for call in model.calls) == 1
+        assert set(results) == {'same', 'other'}
+
+    def test_model_errors_reach_every_caller(self):
+        service, _ = make_service(RecordingModel(error=ValueError('bad input')), max_wait_ms=0)
+
+        with pytest.raises(ValueError):
+            service.encode_query('x')
+        assert service.metrics['errors'] == 1
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+class TestQueryCache:
+    """LRU cache of query embeddings"""
+
+    def test_repeated_query_skips_model(self):
+        service, model = make_service(max_wait_ms=0)
+
+        first = service.encode_query('diabetes')
+        second = service.encode_query('diabetes')
+
+        assert np.array_equal(first, second)
+        assert len(model.calls) == 1
+        assert service.get_status()['cache_hit_rate'] == 0.5
+
+    def test_lru_eviction(self):
+        service, model = make_service(max_wait_ms=0, cache_size=2)
+        for text in ['a', 'b', 'a', 'c']:
+            service.encode_query(text)
+
+        service.encode_query('a')
+        assert len(model.calls) == 3
+        service.encode_query('b')
+        assert len(model.calls) == 4
+
+    def test_returned_vectors_do_not_alias_the_cache(self):
+        service, _ = make_service(max_wait_ms=0)
+
+        vector = service.encode_queries(['hypertension'])
+        vector[0, 0] = -1.0  # e.g. faiss.normalize_L2 in place
+
+        assert service.encode_query('hypertension')[0] == len('hypertension')
+
+    def test_bulk_encode_bypasses_cache(self):
+        service, model = make_service()
+
+        service.encode(['a', 'b', 'c'], batch_size=2, show_progress_bar=True)
+
+        assert model.calls == [['a', 'b', 'c']]
+        assert service.get_status()['cache_entries'] == 0
+
+
+# ============================================================================
+# MODEL LOADING AND SHARING
+# ============================================================================
+
+class TestModelLoading:
+    """Backend selection and the shared instance"""
+
+    def test_from_config(self):
+        service = EmbeddingService.from_config({'embeddings': {
+            'backend': 'onnx', 'onnx_file_name': 'onnx/model_qint8_avx2.onnx',
+            'max_batch_size': 16, 'max_wait_ms': 2, 'cache_size': 10
+        }})
+
+        assert service.backend == 'onnx'
+        assert service.max_batch_size == 16
+        assert service.max_wait == 0.002
+        assert service.cache_size == 10
+
+        with pytest.raises(ValueError):
+            EmbeddingService(backend='tensorrt')
+
+    def test_onnx_falls_back_to_torch(self):
+        created = []
+
+        class FakeSentenceTransformer:
+            def __init__(self, model_name, backend='torch', **kwargs):
+                if backend == 'onnx':
+                    raise ImportError('onnxruntime is not installed')
+                created.append((model_name, backend))
+
+        fake_module = types.SimpleNamespace(SentenceTransformer=FakeSentenceTransformer)
+        with patch.dict(sys.modules, {'sentence_transformers': fake_module}):
+            service = EmbeddingService(backend='onnx')
+            assert service.is_available()
+
+        assert created == [('all-MiniLM-L6-v2', 'torch')]
+        assert service.get_status()['loaded_backend'] == 'torch'
+
+    def test_unavailable_model(self):
+        def broken_loader():
+            raise OSError('model files missing')
+
+        service = EmbeddingService(loader=broken_loader)
+
+        assert not service.is_available()
+        with pytest.raises(RuntimeError):
+            service.encode_query('x')
+        assert 'model files missing' in service.get_status()['load_error']
+
+    def test_failed_load_is_retried_with_backoff(self):
+        attempts = []
+        model = RecordingModel()
+
+        def flaky_loader():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise OSError('connection reset')
+            return model
+
+        service = EmbeddingService(loader=flaky_loader, max_wait_ms=0)
+        now = [1000.0]
+        with patch.object(embedding_service_module.time, 'monotonic', lambda: now[0]):
+            assert not service.is_available()
+            # Not retried on every call while backing off
+            assert not service.is_available()
+            assert len(attempts) == 1
+
+            now[0] += embedding_service_module.LOAD_RETRY_SECONDS
+            assert not service.is_available()
+            assert len(attempts) == 2
+            now[0] += embedding_service_module.LOAD_RETRY_SECONDS
+            assert not service.is_available()
+            assert len(attempts) == 2
+
+            now[0] += embedding_service_module.LOAD_RETRY_SECONDS
+            assert service.is_available()
+            assert len(attempts) == 3
+
+        status = service.get_status()
+        assert status['loaded'] and status['load_error'] is None
+        assert service.encode_query('x')[0] == 1.0
+
+    def test_vector_stores_share_one_model(self, monkeypatch):
+        service, model = make_service(max_wait_ms=0)
+        monkeypatch.setattr(embedding_service_module, '_embedding_service', service)
+
+        stores = [VectorStore(dimension=4) for _ in range(4)]
+
+        assert get_embedding_service() is service
+        assert all(store.encoder is service for store in stores)
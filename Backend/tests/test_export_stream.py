@@ -0,0 +1,220 @@
+"""
+Export Stream Tests
+
+Tests for the streaming exports: session code rows, CSV output against the
+original pandas export, NDJSON and write-only XLSX, batches read from a
+server-side cursor, the range export queries and flat memory while writing.
+"""
+
+import io
+import json
+import tracemalloc
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from sqlalchemy.dialects import postgresql
+
+from medical_coding_ai.utils.export_stream import (
+    CLAIM_EXPORT_FIELDS, SESSION_CODE_FIELDS, SESSION_EXPORT_FIELDS, claim_export_batches, claim_export_query,
+    csv_chunks, export_response, ndjson_chunks, session_code_rows, session_export_batches,
+    session_export_query, single_batch, xlsx_chunks
+)
+
+SELECTED_CODES = [
+    {'code': 'M17.11', 'confidence': 0.92},
+    {'code': '99213', 'confidence': 0},
+    {'code': 'E11.9', 'confidence': 0.5},
+    {'code': 'J45.909'},
+]
+VERIFICATION_RESULTS = [
+    {'code': 'M17.11', 'verification_confidence': 95, 'concerns': ' laterality, "right" ', 'recommendations': ''},
+    {'code': '99213', 'verification_confidence': 70, 'concerns': '', 'recommendations': ''},
+    {'code': 'M17.11', 'verification_confidence': 10, 'concerns': 'later duplicate'},
+    {'code': 'E11.9', 'concerns': 'no A1c\nrecorded', 'recommendations': 'add lab values'},
+]
+
+
+async def batches_of(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+async def collect(chunks):
+    return b"".join([chunk async for chunk in chunks])
+
+
+class FakeStreamResult:
+    def __init__(self, rows, size):
+        self.rows = rows
+        self.size = size
+
+    async def partitions(self):
+        for start in range(0, len(self.rows), self.size):
+            yield self.rows[start:start + self.size]
+
+
+class FakeSession:
+    """AsyncSession.stream over fixed rows, recording the yield_per it was given"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.yield_per = None
+
+    async def stream(self, query):
+        self.yield_per = query.get_execution_options()['yield_per']
+        return FakeStreamResult(self.rows, self.yield_per)
+
+
+class FakeUser:
+    def __init__(self, role):
+        self.user_id = uuid.uuid4()
+        self.tenant_id = uuid.uuid4()
+        self.role = role
+
+
+def test_session_code_rows():
+    rows = list(session_code_rows(SELECTED_CODES, VERIFICATION_RESULTS))
+
+    assert rows == [
+        {'Sno': 1, 'Code': 'M17.11', 'AI confidence score/Manual Code': '92%', 'Validation score': '95%',
+         'Reason': 'Issue: laterality, "right"'},
+        {'Sno': 2, 'Code': '99213', 'AI confidence score/Manual Code': 'Manual', 'Validation score': '70%',
+         'Reason': 'No specific concerns identified'},
+        {'Sno': 3, 'Code': 'E11.9', 'AI confidence score/Manual Code': '50%', 'Validation score': '85%',
+         'Reason': 'Issue: no A1c\nrecorded | Recommendation: add lab values'},
+        {'Sno': 4, 'Code': 'J45.909', 'AI confidence score/Manual Code': 'Manual', 'Validation score': '85%',
+         'Reason': ''},
+    ]
+    assert [row['Validation score'] for row in session_code_rows(SELECTED_CODES, None)] == ['85%'] * 4
+
+
+class TestWriters:
+    """CSV, NDJSON and XLSX are written a batch at a time"""
+
+    ROWS = list(session_code_rows(SELECTED_CODES, VERIFICATION_RESULTS))
+
+    async def test_csv_matches_the_pandas_export(self):
+        expected = pd.DataFrame(self.ROWS).to_csv(index=False).encode('utf-8')
+
+        assert await collect(csv_chunks(batches_of(self.ROWS, 3), SESSION_CODE_FIELDS)) == expected
+        assert await collect(csv_chunks(single_batch(self.ROWS), SESSION_CODE_FIELDS)) == expected
+
+    async def test_csv_chunk_per_batch(self):
+        chunks = [chunk async for chunk in csv_chunks(batches_of(self.ROWS, 1), SESSION_CODE_FIELDS)]
+
+        assert len(chunks) == len(self.ROWS)
+        assert chunks[0].startswith(b"Sno,Code,")
+        assert await collect(csv_chunks(batches_of([], 1), SESSION_CODE_FIELDS)) == (
+            b"Sno,Code,AI confidence score/Manual Code,Validation score,Reason\n")
+
+    async def test_ndjson(self):
+        rows = [{'claim_id': uuid.UUID(int=1), 'service_date_from': date(2026, 3, 1),
+                 'total_charge_amount': Decimal('125.50'), 'is_denied': False}]
+
+        output = await collect(ndjson_chunks(batches_of(rows * 3, 2)))
+        lines = output.decode('utf-8').splitlines()
+        assert len(lines) == 3
+        assert json.loads(lines[0]) == {'claim_id': str(uuid.UUID(int=1)), 'service_date_from': '2026-03-01',
+                                        'total_charge_amount': '125.50', 'is_denied': False}
+
+    async def test_xlsx(self):
+        rows = [{'claim_id': uuid.UUID(int=1), 'service_date_from': date(2026, 3, 1),
+                 'total_charge_amount': Decimal('125.50'), 'is_denied': True}]
+        fields = ['claim_id', 'service_date_from', 'total_charge_amount', 'is_denied', 'paid_amount']
+
+        output = await collect(xlsx_chunks(batches_of(rows, 1), fields, 'Claims'))
+        sheet = load_workbook(io.BytesIO(output))['Claims']
+        values = list(sheet.values)
+        assert values[0] == tuple(fields)
+        assert values[1][0] == str(uuid.UUID(int=1))
+        assert values[1][1] == datetime(2026, 3, 1)
+        assert values[1][2:] == (125.5, True, None)
+
+    async def test_export_response(self):
+        response = export_response(single_batch(self.ROWS), 'xlsx', SESSION_CODE_FIELDS, 'medical_codes_x')
+        assert response.media_type == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        assert response.headers['content-disposition'] == 'attachment; filename=medical_codes_x.xlsx'
+
+        with pytest.raises(ValueError):
+            export_response(single_batch(self.ROWS), 'parquet', SESSION_CODE_FIELDS, 'medical_codes_x')
+
+    async def test_csv_memory_is_flat(self):
+        row = dict(self.ROWS[0], Reason='x' * 200)
+
+        async def many(n_batches):
+            for _ in range(n_batches):
+                yield [row] * 1000
+
+        tracemalloc.start()
+        try:
+            written = 0
+            async for chunk in csv_chunks(many(100), SESSION_CODE_FIELDS):
+                written += len(chunk)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert written > 20_000_000
+        assert peak < 2_000_000
+
+
+class TestRangeExports:
+    """Tenant-wide exports read from a server-side cursor"""
+
+    @staticmethod
+    def sql(query):
+        return str(query.compile(dialect=postgresql.dialect()))
+
+    def test_session_query_scope(self):
+        admin, coder = FakeUser('admin'), FakeUser('coder')
+
+        admin_sql = self.sql(session_export_query(admin, date(2026, 1, 1), date(2026, 1, 31)))
+        assert 'JOIN users' in admin_sql and 'users.tenant_id' in admin_sql
+        assert 'parse_result ->' in admin_sql
+        assert 'created_at >=' in admin_sql and 'created_at <' in admin_sql
+
+        coder_sql = self.sql(session_export_query(coder))
+        assert 'JOIN users' not in coder_sql
+        assert 'medical_code_parse_result.user_id' in coder_sql
+
+    def test_session_query_includes_the_last_day(self):
+        query = session_export_query(FakeUser('admin'), date(2026, 1, 1), date(2026, 1, 31))
+        params = query.compile(dialect=postgresql.dialect()).params
+
+        assert sorted(value for value in params.values() if isinstance(value, datetime)) == [
+            datetime(2026, 1, 1), datetime(2026, 2, 1)]
+
+    def test_claim_query(self):
+        sql = self.sql(claim_export_query(uuid.uuid4(), date(2026, 1, 1)))
+
+        assert 'claims.tenant_id' in sql
+        assert 'claims.service_date_from >=' in sql
+        assert 'claims.notes' not in sql
+
+    async def test_session_batches(self):
+        created = datetime(2026, 1, 5, 9, 30)
+        rows = [(uuid.UUID(int=i), created, SELECTED_CODES[:2], VERIFICATION_RESULTS) for i in range(3)]
+        rows.append((uuid.UUID(int=9), created, None, None))
+        db = FakeSession(rows)
+
+        batches = [batch async for batch in session_export_batches(db, session_export_query(FakeUser('admin')), 2)]
+
+        assert db.yield_per == 2
+        assert [len(batch) for batch in batches] == [4, 2]
+        assert set(batches[0][0]) == set(SESSION_EXPORT_FIELDS)
+        assert batches[0][0]['Session'] == str(uuid.UUID(int=0))
+        assert batches[0][0]['Created'] == '2026-01-05T09:30:00'
+        assert [row['Sno'] for row in batches[0]] == [1, 2, 1, 2]
+
+    async def test_claim_batches(self):
+        rows = [tuple(range(len(CLAIM_EXPORT_FIELDS)))] * 3
+        db = FakeSession(rows)
+
+        batches = [batch async for batch in claim_export_batches(db, claim_export_query(uuid.uuid4()))]
+
+        assert len(batches) == 1
+        assert batches[0][0] == dict(zip(CLAIM_EXPORT_FIELDS, range(len(CLAIM_EXPORT_FIELDS))))
@@ -0,0 +1,198 @@
+"""
+FHIR Mapping Tests
+
+Tests for the compiled FHIR to canonical mappings: the standard FHIR R4
+specs on edge cases (missing, malformed and secondary elements), Select
+preferences and fallbacks, EHR-specific overrides, batch mapping, and the
+pollers sharing them through transform_batch.
+"""
+
+import uuid
+import pytest
+from datetime import date, datetime
+
+from pollers.base_poller import content_hash
+from pollers.cerner.cerner_poller import CernerPoller
+from pollers.epic.epic_poller import EpicPoller
+from pollers.fhir_mapping import (
+    FHIRMappers, GENDERS, PATIENT_SPEC, Path, Select, Coalesce, Const, Lookup, equals, compile_mapping, fhir_date,
+)
+from tests.fixtures.generate_mock_fhir import generate_full_test_data
+
+
+@pytest.fixture
+def mappers():
+    return FHIRMappers()
+
+
+class TestStandardMappings:
+    """FHIR R4 specs on edge cases"""
+
+    def test_empty_patient_gets_defaults(self, mappers):
+        result = mappers.map_patient({}, 'cerner')
+
+        assert result['fhir_id'] is None and result['mrn'] is None
+        assert result['first_name'] == '' and result['last_name'] == ''
+        assert result['gender'] == 'U'
+        assert result['country'] == 'USA'
+        assert result['is_active'] is True and result['is_deceased'] is False
+        assert result['source_ehr'] == 'cerner'
+        assert isinstance(result['last_synced_at'], datetime)
+
+    def test_patient_prefers_typed_and_official_elements(self, mappers):
+        patient = {
+            'id': 'p1',
+            'identifier': [
+                {'system': 'urn:oid:ssn', 'value': '123-45-6789'},
+                {'type': {'coding': [{'code': 'MR'}]}, 'value': 'MRN-9'},
+            ],
+            'name': [
+                {'use': 'usual', 'family': 'Nick', 'given': ['N']},
+                {'use': 'official', 'family': 'Smith', 'given': ['Jane', 'Q']},
+            ],
+            'telecom': [{'system': 'email', 'value': 'j@example.com'}],
+            'address': [{'use': 'work', 'city': 'Work'}, {'use': 'home', 'city': 'Home', 'line': ['1 Main']}],
+            'birthDate': '1990-02-03',
+            'deceasedBoolean': True,
+        }
+
+        result = mappers.map_patient(patient, 'epic')
+
+        assert result['mrn'] == 'MRN-9'
+        assert result['ssn'] == '123-45-6789'
+        assert (result['first_name'], result['middle_name'], result['last_name']) == ('Jane', 'Q', 'Smith')
+        assert result['phone_primary'] is None and result['email'] == 'j@example.com'
+        assert result['city'] == 'Home' and result['address_line1'] == '1 Main' and result['address_line2'] is None
+        assert result['country'] is None  # An address without a country stays None
+        assert result['date_of_birth'] == date(1990, 2, 3)
+        assert result['is_active'] is False and result['is_deceased'] is True
+
+    def test_first_element_is_the_fallback(self, mappers):
+        result = mappers.map_patient({'identifier': [{'value': 'only'}], 'name': [{'family': 'Doe'}]}, 'epic')
+
+        assert result['mrn'] == 'only'
+        assert result['ssn'] is None
+        assert result['last_name'] == 'Doe'
+
+    def test_malformed_values_read_as_missing(self, mappers):
+        result = mappers.map_patient({'name': 'Smith', 'identifier': [None, 'x'], 'birthDate': '1990'}, 'epic')
+
+        assert result['last_name'] == ''
+        assert result['mrn'] is None
+        assert result['date_of_birth'] is None
+
+    def test_encounter_lookups_and_identifier_fallback(self, mappers):
+        result = mappers.map_encounter({
+            'id': 'e1',
+            'identifier': [{'value': ''}],
+            'class': {'code': 'EMER'},
+            'status': 'finished',
+            'period': {'start': '2024-01-15T23:30:00-05:00'},
+            'subject': {'reference': 'Patient/p1'},
+        }, 'epic')
+
+        assert result['encounter_number'] == 'e1'
+        assert result['encounter_type'] == 'Emergency' and result['place_of_service'] == '23'
+        assert result['encounter_status'] == 'Completed'
+        assert result['service_date'] == date(2024, 1, 15)
+        assert result['patient_fhir_id'] == 'p1'
+        assert mappers.map_encounter({}, 'epic')['encounter_type'] == 'Office Visit'
+        assert mappers.map_encounter({'class': {'code': 'HH'}}, 'epic')['encounter_type'] == 'Other'
+
+    def test_condition_without_icd10_coding(self, mappers):
+        text_only = mappers.map_condition({'code': {'text': 'Headache'}}, 'epic')
+        assert text_only['icd10_code'] is None and text_only['diagnosis_description'] == 'Headache'
+
+        other = mappers.map_condition({
+            'code': {'coding': [{'system': 'http://snomed.info/sct', 'code': '25064002', 'display': 'Headache'}]},
+            'category': [{'coding': [{'code': 'other'}]}, {'coding': [{'code': 'encounter-diagnosis'}]}],
+        }, 'epic')
+        assert other['icd10_code'] == '25064002'
+        assert other['diagnosis_type'] == 'Primary'
+
+    def test_procedure_code_type_and_date(self, mappers):
+        hcpcs = mappers.map_procedure({
+            'code': {'coding': [{'system': 'http://snomed.info/sct', 'code': '1'},
+                                {'system': 'https://www.cms.gov/hcpcs', 'code': 'G0008'}]},
+            'performedPeriod': {'start': '2024-05-05T10:00:00Z'},
+        }, 'epic')
+        assert hcpcs['procedure_code'] == 'G0008' and hcpcs['code_type'] == 'HCPCS'
+        assert hcpcs['procedure_date'] == date(2024, 5, 5)
+
+        text_only = mappers.map_procedure({'code': {'text': 'Flu shot'}}, 'epic')
+        assert text_only['code_type'] == 'CPT' and text_only['procedure_description'] == 'Flu shot'
+
+    def test_fhir_date(self):
+        assert fhir_date('2024-01-15T08:00:00Z') == date(2024, 1, 15)
+        assert fhir_date('2024-01') is None
+
+
+class TestCompiledMappings:
+    """Spec compilation, overrides and batches"""
+
+    def test_plain_column_overrides_select(self):
+        mapping = compile_mapping({**PATIENT_SPEC, 'mrn': Path('identifier.1.value')})
+
+        result = mapping.map({'identifier': [{'type': {'coding': [{'code': 'MR'}]}, 'value': 'a'}, {'value': 'b'}]},
+                             'epic')
+
+        assert result['mrn'] == 'b'
+
+    def test_select_otherwise_and_coalesce(self):
+        mapping = compile_mapping({
+            'contact': Select('contact', {'contact_name': Path('name.text'), 'relation': Path('relationship')},
+                              prefer=equals('rank', 1), fallback_first=False,
+                              otherwise={'contact_name': Const('none')}),
+            'label': Coalesce(Path('alias.0'), Path('name'), Const('unnamed')),
+        })
+
+        assert mapping.map({'contact': [{'rank': 2}, {'rank': 1, 'name': {'text': 'Ann'}}]}, 'x') == {
+            'contact_name': 'Ann', 'relation': None, 'label': 'unnamed', 'source_ehr': 'x',
+        }
+        assert mapping.map({'contact': [{'rank': 2}], 'name': 'N'}, 'x')['contact_name'] == 'none'
+        assert mapping.map({'alias': ['A'], 'name': 'N'}, 'x')['label'] == 'A'
+
+    def test_flattened_select_rejects_fallback(self):
+        with pytest.raises(ValueError):
+            Select('category.*.coding', {'code': Path('code')})
+
+    def test_batch_matches_single_mapping_and_shares_sync_time(self, mappers):
+        data = generate_full_test_data(patient_count=5, encounters_per_patient=2, conditions_per_encounter=2)
+
+        for resource in ('patient', 'encounter', 'condition', 'procedure'):
+            resources = data[f'{resource}s']
+            batch = mappers.map_batch(resource, resources, 'epic')
+            single = [getattr(mappers, f'map_{resource}')(r, 'epic') for r in resources]
+            for record in batch + single:
+                record.pop('last_synced_at', None)
+            assert batch == single
+
+        patients = mappers.map_batch('patient', data['patients'], 'epic')
+        assert len({record['last_synced_at'] for record in patients}) == 1
+
+    def test_version_changes_with_the_mapping(self, mappers):
+        version = compile_mapping(PATIENT_SPEC, 'patient').version
+
+        assert version == mappers.version('patient')
+        assert version != compile_mapping({**PATIENT_SPEC, 'mrn': Path('identifier.1.value')}, 'patient').version
+        # Lookup tables are referenced by name, so their contents are hashed too
+        genders = Lookup('gender', {**GENDERS, 'other': 'X'}, default='U')
+        assert version != compile_mapping({**PATIENT_SPEC, 'gender': genders}, 'patient').version
+
+
+class TestPollerTransforms:
+    """Pollers sharing the compiled mappings"""
+
+    @pytest.mark.parametrize('poller_class', [EpicPoller, CernerPoller])
+    def test_transform_all_maps_a_batch_for_the_tenant(self, poller_class):
+        poller = poller_class(uuid.uuid4(), uuid.uuid4(), {'use_mock_data': True})
+        patients = generate_full_test_data(patient_count=3)['patients']
+
+        records = poller._transform_all('patient', patients)
+
+        assert [record['fhir_id'] for record in records] == [patient['id'] for patient in patients]
+        assert all(record['tenant_id'] == poller.tenant_id and record['source_hash'] for record in records)
+        assert all(record['source_ehr'] == poller_class.EHR_TYPE for record in records)
+        assert records[0] == {**poller.transform_patient(patients[0]), 'last_synced_at': records[0]['last_synced_at'],
+                              'tenant_id': poller.tenant_id, 'source_hash': records[0]['source_hash']}
+        assert records[0]['source_hash'] == content_hash(patients[0], poller.mappers.version('patient'))
@@ -0,0 +1,181 @@
+"""
+HTTP Pool Tests
+
+Tests for the pooled HTTP client registry used by the EHR and clearinghouse
+pollers: keep-alive connection reuse against a local server, per-host
+sharing and reference counting, latency histogram, status reporting through
+the pollers, and shutdown from the scheduler.
+"""
+
+import json
+import threading
+import uuid
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pollers.epic.client import EpicClient
+from pollers.epic.epic_poller import EpicPoller
+from pollers.http_pool import HTTPClientRegistry, LatencyHistogram, PooledHTTPClient, host_key
+from clearinghouse_pollers.stedi.stedi_poller import StediPoller
+
+
+class FHIRHandler(BaseHTTPRequestHandler):
+    """Keep-alive FHIR endpoint that records the client port of every request"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.client_ports.append(self.client_address[1])
+        body = json.dumps({'resourceType': 'Bundle', 'entry': [{'resource': {'id': self.path}}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/fhir+json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fhir_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FHIRHandler)
+    server.client_ports = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}/api/FHIR/R4"
+    server.shutdown()
+    server.server_close()
+
+
+class TestPooledClient:
+    """Connection reuse and metrics"""
+
+    @pytest.mark.asyncio
+    async def test_requests_reuse_one_connection(self, fhir_server):
+        server, base_url = fhir_server
+        http = PooledHTTPClient(base_url)
+        client = EpicClient(base_url, http=http)
+
+        for i in range(5):
+            bundle = await client.get(f'/Patient/{i}', token='t')
+            assert bundle['entry'][0]['resource']['id'] == f'/api/FHIR/R4/Patient/{i}'
+
+        status = http.get_status()
+        assert len(set(server.client_ports)) == 1
+        assert status['open_connections'] == 1
+        assert status['idle_connections'] == 1
+        assert status['metrics'] == {'requests': 5, 'errors': 0, 'clients_opened': 1}
+        assert status['latency']['count'] == 5
+
+        await http.aclose()
+        assert http.get_status()['open_connections'] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_requests_are_counted(self):
+        http = PooledHTTPClient('http://127.0.0.1:9')
+
+        with pytest.raises(Exception):
+            await http.get('http://127.0.0.1:9/Patient')
+
+        assert http.metrics['errors'] == 1
+        assert http.latency.count == 1
+        await http.aclose()
+
+    def test_latency_histogram_buckets(self):
+        histogram = LatencyHistogram(buckets_ms=(10, 100))
+        for seconds in (0.005, 0.010, 0.050, 2.0):
+            histogram.observe(seconds)
+
+        snapshot = histogram.snapshot()
+        assert snapshot['buckets'] == {'le_10ms': 2, 'le_100ms': 1, 'gt_100ms': 1}
+        assert snapshot['count'] == 4
+        assert snapshot['avg_ms'] == pytest.approx(516.25)
+
+
+class TestRegistry:
+    """Per-host sharing, reference counting and shutdown"""
+
+    def test_pools_are_shared_per_host(self):
+        registry = HTTPClientRegistry()
+
+        first = registry.acquire('conn-1', 'https://fhir.epic.com/api/FHIR/R4', max_connections=4)
+        second = registry.acquire('conn-2', 'https://FHIR.epic.com/other')
+        other = registry.acquire('conn-3', 'https://healthcare.us.stedi.com/2024-04-01')
+
+        assert first is second
+        assert other is not first
+        assert first.max_connections == 4
+        assert registry.get_status()['pools']['https://fhir.epic.com']['owners'] == 2
+        assert host_key('https://fhir.epic.com:8443/x') == 'https://fhir.epic.com:8443'
+
+    @pytest.mark.asyncio
+    async def test_last_release_closes_the_pool(self, fhir_server):
+        _, base_url = fhir_server
+        registry = HTTPClientRegistry()
+        http = registry.acquire('conn-1', base_url)
+        registry.acquire('conn-2', base_url)
+        await http.get(base_url + '/metadata')
+
+        await registry.release('conn-1')
+        assert http.get_status()['open_connections'] == 1
+
+        await registry.release('conn-2')
+        assert http.get_status()['open_connections'] == 0
+        assert registry.get_status()['pools'] == {}
+
+
+class TestPollerIntegration:
+    """Pollers take their client from the registry and report it"""
+
+    def test_ehr_and_clearinghouse_pollers_report_pool_status(self):
+        # Hosts unique to this test, so no earlier poller has created their pools
+        epic_host = f'https://fhir-{uuid.uuid4().hex[:8]}.example.org'
+        stedi_host = f'https://stedi-{uuid.uuid4().hex[:8]}.example.org'
+        epic = EpicPoller(uuid.uuid4(), uuid.uuid4(), {
+            'base_url': epic_host + '/interconnect-fhir-oauth/api/FHIR/R4',
+            'http_max_connections': 3,
+        })
+        stedi = StediPoller(uuid.uuid4(), uuid.uuid4(), {'api_base_url': stedi_host + '/2024-04-01'})
+
+        assert epic.client.http is epic.http
+        assert epic.auth.http is epic.http
+        assert epic.get_status()['http_pool']['max_connections'] == 3
+        assert epic.get_status()['http_pool']['open_connections'] == 0
+        assert stedi.get_status()['http_pool']['origin'] == stedi_host
+
+    @pytest.mark.asyncio
+    async def test_connection_settings_reach_the_pool(self):
+        from pollers import scheduler as scheduler_module
+
+        connection_id = uuid.uuid4()
+        await scheduler_module._register_poller({
+            'connection_id': connection_id,
+            'tenant_id': uuid.uuid4(),
+            'ehr_type': 'epic',
+            'base_url': f'https://fhir-{uuid.uuid4().hex[:8]}.example.org/R4',
+            'poll_interval_seconds': 60,
+            'use_mock_data': False,
+            'poller_settings': {'http_max_connections': 5, 'http_max_keepalive_connections': 2},
+        })
+        try:
+            status = scheduler_module.active_pollers[connection_id].get_status()['http_pool']
+            assert status['max_connections'] == 5
+            assert status['max_keepalive_connections'] == 2
+        finally:
+            await scheduler_module.remove_poller(connection_id)
+
+    @pytest.mark.asyncio
+    async def test_stop_pollers_closes_pools(self, fhir_server):
+        from pollers.http_pool import get_http_registry
+        from pollers.scheduler import stop_pollers
+
+        _, base_url = fhir_server
+        poller = EpicPoller(uuid.uuid4(), uuid.uuid4(), {'base_url': base_url, 'use_mock_data': False})
+        await poller.client.get('/Patient')
+        assert poller.get_status()['http_pool']['open_connections'] == 1
+
+        await stop_pollers()
+
+        assert poller.get_status()['http_pool']['open_connections'] == 0
+        assert get_http_registry().get_status()['pools'] == {}
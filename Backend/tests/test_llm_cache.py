@@ -0,0 +1,205 @@
+"""
+LLM Cache Tests
+
+Tests for the content-addressed LLM response cache: LRU eviction, TTL,
+the optional Redis tier, per-tenant metrics, bypass, and agent integration.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from medical_coding_ai.agents.icd10_agent import ICD10Agent
+# Agents import the cache through the medical_coding_ai/ path entry, so the
+# context helpers must come from the same module instance
+from utils import llm_cache as llm_cache_module
+from utils.llm_cache import LLMResponseCache, bypass_llm_cache, set_cache_tenant
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis.asyncio client"""
+
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.store[key] = value
+        self.ttls[key] = ttl
+
+
+class CountingLLMClient:
+    """Stand-in for AsyncLLMClient that counts chat calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def chat(self, model, messages, **kwargs):
+        self.calls += 1
+        return f"response {self.calls} to {messages[-1]['content'][-20:]}"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+class TestLLMResponseCache:
+    """Tests for LLMResponseCache"""
+
+    def test_key_depends_on_model_system_and_prompt(self):
+        key = LLMResponseCache.make_key('m1', 'system', 'prompt')
+
+        assert key == LLMResponseCache.make_key('m1', 'system', 'prompt')
+        assert key != LLMResponseCache.make_key('m2', 'system', 'prompt')
+        assert key != LLMResponseCache.make_key('m1', 'other system', 'prompt')
+        assert key != LLMResponseCache.make_key('m1', 'system', 'prompt!')
+
+    def test_hit_and_miss(self):
+        cache = LLMResponseCache()
+
+        assert run(cache.get('k')) is None
+        run(cache.set('k', 'value'))
+
+        assert run(cache.get('k')) == 'value'
+        assert cache.metrics['hits'] == 1
+        assert cache.metrics['misses'] == 1
+
+    def test_lru_eviction(self):
+        cache = LLMResponseCache(max_entries=2)
+        run(cache.set('a', '1'))
+        run(cache.set('b', '2'))
+        run(cache.get('a'))  # a is now most recently used
+        run(cache.set('c', '3'))
+
+        assert run(cache.get('b')) is None
+        assert run(cache.get('a')) == '1'
+        assert cache.metrics['evictions'] == 1
+
+    def test_ttl_expiry(self):
+        cache = LLMResponseCache(ttl_seconds=60)
+        with patch.object(llm_cache_module.time, 'monotonic', return_value=1000.0):
+            run(cache.set('k', 'value'))
+        with patch.object(llm_cache_module.time, 'monotonic', return_value=1061.0):
+            assert run(cache.get('k')) is None
+
+        assert cache.metrics['expirations'] == 1
+
+    def test_bypass_skips_reads_but_stores(self):
+        cache = LLMResponseCache()
+        run(cache.set('k', 'old'))
+
+        with bypass_llm_cache():
+            assert run(cache.get('k')) is None
+            run(cache.set('k', 'new'))
+
+        assert run(cache.get('k')) == 'new'
+        assert cache.metrics['bypassed'] == 1
+
+    def test_per_tenant_metrics(self):
+        cache = LLMResponseCache()
+        run(cache.set('k', 'value'))
+
+        async def lookups(tenant, key):
+            set_cache_tenant(tenant)
+            await cache.get(key)
+
+        run(lookups('tenant-a', 'k'))
+        run(lookups('tenant-a', 'missing'))
+        run(lookups('tenant-b', 'k'))
+
+        tenants = cache.get_status()['metrics']['tenants']
+        assert tenants['tenant-a'] == {'hits': 1, 'misses': 1}
+        assert tenants['tenant-b'] == {'hits': 1, 'misses': 0}
+
+    def test_redis_tier_shared_between_instances(self):
+        redis = FakeRedis()
+
+        async def fake_get_redis():
+            return redis
+
+        with patch.object(llm_cache_module, 'get_redis', fake_get_redis):
+            writer = LLMResponseCache(redis_enabled=True, ttl_seconds=300)
+            reader = LLMResponseCache(redis_enabled=True)
+            run(writer.set('k', 'shared'))
+
+            assert run(reader.get('k')) == 'shared'
+
+        assert redis.ttls['llm_cache:k'] == 300
+        assert reader.metrics['redis_hits'] == 1
+        # Promoted into the reader's in-process tier
+        assert reader._get_memory('k') == 'shared'
+
+    def test_unavailable_redis_is_not_retried_per_call(self):
+        attempts = []
+
+        async def no_redis():
+            attempts.append(1)
+            return None
+
+        with patch.object(llm_cache_module, 'get_redis', no_redis):
+            cache = LLMResponseCache(redis_enabled=True)
+            for _ in range(5):
+                run(cache.get('k'))
+
+        assert len(attempts) == 1
+
+    def test_redis_pool_is_the_api_modules_pool(self):
+        from medical_coding_ai.utils import redis_client
+
+        # utils.llm_cache must not load a second utils.redis_client with its own pool
+        assert llm_cache_module.get_redis is redis_client.get_redis
+
+
+# ============================================================================
+# AGENT INTEGRATION
+# ============================================================================
+
+class TestAgentCaching:
+    """BaseAgent.query_llm_with_context goes through the cache"""
+
+    @pytest.fixture
+    def agent(self):
+        agent = ICD10Agent('test-model')
+        agent.llm_client = CountingLLMClient()
+        agent.llm_cache = LLMResponseCache()
+        return agent
+
+    def test_identical_prompt_served_from_cache(self, agent):
+        first = run(agent.query_llm_with_context('Patient has diabetes'))
+        second = run(agent.query_llm_with_context('Patient has diabetes'))
+
+        assert first == second
+        assert agent.llm_client.calls == 1
+
+    def test_different_context_is_a_different_entry(self, agent):
+        run(agent.query_llm_with_context('Patient has diabetes'))
+        run(agent.query_llm_with_context('Patient has diabetes', [{'code': 'E11.9', 'description': 'T2DM'}]))
+
+        assert agent.llm_client.calls == 2
+
+    def test_forced_reanalysis_bypasses_cache(self, agent):
+        run(agent.query_llm_with_context('Patient has diabetes'))
+
+        with bypass_llm_cache():
+            refreshed = run(agent.query_llm_with_context('Patient has diabetes'))
+
+        assert agent.llm_client.calls == 2
+        assert refreshed.startswith('response 2')
+
+    def test_errors_are_not_cached(self, agent):
+        class FailingClient:
+            async def chat(self, model, messages, **kwargs):
+                raise ConnectionError('down')
+
+        agent.llm_client = FailingClient()
+        assert run(agent.query_llm_with_context('hello')).startswith('Error:')
+
+        agent.llm_client = CountingLLMClient()
+        assert run(agent.query_llm_with_context('hello')).startswith('response 1')
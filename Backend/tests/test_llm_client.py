@@ -0,0 +1,256 @@
+"""
+LLM Client Tests
+
+Tests for the async Ollama client against a local stub server that mimics the
+Ollama /api/chat endpoint: responses, concurrency limit, timeouts and
+cancellation.
+"""
+
+import asyncio
+import json
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from medical_coding_ai.utils.llm_client import (
+    AsyncLLMClient, LLMTimeoutError, ClientDisconnectedError, cancel_on_disconnect
+)
+
+
+class StubOllamaServer:
+    """Minimal Ollama /api/chat stub running in a background thread"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stub._lock:
+                    stub.requests.append(body)
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                try:
+                    time.sleep(stub.delay)
+                    if self.path != '/api/chat':
+                        self.send_response(404)
+                        self.end_headers()
+                        return
+                    prompt = body['messages'][-1]['content']
+                    payload = json.dumps({
+                        'model': body['model'],
+                        'created_at': '2024-01-01T00:00:00Z',
+                        'message': {'role': 'assistant', 'content': f"echo: {prompt}"},
+                        'done': True
+                    }).encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with stub._lock:
+                        stub.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    with StubOllamaServer() as server:
+        yield server
+
+
+@pytest.fixture
+def slow_stub_server():
+    with StubOllamaServer(delay=0.3) as server:
+        yield server
+
+
+def user_message(content):
+    return [{'role': 'user', 'content': content}]
+
+
+# ============================================================================
+# CLIENT
+# ============================================================================
+
+class TestAsyncLLMClient:
+    """Tests for AsyncLLMClient"""
+
+    async def test_chat_returns_message_content(self, stub_server):
+        client = AsyncLLMClient(base_url=stub_server.url, timeout=5)
+
+        content = await client.chat('test-model', user_message('hello'))
+
+        assert content == 'echo: hello'
+        assert stub_server.requests[0]['model'] == 'test-model'
+        assert stub_server.requests[0]['stream'] is False
+        assert client.metrics['successes'] == 1
+
+    async def test_concurrency_is_limited(self, slow_stub_server):
+        client = AsyncLLMClient(base_url=slow_stub_server.url, timeout=10, max_concurrency=2)
+
+        results = await asyncio.gather(*[
+            client.chat('test-model', user_message(str(i))) for i in range(6)
+        ])
+
+        assert results == [f'echo: {i}' for i in range(6)]
+        assert slow_stub_server.max_active == 2
+        assert client.metrics['in_flight'] == 0
+
+    async def test_calls_do_not_block_event_loop(self, slow_stub_server):
+        client = AsyncLLMClient(base_url=slow_stub_server.url, timeout=10)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tick_task = asyncio.create_task(ticker())
+        await client.chat('test-model', user_message('hi'))
+        tick_task.cancel()
+
+        assert ticks >= 10
+
+    async def test_timeout(self, slow_stub_server):
+        client = AsyncLLMClient(base_url=slow_stub_server.url, timeout=10)
+
+        with pytest.raises(LLMTimeoutError):
+            await client.chat('test-model', user_message('slow'), timeout=0.05)
+
+        assert client.metrics['timeouts'] == 1
+
+    async def test_cancellation_frees_slot(self, slow_stub_server):
+        client = AsyncLLMClient(base_url=slow_stub_server.url, timeout=10, max_concurrency=1)
+
+        task = asyncio.create_task(client.chat('test-model', user_message('cancel me')))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert client.metrics['cancelled'] == 1
+        assert client.metrics['in_flight'] == 0
+        # The single slot is free again
+        assert await client.chat('test-model', user_message('next')) == 'echo: next'
+
+    async def test_server_error_counts_failure(self, stub_server):
+        client = AsyncLLMClient(base_url=stub_server.url + '/missing', timeout=5)
+
+        with pytest.raises(Exception):
+            await client.chat('test-model', user_message('x'))
+
+        assert client.metrics['failures'] == 1
+
+    def test_from_config(self):
+        client = AsyncLLMClient.from_config({
+            'ollama': {'base_url': 'http://llm:11434', 'timeout': 30, 'max_concurrent_requests': 8}
+        })
+
+        assert client.base_url == 'http://llm:11434'
+        assert client.timeout == 30.0
+        assert client.max_concurrency == 8
+
+    def test_usable_from_separate_event_loops(self, stub_server):
+        """Streamlit calls agents via asyncio.run, creating a new loop each time"""
+        client = AsyncLLMClient(base_url=stub_server.url, timeout=5)
+
+        assert asyncio.run(client.chat('m', user_message('a'))) == 'echo: a'
+        assert asyncio.run(client.chat('m', user_message('b'))) == 'echo: b'
+
+
+# ============================================================================
+# DISCONNECT HANDLING
+# ============================================================================
+
+class TestCancelOnDisconnect:
+    """Tests for cancel_on_disconnect"""
+
+    async def test_returns_result_when_connected(self):
+        async def connected():
+            return False
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return 'done'
+
+        assert await cancel_on_disconnect(work(), connected, poll_interval=0.01) == 'done'
+
+    async def test_cancels_work_on_disconnect(self, slow_stub_server):
+        client = AsyncLLMClient(base_url=slow_stub_server.url, timeout=10)
+        checks = 0
+
+        async def disconnects_after_first_check():
+            nonlocal checks
+            checks += 1
+            return checks > 1
+
+        with pytest.raises(ClientDisconnectedError):
+            await cancel_on_disconnect(
+                client.chat('test-model', user_message('abandoned')),
+                disconnects_after_first_check,
+                poll_interval=0.02
+            )
+
+        assert client.metrics['cancelled'] == 1
+        assert client.metrics['in_flight'] == 0
+
+
+# ============================================================================
+# AGENTS
+# ============================================================================
+
+class TestAgentsUseAsyncClient:
+    """Agents await the shared client instead of calling ollama.chat"""
+
+    async def test_agent_query_goes_through_client(self, stub_server):
+        from medical_coding_ai.agents.icd10_agent import ICD10Agent
+
+        agent = ICD10Agent('test-model')
+        agent.llm_client = AsyncLLMClient(base_url=stub_server.url, timeout=5)
+        agent.llm_cache = None
+
+        response = await agent.query_llm_with_context(
+            'Patient has diabetes',
+            [{'code': 'E11.9', 'description': 'Type 2 diabetes mellitus'}]
+        )
+
+        assert response.startswith('echo: Relevant ICD-10 codes for reference:')
+        assert stub_server.requests[0]['messages'][0]['role'] == 'system'
+
+    async def test_agent_reports_llm_errors_as_text(self):
+        from medical_coding_ai.agents.cpt_agent import CPTAgent
+
+        agent = CPTAgent('test-model')
+        agent.llm_client = AsyncLLMClient(base_url='http://127.0.0.1:9', timeout=1)
+        agent.llm_cache = None
+
+        response = await agent.query_llm_with_context('Office visit')
+
+        assert response.startswith('Error: Unable to process request')
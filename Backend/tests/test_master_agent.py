@@ -0,0 +1,288 @@
+"""
+Master Agent Tests
+
+Tests for the concurrent fan-out of the ICD-10, CPT and HCPCS agents
+(parallel execution, per-agent timeouts, partial results, latency stats) and
+for batched code verification.
+"""
+
+import asyncio
+import time
+import pytest
+
+
+class FakeAgent:
+    """Specialist agent stand-in with a configurable delay or failure"""
+
+    def __init__(self, agent_type, delay=0.0, error=None):
+        self.agent_type = agent_type
+        self.delay = delay
+        self.error = error
+        self.cancelled = False
+        self.extraction = None
+
+    async def analyze_document(self, document_text, extraction=None):
+        self.extraction = extraction
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return {
+            'agent_type': self.agent_type,
+            'suggested_codes': [{'code': f'{self.agent_type}-1', 'confidence': 0.9}]
+        }
+
+
+@pytest.fixture
+def master_agent():
+    from medical_coding_ai.agents.master_agent import MasterAgent
+    agent = MasterAgent('test-model')
+    agent.config = {'agents': {'agent_timeout': 1}}
+    return agent
+
+
+class TestConcurrentAnalysis:
+    """Tests for MasterAgent.analyze_document fan-out"""
+
+    async def test_agents_run_in_parallel(self, master_agent):
+        master_agent.set_agents(FakeAgent('ICD-10', 0.3), FakeAgent('CPT', 0.3), FakeAgent('HCPCS', 0.3))
+
+        start = time.perf_counter()
+        results = await master_agent.analyze_document('note', run_icd10=True, run_cpt=True, run_hcpcs=True)
+        elapsed = time.perf_counter() - start
+
+        assert set(results) == {'icd10', 'cpt', 'hcpcs', 'processing_stats'}
+        # Close to max(agent), well below sum(agent)
+        assert elapsed < 0.6
+
+    async def test_latency_breakdown(self, master_agent):
+        master_agent.set_agents(FakeAgent('ICD-10', 0.2), FakeAgent('CPT', 0.05), FakeAgent('HCPCS'))
+
+        results = await master_agent.analyze_document('note', run_icd10=True, run_cpt=True, run_hcpcs=False)
+        stats = results['processing_stats']
+
+        assert stats['icd10']['status'] == 'completed'
+        assert stats['icd10']['latency_ms'] >= 200
+        assert stats['cpt']['latency_ms'] < stats['icd10']['latency_ms']
+        assert stats['hcpcs'] == {'status': 'skipped', 'latency_ms': 0.0}
+        assert stats['total_latency_ms'] < stats['icd10']['latency_ms'] + stats['cpt']['latency_ms']
+
+    async def test_failed_agent_returns_partial_results(self, master_agent):
+        master_agent.set_agents(FakeAgent('ICD-10'), FakeAgent('CPT', error=RuntimeError('LLM down')),
+                                FakeAgent('HCPCS'))
+
+        results = await master_agent.analyze_document('note', run_hcpcs=True)
+
+        assert 'cpt' not in results
+        assert results['icd10']['agent_type'] == 'ICD-10'
+        assert results['hcpcs']['agent_type'] == 'HCPCS'
+        assert results['processing_stats']['cpt'] == {
+            'status': 'failed', 'error': 'LLM down', 'latency_ms': results['processing_stats']['cpt']['latency_ms']
+        }
+        # Partial results still feed code suggestions
+        codes = master_agent.get_code_suggestions(results)
+        assert {c['agent'] for c in codes} == {'ICD-10', 'HCPCS'}
+
+    async def test_slow_agent_times_out_and_is_cancelled(self, master_agent):
+        master_agent.config = {'agents': {'agent_timeout': 0.1}}
+        slow = FakeAgent('CPT', delay=5)
+        master_agent.set_agents(FakeAgent('ICD-10'), slow, FakeAgent('HCPCS'))
+
+        results = await master_agent.analyze_document('note')
+
+        assert results['processing_stats']['cpt']['status'] == 'timeout'
+        assert slow.cancelled
+        assert 'icd10' in results
+
+    async def test_orchestrate_analysis_reports_stats(self, master_agent):
+        master_agent.set_agents(FakeAgent('ICD-10'), FakeAgent('CPT'), FakeAgent('HCPCS'))
+
+        async def no_insights(results, document_data, analysis_plan):
+            return {}
+
+        master_agent._generate_insights = no_insights
+        document_data = {
+            'processed': True,
+            'anonymized_text': 'Patient diagnosed with diabetes. Office visit performed.',
+            'patient_data': {}
+        }
+
+        results = await master_agent.orchestrate_analysis(document_data)
+
+        assert results['icd10_analysis']['agent_type'] == 'ICD-10'
+        assert results['processing_stats']['icd10']['status'] == 'completed'
+        assert 'total_latency_ms' in results['processing_stats']
+
+    async def test_agents_share_one_extraction(self, master_agent):
+        from medical_coding_ai.utils.clinical_extraction import extract_clinical_entities
+        agents = [FakeAgent('ICD-10'), FakeAgent('CPT'), FakeAgent('HCPCS')]
+        master_agent.set_agents(*agents)
+        text = 'Chief Complaint: knee pain\nPlan: knee brace and physical therapy'
+        cached = extract_clinical_entities(text)
+
+        await master_agent.analyze_document(text, run_hcpcs=True, extraction=cached)
+        assert all(agent.extraction is cached for agent in agents)
+
+        # Without a matching cached extraction the document is extracted once
+        await master_agent.analyze_document(text + '.', run_hcpcs=True, extraction=cached)
+        assert agents[0].extraction is not cached
+        assert agents[0].extraction is agents[1].extraction is agents[2].extraction
+
+    def test_analysis_plan_uses_extraction_indicators(self, master_agent):
+        plan = master_agent._determine_analysis_plan({
+            'anonymized_text': 'Operative report. Knee brace fitted.',
+            'patient_data': {}
+        })
+
+        assert plan['needs_icd10'] is False
+        assert plan['needs_cpt'] is False
+        assert plan['needs_hcpcs'] is True
+        assert plan['analysis_reasoning'] == 'HCPCS: Document mentions equipment/supplies'
+
+
+# ============================================================================
+# BATCHED VERIFICATION
+# ============================================================================
+
+BATCH_CODE_RE = r'^\s*\d+\. Code: (\S+) \|'
+SINGLE_CODE_RE = r'- Code: (\S+)'
+
+
+def verification_block(code, appropriate='Yes', confidence=90):
+    return (f"CODE: {code}\nAPPROPRIATE: {appropriate}\nCONFIDENCE: {confidence}\n"
+            f"CONCERNS: None\nRECOMMENDATIONS: Code approved as documented\n")
+
+
+class FakeVerifierLLM:
+    """Answers verification prompts and records every call"""
+
+    def __init__(self, skip_codes=(), garble_codes=()):
+        self.prompts = []
+        self.skip_codes = set(skip_codes)
+        self.garble_codes = set(garble_codes)
+
+    async def __call__(self, prompt, context_codes=None):
+        import re
+        self.prompts.append(prompt)
+        batch_codes = re.findall(BATCH_CODE_RE, prompt, re.MULTILINE)
+        if batch_codes:
+            blocks = []
+            for code in batch_codes:
+                if code in self.skip_codes:
+                    continue
+                if code in self.garble_codes:
+                    blocks.append(f"CODE: {code}\nI am not sure about this one.\n")
+                else:
+                    blocks.append(verification_block(code, confidence=85))
+            return "\n".join(blocks)
+        code = re.search(SINGLE_CODE_RE, prompt).group(1)
+        return verification_block(code, confidence=70).split('\n', 1)[1]
+
+
+@pytest.fixture
+def document_data():
+    return {'anonymized_text': 'Patient with type 2 diabetes and hypertension.', 'processed': True}
+
+
+def make_codes(count, agent='ICD-10'):
+    return [{'code': f'E11.{i}', 'description': f'Code {i}', 'agent': agent, 'confidence': 0.8}
+            for i in range(count)]
+
+
+class TestBatchedVerification:
+    """Tests for verifying several codes per LLM prompt"""
+
+    async def test_one_prompt_per_type(self, master_agent, document_data):
+        llm = FakeVerifierLLM()
+        master_agent.query_llm_with_context = llm
+        master_agent.config = {'agents': {'verification_mode': 'batched', 'verification_batch_size': 10}}
+
+        codes = make_codes(5) + [
+            {'code': '99213', 'description': 'Office visit', 'agent': 'CPT', 'confidence': 0.9},
+            {'code': '99214', 'description': 'Office visit', 'agent': 'CPT', 'confidence': 0.9}
+        ]
+        results = await master_agent.verify_codes(codes, document_data)
+
+        assert len(llm.prompts) == 2
+        assert [r['code'] for r in results] == [c['code'] for c in codes]
+        assert all(r['verification_confidence'] == 85 for r in results)
+        assert all(r['status'] == 'approved' for r in results)
+
+    async def test_batch_size_splits_prompts(self, master_agent, document_data):
+        llm = FakeVerifierLLM()
+        master_agent.query_llm_with_context = llm
+        master_agent.config = {'agents': {'verification_batch_size': 4}}
+
+        results = await master_agent.verify_codes(make_codes(10), document_data)
+
+        assert len(llm.prompts) == 3
+        assert len(results) == 10
+
+    async def test_unparsed_codes_fall_back_to_single_prompts(self, master_agent, document_data):
+        llm = FakeVerifierLLM(skip_codes={'E11.1'}, garble_codes={'E11.3'})
+        master_agent.query_llm_with_context = llm
+        master_agent.config = {'agents': {'verification_mode': 'batched'}}
+
+        results = await master_agent.verify_codes(make_codes(5), document_data)
+
+        # One batched prompt plus one retry for each unparsed code
+        assert len(llm.prompts) == 3
+        by_code = {r['code']: r for r in results}
+        assert by_code['E11.1']['verification_confidence'] == 70
+        assert by_code['E11.3']['verification_confidence'] == 70
+        assert by_code['E11.0']['verification_confidence'] == 85
+        assert [r['code'] for r in results] == [f'E11.{i}' for i in range(5)]
+
+    async def test_per_code_mode(self, master_agent, document_data):
+        llm = FakeVerifierLLM()
+        master_agent.query_llm_with_context = llm
+        master_agent.config = {'agents': {'verification_mode': 'per_code'}}
+
+        await master_agent.verify_codes(make_codes(4), document_data)
+
+        assert len(llm.prompts) == 4
+
+    async def test_failed_batch_is_not_retried_per_code(self, master_agent, document_data):
+        calls = []
+
+        async def failing_llm(prompt, context_codes=None):
+            calls.append(prompt)
+            return "Error: Unable to process request - connection refused"
+
+        master_agent.query_llm_with_context = failing_llm
+        master_agent.config = {'agents': {}}
+
+        results = await master_agent.verify_codes(make_codes(3), document_data)
+
+        assert len(calls) == 1
+        assert [r['code'] for r in results] == ['E11.0', 'E11.1', 'E11.2']
+        assert all(r['status'] == 'approved_with_review' and r['verification_confidence'] == 60 for r in results)
+
+    def test_split_tolerates_markdown(self, master_agent):
+        response = (
+            "**CODE:** E11.9\n- **APPROPRIATE:** Yes\n- **CONFIDENCE:** 92%\n- CONCERNS: None\n\n"
+            "CODE: I10\nAPPROPRIATE: No\nCONFIDENCE: high\n"
+        )
+
+        blocks = master_agent._split_verification_blocks(response)
+
+        assert list(blocks) == ['E11.9']
+        result = master_agent._parse_verification_enhanced(blocks['E11.9'][0], {
+            'code': 'E11.9', 'description': 'Diabetes', 'confidence': 0.9
+        })
+        assert result['is_appropriate'] is True
+        assert result['verification_confidence'] == 92
+
+    async def test_invalid_entries_keep_their_position(self, master_agent, document_data):
+        master_agent.query_llm_with_context = FakeVerifierLLM()
+        master_agent.config = {'agents': {}}
+
+        results = await master_agent._verify_code_batch(
+            [make_codes(1)[0], 'not-a-dict', {'code': 'E11.5', 'description': 'x'}],
+            document_data, 'ICD-10'
+        )
+
+        assert [r['status'] for r in results] == ['approved', 'error', 'approved']
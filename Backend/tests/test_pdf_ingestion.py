@@ -0,0 +1,224 @@
+"""
+PDF Ingestion Tests
+
+Tests for the sharded PDF ingestion pipeline: shard planning, parallel vs.
+serial equivalence, deterministic merge and dedup, resumable checkpoints,
+progress tracking and the knowledge base managers that use it.
+"""
+
+import json
+import pytest
+from unittest.mock import patch
+
+from medical_coding_ai.utils.pdf_ingestion import (
+    IngestionTracker, PDFIngestionPipeline, merge_shards, plan_shards
+)
+
+
+def write_pdf(path, pages, rules=0, streams=None):
+    """Write a minimal text PDF, one list of lines per page, each drawing rules horizontal lines
+
+    streams, if given, are the raw content streams of the pages instead.
+    """
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    if streams is None:
+        streams = []
+        for lines in pages:
+            text = "".join(f"({line}) Tj T* " for line in lines)
+            drawing = "".join(f"50 {740 - 14 * rule} m 550 {740 - 14 * rule} l S " for rule in range(rules))
+            streams.append(f"{drawing}BT /F1 10 Tf 14 TL 50 750 Td {text}ET")
+    pages_id = len(objects) + 1 + 2 * len(streams)
+    page_ids = []
+    for stream in streams:
+        stream = stream.encode('latin-1')
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+                            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content, font)))
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % i for i in page_ids), len(page_ids)))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    path.write_bytes(bytes(out))
+    return path
+
+
+def manual_pages(n_pages=10):
+    """ICD-10 style manual; every page also repeats a code from the first page"""
+    return [[f"A{page:02d}.{line} Disease of chapter {page} variant {line}" for line in range(3)]
+            + ["A00.0 Disease of chapter 0 variant 0 repeated"]
+            for page in range(n_pages)]
+
+
+def extract_lines(text, first_page):
+    """Picklable extractor: one record per 'CODE description' line"""
+    codes = []
+    for line in text.splitlines():
+        code, _, description = line.partition(' ')
+        if description:
+            codes.append({'code': code, 'description': description, 'first_page': first_page})
+    return codes
+
+
+class FailingExtractor:
+    """Fails on chosen chunks, e.g. to simulate a crash mid-run"""
+
+    def __init__(self, fail_pages):
+        self.fail_pages = set(fail_pages)
+
+    def __call__(self, text, first_page):
+        if first_page in self.fail_pages:
+            raise RuntimeError(f"worker died on page {first_page}")
+        return extract_lines(text, first_page)
+
+
+@pytest.fixture
+def manual_pdf(tmp_path):
+    return write_pdf(tmp_path / 'icd10.pdf', manual_pages())
+
+
+def make_pipeline(tmp_path, workers=1, pages_per_shard=3):
+    return PDFIngestionPipeline(tmp_path / 'checkpoints', workers=workers,
+                                pages_per_shard=pages_per_shard, tracker=IngestionTracker())
+
+
+# ============================================================================
+# SHARDING AND MERGE
+# ============================================================================
+
+class TestSharding:
+    """Shard planning and deterministic merge"""
+
+    def test_plan_shards_covers_every_page(self):
+        assert plan_shards(10, 4) == [(0, 4), (4, 8), (8, 10)]
+        assert plan_shards(0, 4) == []
+
+    def test_shards_hold_whole_chunks(self):
+        # 100-page shards with 50-page batches stay aligned; 120 rounds up to 150
+        assert plan_shards(400, 100, 50) == [(0, 100), (100, 200), (200, 300), (300, 400)]
+        assert plan_shards(400, 120, 50)[0] == (0, 150)
+
+    def test_merge_is_ordered_and_deduplicated(self):
+        shards = [
+            {'start': 5, 'codes': [{'code': 'B'}, {'code': 'A', 'late': True}]},
+            {'start': 0, 'codes': [{'code': 'A'}, {'code': ''}]},
+        ]
+
+        assert merge_shards(shards) == [{'code': 'A'}, {'code': 'B'}]
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+class TestPipeline:
+    """Parallel extraction, checkpoints and progress"""
+
+    def test_parallel_matches_serial(self, tmp_path, manual_pdf):
+        serial = make_pipeline(tmp_path / 'serial', workers=1).run('icd10', manual_pdf, extract_lines, 'h1')
+        parallel = make_pipeline(tmp_path / 'parallel', workers=2).run('icd10', manual_pdf, extract_lines, 'h1')
+
+        assert parallel == serial
+        assert len(serial) == 30
+        assert serial[0] == {'code': 'A00.0', 'description': 'Disease of chapter 0 variant 0', 'first_page': 1}
+        assert [code['first_page'] for code in serial] == sorted(code['first_page'] for code in serial)
+
+    def test_chunks_span_several_pages(self, tmp_path, manual_pdf):
+        codes = make_pipeline(tmp_path, pages_per_shard=4).run('icd10', manual_pdf, extract_lines, 'h1',
+                                                                pages_per_chunk=2)
+
+        assert {code['first_page'] for code in codes} == {1, 3, 5, 7, 9}
+
+    def test_failed_shards_resume_from_checkpoints(self, tmp_path, manual_pdf):
+        pipeline = make_pipeline(tmp_path)
+
+        with pytest.raises(RuntimeError):
+            pipeline.run('icd10', manual_pdf, FailingExtractor({4}), 'h1')
+        status = pipeline.tracker.get_status()['icd10']
+        assert status['status'] == 'failed'
+        assert status['shards_done'] == 3
+
+        codes = pipeline.run('icd10', manual_pdf, extract_lines, 'h1')
+        status = pipeline.tracker.get_status()['icd10']
+        assert status['status'] == 'completed'
+        assert status['shards_resumed'] == 3
+        assert status['pages_done'] == 10
+        assert len(codes) == 30
+
+    def test_checkpoints_of_an_old_pdf_are_dropped(self, tmp_path, manual_pdf):
+        pipeline = make_pipeline(tmp_path)
+        with pytest.raises(RuntimeError):
+            pipeline.run('icd10', manual_pdf, FailingExtractor({10}), 'old-hash')
+
+        pipeline.run('icd10', manual_pdf, extract_lines, 'new-hash')
+
+        assert pipeline.tracker.get_status()['icd10']['shards_resumed'] == 0
+        assert [path.name for path in (tmp_path / 'checkpoints').iterdir()] == ['icd10_new-hash']
+
+        pipeline.clear_checkpoints('icd10')
+        assert list((tmp_path / 'checkpoints').iterdir()) == []
+
+    def test_progress_is_reported(self, tmp_path, manual_pdf):
+        messages = []
+        pipeline = make_pipeline(tmp_path)
+
+        pipeline.run('icd10', manual_pdf, extract_lines, 'h1', progress_callback=messages.append)
+
+        status = pipeline.tracker.get_status()['icd10']
+        assert status['progress'] == 100.0
+        assert status['shards_total'] == 4
+        assert status['codes_merged'] == 30
+        assert messages[-1] == "Processed 10/10 pages (100.0%)"
+
+
+# ============================================================================
+# KNOWLEDGE BASE MANAGERS
+# ============================================================================
+
+class TestKnowledgeBaseManagers:
+    """Both managers ingest through the pipeline with pickled extractors"""
+
+    def test_startup_manager_processes_pdf(self, tmp_path, manual_pdf):
+        from medical_coding_ai.utils.knowledge_base_manager import KnowledgeBaseManager
+        manager = KnowledgeBaseManager()
+        manager.processed_dir = tmp_path
+        manager.json_files['icd10'] = tmp_path / 'icd10_processed.json'
+        manager.metadata_files['icd10'] = tmp_path / 'icd10_metadata.json'
+        manager.ingestion = make_pipeline(tmp_path, workers=2, pages_per_shard=4)
+        manager.config.setdefault('knowledge_base', {})['max_pages_per_batch'] = 2
+
+        with patch.object(KnowledgeBaseManager, '_generate_embeddings', side_effect=lambda codes: codes):
+            assert manager._process_pdf('icd10', manual_pdf)
+
+        codes = json.loads(manager.json_files['icd10'].read_text(encoding='utf-8'))
+        assert len(codes) == 30
+        assert codes[0]['code'] == 'A00.0'
+        assert not manager._needs_processing('icd10', manual_pdf)
+        assert list((tmp_path / 'checkpoints').iterdir()) == []
+
+    def test_api_manager_processes_pdf(self, tmp_path, manual_pdf):
+        from medical_coding_ai.utils.kb_manager import KnowledgeBaseManager
+        manager = KnowledgeBaseManager()
+        manager.pdf_source_dir = str(tmp_path)
+        manager.processed_dir = str(tmp_path)
+        manager.ingestion = make_pipeline(tmp_path, workers=2)
+
+        with patch.object(KnowledgeBaseManager, 'create_embeddings', return_value=True):
+            assert manager.process_pdf_to_json('icd10')
+
+        data = json.loads((tmp_path / 'icd10_processed.json').read_text(encoding='utf-8'))
+        assert data['total_codes'] == 30
+        assert data['codes'][3]['page'] == 2
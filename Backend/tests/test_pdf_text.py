@@ -0,0 +1,189 @@
+"""
+PDF Text Extraction Tests
+
+Tests for the streaming page extractor: pdfium text layer against
+pdfplumber's layout text, table and out-of-order pages, the page budget and
+the document processor that consumes the page stream, and the upload
+endpoint's budget from the shipped config.
+"""
+
+import glob
+import uuid
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pdfplumber
+from fastapi.testclient import TestClient
+
+import main
+from medical_coding_ai.api.deps import get_current_user
+
+from medical_coding_ai.utils import pdf_text
+from medical_coding_ai.utils.document_processor import DocumentProcessor, process_document_job
+from medical_coding_ai.utils.pdf_text import PDFBudgetExceeded, iter_pdf_pages
+from tests.test_pdf_ingestion import write_pdf
+
+SAMPLE_PDFS = sorted(glob.glob(str(Path(__file__).parents[2] / 'sample-data' / '*.pdf')))
+
+REPORT_PAGES = [
+    ["PHYSICIAN SUMMARY REPORT", "Chief Complaint: knee pain for 3 weeks   ", "Vital Signs: BP 120/80"],
+    [],
+    ["Assessment: osteoarthritis of the right knee", "Plan: physical therapy twice a week"],
+]
+
+# Pages pdfium reads differently from pdfplumber: lines drawn bottom first,
+# and TJ kerning that pdfium turns into spaces
+BOTTOM_FIRST_PAGE = ("BT /F1 10 Tf 50 736 Td (Plan: physical therapy) Tj ET "
+                     "BT /F1 10 Tf 50 750 Td (Assessment: osteoarthritis) Tj ET")
+KERNED_PAGE = "BT /F1 10 Tf 50 750 Td [(Chief) -300 (Complaint:) -250 (knee) 40 (pain)] TJ ET"
+SPACED_PAGE = ("BT /F1 10 Tf 50 750 Td (Vital Signs: ) Tj ET BT /F1 10 Tf 114 750 Td (BP 120/80) Tj ET "
+               "BT /F1 10 Tf 50 736 Td [(Pulse) -500 (72)] TJ ET")
+
+
+def layout_pages(path):
+    with pdfplumber.open(path) as pdf:
+        return [page.extract_text() for page in pdf.pages]
+
+
+@pytest.fixture
+def report_pdf(tmp_path):
+    return write_pdf(tmp_path / 'report.pdf', REPORT_PAGES)
+
+
+class TestPageStream:
+    """Pages are yielded one by one from the cheapest text source"""
+
+    def test_text_layer_matches_pdfplumber(self, report_pdf):
+        pages = list(iter_pdf_pages(str(report_pdf)))
+
+        assert [page.number for page in pages] == [1, 3]
+        assert {page.method for page in pages} == {'text_layer'}
+        expected = layout_pages(report_pdf)
+        assert [page.text for page in pages] == [expected[0], expected[2]]
+
+    @pytest.mark.parametrize('path', SAMPLE_PDFS, ids=lambda path: Path(path).name)
+    def test_sample_reports_match_pdfplumber(self, path):
+        assert [page.text for page in iter_pdf_pages(path)] == [text for text in layout_pages(path) if text]
+
+    @pytest.mark.parametrize('stream, expected', [
+        (BOTTOM_FIRST_PAGE, "Assessment: osteoarthritis\nPlan: physical therapy"),
+        (KERNED_PAGE, "ChiefComplaint:kneepain"),
+    ], ids=['bottom_first', 'kerned'])
+    def test_out_of_order_pages_use_layout_analysis(self, tmp_path, stream, expected):
+        path = write_pdf(tmp_path / 'page.pdf', [], streams=[stream])
+
+        pages = list(iter_pdf_pages(path.read_bytes()))
+        assert [(page.text, page.method) for page in pages] == [(expected, 'layout')]
+        assert layout_pages(path) == [expected]
+
+    def test_spaces_pdfplumber_also_reads_stay_on_the_text_layer(self, tmp_path):
+        path = write_pdf(tmp_path / 'page.pdf', [], streams=[SPACED_PAGE, BOTTOM_FIRST_PAGE])
+
+        pages = list(iter_pdf_pages(path.read_bytes()))
+        assert [page.method for page in pages] == ['text_layer', 'layout']
+        assert [page.text for page in pages] == layout_pages(path)
+        assert pages[0].text == "Vital Signs: BP 120/80\nPulse 72"
+
+    def test_sources(self, report_pdf):
+        expected = list(iter_pdf_pages(str(report_pdf)))
+
+        assert list(iter_pdf_pages(report_pdf.read_bytes())) == expected
+        with open(report_pdf, 'rb') as f:
+            assert list(iter_pdf_pages(f)) == expected
+
+    def test_table_pages_use_layout_analysis(self, tmp_path):
+        path = write_pdf(tmp_path / 'table.pdf', REPORT_PAGES, rules=10)
+        expected = [text for text in layout_pages(path) if text]
+
+        pages = list(iter_pdf_pages(path.read_bytes()))
+        assert {page.method for page in pages} == {'layout'}
+        assert [page.text for page in pages] == expected
+
+        pages = list(iter_pdf_pages(path.read_bytes(), table_path_objects=0))
+        assert {page.method for page in pages} == {'text_layer'}
+
+    def test_without_pypdfium2_pdfplumber_reads_every_page(self, report_pdf):
+        with patch.object(pdf_text, 'pypdfium2', None):
+            pages = list(iter_pdf_pages(report_pdf.read_bytes()))
+
+        assert [page.number for page in pages] == [1, 3]
+        assert {page.method for page in pages} == {'layout'}
+
+    def test_without_pdfplumber_the_text_layer_is_used_as_is(self, tmp_path):
+        path = write_pdf(tmp_path / 'page.pdf', [], rules=10, streams=[BOTTOM_FIRST_PAGE])
+
+        with patch.object(pdf_text, 'pdfplumber', None):
+            pages = list(iter_pdf_pages(path.read_bytes()))
+
+        assert [(page.text, page.method) for page in pages] == [
+            ("Plan: physical therapy\nAssessment: osteoarthritis", 'text_layer')]
+
+    def test_page_budget_is_checked_before_parsing(self, report_pdf):
+        pages = iter_pdf_pages(report_pdf.read_bytes(), max_pages=2)
+        with patch.object(pdf_text, '_text_layer') as text_layer:
+            with pytest.raises(PDFBudgetExceeded, match="3 pages"):
+                next(pages)
+        text_layer.assert_not_called()
+
+        with patch.object(pdf_text, 'pypdfium2', None):
+            with pytest.raises(PDFBudgetExceeded):
+                next(iter_pdf_pages(report_pdf.read_bytes(), max_pages=2))
+
+        assert len(list(iter_pdf_pages(report_pdf.read_bytes(), max_pages=3))) == 2
+
+
+class TestDocumentProcessor:
+    """The processor joins the page stream once"""
+
+    def test_extract_text_from_pdf(self, report_pdf):
+        expected = layout_pages(report_pdf)
+
+        with open(report_pdf, 'rb') as f:
+            text = DocumentProcessor().extract_text_from_pdf(f)
+        assert text == f"{expected[0]}\n\n{expected[2]}\n\n"
+
+    def test_process_pdf_marks_pages(self, report_pdf):
+        processed = DocumentProcessor().process_pdf(report_pdf.read_bytes())
+
+        assert processed['processed']
+        assert processed['raw_text'].startswith("--- Page 1 ---\nPHYSICIAN SUMMARY REPORT\n")
+        assert "--- Page 2 ---" not in processed['raw_text']
+        assert "--- Page 3 ---\nAssessment: osteoarthritis" in processed['raw_text']
+        assert processed['patient_data']['assessment'] == 'osteoarthritis of the right knee'
+
+    def test_document_job_enforces_page_budget(self, report_pdf):
+        content = report_pdf.read_bytes()
+
+        text, processed = process_document_job(content, 'report.pdf', 3)
+        assert processed['patient_data']['chiefComplaint'] == 'knee pain for 3 weeks'
+        # The processor imports the extractor as utils.pdf_text, a separate module object
+        with pytest.raises(ValueError, match="3 pages"):
+            process_document_job(content, 'report.pdf', 2)
+
+
+class TestUploadEndpoint:
+    """/api/document/upload enforces the document_upload section of config.yaml"""
+
+    def test_upload_over_the_shipped_limit_gets_413(self):
+        config = main.load_config()
+        max_bytes = config['document_upload']['max_bytes']
+        assert max_bytes and config['document_upload']['max_pages']
+
+        async def database():
+            yield MagicMock()
+
+        main.app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(user_id=uuid.uuid4())
+        main.app.dependency_overrides[main.get_db] = database
+        try:
+            with patch.object(main, 'app_config', config), \
+                    patch.object(main, 'get_cpu_executor') as executor, \
+                    patch('medical_coding_ai.middleware.audit.get_audit_writer'):
+                response = TestClient(main.app).post(
+                    '/api/document/upload', files={'file': ('big.pdf', b'%' * (max_bytes + 1), 'application/pdf')})
+        finally:
+            main.app.dependency_overrides.clear()
+
+        assert response.status_code == 413
+        executor.assert_not_called()
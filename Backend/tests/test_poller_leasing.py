@@ -0,0 +1,313 @@
+"""
+Poller Leasing Tests
+
+Tests for distributed poller workers: fair-share sizing, the lease SQL
+(take over only expired leases, renew only our own), claim and rebalance
+logic, and the scheduler's worker and api modes - starting and stopping
+pollers as leases move (cancelling their syncs first), running syncs
+requested by other processes, and routing trigger and status requests to
+the worker holding a lease.
+"""
+
+import asyncio
+import uuid
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+import pollers.scheduler as scheduler_module
+from pollers.leasing import LeaseManager, fair_share
+from pollers.scheduler import active_pollers, get_cluster_status, remove_poller, trigger_sync
+
+
+def compile_postgres(statement):
+    """Render a statement as PostgreSQL SQL"""
+    from sqlalchemy.dialects import postgresql
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def result(scalar=None, rows=()):
+    mock = MagicMock()
+    mock.scalar.return_value = scalar
+    mock.scalars.return_value.all.return_value = list(rows)
+    return mock
+
+
+def session_factory(results):
+    """Async session factory whose sessions return results in order"""
+    session = MagicMock()
+    session.execute = AsyncMock(side_effect=results)
+    session.commit = AsyncMock()
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=False)
+    return MagicMock(return_value=session), session
+
+
+def connection(connection_id):
+    return {
+        'connection_id': connection_id,
+        'tenant_id': uuid.uuid4(),
+        'ehr_type': 'epic',
+        'base_url': 'https://fhir.epic.com/interconnect-fhir-oauth/api/FHIR/R4',
+        'poll_interval_seconds': 60,
+        'use_mock_data': True,
+    }
+
+
+class TestLeaseManager:
+    """Lease statements and claim logic"""
+
+    def test_fair_share(self):
+        assert fair_share(10, 3) == 4
+        assert fair_share(10, 0) == 10
+        assert fair_share(0, 2) == 0
+
+    def test_acquire_takes_over_only_expired_leases(self):
+        manager = LeaseManager(MagicMock(), worker_id='w1')
+        sql = compile_postgres(manager._acquire_statement([uuid.uuid4()]))
+
+        assert 'ON CONFLICT (connection_id) DO UPDATE SET worker_id = excluded.worker_id' in sql
+        assert 'WHERE poller_leases.lease_expires_at < timezone' in sql
+        assert 'RETURNING poller_leases.connection_id' in sql
+
+    def test_renew_touches_only_own_leases(self):
+        manager = LeaseManager(MagicMock(), worker_id='w1')
+        statement = manager._renew_statement([uuid.uuid4()])
+
+        assert 'poller_leases.worker_id = %(worker_id_1)s' in compile_postgres(statement)
+        assert statement.compile().params['worker_id_1'] == 'w1'
+
+    @pytest.mark.asyncio
+    async def test_claim_takes_free_connections_up_to_fair_share(self):
+        ids = [uuid.uuid4() for _ in range(4)]
+        factory, session = session_factory([
+            result(), result(), result(scalar=2),   # heartbeat: two live workers
+            result(rows=[ids[0]]),                  # ids[0] held by another worker
+            result(rows=[ids[1], ids[2]]),          # acquired
+        ])
+        manager = LeaseManager(factory, worker_id='w1')
+
+        held = await manager.claim(ids)
+
+        assert held == {ids[1], ids[2]}
+        acquire_params = session.execute.call_args_list[4].args[0].compile().params
+        assert ids[0] not in acquire_params.values()
+        assert manager.metrics['leases_acquired'] == 2
+
+    @pytest.mark.asyncio
+    async def test_claim_releases_surplus_when_workers_join(self):
+        ids = [uuid.uuid4() for _ in range(4)]
+        factory, session = session_factory([
+            result(), result(), result(scalar=4),   # heartbeat: four live workers
+            result(rows=ids[:3]),                   # renewed three leases
+            result(rows=[]),                        # nothing left to take
+            result(),                               # released surplus
+        ])
+        manager = LeaseManager(factory, worker_id='w1')
+        manager.held = set(ids[:3])
+
+        held = await manager.claim(ids)
+
+        assert len(held) == 1
+        assert len(manager.surplus) == 2 and not held & manager.surplus
+        assert manager.metrics['leases_lost'] == 0
+        # Nothing is deleted until the pollers of the surplus have stopped
+        assert not any('DELETE FROM poller_leases' in compile_postgres(call.args[0])
+                       for call in session.execute.call_args_list)
+
+        await manager.release_surplus()
+
+        assert manager.metrics['leases_released'] == 2
+        assert manager.surplus == set()
+        release = session.execute.call_args_list[5].args[0]
+        assert 'DELETE FROM poller_leases' in compile_postgres(release)
+        assert set(release.compile().params['connection_id_1']) == set(ids[:3]) - held
+
+    @pytest.mark.asyncio
+    async def test_claim_keeps_busy_connections(self):
+        ids = [uuid.uuid4() for _ in range(4)]
+        factory, session = session_factory([
+            result(), result(), result(scalar=4),   # heartbeat: four live workers
+            result(rows=ids[:3]),                   # renewed three leases
+            result(rows=[]),                        # nothing left to take
+        ])
+        manager = LeaseManager(factory, worker_id='w1')
+        manager.held = set(ids[:3])
+
+        held = await manager.claim(ids, busy=ids[:2])
+
+        # Both syncing connections are kept over the fair share of one
+        assert held == set(ids[:2])
+        assert manager.surplus == {ids[2]}
+
+
+class FakeLeaseManager:
+    """Lease manager double holding whatever the test assigns"""
+
+    def __init__(self, worker_id='w1'):
+        self.worker_id = worker_id
+        self.held = set()
+        self.published = {}
+        self.sync_requests = []
+        self.holders = {}
+        self.busy = set()
+        self.released_while_polling = None
+
+    async def claim(self, connection_ids, busy=()):
+        self.busy = set(busy)
+        return set(self.held) & set(connection_ids)
+
+    async def release_surplus(self):
+        self.released_while_polling = set(active_pollers) - self.held
+
+    async def publish_status(self, statuses):
+        self.published = statuses
+
+    async def take_sync_requests(self):
+        requests, self.sync_requests = self.sync_requests, []
+        return requests
+
+    async def request_sync(self, connection_id):
+        return self.holders.get(connection_id)
+
+    async def get_cluster(self):
+        return {
+            'workers': [{'worker_id': 'w2', 'leases': 1}],
+            'leases': [
+                {'connection_id': str(cid), 'worker_id': worker, 'status': {'is_running': True}}
+                for cid, worker in self.holders.items()
+            ],
+        }
+
+    def get_status(self):
+        return {'worker_id': self.worker_id}
+
+
+@pytest.fixture
+async def leased_scheduler(monkeypatch):
+    """Scheduler module in worker mode with a fake lease manager"""
+    ids = [uuid.uuid4() for _ in range(3)]
+    manager = FakeLeaseManager()
+    monkeypatch.setattr(scheduler_module, 'poller_mode', 'worker')
+    monkeypatch.setattr(scheduler_module, '_lease_manager', manager)
+    monkeypatch.setattr(scheduler_module, '_get_active_connections',
+                        AsyncMock(return_value=[connection(cid) for cid in ids]))
+    yield manager, ids
+    for connection_id in ids:
+        await remove_poller(connection_id)
+
+
+class TestWorkerMode:
+    """Scheduler behaviour when connections are leased"""
+
+    @pytest.mark.asyncio
+    async def test_pollers_follow_leases(self, leased_scheduler):
+        manager, ids = leased_scheduler
+
+        manager.held = {ids[0], ids[1]}
+        await scheduler_module._lease_cycle()
+        assert {ids[0], ids[1]} <= set(active_pollers)
+        assert set(manager.published) == {cid for cid in active_pollers}
+
+        # ids[1] moved to another worker, ids[2] moved here
+        manager.held = {ids[0], ids[2]}
+        await scheduler_module._lease_cycle()
+        assert ids[1] not in active_pollers
+        assert {ids[0], ids[2]} <= set(active_pollers)
+
+    @pytest.mark.asyncio
+    async def test_lost_lease_cancels_sync_before_releasing_pool(self, leased_scheduler, monkeypatch):
+        manager, ids = leased_scheduler
+        manager.held = {ids[0]}
+        await scheduler_module._lease_cycle()
+        poller = active_pollers[ids[0]]
+
+        started = asyncio.Event()
+
+        async def hanging_sync():
+            started.set()
+            await asyncio.Event().wait()
+
+        poller._sync_cycle = hanging_sync
+        sync = asyncio.create_task(poller.sync_cycle())
+        await started.wait()
+        assert poller.is_syncing
+
+        # Still syncing at the next heartbeat, so the lease is not released as surplus
+        await scheduler_module._lease_cycle()
+        assert manager.busy == {ids[0]}
+
+        released = []
+        registry = scheduler_module.get_http_registry()
+        original_release = registry.release
+
+        async def release(connection_id):
+            released.append((connection_id, poller.is_syncing))
+            await original_release(connection_id)
+
+        monkeypatch.setattr(registry, 'release', release)
+        manager.held = set()
+        await scheduler_module._lease_cycle()
+
+        assert ids[0] not in active_pollers
+        assert released == [(ids[0], False)]
+        assert manager.released_while_polling == set()
+        await asyncio.wait_for(sync, timeout=1)  # the cancelled cycle returns to its caller
+
+    @pytest.mark.asyncio
+    async def test_requested_sync_runs_on_next_heartbeat(self, leased_scheduler):
+        manager, ids = leased_scheduler
+        manager.held = {ids[0]}
+        await scheduler_module._lease_cycle()
+        job = scheduler_module.get_scheduler().get_job(f"ehr_sync_{ids[0]}")
+        scheduled = job.trigger.start_date
+
+        manager.sync_requests = [ids[0]]
+        await scheduler_module._lease_cycle()
+
+        job = scheduler_module.get_scheduler().get_job(f"ehr_sync_{ids[0]}")
+        assert job.next_run_time is not None and job.next_run_time <= scheduled
+
+    @pytest.mark.asyncio
+    async def test_trigger_routes_to_lease_holder(self, leased_scheduler):
+        manager, ids = leased_scheduler
+        manager.holders = {ids[1]: 'w2'}
+
+        routed = await trigger_sync(ids[1])
+        missing = await trigger_sync(ids[2])
+
+        assert routed['success'] and routed['queued'] and routed['worker_id'] == 'w2'
+        assert not missing['success']
+
+    @pytest.mark.asyncio
+    async def test_cluster_status_includes_other_workers(self, leased_scheduler):
+        manager, ids = leased_scheduler
+        manager.holders = {ids[1]: 'w2'}
+
+        status = await get_cluster_status()
+        single = await get_cluster_status(ids[1])
+
+        assert status['mode'] == 'worker'
+        assert status['active_pollers'] == 1
+        assert status['pollers'] == [{'is_running': True, 'worker_id': 'w2'}]
+        assert status['workers'][0]['worker_id'] == 'w2'
+        assert single['worker_id'] == 'w2'
+        assert (await get_cluster_status(ids[2])) == {'error': 'Poller not found'}
+
+    @pytest.mark.asyncio
+    async def test_api_mode_runs_no_pollers(self, monkeypatch):
+        monkeypatch.setattr(scheduler_module, '_lease_manager', None)
+        before = dict(active_pollers)
+
+        await scheduler_module.start_pollers(db_session_factory=MagicMock(), mode='api')
+        try:
+            assert scheduler_module.poller_mode == 'api'
+            assert isinstance(scheduler_module._lease_manager, LeaseManager)
+            assert dict(active_pollers) == before
+            assert (await scheduler_module.reload_connections())['active_pollers'] == 0
+        finally:
+            monkeypatch.setattr(scheduler_module, 'poller_mode', 'embedded')
+
+    @pytest.mark.asyncio
+    async def test_unknown_mode_is_rejected(self):
+        with pytest.raises(ValueError):
+            await scheduler_module.start_pollers(mode='replica')
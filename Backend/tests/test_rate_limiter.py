@@ -0,0 +1,198 @@
+"""
+Rate Limiter Tests
+
+Tests for the adaptive per-host token bucket shared by the EHR pollers:
+bursts and refill, AIMD rate control on 429 and Retry-After, round-robin
+fairness between tenants, cancellation, sharing through the pollers, the
+Epic client's use of the limiter, and jittered poll scheduling.
+"""
+
+import asyncio
+import time
+import uuid
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from pollers.epic.client import EpicClient
+from pollers.epic.epic_poller import EpicPoller
+from pollers.rate_limiter import AdaptiveTokenBucket, parse_retry_after
+
+
+def response(status_code, body=None, retry_after=None):
+    mock = MagicMock()
+    mock.status_code = status_code
+    mock.headers = {'Retry-After': retry_after} if retry_after is not None else {}
+    mock.json.return_value = body or {}
+    mock.text = ''
+    return mock
+
+
+class TestTokenBucket:
+    """Bursts, refill and AIMD"""
+
+    @pytest.mark.asyncio
+    async def test_burst_then_refill_rate(self):
+        limiter = AdaptiveTokenBucket('test', rate=50, burst=5)
+
+        start = time.monotonic()
+        for _ in range(5):
+            await limiter.acquire('t1')
+        assert time.monotonic() - start < 0.01
+        assert limiter.metrics['waited'] == 0
+
+        for _ in range(5):
+            await limiter.acquire('t1')
+        # Five more tokens at 50/s take about 0.1s
+        assert 0.07 < time.monotonic() - start < 0.5
+        assert limiter.metrics['granted'] == 10
+        assert limiter.metrics['waited'] == 5
+
+    @pytest.mark.asyncio
+    async def test_429_halves_rate_and_pauses_for_retry_after(self):
+        limiter = AdaptiveTokenBucket('test', rate=20, burst=5)
+
+        limiter.on_response(429, retry_after=0.2)
+        start = time.monotonic()
+        await limiter.acquire('t1')
+
+        assert time.monotonic() - start >= 0.19
+        assert limiter.rate == 10
+        assert limiter.metrics['throttled'] == 1
+
+    def test_rate_stays_within_bounds(self):
+        limiter = AdaptiveTokenBucket('test', rate=2, min_rate=1, max_rate=3, increase_step=1)
+
+        for _ in range(5):
+            limiter.on_response(429, retry_after=0)
+        assert limiter.rate == 1
+
+        limiter.on_response(200)
+        assert limiter.rate == 2
+        limiter.on_response(200)
+        assert limiter.rate == 2.5
+        for _ in range(10):
+            limiter.on_response(200)
+        assert limiter.rate == 3
+        # Client errors other than 429 leave the rate alone
+        limiter.on_response(404)
+        assert limiter.rate == 3
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after('5') == 5.0
+        assert parse_retry_after('-1') == 0.0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after('Wed, 21 Oct 2026 07:28:00 GMT') is None
+
+
+class TestFairness:
+    """Round-robin service of waiting tenants"""
+
+    @pytest.mark.asyncio
+    async def test_small_tenant_is_not_starved_by_backfill(self):
+        limiter = AdaptiveTokenBucket('test', rate=200, burst=1)
+        order = []
+
+        async def request(tenant_id):
+            await limiter.acquire(tenant_id)
+            order.append(tenant_id)
+
+        await limiter.acquire('big')
+        backfill = [asyncio.create_task(request('big')) for _ in range(20)]
+        await asyncio.sleep(0)
+        small = [asyncio.create_task(request('small')) for _ in range(2)]
+
+        await asyncio.gather(*backfill, *small)
+
+        # The small tenant's requests interleave with the backfill instead of queuing behind it
+        assert order.index('small') <= 1
+        assert [i for i, tenant in enumerate(order) if tenant == 'small'] == [1, 3]
+        assert limiter.tenant_grants == {'big': 21, 'small': 2}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_gives_up_its_place(self):
+        limiter = AdaptiveTokenBucket('test', rate=20, burst=1)
+        await limiter.acquire('t1')
+
+        waiter = asyncio.create_task(limiter.acquire('t1'))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert limiter.get_status()['waiting_tenants'] == 0
+        await asyncio.wait_for(limiter.acquire('t2'), timeout=1)
+        assert limiter.tenant_grants == {'t1': 1, 't2': 1}
+
+
+class TestPollerIntegration:
+    """Pollers share a limiter per host and the Epic client uses it"""
+
+    def test_pollers_on_one_host_share_a_limiter(self):
+        host = f'https://fhir-{uuid.uuid4().hex[:8]}.example.org'
+        first = EpicPoller(uuid.uuid4(), uuid.uuid4(), {'base_url': host + '/R4', 'rate_limit_per_second': 4})
+        second = EpicPoller(uuid.uuid4(), uuid.uuid4(), {'base_url': host + '/other/R4'})
+
+        assert first.rate_limiter is second.rate_limiter
+        assert first.client.limiter is first.rate_limiter
+        assert second.client.tenant_id == second.tenant_id
+        assert first.get_status()['rate_limit']['rate'] == 4
+
+    @pytest.mark.asyncio
+    async def test_client_backs_off_on_429_and_retries(self):
+        limiter = AdaptiveTokenBucket('test', rate=10, burst=5)
+        http = MagicMock()
+        http.get = AsyncMock(side_effect=[
+            response(429, retry_after='0.1'),
+            response(200, body={'resourceType': 'Bundle'}),
+        ])
+        client = EpicClient('https://fhir.example.com/R4', http=http, limiter=limiter, tenant_id='t1')
+
+        start = time.monotonic()
+        bundle = await client.get('/Patient', token='t')
+
+        assert bundle == {'resourceType': 'Bundle'}
+        # The retry waited for Retry-After via the limiter, not the client's backoff
+        assert 0.09 < time.monotonic() - start < 0.9
+        assert limiter.metrics['throttled'] == 1
+        assert limiter.metrics['rate_increases'] == 1
+        assert limiter.tenant_grants == {'t1': 2}
+
+
+class TestScheduling:
+    """Jittered poll triggers"""
+
+    def test_trigger_has_jitter_and_random_start(self):
+        from datetime import datetime, timedelta, timezone
+        from pollers.scheduler import _poll_trigger
+
+        now = datetime.now(timezone.utc)
+        triggers = [_poll_trigger(60) for _ in range(20)]
+
+        assert all(trigger.jitter == 6 for trigger in triggers)
+        assert all(now <= trigger.start_date <= now + timedelta(seconds=61) for trigger in triggers)
+        assert len({trigger.start_date for trigger in triggers}) > 1
+        assert _poll_trigger(5).jitter == 1
+        assert _poll_trigger(30, jitter=0).jitter == 0
+
+    @pytest.mark.asyncio
+    async def test_connection_settings_reach_limiter_and_trigger(self):
+        from pollers import scheduler as scheduler_module
+
+        connection_id = uuid.uuid4()
+        await scheduler_module._register_poller({
+            'connection_id': connection_id,
+            'tenant_id': uuid.uuid4(),
+            'ehr_type': 'epic',
+            'base_url': f'https://fhir-{uuid.uuid4().hex[:8]}.example.org/R4',
+            'poll_interval_seconds': 60,
+            'use_mock_data': False,
+            'poller_settings': {'rate_limit_per_second': 3, 'rate_limit_burst': 7,
+                                'poll_jitter_seconds': 2},
+        })
+        try:
+            limiter = scheduler_module.active_pollers[connection_id].rate_limiter
+            assert (limiter.rate, limiter.burst) == (3, 7)
+            job = scheduler_module.get_scheduler().get_job(f'ehr_sync_{connection_id}')
+            assert job.trigger.jitter == 2
+        finally:
+            await scheduler_module.remove_poller(connection_id)
@@ -10,6 +10,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime, date, timedelta
 from uuid import uuid4, UUID
 import asyncio
+from collections import namedtuple
 
 # Test data fixtures
 TEST_TENANT_ID = uuid4()
@@ -719,6 +720,23 @@ class TestMultiTenantIsolation:
 
         assert mock_session.execute.called
 
+    @pytest.mark.asyncio
+    async def test_known_patients_are_scoped_to_the_connection(self, mock_session):
+        """Incremental syncs only search the patients of their own connection"""
+        from medical_coding_ai.repositories.patient_repository import PatientRepository
+
+        mock_session.execute.return_value = create_mock_result(scalars_list=['patient-1'])
+
+        repo = PatientRepository(mock_session)
+        result = await repo.get_fhir_ids(TEST_TENANT_ID, 'epic', TEST_CONNECTION_ID)
+
+        assert result == ['patient-1']
+        statement = mock_session.execute.call_args.args[0]
+        sql = compile_postgres(statement)
+        assert 'patients.source_connection_id = %(source_connection_id_1)s' in sql
+        assert 'patients.source_connection_id IS NULL' in sql
+        assert TEST_CONNECTION_ID in statement.compile().params.values()
+
     @pytest.mark.asyncio
     async def test_encounter_tenant_isolation(self, mock_session):
         """Test that encounters from other tenants are not returned"""
@@ -745,6 +763,192 @@ class TestMultiTenantIsolation:
         assert mock_session.execute.called
 
 
+# ============================================================================
+# BULK UPSERT TESTS
+# ============================================================================
+
+UpsertRow = namedtuple('UpsertRow', ['id', 'inserted', 'fhir_id'])
+
+
+def create_upsert_result(records):
+    """Mock INSERT ... RETURNING result; records are (id, inserted, fhir_id)"""
+    result = MagicMock()
+    result.all = MagicMock(return_value=[UpsertRow(*record) for record in records])
+    return result
+
+
+def compile_postgres(statement):
+    """Render a statement as PostgreSQL SQL"""
+    from sqlalchemy.dialects import postgresql
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+class TestBulkUpsert:
+    """Tests for the set-based EHR sync upserts"""
+
+    @pytest.fixture
+    def mock_session(self):
+        return create_mock_session()
+
+    @pytest.mark.asyncio
+    async def test_patients_are_upserted_in_batches(self, mock_session):
+        """One INSERT ... ON CONFLICT per batch, duplicates collapsed to the last row"""
+        from medical_coding_ai.repositories.patient_repository import PatientRepository
+
+        patients = [
+            {'tenant_id': TEST_TENANT_ID, 'fhir_id': f'patient-{i}', 'first_name': f'Name {i}'}
+            for i in range(4)
+        ]
+        patients.append({'tenant_id': TEST_TENANT_ID, 'fhir_id': 'patient-0', 'first_name': 'Renamed'})
+        ids = [uuid4() for _ in range(4)]
+        mock_session.execute.side_effect = [
+            create_upsert_result([(ids[0], False, 'patient-0'), (ids[1], True, 'patient-1')]),
+            create_upsert_result([(ids[2], True, 'patient-2'), (ids[3], True, 'patient-3')]),
+        ]
+
+        repo = PatientRepository(mock_session)
+        result = await repo.bulk_upsert_from_ehr(patients, batch_size=2)
+
+        assert mock_session.execute.call_count == 2
+        assert result['created'] == 3
+        assert result['updated'] == 1
+        assert result['ids']['patient-0'] == ids[0]
+        mock_session.commit.assert_not_called()
+
+        statement = mock_session.execute.call_args_list[0].args[0]
+        sql = compile_postgres(statement)
+        assert 'ON CONFLICT (tenant_id, fhir_id) WHERE fhir_id IS NOT NULL DO UPDATE' in sql
+        assert 'RETURNING patients.patient_id, (xmax = 0) AS inserted, patients.fhir_id' in sql
+        assert 'created_at = excluded.created_at' not in sql
+        params = statement.compile().params
+        assert 'Renamed' in params.values()
+        assert 'Name 0' not in params.values()
+
+    @pytest.mark.asyncio
+    async def test_patients_require_tenant_and_fhir_id(self, mock_session):
+        """Same validation as the per-row upsert"""
+        from medical_coding_ai.repositories.patient_repository import PatientRepository
+
+        repo = PatientRepository(mock_session)
+        with pytest.raises(ValueError):
+            await repo.bulk_upsert_from_ehr([{'tenant_id': TEST_TENANT_ID}])
+        mock_session.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_encounters_resolve_missing_patients_in_one_query(self, mock_session):
+        """Known patients come from the map, the rest from one IN query; orphans are skipped"""
+        from medical_coding_ai.repositories.encounter_repository import EncounterRepository
+
+        lookup = MagicMock()
+        lookup.all = MagicMock(return_value=[('patient-2', TEST_PATIENT_ID)])
+        encounter_id = uuid4()
+        mock_session.execute.side_effect = [
+            lookup,
+            create_upsert_result([(encounter_id, True, 'enc-1'), (uuid4(), True, 'enc-2')]),
+        ]
+        encounters = [
+            {'tenant_id': TEST_TENANT_ID, 'fhir_id': f'enc-{i}', 'patient_fhir_id': f'patient-{i}'}
+            for i in range(1, 4)
+        ]
+
+        repo = EncounterRepository(mock_session)
+        result = await repo.bulk_upsert_from_ehr(encounters, patient_ids={'patient-1': uuid4()})
+
+        assert mock_session.execute.call_count == 2
+        lookup_sql = compile_postgres(mock_session.execute.call_args_list[0].args[0])
+        assert 'patients.fhir_id IN' in lookup_sql
+        assert 'patients.tenant_id =' in lookup_sql
+        assert result['skipped'] == ['enc-3']
+        assert result['ids']['enc-1'] == encounter_id
+
+    @pytest.mark.asyncio
+    async def test_conditions_drop_non_column_keys(self, mock_session):
+        """tenant_id and encounter_fhir_id are not diagnosis columns"""
+        from medical_coding_ai.repositories.condition_repository import ConditionRepository
+
+        mock_session.execute.return_value = create_upsert_result([(uuid4(), True, 'condition-1')])
+        conditions = [{
+            'tenant_id': TEST_TENANT_ID,
+            'fhir_id': 'condition-1',
+            'encounter_fhir_id': 'enc-1',
+            'icd10_code': 'E11.9',
+        }]
+
+        repo = ConditionRepository(mock_session)
+        result = await repo.bulk_upsert_from_ehr(conditions, encounter_ids={'enc-1': TEST_ENCOUNTER_ID})
+
+        assert result['created'] == 1
+        sql = compile_postgres(mock_session.execute.call_args.args[0])
+        assert 'ON CONFLICT (encounter_id, fhir_id) WHERE fhir_id IS NOT NULL' in sql
+        assert 'tenant_id' not in sql
+        assert 'encounter_fhir_id' not in sql
+
+    @pytest.mark.asyncio
+    async def test_unchanged_source_hash_skips_the_update(self, mock_session):
+        """Rows whose hash matches are not rewritten but still get their IDs"""
+        from medical_coding_ai.repositories.patient_repository import PatientRepository
+
+        ids = [uuid4(), uuid4()]
+        lookup = MagicMock()
+        lookup.all = MagicMock(return_value=[(ids[1], TEST_TENANT_ID, 'patient-1')])
+        mock_session.execute.side_effect = [create_upsert_result([(ids[0], True, 'patient-0')]), lookup, MagicMock()]
+        patients = [
+            {'tenant_id': TEST_TENANT_ID, 'fhir_id': f'patient-{i}', 'source_hash': f'hash-{i}'}
+            for i in range(2)
+        ]
+
+        repo = PatientRepository(mock_session)
+        result = await repo.bulk_upsert_from_ehr(patients)
+
+        assert result['created'] == 1
+        assert result['unchanged'] == 1
+        assert result['ids'] == {'patient-0': ids[0], 'patient-1': ids[1]}
+        sql = compile_postgres(mock_session.execute.call_args_list[0].args[0])
+        assert 'WHERE patients.source_hash IS DISTINCT FROM excluded.source_hash' in sql
+        lookup_sql = compile_postgres(mock_session.execute.call_args_list[1].args[0])
+        assert 'patients.fhir_id IN' in lookup_sql
+
+    @pytest.mark.asyncio
+    async def test_unchanged_rows_get_last_synced_at(self, mock_session):
+        """Skipped rows still record that they were synced"""
+        from medical_coding_ai.repositories.patient_repository import PatientRepository
+
+        patient_id = uuid4()
+        lookup = MagicMock()
+        lookup.all = MagicMock(return_value=[(patient_id, TEST_TENANT_ID, 'patient-0')])
+        mock_session.execute.side_effect = [create_upsert_result([]), lookup, MagicMock()]
+        patients = [{'tenant_id': TEST_TENANT_ID, 'fhir_id': 'patient-0', 'source_hash': 'hash-0'}]
+
+        repo = PatientRepository(mock_session)
+        result = await repo.bulk_upsert_from_ehr(patients)
+
+        assert result['unchanged'] == 1
+        touch = mock_session.execute.call_args_list[2].args[0]
+        sql = compile_postgres(touch)
+        assert sql.startswith('UPDATE patients SET last_synced_at=')
+        assert 'WHERE patients.patient_id IN' in sql
+        assert isinstance(touch.compile().params['last_synced_at'], datetime)
+
+    @pytest.mark.asyncio
+    async def test_statement_stays_under_bind_parameter_limit(self, mock_session):
+        """Wide tables get fewer rows per statement than batch_size"""
+        from medical_coding_ai.repositories.procedure_repository import ProcedureRepository
+        from medical_coding_ai.repositories.base_repository import MAX_BIND_PARAMETERS
+        from medical_coding_ai.models.ehr_models import EncounterProcedure
+
+        mock_session.execute.return_value = create_upsert_result([])
+        rows_per_statement = MAX_BIND_PARAMETERS // len(EncounterProcedure.__table__.columns)
+        procedures = [
+            {'fhir_id': f'procedure-{i}', 'encounter_id': TEST_ENCOUNTER_ID, 'procedure_code': '99213'}
+            for i in range(rows_per_statement + 1)
+        ]
+
+        repo = ProcedureRepository(mock_session)
+        await repo.bulk_upsert_from_ehr(procedures, batch_size=100000)
+
+        assert mock_session.execute.call_count == 2
+
+
 # ============================================================================
 # ERROR HANDLING TESTS
 # ============================================================================
@@ -0,0 +1,467 @@
+"""
+Sync Pipeline Tests
+
+Tests for the streaming fetch → transform → write pipeline in BasePoller:
+completeness against the mock FHIR generator, chunking and bounded fetch
+concurrency, overlap of writes with fetches, queue backpressure, failure
+propagation, paged patient streaming in the Epic client, and incremental
+sync: per-resource watermarks, content hashes and cached tokens.
+"""
+
+import asyncio
+import uuid
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from pollers.epic.client import EpicApiError, EpicClient
+from pollers.base_poller import content_hash
+from pollers.epic.epic_poller import EpicPoller
+from tests.fixtures.generate_mock_fhir import generate_full_test_data
+
+
+def reference_id(resource, field):
+    return resource[field]['reference'].split('/')[-1]
+
+
+def session_factory():
+    """Async session factory returning one mock session"""
+    session = MagicMock()
+    session.commit = AsyncMock()
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=False)
+    return MagicMock(return_value=session), session
+
+
+class FixturePoller(EpicPoller):
+    """Epic poller serving generate_mock_fhir data with simulated latency"""
+
+    def __init__(self, data, fetch_delay=0.005, write_delay=0.0, page_size=4, fail_on=None,
+                 watermark=None, updated_patients=2, new_patients=1, **config):
+        super().__init__(uuid.uuid4(), uuid.uuid4(), {'use_mock_data': False, **config})
+        self.data = data
+        self.fetch_delay = fetch_delay
+        self.write_delay = write_delay
+        self.page_size = page_size
+        self.fail_on = fail_on
+        self.updated_patients = updated_patients
+        self.calls = []
+        self.scopes = []
+        self.events = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.written = {'patient': 0, 'encounter': 0, 'condition': 0, 'procedure': 0}
+        self._get_last_sync_time = AsyncMock(return_value=watermark)
+        self._get_known_patient_ids = AsyncMock(return_value=[
+            patient['id'] for patient in data['patients'][new_patients:]
+        ])
+        self._update_sync_state = AsyncMock()
+        self.authenticate = AsyncMock(return_value='fixture-token')
+        self.encounter_patients = {
+            encounter['id']: reference_id(encounter, 'subject') for encounter in data['encounters']
+        }
+
+    def _in_scope(self, resource, patient_ids, encounter_ids):
+        encounter_id = reference_id(resource, 'encounter')
+        if encounter_ids is not None:
+            return encounter_id in encounter_ids
+        return patient_ids is None or self.encounter_patients[encounter_id] in patient_ids
+
+    async def _serve(self, name, resources):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.fetch_delay)
+            if name == self.fail_on:
+                raise RuntimeError(f"{name} fetch failed")
+            self.events.append(('fetched', name))
+            return resources
+        finally:
+            self.in_flight -= 1
+
+    async def iter_patient_pages(self, last_sync=None):
+        self.calls.append(('patients', last_sync))
+        patients = self.data['patients'][:self.updated_patients] if last_sync else self.data['patients']
+        for start in range(0, len(patients), self.page_size):
+            await asyncio.sleep(self.fetch_delay)
+            yield patients[start:start + self.page_size]
+
+    async def fetch_encounters(self, patient_ids=None, last_sync=None):
+        self.calls.append(('encounters', last_sync))
+        self.scopes.append(('encounters', last_sync, patient_ids, None))
+        return await self._serve('encounters', [
+            encounter for encounter in self.data['encounters']
+            if patient_ids is None or reference_id(encounter, 'subject') in patient_ids
+        ])
+
+    async def fetch_conditions(self, patient_ids=None, encounter_ids=None, last_sync=None):
+        self.calls.append(('conditions', last_sync))
+        self.scopes.append(('conditions', last_sync, patient_ids, encounter_ids))
+        return await self._serve('conditions', [
+            condition for condition in self.data['conditions']
+            if self._in_scope(condition, patient_ids, encounter_ids)
+        ])
+
+    async def fetch_procedures(self, patient_ids=None, encounter_ids=None, last_sync=None):
+        self.calls.append(('procedures', last_sync))
+        self.scopes.append(('procedures', last_sync, patient_ids, encounter_ids))
+        return await self._serve('procedures', [
+            procedure for procedure in self.data['procedures']
+            if self._in_scope(procedure, patient_ids, encounter_ids)
+        ])
+
+    async def _bulk_upsert(self, resource, records, **references):
+        await asyncio.sleep(self.write_delay)
+        if self.fail_on == 'write':
+            raise RuntimeError("database unavailable")
+        self.events.append(('written', resource))
+        self.written[resource] += len(records)
+        return {record['fhir_id']: uuid.uuid4() for record in records}
+
+
+@pytest.fixture
+def fhir_data():
+    return generate_full_test_data(
+        patient_count=12, encounters_per_patient=2, conditions_per_encounter=2, procedures_per_encounter=1
+    )
+
+
+class TestSyncPipeline:
+    """Streaming sync over the mock FHIR fixtures"""
+
+    @pytest.mark.asyncio
+    async def test_every_record_is_written(self, fhir_data):
+        poller = FixturePoller(fhir_data, fetch_chunk_size=3, fetch_concurrency=2)
+
+        await poller.sync_cycle()
+
+        assert poller.metrics['successful_syncs'] == 1
+        assert poller.written == {'patient': 12, 'encounter': 24, 'condition': 48, 'procedure': 24}
+        assert poller.metrics['records_processed'] == 108
+        # Three pages of 4 patients, each split into chunks of 3 + 1
+        assert poller.metrics['pipeline_batches'] == 6
+
+    @pytest.mark.asyncio
+    async def test_fetch_concurrency_is_bounded(self, fhir_data):
+        poller = FixturePoller(fhir_data, fetch_chunk_size=1, fetch_concurrency=3)
+
+        await poller.sync_cycle()
+
+        # Conditions and procedures of a chunk are fetched together
+        assert 2 < poller.max_in_flight <= 3 * 2
+        assert [name for event, name in poller.events if event == 'fetched'].count('encounters') == 12
+
+    @pytest.mark.asyncio
+    async def test_writes_overlap_with_fetches(self, fhir_data):
+        poller = FixturePoller(fhir_data, fetch_chunk_size=2, fetch_concurrency=2)
+
+        await poller.sync_cycle()
+
+        first_write = poller.events.index(('written', 'patient'))
+        last_fetch = max(i for i, (event, _) in enumerate(poller.events) if event == 'fetched')
+        assert first_write < last_fetch
+
+    @pytest.mark.asyncio
+    async def test_slow_writes_apply_backpressure(self, fhir_data):
+        poller = FixturePoller(fhir_data, fetch_delay=0, write_delay=0.01,
+                               fetch_chunk_size=1, fetch_concurrency=1, pipeline_queue_size=1)
+
+        await poller.sync_cycle()
+
+        # Fetched chunks never run more than queue + in-flight ahead of the writer
+        fetched = written = 0
+        for event, name in poller.events:
+            if (event, name) == ('fetched', 'encounters'):
+                fetched += 1
+            elif (event, name) == ('written', 'patient'):
+                written += 1
+            assert fetched - written <= 1 + 1 + 1
+        assert written == 12
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('fail_on', ['conditions', 'write'])
+    async def test_failures_stop_the_sync(self, fhir_data, fail_on):
+        poller = FixturePoller(fhir_data, fail_on=fail_on, fetch_chunk_size=1,
+                               fetch_concurrency=2, pipeline_queue_size=1)
+
+        await asyncio.wait_for(poller.sync_cycle(), timeout=5)
+
+        assert poller.metrics['failed_syncs'] == 1
+        assert poller.metrics['successful_syncs'] == 0
+        for resource_type in ('Patient', 'Encounter', 'Condition', 'Procedure'):
+            poller._update_sync_state.assert_any_await(resource_type, 'error', error_message=poller.metrics['last_error'])
+        assert not [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_triggers_share_one_cycle(self, fhir_data):
+        poller = FixturePoller(fhir_data)
+
+        await asyncio.gather(poller.sync_cycle(), poller.sync_cycle())
+
+        assert poller.metrics['total_syncs'] == 1
+        assert poller.written['patient'] == 12
+
+    @pytest.mark.asyncio
+    async def test_stop_cancels_the_sync_in_flight(self, fhir_data):
+        poller = FixturePoller(fhir_data, fetch_delay=0.05)
+        poller.start()
+        sync = asyncio.create_task(poller.sync_cycle())
+        await asyncio.sleep(0.01)
+        assert poller.is_syncing
+
+        poller.stop()
+        await poller.wait_stopped()
+
+        assert not poller.is_syncing
+        assert poller.metrics['successful_syncs'] == 0
+        poller._update_sync_state.assert_not_awaited()
+        await sync
+
+
+class TestIncrementalSync:
+    """Watermarks, unchanged-resource skipping and token reuse"""
+
+    @pytest.mark.asyncio
+    async def test_incremental_cycle_fetches_changes_since_watermark(self, fhir_data):
+        watermark = datetime(2026, 10, 1, 12, 0)
+        poller = FixturePoller(fhir_data, watermark=watermark, watermark_overlap_seconds=30, fetch_chunk_size=5)
+
+        await poller.sync_cycle()
+
+        since = watermark - timedelta(seconds=30)
+        new_id = fhir_data['patients'][0]['id']
+        known_ids = sorted(patient['id'] for patient in fhir_data['patients'][1:])
+        assert ('patients', since) in poller.calls
+        # The new patient gets everything it has
+        assert ('encounters', None, [new_id], None) in poller.scopes
+        # Known patients get their changes, a chunk of patients per search
+        changed = [scope for scope in poller.scopes if scope[1] == since]
+        assert sorted(scope[2] for scope in changed if scope[0] == 'conditions') == [
+            known_ids[0:5], known_ids[5:10], known_ids[10:]
+        ]
+        assert len(changed) == 9
+        # No search goes out without a patient or encounter filter
+        assert all(patient_ids or encounter_ids for _, _, patient_ids, encounter_ids in poller.scopes)
+        assert poller.written == {'patient': 2, 'encounter': 24, 'condition': 48, 'procedure': 24}
+
+    @pytest.mark.asyncio
+    async def test_without_known_patients_only_updated_ones_are_searched(self, fhir_data):
+        poller = FixturePoller(fhir_data, watermark=datetime(2026, 10, 1, 12, 0), new_patients=12)
+
+        await poller.sync_cycle()
+
+        assert {tuple(scope[2]) for scope in poller.scopes if scope[0] == 'encounters'} == {
+            tuple(patient['id'] for patient in fhir_data['patients'][:2])
+        }
+        assert poller.written['patient'] == 2
+
+    @pytest.mark.asyncio
+    async def test_known_patient_sweep_waits_for_its_interval(self, fhir_data):
+        watermark = datetime(2026, 10, 1, 12, 0)
+        poller = FixturePoller(fhir_data, watermark=watermark, known_patient_sweep_seconds=3600)
+        last_sweep = datetime.utcnow() - timedelta(minutes=10)
+        poller._get_last_sync_time = AsyncMock(
+            side_effect=lambda resource_type: last_sweep if resource_type == 'KnownPatients' else watermark
+        )
+
+        await poller.sync_cycle()
+
+        # Only the updated patients are searched; the sweep watermark stays put
+        assert not [scope for scope in poller.scopes if scope[0] == 'conditions' and scope[2]]
+        assert 'KnownPatients' not in [call.args[0] for call in poller._update_sync_state.await_args_list]
+
+        last_sweep = datetime.utcnow() - timedelta(hours=2)
+        await poller.sync_cycle()
+
+        # A due sweep covers everything since the previous one
+        sweep_since = last_sweep - poller.watermark_overlap
+        assert sorted(scope[0] for scope in poller.scopes if scope[1] == sweep_since) == [
+            'conditions', 'encounters', 'procedures'
+        ]
+        assert poller._update_sync_state.await_args_list[-1].args[:2] == ('KnownPatients', 'success')
+
+    @pytest.mark.asyncio
+    async def test_mock_connections_skip_the_known_patient_sweep(self, fhir_data):
+        poller = FixturePoller(fhir_data, watermark=datetime(2026, 10, 1, 12, 0), use_mock_data=True)
+
+        await poller.sync_cycle()
+
+        assert not [scope for scope in poller.scopes if scope[0] in ('conditions', 'procedures') and scope[2]]
+        assert 'KnownPatients' not in [call.args[0] for call in poller._update_sync_state.await_args_list]
+
+    @pytest.mark.asyncio
+    async def test_first_cycle_is_a_full_sync(self, fhir_data):
+        poller = FixturePoller(fhir_data, fetch_chunk_size=6)
+
+        await poller.sync_cycle()
+
+        assert ('patients', None) in poller.calls
+        assert {since for _, since in poller.calls} == {None}
+        # One encounter fetch per page-sized chunk and no flat changes pass
+        assert [name for name, _ in poller.calls].count('encounters') == 3
+
+    @pytest.mark.asyncio
+    async def test_success_advances_every_watermark_to_cycle_start(self, fhir_data):
+        poller = FixturePoller(fhir_data)
+        before = datetime.utcnow()
+
+        await poller.sync_cycle()
+
+        calls = poller._update_sync_state.await_args_list
+        # A full sync covers every known patient, so it also counts as a sweep
+        assert [call.args[0] for call in calls] == ['Patient', 'Encounter', 'Condition', 'Procedure', 'KnownPatients']
+        assert all(call.args[1] == 'success' and before <= call.args[2] <= datetime.utcnow() for call in calls)
+
+    @pytest.mark.asyncio
+    async def test_sync_state_records_cycle_counts(self):
+        factory, session = session_factory()
+        poller = EpicPoller(uuid.uuid4(), uuid.uuid4(), {'use_mock_data': True}, db_session_factory=factory)
+        poller.cycle_counts['Encounter'] = {'processed': 5, 'created': 1, 'updated': 1, 'skipped': 3}
+        sync_time = datetime(2026, 10, 1, 12, 0)
+
+        with patch('pollers.base_poller.SyncStateRepository') as repository:
+            repository.return_value.update_sync_success = AsyncMock()
+            await poller._update_sync_state('Encounter', 'success', sync_time)
+
+        repository.return_value.update_sync_success.assert_awaited_once_with(
+            poller.connection_id, 'Encounter', records_processed=5, records_created=1,
+            records_updated=1, records_skipped=3, sync_time=sync_time,
+        )
+        session.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_unchanged_rows_are_counted_as_skipped(self):
+        factory, _ = session_factory()
+        poller = EpicPoller(uuid.uuid4(), uuid.uuid4(), {'use_mock_data': True}, db_session_factory=factory)
+        poller.cycle_counts = {'Patient': {'processed': 0, 'created': 0, 'updated': 0, 'skipped': 0}}
+        ids = {'p1': uuid.uuid4(), 'p2': uuid.uuid4(), 'p3': uuid.uuid4()}
+
+        with patch('pollers.base_poller.PatientRepository') as repository:
+            repository.return_value.bulk_upsert_from_ehr = AsyncMock(
+                return_value={'ids': ids, 'created': 1, 'updated': 0, 'unchanged': 2}
+            )
+            result = await poller._bulk_upsert('patient', [{'fhir_id': fhir_id} for fhir_id in ids])
+
+        assert result == ids
+        assert poller.metrics['records_written'] == 1
+        assert poller.metrics['records_skipped'] == 2
+        assert poller.cycle_counts['Patient'] == {'processed': 3, 'created': 1, 'updated': 0, 'skipped': 2}
+
+    def test_content_hash_ignores_meta(self):
+        resource = {'resourceType': 'Patient', 'id': 'p1', 'name': [{'family': 'Doe'}],
+                    'meta': {'versionId': '1', 'lastUpdated': '2026-10-01T00:00:00Z'}}
+        touched = {**resource, 'meta': {'versionId': '2', 'lastUpdated': '2026-10-02T00:00:00Z'}}
+        renamed = {**resource, 'name': [{'family': 'Roe'}]}
+
+        assert content_hash(resource) == content_hash(touched)
+        assert content_hash(resource) != content_hash(renamed)
+        assert len(content_hash(resource)) == 64
+
+    def test_content_hash_changes_with_the_mapping_version(self):
+        resource = {'resourceType': 'Patient', 'id': 'p1', 'name': [{'family': 'Doe'}]}
+
+        assert content_hash(resource, '1') == content_hash(resource, '1')
+        assert content_hash(resource, '1') != content_hash(resource, '2')
+
+    @pytest.mark.asyncio
+    async def test_transformed_records_carry_source_hash(self, fhir_data):
+        poller = FixturePoller(fhir_data)
+        records = []
+
+        async def capture(resource, batch, **references):
+            records.extend(batch)
+            return {record['fhir_id']: uuid.uuid4() for record in batch}
+
+        poller._bulk_upsert = capture
+        await poller.sync_cycle()
+
+        patient = next(record for record in records if record['fhir_id'] == fhir_data['patients'][0]['id'])
+        assert patient['source_hash'] == content_hash(fhir_data['patients'][0], poller.mapping_version('patient'))
+
+    @pytest.mark.asyncio
+    async def test_token_is_reused_across_cycles(self, fhir_data):
+        poller = FixturePoller(fhir_data)
+        poller.authenticate = AsyncMock(return_value='token')
+
+        await poller.sync_cycle()
+        await poller.sync_cycle()
+
+        poller.authenticate.assert_awaited_once()
+        assert poller.metrics['token_refreshes'] == 1
+
+    @pytest.mark.asyncio
+    async def test_token_is_refreshed_before_it_expires(self, fhir_data):
+        poller = FixturePoller(fhir_data)
+        poller.authenticate = AsyncMock(return_value='token')
+        poller.token_expires_at = MagicMock(return_value=datetime.utcnow() + timedelta(minutes=2))
+
+        await poller._ensure_authenticated()
+        await poller._ensure_authenticated()
+
+        # Inside the refresh margin, so every call re-authenticates
+        assert poller.authenticate.await_count == 2
+
+
+class TestEpicPaging:
+    """Streaming pages from the Epic client"""
+
+    @staticmethod
+    def bundle(ids, next_url=None):
+        return {
+            'entry': [{'resource': {'id': resource_id}} for resource_id in ids],
+            'link': [{'relation': 'next', 'url': next_url}] if next_url else []
+        }
+
+    @pytest.mark.asyncio
+    async def test_next_page_is_prefetched(self):
+        client = EpicClient('https://fhir.example.com/R4')
+        client.get = AsyncMock(side_effect=[
+            self.bundle(['p1', 'p2'], 'https://fhir.example.com/R4/Patient?page=2'),
+            self.bundle(['p3'], 'https://fhir.example.com/R4/Patient?page=3'),
+            self.bundle(['p4']),
+        ])
+
+        pages = []
+        async for page in client.iter_pages('/Patient', params={'_count': '2'}, token='t'):
+            await asyncio.sleep(0)
+            # The request for the following page is already out
+            pages.append((page, client.get.await_count))
+
+        assert [[r['id'] for r in page] for page, _ in pages] == [['p1', 'p2'], ['p3'], ['p4']]
+        assert [count for _, count in pages] == [2, 3, 3]
+        assert client.get.await_args_list[1].args == ('/Patient?page=2', None, 't')
+
+    @pytest.mark.asyncio
+    async def test_get_all_pages_fails_past_max_pages(self):
+        client = EpicClient('https://fhir.example.com/R4')
+        client.get = AsyncMock(side_effect=[
+            self.bundle(['p1'], 'https://fhir.example.com/R4/Patient?page=2'),
+            self.bundle(['p2'], 'https://fhir.example.com/R4/Patient?page=3'),
+        ])
+
+        # A truncated result must not pass for a complete one
+        with pytest.raises(EpicApiError, match="more than 2 pages"):
+            await client.get_all_pages('/Patient', max_pages=2)
+        assert client.get.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_get_all_pages_within_max_pages(self):
+        client = EpicClient('https://fhir.example.com/R4')
+        client.get = AsyncMock(side_effect=[
+            self.bundle(['p1'], 'https://fhir.example.com/R4/Patient?page=2'),
+            self.bundle(['p2']),
+        ])
+
+        resources = await client.get_all_pages('/Patient', max_pages=2)
+
+        assert [r['id'] for r in resources] == ['p1', 'p2']
+
+    @pytest.mark.asyncio
+    async def test_truncated_search_fails_the_cycle(self, fhir_data):
+        poller = FixturePoller(fhir_data, watermark=datetime(2026, 10, 1, 12, 0))
+        poller.fetch_conditions = AsyncMock(side_effect=EpicApiError("/Condition has more than 100 pages"))
+
+        await poller.sync_cycle()
+
+        assert poller.metrics['failed_syncs'] == 1
+        assert all(call.args[1] == 'error' for call in poller._update_sync_state.await_args_list)
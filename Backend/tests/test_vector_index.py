@@ -0,0 +1,382 @@
+"""
+Vector Index Tests
+
+Tests for the persisted, memory-mapped FAISS index: build/load round trip,
+staleness checks, VectorStore serving, the KB manager build step, agent
+start-up without re-encoding the codes, and the config-selected index types.
+"""
+
+import hashlib
+import json
+import os
+import zlib
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+from medical_coding_ai.utils.code_catalog import CodeCatalog
+from medical_coding_ai.utils.embedding_service import DEFAULT_EMBEDDING_MODEL, EmbeddingService
+from medical_coding_ai.utils.index_factory import (
+    DEFAULT_INDEX_PARAMS, build_index, create_index, index_params_from_config
+)
+from medical_coding_ai.utils.vector_index import PersistedCodeIndex, code_documents
+from medical_coding_ai.utils.vector_store import VectorStore
+
+DIMENSION = 32
+
+CODES = [
+    {"code": "E11.9", "description": "Type 2 diabetes mellitus without complications", "type": "ICD-10"},
+    {"code": "I10", "description": "Essential primary hypertension", "type": "ICD-10"},
+    {"code": "J45.909", "description": "Unspecified asthma, uncomplicated", "type": "ICD-10",
+     "text_chunk": "J45.909 - Unspecified asthma, uncomplicated"},
+]
+
+
+class FakeEncoder:
+    """Deterministic bag-of-words encoder standing in for SentenceTransformer"""
+
+    def __init__(self, model_name=DEFAULT_EMBEDDING_MODEL):
+        self.model_name = model_name
+        self.encoded = 0
+
+    def encode(self, texts, **kwargs):
+        self.encoded += len(texts)
+        vectors = np.zeros((len(texts), DIMENSION), dtype='float32')
+        for row, text in enumerate(texts):
+            for token in text.lower().replace(',', ' ').split():
+                vectors[row, zlib.crc32(token.encode()) % DIMENSION] += 1.0
+        return vectors
+
+
+def fake_service():
+    return EmbeddingService(loader=FakeEncoder, max_wait_ms=0)
+
+
+def md5(path):
+    return hashlib.md5(path.read_bytes()).hexdigest()
+
+
+def anonymous_rss():
+    """Private (not file-backed) resident memory of this process, in bytes"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('RssAnon:'):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("RssAnon not reported")
+
+
+@pytest.fixture
+def kb_dir(tmp_path):
+    path = tmp_path / 'icd10_processed.json'
+    path.write_text(json.dumps({'codes': CODES}), encoding='utf-8')
+    return tmp_path
+
+
+def build_code_index(kb_dir, source_hash=None):
+    documents, metadata = code_documents(CODES)
+    embeddings = FakeEncoder().encode(documents)
+    return PersistedCodeIndex.build(
+        kb_dir / 'embeddings', 'icd10', documents, metadata, embeddings,
+        source_hash or md5(kb_dir / 'icd10_processed.json')
+    )
+
+
+# ============================================================================
+# PERSISTED INDEX
+# ============================================================================
+
+class TestPersistedCodeIndex:
+    """Tests for PersistedCodeIndex build/load"""
+
+    def test_round_trip(self, kb_dir):
+        manifest = build_code_index(kb_dir)
+        index = PersistedCodeIndex.load(kb_dir / 'embeddings', 'icd10', manifest['source_hash'])
+
+        assert len(index) == 3
+        assert index.dimension == DIMENSION
+        assert index.index.ntotal == 3
+        assert index.get_record(2) == {
+            'document': 'J45.909 - Unspecified asthma, uncomplicated',
+            'metadata': {'code': 'J45.909', 'description': 'Unspecified asthma, uncomplicated', 'type': 'ICD-10'}
+        }
+        assert index.get_record(0)['document'] == 'E11.9: Type 2 diabetes mellitus without complications'
+
+    def test_stale_source_hash_is_ignored(self, kb_dir):
+        build_code_index(kb_dir)
+
+        assert PersistedCodeIndex.load(kb_dir / 'embeddings', 'icd10', 'other-hash') is None
+        # No expected hash skips the check
+        assert PersistedCodeIndex.load(kb_dir / 'embeddings', 'icd10') is not None
+
+    def test_other_embedding_model_is_ignored(self, kb_dir):
+        manifest = build_code_index(kb_dir)
+
+        assert PersistedCodeIndex.load(kb_dir / 'embeddings', 'icd10', manifest['source_hash'],
+                                       model_name='another-model') is None
+
+    def test_missing_or_partial_build_is_ignored(self, kb_dir):
+        assert PersistedCodeIndex.load(kb_dir / 'embeddings', 'icd10') is None
+
+        build_code_index(kb_dir)
+        (kb_dir / 'embeddings' / 'icd10.faiss').write_bytes(b'truncated')
+
+        assert PersistedCodeIndex.load(kb_dir / 'embeddings', 'icd10') is None
+
+    @pytest.mark.skipif(not os.path.exists('/proc/self/maps'), reason="needs /proc")
+    @pytest.mark.parametrize('params', [
+        {'index_type': 'flat'},
+        {'index_type': 'hnsw', 'hnsw_m': 16, 'ef_construction': 40},
+        {'index_type': 'ivf_flat', 'nlist': 16},
+        {'index_type': 'ivf_pq', 'nlist': 16, 'pq_m': 32, 'pq_nbits': 8},
+    ], ids=lambda params: params['index_type'])
+    def test_index_is_mapped_not_copied(self, kb_dir, params):
+        n_vectors = 10000
+        PersistedCodeIndex.build(kb_dir / 'embeddings', 'icd10', ['doc'] * n_vectors,
+                                 [{'code': 'X'}] * n_vectors, clustered_vectors(n_vectors, dimension=128),
+                                 'hash', index_params=params)
+        index_path = kb_dir / 'embeddings' / 'icd10.faiss'
+
+        before = anonymous_rss()
+        index = PersistedCodeIndex.load(kb_dir / 'embeddings', 'icd10', 'hash')
+        index.index.search(clustered_vectors(5, dimension=128), 5)
+
+        # The index file backs the index (shared page cache), not a private copy
+        assert str(index_path) in open('/proc/self/maps').read()
+        assert anonymous_rss() - before < max(2_000_000, index_path.stat().st_size // 4)
+
+    def test_mismatched_lengths_rejected(self, kb_dir):
+        with pytest.raises(ValueError):
+            PersistedCodeIndex.build(kb_dir, 'icd10', ['a'], [], np.zeros((1, DIMENSION)), None)
+
+
+# ============================================================================
+# VECTOR STORE
+# ============================================================================
+
+class TestVectorStorePersisted:
+    """VectorStore serving searches from a persisted index"""
+
+    @pytest.fixture
+    def store(self, kb_dir):
+        build_code_index(kb_dir)
+        store = VectorStore()
+        store._encoder = fake_service()
+        assert store.load_persisted(kb_dir / 'embeddings', 'icd10', md5(kb_dir / 'icd10_processed.json'))
+        return store
+
+    def test_search(self, store):
+        results = store.search('asthma uncomplicated', k=2)
+
+        assert results[0]['metadata']['code'] == 'J45.909'
+        assert results[0]['score'] > results[1]['score']
+        assert store.count() == 3
+        assert store.get_stats()['persisted'] is True
+
+    def test_batch_search(self, store):
+        results = store.batch_search(['hypertension', 'diabetes mellitus'], k=1)
+
+        assert [r[0]['metadata']['code'] for r in results] == ['I10', 'E11.9']
+
+    def test_index_of_another_model_is_not_served(self, kb_dir):
+        build_code_index(kb_dir)
+        store = VectorStore()
+        store._encoder = EmbeddingService(model_name='all-mpnet-base-v2', loader=FakeEncoder, max_wait_ms=0)
+
+        assert not store.load_persisted(kb_dir / 'embeddings', 'icd10', md5(kb_dir / 'icd10_processed.json'))
+
+    def test_persisted_index_is_read_only(self, store):
+        with pytest.raises(ValueError):
+            store.add_documents(['new code'])
+
+        store.clear()
+        assert store.count() == 0
+        store.add_documents(['hypertension'], [{'code': 'I10'}])
+        assert store.count() == 1
+
+
+# ============================================================================
+# BUILD AND START-UP
+# ============================================================================
+
+class TestKnowledgeBaseManagerBuild:
+    """KnowledgeBaseManager.create_embeddings writes the persisted index"""
+
+    @pytest.fixture
+    def kb_manager(self, kb_dir):
+        from medical_coding_ai.utils.kb_manager import KnowledgeBaseManager
+        manager = KnowledgeBaseManager()
+        manager.processed_dir = str(kb_dir)
+        manager.embeddings_dir = str(kb_dir / 'embeddings')
+        manager._encoder = FakeEncoder()
+        return manager
+
+    def test_builds_versioned_index(self, kb_manager, kb_dir):
+        assert kb_manager.create_embeddings('icd10')
+
+        manifest = json.loads((kb_dir / 'embeddings' / 'icd10_manifest.json').read_text())
+        assert manifest['source_hash'] == md5(kb_dir / 'icd10_processed.json')
+        assert manifest['count'] == 3
+        assert kb_manager.get_status()['embeddings_available']['icd10'] is True
+
+    def test_index_records_the_configured_model(self, kb_manager, kb_dir):
+        kb_manager._encoder = FakeEncoder(model_name='all-mpnet-base-v2')
+        assert kb_manager.create_embeddings('icd10')
+
+        manifest = json.loads((kb_dir / 'embeddings' / 'icd10_manifest.json').read_text())
+        assert manifest['model_name'] == 'all-mpnet-base-v2'
+
+        # Switching models rebuilds instead of accepting the other model's vectors
+        kb_manager._encoder = FakeEncoder()
+        assert kb_manager.create_embeddings('icd10')
+        assert kb_manager._encoder.encoded == 3
+
+    def test_current_index_is_not_rebuilt(self, kb_manager):
+        kb_manager.create_embeddings('icd10')
+        encoded = kb_manager._encoder.encoded
+
+        assert kb_manager.create_embeddings('icd10')
+        assert kb_manager._encoder.encoded == encoded
+
+
+class TestAgentStartup:
+    """BaseAgent.load_knowledge_base memory-maps the index instead of encoding"""
+
+    @pytest.fixture
+    def agent(self, kb_dir):
+        from medical_coding_ai.agents.icd10_agent import ICD10Agent
+        agent = ICD10Agent('test-model')
+        agent.vector_store = VectorStore(dimension=DIMENSION)
+        agent.vector_store._encoder = fake_service()
+        return agent
+
+    def load(self, agent, kb_dir):
+        catalog = CodeCatalog(data_dir=kb_dir, check_interval=0)
+        # Agents import base_agent through the medical_coding_ai/ path entry
+        with patch('agents.base_agent.get_code_catalog', return_value=catalog):
+            agent.load_knowledge_base()
+
+    def test_loads_persisted_index_without_encoding(self, agent, kb_dir):
+        build_code_index(kb_dir)
+
+        self.load(agent, kb_dir)
+
+        assert agent.knowledge_loaded
+        assert agent.vector_store.encoder.model.encoded == 0
+        assert agent.get_agent_stats()['vector_store_size'] == 3
+        assert agent.search_relevant_codes('essential hypertension', k=1)[0]['code'] == 'I10'
+
+    def test_stale_index_falls_back_to_encoding(self, agent, kb_dir):
+        build_code_index(kb_dir, source_hash='built-from-older-json')
+
+        self.load(agent, kb_dir)
+
+        assert agent.knowledge_loaded
+        assert agent.vector_store.encoder.model.encoded == 3
+        assert agent.vector_store.get_stats()['persisted'] is False
+
+    def test_reload_replaces_instead_of_appending(self, agent, kb_dir):
+        self.load(agent, kb_dir)
+        self.load(agent, kb_dir)
+
+        assert agent.vector_store.count() == 3
+
+
+# ============================================================================
+# INDEX TYPES
+# ============================================================================
+
+def clustered_vectors(n, dimension=DIMENSION, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((20, dimension)).astype('float32')
+    vectors = centers[rng.integers(0, 20, n)] + 0.3 * rng.standard_normal((n, dimension)).astype('float32')
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class TestIndexFactory:
+    """Tests for config-selected index types"""
+
+    @pytest.mark.parametrize('params, expected_type, min_recall', [
+        ({'index_type': 'flat'}, 'IndexFlatIP', 1.0),
+        ({'index_type': 'hnsw', 'hnsw_m': 16, 'ef_construction': 40}, 'IndexHNSWFlat', 0.9),
+        ({'index_type': 'ivf_flat', 'nlist': 16}, 'IndexIVFFlat', 0.9),
+        # Lossy compression: ranks are approximate
+        ({'index_type': 'ivf_pq', 'nlist': 16, 'pq_m': 32, 'pq_nbits': 4}, 'IndexIVFPQ', 0.5),
+    ])
+    def test_index_types_recall_against_flat(self, params, expected_type, min_recall):
+        vectors = clustered_vectors(2000)
+        queries = vectors[:50]
+        exact, _ = build_index(vectors, {'index_type': 'flat'})
+        _, truth = exact.search(queries, 10)
+
+        index, built = build_index(vectors, dict(params, nprobe=16))
+        _, ids = index.search(queries, 10)
+        recall = np.mean([len(set(ids[i]) & set(truth[i])) / 10 for i in range(len(queries))])
+
+        assert type(index).__name__ == expected_type
+        assert built['index_type'] == params['index_type']
+        assert recall >= min_recall
+
+    def test_small_corpus_falls_back(self):
+        # Too few vectors to train PQ codebooks or 1024 IVF cells
+        index, built = build_index(clustered_vectors(300), {'index_type': 'ivf_pq', 'nlist': 1024, 'pq_m': 8})
+        assert built == {'index_type': 'ivf_flat', 'nlist': 7}
+
+        index, built = build_index(clustered_vectors(50), {'index_type': 'ivf_flat'})
+        assert built == {'index_type': 'flat'}
+        assert index.ntotal == 50
+
+    def test_config_validation(self):
+        with pytest.raises(ValueError):
+            index_params_from_config({'vector_store': {'index_type': 'annoy'}})
+        with pytest.raises(ValueError):
+            create_index(DIMENSION, {'index_type': 'ivf_pq', 'pq_m': 5}, 100000)
+
+        params = index_params_from_config({'vector_store': {'index_type': 'HNSW', 'ef_search': 99}})
+        assert params['index_type'] == 'hnsw'
+        assert params['ef_search'] == 99
+        assert params['nlist'] == DEFAULT_INDEX_PARAMS['nlist']
+
+    def test_vector_store_trains_ivf_on_first_add(self):
+        store = VectorStore(dimension=DIMENSION, index_type='ivf_flat', index_params={'nlist': 8, 'nprobe': 8})
+        store._encoder = fake_service()
+        assert not store.index.is_trained
+
+        documents = [f"code {i} " + ' '.join(f"term{(i * 7 + j) % 97}" for j in range(5)) for i in range(400)]
+        store.add_documents(documents, [{'code': str(i)} for i in range(400)])
+
+        assert store.get_stats()['index_build'] == {'index_type': 'ivf_flat', 'nlist': 8}
+        assert store.search(documents[3], k=1)[0]['metadata']['code'] == '3'
+
+    def test_persisted_build_and_query_params(self, kb_dir):
+        documents = [f"doc {i}" for i in range(2000)]
+        metadata = [{'code': str(i), 'description': '', 'type': 'ICD-10'} for i in range(2000)]
+        manifest = PersistedCodeIndex.build(
+            kb_dir / 'embeddings', 'icd10', documents, metadata, clustered_vectors(2000), 'hash',
+            index_params={'index_type': 'hnsw', 'hnsw_m': 8, 'ef_construction': 40}
+        )
+        assert manifest['index'] == {'index_type': 'hnsw', 'hnsw_m': 8, 'ef_construction': 40}
+
+        store = VectorStore.from_config({'vector_store': {'dimension': DIMENSION, 'index_type': 'hnsw',
+                                                          'ef_search': 77}})
+        assert store.load_persisted(kb_dir / 'embeddings', 'icd10', 'hash')
+
+        # ef_search comes from the current config, not from build time
+        assert store.index.hnsw.efSearch == 77
+        assert store.get_stats()['index_build']['index_type'] == 'hnsw'
+
+    def test_kb_manager_rebuilds_when_index_type_changes(self, kb_dir):
+        from medical_coding_ai.utils.kb_manager import KnowledgeBaseManager
+        manager = KnowledgeBaseManager()
+        manager.processed_dir = str(kb_dir)
+        manager.embeddings_dir = str(kb_dir / 'embeddings')
+        manager._encoder = FakeEncoder()
+        manager.config = {'vector_store': {'index_type': 'flat'}}
+
+        manager.create_embeddings('icd10')
+        encoded = manager._encoder.encoded
+        manager.config = {'vector_store': {'index_type': 'hnsw'}}
+        manager.create_embeddings('icd10')
+
+        assert manager._encoder.encoded == encoded * 2
+        manifest = json.loads((kb_dir / 'embeddings' / 'icd10_manifest.json').read_text())
+        assert manifest['index']['index_type'] == 'hnsw'